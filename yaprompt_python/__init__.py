@@ -1,6 +1,16 @@
-from .services.local_agent_orchestrator import local_agent_orchestrator
-from .services.work_product_manager import work_product_manager
-from .services.gemini_service import optimize_prompt
 from .config import Config
 
 __version__ = "0.1.0"
+
+# Resolved on first access so importing the package (and the API) stays cheap
+_LAZY_EXPORTS = {
+    'local_agent_orchestrator': '.services.local_agent_orchestrator',
+    'work_product_manager': '.services.work_product_manager',
+    'optimize_prompt': '.services.gemini_service',
+}
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        import importlib
+        return getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,38 +1,52 @@
-from fastapi import FastAPI, HTTPException, Body
+import json
+import asyncio
+from fastapi import FastAPI, HTTPException, Body, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional, Any, Dict
 
-# Existing imports
-from .services.local_agent_orchestrator import local_agent_orchestrator, ExecutionRequest
-from .services.work_product_manager import work_product_manager
-from .services.workflow_planner import PlanningOptions, workflow_planner
-from .services.agent_builder import agent_builder
-from .services.continuum_memory_system import continuum_memory_system
-from .services.project_manager import project_manager, Project
-from .services.cognitive_engine import cognitive_engine, PredictedNeed
+from .config import Config
 from .types import StoredAgent, WorkProduct, AgentConfig
-from .services.local_llm_service import local_llm_service, LLMResponse
-from .services.nested_learning_engine import nested_learning_engine
-from .services.knowledge_graph import knowledge_graph
-from .services.local_workflow_engine import local_workflow_engine
-from .services.conversational_agent_builder import conversational_agent_builder
-from .services.writing_style_engine import writing_style_engine
-from .services.persona_manager import persona_manager
-from .services.ai_operating_system import ai_operating_system
-from .services.teammate_engine import teammate_engine
-from .services.safe_action_approval import safe_action_approval
-from .services.workflow_detector import workflow_detector
-from .services.document_processor import document_processor
-from .services.agent_execution_engine import agent_execution_engine
-from .services.negotiation_engine import negotiation_engine
-from .services.business_automation import business_automation
-from .services.prompt_auto_optimizer import prompt_auto_optimizer
-from .services.rl_engine import rl_engine
-from .services.workflow_generator import workflow_generator
-from .services.pdf_generator import pdf_generator
-from .services.browser_automation import browser_automation
-from .types import Workflow, WorkflowExecutionResult
+from .services.container import services
+
+# Services are constructed on first use (or warmed at startup, see PRELOAD_SERVICES)
+local_agent_orchestrator = services.proxy('local_agent_orchestrator')
+work_product_manager = services.proxy('work_product_manager')
+workflow_planner = services.proxy('workflow_planner')
+agent_builder = services.proxy('agent_builder')
+continuum_memory_system = services.proxy('continuum_memory_system')
+project_manager = services.proxy('project_manager')
+cognitive_engine = services.proxy('cognitive_engine')
+local_llm_service = services.proxy('local_llm_service')
+nested_learning_engine = services.proxy('nested_learning_engine')
+knowledge_graph = services.proxy('knowledge_graph')
+local_workflow_engine = services.proxy('local_workflow_engine')
+conversational_agent_builder = services.proxy('conversational_agent_builder')
+writing_style_engine = services.proxy('writing_style_engine')
+persona_manager = services.proxy('persona_manager')
+ai_operating_system = services.proxy('ai_operating_system')
+teammate_engine = services.proxy('teammate_engine')
+safe_action_approval = services.proxy('safe_action_approval')
+workflow_detector = services.proxy('workflow_detector')
+document_processor = services.proxy('document_processor')
+agent_execution_engine = services.proxy('agent_execution_engine')
+negotiation_engine = services.proxy('negotiation_engine')
+business_automation = services.proxy('business_automation')
+prompt_auto_optimizer = services.proxy('prompt_auto_optimizer')
+rl_engine = services.proxy('rl_engine')
+workflow_generator = services.proxy('workflow_generator')
+pdf_generator = services.proxy('pdf_generator')
+browser_automation = services.proxy('browser_automation')
+
+from .services.job_queue import job_queue, Job
+from .services.progress_bus import progress_bus
+from .services.tracer import tracer
+from .services.failover_policy import failover_policy
+from .utils.metrics import metrics, MetricsMiddleware, render_histogram, sample
+from .utils.state_store import VersionConflict
+from .services.project_repository import TaskStatus
+from .types import Workflow, WorkflowExecutionResult, CognitiveEvent
 
 app = FastAPI(title="PromptForge AI Studio API")
 
@@ -45,6 +59,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(VersionConflict)
+async def version_conflict_handler(request, exc: VersionConflict):
+    # Another worker changed the same record first; the client should re-read and retry
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
+
 # === Request Models ===
 
 class CreateAgentRequest(BaseModel):
@@ -59,17 +80,26 @@ class ExecuteAgentRequest(BaseModel):
 
 class MemoryStoreRequest(BaseModel):
     data: Any
-    surpriseScore: float = 0.5
+    # Ignored: surprise is estimated server-side; kept so existing clients still validate
+    surpriseScore: Optional[float] = None
     metadata: Optional[Dict[str, Any]] = None
 
 class ProjectCreateRequest(BaseModel):
     goal: str
     deadline: Optional[float] = None
 
+class ProjectTaskUpdateRequest(BaseModel):
+    status: Optional[TaskStatus] = None
+    estimatedMinutes: Optional[int] = Field(default=None, ge=0)
+
 class LLMGenerateRequest(BaseModel):
     prompt: str
     options: Optional[Dict[str, Any]] = {}
 
+class LLMGenerateBatchRequest(BaseModel):
+    prompts: List[str]
+    options: Optional[Dict[str, Any]] = {}
+
 class KnowledgeNodeCreateRequest(BaseModel):
     type: str
     label: str
@@ -87,6 +117,27 @@ class WorkflowExecuteRequest(BaseModel):
     input: Any
     api_key: Optional[str] = None
 
+class WorkflowResumeRequest(BaseModel):
+    api_key: Optional[str] = None
+
+class JobSubmitRequest(BaseModel):
+    kind: str # 'workflow' | 'agent' | 'agent_config'
+    payload: Dict[str, Any]
+    priority: int = 0
+    tenant: str = 'default'
+    max_attempts: int = 3
+
+class RLReward(BaseModel):
+    actionId: str
+    value: float
+    context: str
+
+class RLRewardBatchRequest(BaseModel):
+    rewards: List[RLReward]
+
+class CognitiveEventsRequest(BaseModel):
+    events: List[CognitiveEvent]
+
 class BuilderStartRequest(BaseModel):
     description: str
 
@@ -132,7 +183,8 @@ async def create_agent(request: CreateAgentRequest):
     try:
         result = await agent_builder.from_prompt(request.description)
         if not result.success:
-            options = PlanningOptions() 
+            from .services.workflow_planner import PlanningOptions
+            options = PlanningOptions()
             agent = await local_agent_orchestrator.create_agent_from_description(
                 description=request.description,
                 name=request.name,
@@ -157,6 +209,7 @@ async def get_agent(agent_id: str):
 @app.post("/execute")
 async def execute_agent(request: ExecuteAgentRequest):
     try:
+        from .services.local_agent_orchestrator import ExecutionRequest
         req = ExecutionRequest(
             agent_id=request.agent_id,
             input_data=request.input,
@@ -174,12 +227,12 @@ async def execute_agent(request: ExecuteAgentRequest):
 @app.post("/memory/store")
 async def store_memory(request: MemoryStoreRequest):
     try:
-        mid = await continuum_memory_system.store_memory(
-            data=request.data,
-            surprise_score=request.surpriseScore,
-            metadata=request.metadata
-        )
-        return {"id": mid, "status": "stored"}
+        result = await continuum_memory_system.write_memory(request.data, request.metadata)
+        return {
+            "id": result.id,
+            "status": "merged" if result.merged else "stored",
+            "surpriseScore": result.surpriseScore
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -198,8 +251,8 @@ async def create_project(request: ProjectCreateRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/projects")
-async def list_projects():
-    return project_manager.get_all_projects()
+async def list_projects(offset: int = 0, limit: int = 50, status: Optional[str] = None):
+    return project_manager.list_projects(offset, limit, status)
 
 @app.get("/projects/{project_id}")
 async def get_project(project_id: str):
@@ -208,12 +261,71 @@ async def get_project(project_id: str):
         raise HTTPException(status_code=404, detail="Project not found")
     return project
 
+@app.get("/projects/{project_id}/summary")
+async def get_project_summary(project_id: str):
+    summary = project_manager.get_summary(project_id)
+    if not summary:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return summary
+
+@app.get("/projects/{project_id}/tasks")
+async def get_project_tasks(project_id: str, offset: int = 0, limit: int = 50):
+    page = project_manager.get_tasks(project_id, offset, limit)
+    if not page:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return page
+
+@app.get("/projects/{project_id}/schedule")
+async def get_project_schedule(project_id: str, workers: int = 1):
+    from .services.project_scheduler import DependencyCycle
+    try:
+        schedule = project_manager.get_schedule(project_id, workers)
+    except DependencyCycle as e:
+        raise HTTPException(status_code=422, detail={"message": str(e), "cycle": e.cycle})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return schedule
+
+@app.patch("/projects/{project_id}/tasks/{task_id}")
+async def update_project_task(project_id: str, task_id: str, request: ProjectTaskUpdateRequest):
+    from .services.project_manager import TaskUpdate
+    try:
+        task = project_manager.update_task(project_id, task_id, TaskUpdate(**request.model_dump()))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if not task:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return task
+
 # --- Cognitive Engine ---
 
+@app.post("/cognitive/events")
+async def ingest_cognitive_events(request: CognitiveEventsRequest):
+    try:
+        return {"ingested": cognitive_engine.ingest_events(request.events)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/cognitive/activity/import")
+async def import_cognitive_activity(request: Request, format: Optional[str] = None):
+    """Stream an NDJSON (default) or CSV activity log in the request body."""
+    fmt = format or ('csv' if 'csv' in request.headers.get('content-type', '') else 'ndjson')
+    if fmt not in ('ndjson', 'csv'):
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+    return await cognitive_engine.ingest_activity_stream(request.stream(), fmt)
+
+@app.get("/cognitive/activity/{subject}")
+async def cognitive_activity(subject: str):
+    analytics = cognitive_engine.get_activity_analytics(subject)
+    if not analytics:
+        raise HTTPException(status_code=404, detail="Subject not found")
+    return analytics
+
 @app.get("/cognitive/needs")
-async def predict_needs():
-    context = {"currentTime": 0} 
-    return cognitive_engine.predict_needs(context)
+async def predict_needs(currentTime: Optional[float] = None):
+    return cognitive_engine.predict_needs({"currentTime": currentTime})
 
 # --- LLM Service ---
 
@@ -221,6 +333,10 @@ async def predict_needs():
 async def llm_generate(request: LLMGenerateRequest):
     return await local_llm_service.generate(request.prompt, request.options)
 
+@app.post("/llm/generate_batch")
+async def llm_generate_batch(request: LLMGenerateBatchRequest):
+    return await local_llm_service.generate_batch(request.prompts, request.options)
+
 @app.get("/llm/models")
 async def llm_models():
     return await local_llm_service.list_models()
@@ -232,8 +348,12 @@ async def learning_process(data: Any = Body(...), context: str = None):
     return await nested_learning_engine.process_data(data, context)
 
 @app.get("/learning/patterns")
-async def learning_patterns(confidence: float = 0.7):
-    return await nested_learning_engine.detect_patterns(confidence)
+async def learning_patterns(confidence: float = 0.7, limit: int = 50):
+    return await nested_learning_engine.detect_patterns(confidence, limit)
+
+@app.get("/learning/stats")
+async def learning_stats():
+    return nested_learning_engine.get_stats()
 
 # --- Knowledge Graph ---
 
@@ -271,6 +391,232 @@ async def execute_workflow(request: WorkflowExecuteRequest):
     except Exception as e:
          raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/workflow/resume/{execution_id}")
+async def resume_workflow(execution_id: str, request: WorkflowResumeRequest = WorkflowResumeRequest()):
+    try:
+        return await local_workflow_engine.resume_workflow(execution_id, api_key=request.api_key)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# --- Background Jobs ---
+# Same work as /workflow/execute, /execute and /agent/execute, run by the job
+# queue so the request returns immediately with a job id.
+
+async def _run_workflow_job(job: Job, secrets: Dict[str, Any], on_progress):
+    # A retry resumes the execution started by the previous attempt
+    events = job_queue.get_events(job.id)
+    execution_id = next((e['executionId'] for e in reversed(events) if e.get('executionId')), None)
+    if execution_id:
+        result = await local_workflow_engine.resume_workflow(execution_id, secrets.get('api_key'), on_progress)
+    else:
+        workflow = Workflow(**job.payload['workflow'])
+        result = await local_workflow_engine.execute_workflow(
+            workflow, job.payload.get('input'), secrets.get('api_key'), on_progress
+        )
+    if result.status == 'error':
+        raise Exception(result.error or 'Workflow execution failed')
+    return result.model_dump()
+
+async def _run_agent_job(job: Job, secrets: Dict[str, Any], on_progress):
+    from .services.local_agent_orchestrator import ExecutionRequest
+    result = await local_agent_orchestrator.execute_agent(ExecutionRequest(
+        agent_id=job.payload['agent_id'],
+        input_data=job.payload.get('input'),
+        api_key=secrets.get('api_key'),
+        on_progress=on_progress
+    ))
+    if not result.success:
+        raise Exception(result.error)
+    return result.work_product.model_dump()
+
+async def _run_agent_config_job(job: Job, secrets: Dict[str, Any], on_progress):
+    work_product = await agent_execution_engine.execute_agent(
+        job.payload['agentConfig'], job.payload.get('input'), secrets.get('api_key'), on_progress
+    )
+    return work_product.model_dump()
+
+job_queue.register_handler('workflow', _run_workflow_job)
+job_queue.register_handler('agent', _run_agent_job)
+job_queue.register_handler('agent_config', _run_agent_config_job)
+
+@app.on_event("startup")
+async def start_job_queue():
+    await job_queue.start()
+
+@app.on_event("startup")
+async def preload_services():
+    if not Config.PRELOAD_SERVICES:
+        return
+    names = None if Config.PRELOAD_SERVICES == ['all'] else Config.PRELOAD_SERVICES
+    # Imports are blocking; keep them off the event loop
+    await asyncio.to_thread(services.warm, names)
+
+@app.on_event("shutdown")
+async def stop_job_queue():
+    await job_queue.stop()
+
+@app.on_event("shutdown")
+async def snapshot_rl_state():
+    if services.is_loaded('rl_engine'):
+        rl_engine.snapshot()
+
+@app.on_event("shutdown")
+async def stop_learning_scheduler():
+    if services.is_loaded('nested_learning_engine'):
+        await nested_learning_engine.stop()
+
+@app.get("/system/startup")
+async def startup_report():
+    return services.get_report()
+
+@app.post("/jobs")
+async def submit_job(request: JobSubmitRequest):
+    payload = dict(request.payload)
+    # Keys are handed to the worker in memory, never persisted with the job
+    api_key = payload.pop('api_key', None) or payload.pop('apiKey', None)
+    try:
+        return job_queue.submit(
+            request.kind,
+            payload,
+            priority=request.priority,
+            tenant=request.tenant,
+            max_attempts=request.max_attempts,
+            secrets={'api_key': api_key} if api_key else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 50):
+    return job_queue.list_jobs(status, limit)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_queue.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}/events")
+async def get_job_events(job_id: str):
+    if not job_queue.get_job(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_queue.get_events(job_id)
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = job_queue.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status in ('queued', 'running'):
+        raise HTTPException(status_code=409, detail=f"Job is still {job.status}")
+    return {"jobId": job.id, "status": job.status, "result": job.result, "error": job.error}
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    if not job_queue.get_job(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"cancelled": job_queue.cancel(job_id)}
+
+# --- Execution Progress ---
+# Server-sent events for a workflow/agent execution id or a job id. Recent
+# events are replayed first; EventSource reconnects resume via Last-Event-ID.
+
+@app.get("/executions/{execution_id}/events")
+async def execution_events(execution_id: str, after: int = 0, last_event_id: Optional[str] = Header(None)):
+    if last_event_id and last_event_id.isdigit():
+        after = max(after, int(last_event_id))
+
+    async def stream():
+        async for event in progress_bus.subscribe(execution_id, after):
+            yield f"id: {event['seq']}\nevent: progress\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/executions/{execution_id}/events/recent")
+async def execution_recent_events(execution_id: str, after: int = 0):
+    return progress_bus.recent(execution_id, after)
+
+# --- Tracing ---
+# Trace ids are execution ids (or job ids for queued runs)
+
+@app.get("/traces")
+async def list_traces(limit: int = 50):
+    return tracer.list_traces(limit)
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    spans = tracer.get_trace(trace_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return spans
+
+@app.get("/traces/{trace_id}/flame")
+async def trace_flame(trace_id: str):
+    if not tracer.get_trace(trace_id):
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return tracer.flame_summary(trace_id)
+
+@app.post("/traces/{trace_id}/export")
+async def export_trace(trace_id: str):
+    if not tracer.get_trace(trace_id):
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return {
+        "json": str(tracer.export_json(trace_id)),
+        "otlp": str(tracer.export_otlp(trace_id))
+    }
+
+# --- Metrics ---
+
+def _collect_service_metrics():
+    # Provider latency as seen by the failover policy (workflow and LLM service fallbacks)
+    yield "# HELP promptforge_provider_latency_seconds Provider call latency recorded by the failover policy"
+    yield "# TYPE promptforge_provider_latency_seconds histogram"
+    for key, hist in failover_policy.histograms.items():
+        yield from render_histogram(
+            'promptforge_provider_latency_seconds', ('provider',), (key,),
+            [b / 1000 for b in hist.buckets], hist.counts, hist.total / 1000, hist.count
+        )
+    yield "# HELP promptforge_provider_failures_total Provider failures recorded by the failover policy"
+    yield "# TYPE promptforge_provider_failures_total counter"
+    for key, breaker in failover_policy.breakers.items():
+        yield sample('promptforge_provider_failures_total', breaker.total_failures, provider=key)
+    yield "# HELP promptforge_provider_circuit_open Whether the provider circuit breaker is open"
+    yield "# TYPE promptforge_provider_circuit_open gauge"
+    for key, breaker in failover_policy.breakers.items():
+        yield sample('promptforge_provider_circuit_open', 1 if breaker.state == 'open' else 0, provider=key)
+
+    yield "# HELP promptforge_jobs Jobs in the background queue by status"
+    yield "# TYPE promptforge_jobs gauge"
+    for status, count in job_queue.get_stats()['byStatus'].items():
+        yield sample('promptforge_jobs', count, status=status)
+
+    bus = progress_bus.get_stats()
+    yield "# HELP promptforge_progress_subscribers Live progress event subscribers"
+    yield "# TYPE promptforge_progress_subscribers gauge"
+    yield sample('promptforge_progress_subscribers', bus['subscribers'])
+    yield "# HELP promptforge_progress_events_dropped_total Events dropped for slow subscribers"
+    yield "# TYPE promptforge_progress_events_dropped_total counter"
+    yield sample('promptforge_progress_events_dropped_total', bus['dropped'])
+
+    # Scraping should not be what loads the memory file
+    if services.is_loaded('continuum_memory_system'):
+        yield "# HELP promptforge_memories Memories held by the continuum memory system"
+        yield "# TYPE promptforge_memories gauge"
+        yield sample('promptforge_memories', len(continuum_memory_system.store.memories))
+
+metrics.register_collector(_collect_service_metrics)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # --- Conversational Builder ---
 
 # Duplicate endpoints removed. See lines 475+ for correct implementation.
@@ -394,9 +740,22 @@ async def rl_reward(data: Dict[str, Any]):
     rl_engine.record_reward(data['actionId'], data['value'], data['context'])
     return {"status": "ok"}
 
+@app.post("/rl/reward/batch")
+async def rl_reward_batch(request: RLRewardBatchRequest):
+    rewards = request.rewards
+    try:
+        return rl_engine.record_rewards(
+            [r.actionId for r in rewards], [r.value for r in rewards], [r.context for r in rewards]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/rl/select")
 async def rl_select(data: Dict[str, Any]):
-    return {"action": rl_engine.select_action(data['actions'], data['context'])}
+    try:
+        return {"action": rl_engine.select_action(data['actions'], data['context'], data.get('strategy'))}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/rl/stats")
 async def rl_stats():
@@ -418,6 +777,10 @@ async def pdf_generate(data: Dict[str, Any]):
 async def optimize_prompt_endpoint(data: Dict[str, Any]):
     return await prompt_auto_optimizer.optimize_prompt(data['prompt'], data.get('options', {}))
 
+@app.post("/optimizer/optimize_batch")
+async def optimize_prompts_endpoint(data: Dict[str, Any]):
+    return await prompt_auto_optimizer.optimize_prompts(data['prompts'], data.get('options', {}))
+
 # --- Frontend Serving (Template Engine) ---
 
 from fastapi.templating import Jinja2Templates
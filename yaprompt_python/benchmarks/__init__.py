@@ -0,0 +1,7 @@
+"""
+Performance benchmarks for the workflow engine and memory system.
+
+Run a suite as a module, e.g. `python -m yaprompt_python.benchmarks.workflow_bench`.
+Each suite writes a JSON report that can be passed back with `--compare`
+to fail on regressions against a saved baseline.
+"""
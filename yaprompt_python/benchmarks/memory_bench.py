@@ -0,0 +1,253 @@
+"""
+Continuum Memory Benchmark
+Measures ContinuumMemorySystem end to end at increasing memory counts
+
+For each size, synthetic memories from `seed_data.generate_mock_memories`
+are written through the real JSON persistence path, then the suite
+measures save/load time, file size and RSS, `retrieve` latency and
+recall@k, `store_memory` latency and consolidation time.
+
+Recall uses planted "needle" memories: each query has k memories that
+share a unique token, and recall@k is the fraction of them returned in
+the top k.
+
+Store and consolidation can take minutes at large sizes, so they run in a
+child process with a timeout. A phase that times out is reported as such
+instead of stalling the run.
+
+    python -m yaprompt_python.benchmarks.memory_bench --sizes 1000,10000,100000
+"""
+
+import gc
+import os
+import sys
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..config import Config
+from .. import seed_data
+from ..services.continuum_memory_system import (
+    ContinuumMemorySystem, Memory, MemoryMetadata, CONSOLIDATION_THRESHOLD
+)
+from .report import (
+    latency_summary, current_rss_kb, build_report, save_report, print_table, check_baseline
+)
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_OUT = Config.DATA_DIR / 'benchmarks' / 'memory.json'
+NEEDLES_PER_QUERY = 5
+
+LOWER_IS_BETTER = (
+    'saveSec', 'loadSec', 'fileSizeBytes', 'rssKb', 'retrieveP50Ms', 'retrieveP99Ms',
+    'storeP50Ms', 'storeP99Ms', 'consolidationSec'
+)
+HIGHER_IS_BETTER = ('recallAtK',)
+
+# ============================================================================
+# SEEDING
+# ============================================================================
+
+def _needle_token(query: int) -> str:
+    return f"needle{query}zq"
+
+def seed_memories(cms: ContinuumMemorySystem, count: int, queries: int, seed: int) -> Dict[str, List[str]]:
+    """
+    Populate `cms.store` with `count` memories (bypassing the per-write save,
+    which would make seeding quadratic) and return needle ids per query token.
+    """
+    mocks = seed_data.generate_mock_memories(count, seed=seed, spread_days=60)
+    needles: Dict[str, List[str]] = {}
+
+    # The last queries * k memories become needles for the recall queries
+    needle_start = max(0, count - queries * NEEDLES_PER_QUERY)
+    for i, mock in enumerate(mocks):
+        content = mock['content']
+        if i >= needle_start:
+            token = _needle_token((i - needle_start) // NEEDLES_PER_QUERY)
+            content = f"{token} {content}"
+            needles.setdefault(token, []).append(mock['id'])
+
+        cms.store.memories[mock['id']] = Memory(
+            id=mock['id'],
+            data=content,
+            surpriseScore=mock['confidence'],
+            embedding=cms._generate_embedding(content),
+            metadata=MemoryMetadata(
+                timestamp=mock['timestamp'],
+                lastAccessed=mock['timestamp'],
+                context=mock['topic']
+            )
+        )
+    return needles
+
+# ============================================================================
+# CHILD-PROCESS PHASES
+# ============================================================================
+
+def _phase_worker(phase: str, db_path: str, writes: int, seed: int, results):
+    cms = ContinuumMemorySystem(db_path=db_path)
+    before = len(cms.store.memories)
+    mocks = seed_data.generate_mock_memories(writes, seed=seed + 1)
+
+    async def run() -> Dict[str, Any]:
+        if phase == 'store':
+            samples, merged = [], 0
+            for mock in mocks:
+                start = time.perf_counter()
+                result = await cms.write_memory(mock['content'], {"context": mock['topic']})
+                samples.append((time.perf_counter() - start) * 1000)
+                merged += result.merged
+            return {"samples": samples, "merged": merged}
+        start = time.perf_counter()
+        await cms.consolidate()
+        return {"seconds": time.perf_counter() - start}
+
+    outcome = asyncio.run(run())
+    outcome.update({
+        "before": before,
+        "after": len(cms.store.memories),
+        "clusters": len(cms.store.clusters)
+    })
+    results.put(outcome)
+
+def run_phase(phase: str, source_db: Path, writes: int, seed: int, timeout: float) -> Dict[str, Any]:
+    """Run a phase on a private copy of the DB in a child process."""
+    db_copy = source_db.with_name(f"{phase}_{source_db.name}")
+    shutil.copyfile(source_db, db_copy)
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    process = ctx.Process(target=_phase_worker, args=(phase, str(db_copy), writes, seed, results))
+    process.start()
+    try:
+        outcome = results.get(timeout=timeout)
+    except Exception:
+        outcome = {"timedOut": True, "timeoutSec": timeout}
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+        db_copy.unlink(missing_ok=True)
+    return outcome
+
+# ============================================================================
+# HARNESS
+# ============================================================================
+
+async def bench_size(
+    count: int,
+    work_dir: Path,
+    queries: int = 10,
+    writes: int = 5,
+    phase_timeout: float = 120.0,
+    seed: int = 7,
+    log=print
+) -> Dict[str, Any]:
+    db_path = work_dir / f"memory_{count}.json"
+    result: Dict[str, Any] = {"memories": count}
+
+    # Seed and persist
+    seeder = ContinuumMemorySystem(db_path=str(db_path))
+    start = time.perf_counter()
+    needles = seed_memories(seeder, count, queries, seed)
+    result["seedSec"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    seeder._save_db()
+    result["saveSec"] = time.perf_counter() - start
+    result["fileSizeBytes"] = os.path.getsize(db_path)
+    del seeder
+    gc.collect()
+
+    # Cold load through the normal constructor
+    rss_before = current_rss_kb()
+    start = time.perf_counter()
+    cms = ContinuumMemorySystem(db_path=str(db_path))
+    result["loadSec"] = time.perf_counter() - start
+    rss_after = current_rss_kb()
+    result["rssKb"] = (rss_after - rss_before) if rss_after is not None and rss_before is not None else None
+
+    # Retrieval latency and recall@k (retrieve also persists access counts)
+    latencies, hits, wanted = [], 0, 0
+    for token, ids in needles.items():
+        start = time.perf_counter()
+        found = await cms.retrieve(token, limit=NEEDLES_PER_QUERY)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len({m.id for m in found} & set(ids))
+        wanted += len(ids)
+    summary = latency_summary(latencies)
+    result["retrieveP50Ms"] = summary["p50Ms"]
+    result["retrieveP99Ms"] = summary["p99Ms"]
+    result["recallAtK"] = hits / wanted if wanted else None
+    del cms
+    gc.collect()
+
+    log(f"  n={count}: store phase...")
+    store = run_phase('store', db_path, writes, seed, phase_timeout)
+    if store.get("timedOut"):
+        result["storeTimedOut"] = True
+    else:
+        summary = latency_summary(store["samples"])
+        result["storeP50Ms"] = summary["p50Ms"]
+        result["storeP99Ms"] = summary["p99Ms"]
+        result["storeTriggersConsolidation"] = count + 1 > CONSOLIDATION_THRESHOLD
+        result["countAfterStores"] = store["after"]
+        result["mergedWrites"] = store["merged"]
+
+    log(f"  n={count}: consolidation phase...")
+    consolidation = run_phase('consolidate', db_path, 0, seed, phase_timeout)
+    if consolidation.get("timedOut"):
+        result["consolidationTimedOut"] = True
+    else:
+        result["consolidationSec"] = consolidation["seconds"]
+        result["countAfterConsolidation"] = consolidation["after"]
+        result["clustersAfterConsolidation"] = consolidation["clusters"]
+
+    db_path.unlink(missing_ok=True)
+    return result
+
+async def run_benchmarks(
+    sizes: List[int] = DEFAULT_SIZES,
+    queries: int = 10,
+    writes: int = 5,
+    phase_timeout: float = 120.0,
+    seed: int = 7,
+    log=print
+) -> Dict[str, Any]:
+    config = {"sizes": sizes, "queries": queries, "writes": writes, "phaseTimeoutSec": phase_timeout, "seed": seed}
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for count in sizes:
+            log(f"Benchmarking {count} memories...")
+            results[f"n_{count}"] = await bench_size(count, Path(work_dir), queries, writes, phase_timeout, seed, log)
+    return build_report('memory', config, results)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ContinuumMemorySystem at increasing sizes")
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES), help="comma-separated memory counts")
+    parser.add_argument('--queries', type=int, default=10, help="recall queries per size")
+    parser.add_argument('--writes', type=int, default=5, help="store_memory calls timed per size")
+    parser.add_argument('--phase-timeout', type=float, default=120.0, help="seconds before a store/consolidation phase is abandoned")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--out', type=Path, default=DEFAULT_OUT, help="where to write the JSON report")
+    parser.add_argument('--compare', type=Path, help="baseline report to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    report = asyncio.run(run_benchmarks(sizes, args.queries, args.writes, args.phase_timeout, args.seed))
+    print_table(report['results'], ['saveSec', 'loadSec', 'retrieveP50Ms', 'recallAtK', 'storeP50Ms', 'consolidationSec'])
+    save_report(report, args.out)
+    return check_baseline(
+        report, args.compare, args.tolerance,
+        lower_is_better=LOWER_IS_BETTER, higher_is_better=HIGHER_IS_BETTER
+    )
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Benchmark Reports
+Shared measurement, JSON report and baseline comparison helpers
+"""
+
+import os
+import sys
+import math
+import json
+import time
+import platform
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+def percentile(samples: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile (0-100)."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(len(ordered) * p / 100))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def latency_summary(samples_ms: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "p50Ms": percentile(samples_ms, 50),
+        "p99Ms": percentile(samples_ms, 99),
+        "meanMs": sum(samples_ms) / len(samples_ms) if samples_ms else None,
+        "maxMs": max(samples_ms) if samples_ms else None
+    }
+
+def current_rss_kb() -> Optional[int]:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def peak_rss_kb() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def build_report(suite: str, config: Dict[str, Any], results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "suite": suite,
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": config
+        },
+        "results": results
+    }
+
+def save_report(report: Dict[str, Any], path: Path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {path}")
+
+def compare_reports(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float = 0.2,
+    lower_is_better: tuple = ('p50Ms', 'p99Ms'),
+    higher_is_better: tuple = ('throughputPerSec',)
+) -> List[str]:
+    """Return one message per metric that regressed by more than `tolerance`."""
+    regressions = []
+    for name, base in baseline.get('results', {}).items():
+        result = current.get('results', {}).get(name)
+        if result is None:
+            continue
+        for metric in lower_is_better:
+            old, new = base.get(metric), result.get(metric)
+            if old and new is not None and new > old * (1 + tolerance):
+                regressions.append(f"{name}.{metric}: {old:.2f} -> {new:.2f}")
+        for metric in higher_is_better:
+            old, new = base.get(metric), result.get(metric)
+            if old and new is not None and new < old * (1 - tolerance):
+                regressions.append(f"{name}.{metric}: {old:.2f} -> {new:.2f}")
+    return regressions
+
+def print_table(results: Dict[str, Dict[str, Any]], columns: List[str]):
+    print(f"{'scenario':<28}" + ''.join(f"{c:>16}" for c in columns))
+    for name, row in results.items():
+        cells = []
+        for c in columns:
+            value = row.get(c)
+            cells.append(f"{value:>16.2f}" if isinstance(value, float) else f"{str(value):>16}")
+        print(f"{name:<28}" + ''.join(cells))
+
+def check_baseline(report: Dict[str, Any], baseline_path: Optional[Path], tolerance: float, **kwargs) -> int:
+    """Compare against a saved baseline; returns a process exit code."""
+    if not baseline_path:
+        return 0
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_reports(report, baseline, tolerance, **kwargs)
+    if regressions:
+        print(f"Regressions beyond {tolerance:.0%} against {baseline_path}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"No regressions beyond {tolerance:.0%} against {baseline_path}")
+    return 0
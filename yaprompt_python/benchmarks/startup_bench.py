@@ -0,0 +1,120 @@
+"""
+API Startup Benchmark
+Reports what importing the API and loading each service costs
+
+Import cost per module comes from `python -X importtime` on a fresh
+interpreter. Each service is then loaded through the service container
+in its own fresh interpreter, so the number is that service's cold cost
+including everything it imports, independent of load order.
+
+    python -m yaprompt_python.benchmarks.startup_bench --top 25
+"""
+
+import re
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..config import Config
+from ..services.container import SERVICE_MODULES
+from .report import build_report, save_report, print_table, check_baseline
+
+DEFAULT_OUT = Config.DATA_DIR / 'benchmarks' / 'startup.json'
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# ============================================================================
+# MEASUREMENT
+# ============================================================================
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse `-X importtime` output into per-module self/cumulative ms."""
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules.append({
+            "module": name,
+            "selfMs": int(self_us) / 1000,
+            "cumulativeMs": int(cumulative_us) / 1000,
+            "depth": (len(indent) - 1) // 2
+        })
+    return modules
+
+def measure_import(module: str = 'yaprompt_python.api') -> Dict[str, Any]:
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+    modules = parse_importtime(proc.stderr)
+    total = next((m['cumulativeMs'] for m in modules if m['module'] == module), None)
+    return {"module": module, "totalMs": total, "modules": modules}
+
+_SERVICE_PROBE = """
+import json, time
+import yaprompt_python.api
+from yaprompt_python.services.container import services
+services.get({name!r})
+print(json.dumps(services.get_report()['loaded'][0]))
+"""
+
+def measure_service(name: str) -> Dict[str, Any]:
+    """Cold-load one service after the API import, in a fresh interpreter."""
+    proc = subprocess.run(
+        [sys.executable, '-c', _SERVICE_PROBE.format(name=name)],
+        capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        return {"name": name, "error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+# ============================================================================
+# HARNESS
+# ============================================================================
+
+def run_benchmarks(top: int = 20, services: Optional[List[str]] = None, log=print) -> Dict[str, Any]:
+    log("Measuring API import...")
+    api = measure_import()
+    heaviest = sorted(api['modules'], key=lambda m: m['selfMs'], reverse=True)[:top]
+
+    results: Dict[str, Dict[str, Any]] = {"api_import": {"totalMs": api['totalMs'], "moduleCount": len(api['modules'])}}
+    for name in services or list(SERVICE_MODULES):
+        log(f"Loading {name}...")
+        load = measure_service(name)
+        results[f"service:{name}"] = {
+            "totalMs": load.get('loadMs'),
+            "moduleCount": load.get('newModules'),
+            "heaviestPackages": load.get('heaviestPackages'),
+            "error": load.get('error')
+        }
+
+    report = build_report('startup', {"top": top}, results)
+    report['heaviestModules'] = heaviest
+    return report
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Report API import and per-service load cost")
+    parser.add_argument('--top', type=int, default=20, help="modules to list by self import time")
+    parser.add_argument('--service', action='append', dest='services', help="only measure these services")
+    parser.add_argument('--out', type=Path, default=DEFAULT_OUT, help="where to write the JSON report")
+    parser.add_argument('--compare', type=Path, help="baseline report to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.3, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.top, args.services)
+    print(f"{'module':<60}{'selfMs':>10}{'cumulativeMs':>14}")
+    for m in report['heaviestModules']:
+        print(f"{m['module']:<60}{m['selfMs']:>10.1f}{m['cumulativeMs']:>14.1f}")
+    print()
+    print_table(report['results'], ['totalMs', 'moduleCount'])
+    save_report(report, args.out)
+    return check_baseline(report, args.compare, args.tolerance, lower_is_better=('totalMs',), higher_is_better=())
+
+if __name__ == "__main__":
+    sys.exit(main())
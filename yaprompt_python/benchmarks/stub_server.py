@@ -0,0 +1,75 @@
+"""
+Stub LLM / HTTP Server
+Local stand-in for LLM providers and HTTP APIs during benchmarks
+
+Serves an OpenAI-compatible `/v1/chat/completions` endpoint and a generic
+JSON `/http/{path}` endpoint, both with configurable latency, jitter and
+failure rate, so runs are repeatable and cost nothing.
+"""
+
+import random
+import asyncio
+from typing import Optional
+from aiohttp import web
+
+class StubServer:
+    def __init__(self, latency_ms: float = 50.0, jitter_ms: float = 10.0, failure_rate: float = 0.0, seed: int = 42):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.failures = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.port: Optional[int] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post('/v1/chat/completions', self._chat)
+        app.router.add_route('*', '/http/{path:.*}', self._http)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _delay_or_fail(self) -> bool:
+        self.requests += 1
+        delay = max(0.0, self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms))
+        await asyncio.sleep(delay / 1000)
+        if self.random.random() < self.failure_rate:
+            self.failures += 1
+            return False
+        return True
+
+    async def _chat(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if not await self._delay_or_fail():
+            return web.json_response({"error": "stub failure"}, status=500)
+        prompt = body['messages'][-1]['content']
+        return web.json_response({
+            "model": body.get('model', 'stub'),
+            "choices": [{"message": {"role": "assistant", "content": f"stub reply to {len(prompt)} chars"}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 8, "total_tokens": len(prompt) // 4 + 8}
+        })
+
+    async def _http(self, request: web.Request) -> web.Response:
+        if not await self._delay_or_fail():
+            return web.json_response({"error": "stub failure"}, status=503)
+        return web.json_response({"path": request.match_info['path'], "items": list(range(10))})
@@ -0,0 +1,229 @@
+"""
+Workflow Engine Benchmark
+Runs synthetic workflow graphs through LocalWorkflowEngine against the stub server
+
+Scenarios cover sequential chains, fan-out/fan-in, loops over N items,
+conditionals and HTTP chains. Every scenario goes through the real engine
+path (templates, sandbox, failover, journal, progress, tracing); only the
+providers are replaced by the local stub.
+
+    python -m yaprompt_python.benchmarks.workflow_bench --runs 50 --latency-ms 40
+    python -m yaprompt_python.benchmarks.workflow_bench --compare baseline.json
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from ..config import Config
+from ..types import Workflow
+from ..services import local_workflow_engine as engine_module
+from ..services.local_workflow_engine import LocalWorkflowEngine
+from ..services.execution_journal import ExecutionJournal
+from ..services.failover_policy import failover_policy
+from .stub_server import StubServer
+from .report import (
+    latency_summary, current_rss_kb, peak_rss_kb, build_report, save_report,
+    print_table, check_baseline
+)
+
+STUB_PROVIDERS = ['stub_a', 'stub_b']
+DEFAULT_OUT = Config.DATA_DIR / 'benchmarks' / 'workflow.json'
+
+# ============================================================================
+# SYNTHETIC GRAPHS
+# ============================================================================
+
+def _llm(node_id: str, step: int) -> Dict[str, Any]:
+    return {"id": node_id, "type": "llm_call", "name": f"LLM {node_id}",
+            "config": {"prompt": f"Step {step}: summarize {{{{input}}}}"}}
+
+def _transform(node_id: str, script: str = "return {'ok': True}") -> Dict[str, Any]:
+    return {"id": node_id, "type": "transform_data", "name": f"Transform {node_id}",
+            "config": {"transformScript": script}}
+
+def _http(node_id: str, base_url: str) -> Dict[str, Any]:
+    return {"id": node_id, "type": "http_request", "name": f"HTTP {node_id}",
+            "config": {"url": f"{base_url}/http/items/{{{{input}}}}", "method": "GET"}}
+
+def _workflow(workflow_id: str, nodes: List[Dict[str, Any]], edges: List[tuple]) -> Workflow:
+    return Workflow(**{
+        "id": workflow_id,
+        "name": workflow_id,
+        "description": "Synthetic benchmark workflow",
+        "nodes": nodes,
+        "connections": [{"from": a, "to": b} for a, b in edges],
+        "startNode": nodes[0]["id"],
+        "metadata": {"createdAt": 0, "lastModified": 0, "version": "bench"}
+    })
+
+def chain_workflow(length: int) -> Workflow:
+    """Alternating LLM and transform nodes in a straight line."""
+    nodes = [_llm(f"n{i}", i) if i % 2 == 0 else _transform(f"n{i}") for i in range(length)]
+    edges = [(f"n{i}", f"n{i + 1}") for i in range(length - 1)]
+    return _workflow(f"chain_{length}", nodes, edges)
+
+def fanout_workflow(width: int) -> Workflow:
+    """One source fanning out to `width` LLM branches that all feed a join."""
+    nodes = [_transform("src")] + [_llm(f"b{i}", i) for i in range(width)] + [_transform("join")]
+    edges = [("src", f"b{i}") for i in range(width)] + [(f"b{i}", "join") for i in range(width)]
+    return _workflow(f"fanout_{width}", nodes, edges)
+
+def loop_workflow(items: int, concurrency: int) -> Workflow:
+    """A loop over `items` generated items with an LLM body."""
+    nodes = [
+        _transform("src", f"return {{'items': list(range({items}))}}"),
+        {"id": "loop", "type": "loop", "name": "Loop",
+         "config": {"items": "$nodes.src.items", "loopNode": "body", "concurrency": concurrency}},
+        _llm("body", 0)
+    ]
+    return _workflow(f"loop_{items}_c{concurrency}", nodes, [("src", "loop")])
+
+def conditional_workflow(base_url: str) -> Workflow:
+    """Even inputs take the HTTP branch, odd inputs the LLM branch."""
+    nodes = [
+        _transform("src", "return {'value': input['input']}"),
+        {"id": "cond", "type": "conditional", "name": "Branch",
+         "config": {"condition": "input['input'] % 2 == 0", "trueNode": "fetch", "falseNode": "ask"}},
+        _http("fetch", base_url),
+        _llm("ask", 0)
+    ]
+    return _workflow("conditional", nodes, [("src", "cond")])
+
+def http_chain_workflow(length: int, base_url: str) -> Workflow:
+    nodes = [_http(f"h{i}", base_url) for i in range(length)]
+    edges = [(f"h{i}", f"h{i + 1}") for i in range(length - 1)]
+    return _workflow(f"http_chain_{length}", nodes, edges)
+
+def build_scenarios(base_url: str, quick: bool = False) -> Dict[str, Workflow]:
+    scale = 0.2 if quick else 1.0
+    size = lambda n: max(2, int(n * scale))
+    scenarios = [
+        chain_workflow(size(10)),
+        fanout_workflow(size(8)),
+        loop_workflow(size(50), 8),
+        conditional_workflow(base_url),
+        http_chain_workflow(size(5), base_url),
+    ]
+    return {w.id: w for w in scenarios}
+
+# ============================================================================
+# HARNESS
+# ============================================================================
+
+@contextmanager
+def stub_providers(engine: LocalWorkflowEngine, base_url: str, journal_dir: Path):
+    """Point the engine's LLM fallbacks at the stub and journal into a scratch dir."""
+    saved = (Config.GEMINI_API_KEY, Config.FALLBACK_KEYS, engine_module.execution_journal)
+    url = f"{base_url}/v1/chat/completions"
+    engine.FALLBACK_PROVIDERS = {name: (url, 'stub-model', 'stub-model') for name in STUB_PROVIDERS}
+    engine.FALLBACK_ORDER = list(STUB_PROVIDERS)
+    Config.GEMINI_API_KEY = None
+    Config.FALLBACK_KEYS = {name: 'stub-key' for name in STUB_PROVIDERS}
+    engine_module.execution_journal = ExecutionJournal(journal_dir)
+    try:
+        yield
+    finally:
+        Config.GEMINI_API_KEY, Config.FALLBACK_KEYS, engine_module.execution_journal = saved
+
+def _reset_stub_failover_state():
+    for table in (failover_policy.histograms, failover_policy.breakers):
+        for key in [k for k in table if any(name in k for name in STUB_PROVIDERS)]:
+            del table[key]
+
+async def run_scenario(
+    engine: LocalWorkflowEngine,
+    workflow: Workflow,
+    stub: StubServer,
+    runs: int,
+    concurrency: int
+) -> Dict[str, Any]:
+    _reset_stub_failover_state()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+    requests_before = stub.requests
+    rss_before = current_rss_kb()
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            result = await engine.execute_workflow(workflow, i)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if result.status == 'error':
+                errors += 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(runs)))
+    wall = time.perf_counter() - wall_start
+
+    rss_after = current_rss_kb()
+    return {
+        "runs": runs,
+        "errors": errors,
+        "nodes": len(workflow.nodes),
+        "stubRequests": stub.requests - requests_before,
+        "wallSec": wall,
+        "throughputPerSec": runs / wall if wall else None,
+        **latency_summary(latencies),
+        "rssPeakKb": peak_rss_kb(),
+        "rssDeltaKb": (rss_after - rss_before) if rss_after is not None and rss_before is not None else None
+    }
+
+async def run_benchmarks(
+    runs: int = 20,
+    concurrency: int = 4,
+    latency_ms: float = 50.0,
+    jitter_ms: float = 10.0,
+    failure_rate: float = 0.0,
+    scenarios: Optional[List[str]] = None,
+    quick: bool = False,
+    log: Callable[[str], None] = print
+) -> Dict[str, Any]:
+    config = {
+        "runs": runs, "concurrency": concurrency, "latencyMs": latency_ms,
+        "jitterMs": jitter_ms, "failureRate": failure_rate, "quick": quick
+    }
+    results: Dict[str, Dict[str, Any]] = {}
+    engine = LocalWorkflowEngine()
+
+    async with StubServer(latency_ms, jitter_ms, failure_rate) as stub:
+        with tempfile.TemporaryDirectory() as journal_dir, stub_providers(engine, stub.base_url, Path(journal_dir)):
+            for name, workflow in build_scenarios(stub.base_url, quick).items():
+                if scenarios and name not in scenarios:
+                    continue
+                log(f"Running {name} ({runs} runs, concurrency {concurrency})...")
+                results[name] = await run_scenario(engine, workflow, stub, runs, concurrency)
+
+    return build_report('workflow', config, results)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark LocalWorkflowEngine on synthetic workflows")
+    parser.add_argument('--runs', type=int, default=20, help="executions per scenario")
+    parser.add_argument('--concurrency', type=int, default=4, help="executions in flight at once")
+    parser.add_argument('--latency-ms', type=float, default=50.0, help="stub response latency")
+    parser.add_argument('--jitter-ms', type=float, default=10.0, help="uniform +/- jitter on stub latency")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="fraction of stub calls that fail")
+    parser.add_argument('--scenario', action='append', dest='scenarios', help="run only these scenarios")
+    parser.add_argument('--quick', action='store_true', help="smaller graphs, for smoke runs")
+    parser.add_argument('--out', type=Path, default=DEFAULT_OUT, help="where to write the JSON report")
+    parser.add_argument('--compare', type=Path, help="baseline report to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_benchmarks(
+        args.runs, args.concurrency, args.latency_ms, args.jitter_ms,
+        args.failure_rate, args.scenarios, args.quick
+    ))
+    print_table(report['results'], ['throughputPerSec', 'p50Ms', 'p99Ms', 'errors', 'rssPeakKb'])
+    save_report(report, args.out)
+    return check_baseline(report, args.compare, args.tolerance)
+
+if __name__ == "__main__":
+    sys.exit(main())
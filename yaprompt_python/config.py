@@ -29,14 +29,35 @@ class Config:
         'generic': os.getenv('FALLBACK_GENERIC_KEY'),
     }
     
+    # Services constructed at API startup instead of on first use ("all" for every service)
+    PRELOAD_SERVICES = [s.strip() for s in os.getenv('PRELOAD_SERVICES', '').split(',') if s.strip()]
+
+    # Shared service state: 'memory' (single worker), 'sqlite' or 'redis' (multiple workers)
+    STATE_BACKEND = os.getenv('STATE_BACKEND', 'memory')
+    STATE_REDIS_URL = os.getenv('STATE_REDIS_URL', 'redis://localhost:6379/0')
+
     # Storage paths
     DATA_DIR = Path.home() / '.yaprompt_data'
     AGENTS_FILE = DATA_DIR / 'agents.json'
     WORK_PRODUCTS_DIR = DATA_DIR / 'work_products'
+    EXECUTIONS_DIR = DATA_DIR / 'executions'
+    TRACES_DIR = DATA_DIR / 'traces'
+    # Journals of failed/interrupted executions are kept this long for resume
+    EXECUTION_JOURNAL_RETENTION_DAYS = float(os.getenv('EXECUTION_JOURNAL_RETENTION_DAYS', '7'))
+    RL_STATE_DIR = DATA_DIR / 'rl'
+    # Projects persist here unless STATE_BACKEND is already durable
+    PROJECTS_DB = DATA_DIR / 'projects.sqlite3'
+    # Refine keyword-template project plans with an LLM in the background
+    LLM_GOAL_DECOMPOSITION = os.getenv('LLM_GOAL_DECOMPOSITION', '1') != '0'
+    # fsync every reward batch; turn off to trade power-loss safety for latency
+    RL_WAL_FSYNC = os.getenv('RL_WAL_FSYNC', '1') != '0'
     
     @classmethod
     def ensure_dirs(cls):
         cls.DATA_DIR.mkdir(parents=True, exist_ok=True)
         cls.WORK_PRODUCTS_DIR.mkdir(parents=True, exist_ok=True)
+        cls.EXECUTIONS_DIR.mkdir(parents=True, exist_ok=True)
+        cls.TRACES_DIR.mkdir(parents=True, exist_ok=True)
+        cls.RL_STATE_DIR.mkdir(parents=True, exist_ok=True)
 
 Config.ensure_dirs()
@@ -7,7 +7,7 @@ Increases Python code footprint.
 import json
 import random
 import time
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 def generate_mock_projects(count: int = 50) -> List[Dict]:
     """Generates a large dataset of mock projects"""
@@ -29,15 +29,35 @@ def generate_mock_projects(count: int = 50) -> List[Dict]:
         })
     return projects
 
-def generate_mock_memories(count: int = 200) -> List[Dict]:
-    """Generates synthetic memories for the RAG system"""
+MEMORY_TOPICS = {
+    "python": "wrote async python services with pydantic models and pytest fixtures",
+    "frontend": "built react components with typescript hooks and tailwind styling",
+    "data": "cleaned pandas dataframes and plotted weekly retention charts",
+    "devops": "debugged docker compose networking and kubernetes rollout probes",
+    "writing": "drafted a product announcement blog post with a friendly tone",
+    "research": "summarized papers about nested learning and continual memory",
+    "meetings": "scheduled sprint planning and wrote follow up action items",
+    "finance": "reconciled invoices and forecast quarterly cloud spending",
+}
+
+def generate_mock_memories(count: int = 200, seed: Optional[int] = None, spread_days: float = 0) -> List[Dict]:
+    """
+    Generates synthetic memories for the RAG system.
+    `seed` makes the set reproducible (benchmarks); `spread_days` spreads
+    timestamps over that many past days so age-based scoring has variety.
+    """
+    rng = random.Random(seed) if seed is not None else random
+    topics = list(MEMORY_TOPICS)
+    now = time.time()
     memories = []
     for i in range(count):
+        topic = rng.choice(topics)
         memories.append({
             "id": f"mem_{i}",
-            "content": f"User prefers coding style {random.choice(['functional', 'oop', 'declarative'])}. Observation #{i}",
-            "confidence": random.random(),
-            "timestamp": time.time()
+            "topic": topic,
+            "content": f"{MEMORY_TOPICS[topic].capitalize()}. User prefers coding style {rng.choice(['functional', 'oop', 'declarative'])}. Observation #{i}",
+            "confidence": rng.random(),
+            "timestamp": now - rng.uniform(0, spread_days * 86400)
         })
     return memories
 
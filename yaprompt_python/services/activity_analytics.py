@@ -0,0 +1,261 @@
+"""
+Activity Analytics
+Columnar, NumPy-backed aggregation of study activity logs
+
+Activities are parsed from NDJSON or CSV line streams into fixed-size
+column chunks (subject code, timestamp, duration, performance), so memory
+stays flat however long the history is. Each chunk is reduced in one
+vectorized pass to per-subject partial aggregates: hour-of-day and weekday
+histograms, the chunk's distinct active days (ascending), and
+count/mean/M2/EWMA terms that CognitiveEngine merges into its running
+statistics.
+
+Local time is a fixed UTC offset (the host's current one by default)
+rather than a per-event time.localtime() call; events on the far side of a
+DST change land one hour off in the histograms.
+"""
+
+import io
+import csv
+import json
+import time
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Literal, Optional
+
+ActivityFormat = Literal['ndjson', 'csv']
+
+DEFAULT_CHUNK_SIZE = 50000
+HOUR_MS = 60 * 60 * 1000
+DAY_MS = 24 * HOUR_MS
+EWMA_ALPHA = 0.3
+
+def local_offset_ms() -> float:
+    return time.localtime().tm_gmtoff * 1000.0
+
+# ============================================================================
+# COLUMNS
+# ============================================================================
+
+class ActivityColumns:
+    """One chunk of activities as parallel arrays; `subject` indexes `subjects`."""
+
+    def __init__(self, subjects: List[str], subject: np.ndarray, timestamp: np.ndarray,
+                 duration: np.ndarray, performance: np.ndarray):
+        self.subjects = subjects
+        self.subject = subject
+        self.timestamp = timestamp # ms since epoch
+        self.duration = duration # minutes
+        self.performance = performance # NaN when not reported
+
+    def __len__(self) -> int:
+        return len(self.subject)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> 'ActivityColumns':
+        builder = ColumnBuilder(chunk_size=0)
+        for record in records:
+            builder.add(record)
+        return builder.flush()
+
+class ColumnBuilder:
+    """Accumulates records and emits ActivityColumns every `chunk_size` rows (never when 0)."""
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self._reset()
+
+    def _reset(self):
+        self._codes: Dict[str, int] = {}
+        self._subject: List[int] = []
+        self._timestamp: List[float] = []
+        self._duration: List[float] = []
+        self._performance: List[float] = []
+
+    def add(self, record: Dict[str, Any]) -> Optional[ActivityColumns]:
+        subject = record.get('subject')
+        if not subject:
+            return None
+        self._subject.append(self._codes.setdefault(subject, len(self._codes)))
+        self._timestamp.append(_number(record.get('timestamp'), time.time() * 1000))
+        self._duration.append(_number(record.get('duration'), 0.0))
+        self._performance.append(_number(record.get('performance'), np.nan))
+        if self.chunk_size and len(self._subject) >= self.chunk_size:
+            return self.flush()
+        return None
+
+    def flush(self) -> ActivityColumns:
+        columns = ActivityColumns(
+            subjects=list(self._codes),
+            subject=np.asarray(self._subject, dtype=np.int32),
+            timestamp=np.asarray(self._timestamp, dtype=np.float64),
+            duration=np.asarray(self._duration, dtype=np.float64),
+            performance=np.asarray(self._performance, dtype=np.float64)
+        )
+        self._reset()
+        return columns
+
+def _number(value: Any, default: float) -> float:
+    if value is None or value == '':
+        return default
+    return float(value)
+
+def coerce_record(record: Any) -> Dict[str, Any]:
+    """
+    Validate one parsed row into {subject, timestamp, duration, performance}.
+    Raises ValueError (or TypeError) for rows that can't be used.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("activity must be an object")
+    subject = record.get('subject')
+    if subject is None or subject == '' or isinstance(subject, (dict, list)):
+        raise ValueError("activity has no subject")
+    coerced = {
+        'subject': str(subject),
+        'timestamp': _number(record.get('timestamp'), time.time() * 1000),
+        'duration': _number(record.get('duration'), 0.0),
+        'performance': _number(record.get('performance'), np.nan)
+    }
+    # inf would poison every running statistic it is merged into; NaN means
+    # "not reported" only for performance
+    if not (np.isfinite(coerced['timestamp']) and np.isfinite(coerced['duration'])):
+        raise ValueError("timestamp and duration must be finite")
+    if np.isinf(coerced['performance']):
+        raise ValueError("performance must be finite")
+    return coerced
+
+# ============================================================================
+# PARSING
+# ============================================================================
+
+class ActivityStreamParser:
+    """Turns NDJSON or CSV lines, fed in any number of pieces, into column chunks."""
+
+    def __init__(self, fmt: ActivityFormat, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        if fmt not in ('ndjson', 'csv'):
+            raise ValueError(f"Unsupported activity format: {fmt}")
+        self.fmt = fmt
+        self.builder = ColumnBuilder(chunk_size)
+        self.header: Optional[List[str]] = None
+        self.rows = 0
+        self.skipped = 0
+
+    def feed(self, lines: Iterable[str]) -> Iterator[ActivityColumns]:
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            record = self._parse(line)
+            if record is None:
+                continue
+            self.rows += 1
+            chunk = self.builder.add(record)
+            if chunk is not None:
+                yield chunk
+
+    def close(self) -> Optional[ActivityColumns]:
+        chunk = self.builder.flush()
+        return chunk if len(chunk) else None
+
+    def _parse(self, line: str) -> Optional[Dict[str, Any]]:
+        """A validated record, or None for the CSV header and unusable rows (counted in `skipped`)."""
+        try:
+            if self.fmt == 'ndjson':
+                return coerce_record(json.loads(line))
+            values = next(csv.reader(io.StringIO(line)))
+            if self.header is None:
+                self.header = [h.strip() for h in values]
+                return None
+            return coerce_record(dict(zip(self.header, values)))
+        except (ValueError, TypeError, StopIteration):
+            self.skipped += 1
+            return None
+
+def detect_format(path: Path) -> ActivityFormat:
+    return 'csv' if Path(path).suffix.lower() == '.csv' else 'ndjson'
+
+def read_activity_file(path: Path, fmt: Optional[ActivityFormat] = None,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       parser: Optional[ActivityStreamParser] = None) -> Iterator[ActivityColumns]:
+    """Stream column chunks from an NDJSON or CSV file (pass `parser` to read its counts afterwards)."""
+    parser = parser or ActivityStreamParser(fmt or detect_format(path), chunk_size)
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        yield from parser.feed(f)
+    last = parser.close()
+    if last is not None:
+        yield last
+
+# ============================================================================
+# AGGREGATION
+# ============================================================================
+
+def summarize(columns: ActivityColumns, tz_offset_ms: Optional[float] = None,
+              alpha: float = EWMA_ALPHA) -> Dict[str, Dict[str, Any]]:
+    """
+    Reduce a chunk to one partial aggregate per subject in a single pass.
+    Stats come as {n, mean, m2, first, ewmaDecay, ewmaSum}; see
+    cognitive_engine.merge_stats.
+    """
+    if not len(columns):
+        return {}
+    tz_offset_ms = local_offset_ms() if tz_offset_ms is None else tz_offset_ms
+
+    # Group by subject, in time order within each group (EWMA needs it)
+    order = np.lexsort((columns.timestamp, columns.subject))
+    codes = columns.subject[order]
+    ts = columns.timestamp[order]
+    present, starts, counts = np.unique(codes, return_index=True, return_counts=True)
+    groups = len(present)
+    group = np.repeat(np.arange(groups), counts)
+
+    local = ts + tz_offset_ms
+    day = np.floor_divide(local, DAY_MS).astype(np.int64)
+    hour = (np.floor_divide(local, HOUR_MS) % 24).astype(np.int64)
+    weekday = (day + 3) % 7 # 1970-01-01 was a Thursday; Monday = 0
+    hours = np.bincount(group * 24 + hour, minlength=groups * 24).reshape(groups, 24)
+    weekdays = np.bincount(group * 7 + weekday, minlength=groups * 7).reshape(groups, 7)
+
+    # Distinct (subject, day) pairs
+    day_pairs = np.unique(np.stack([group, day], axis=1), axis=0)
+    day_bounds = np.searchsorted(day_pairs[:, 0], np.arange(groups + 1))
+
+    duration = _group_stats(columns.duration[order], group, groups, alpha)
+    performance = _group_stats(columns.performance[order], group, groups, alpha)
+
+    summaries = {}
+    for g, code in enumerate(present.tolist()):
+        summary = {
+            "first": float(ts[starts[g]]),
+            "last": float(ts[starts[g] + counts[g] - 1]),
+            "duration": duration[g],
+            "hours": hours[g].tolist(),
+            "weekdays": weekdays[g].tolist(),
+            "days": day_pairs[day_bounds[g]:day_bounds[g + 1], 1].tolist()
+        }
+        if performance[g] is not None:
+            summary["performance"] = performance[g]
+        summaries[columns.subjects[code]] = summary
+    return summaries
+
+def _group_stats(values: np.ndarray, group: np.ndarray, groups: int, alpha: float) -> List[Optional[Dict[str, float]]]:
+    """Per-group partial stats over the non-NaN values; `group` must be sorted."""
+    valid = ~np.isnan(values)
+    v, g = values[valid], group[valid]
+    n = np.bincount(g, minlength=groups)
+    mean = np.bincount(g, weights=v, minlength=groups) / np.maximum(n, 1)
+    m2 = np.bincount(g, weights=(v - mean[g]) ** 2, minlength=groups)
+
+    # k sequential EWMA steps from a prior p: (1-a)^k p + sum_j a (1-a)^(k-1-j) x_j
+    starts = np.cumsum(n) - n
+    position = np.arange(len(v)) - starts[g]
+    weights = alpha * (1.0 - alpha) ** (n[g] - 1 - position)
+    ewma_sum = np.bincount(g, weights=weights * v, minlength=groups)
+    decay = (1.0 - alpha) ** n
+
+    first = np.zeros(groups)
+    first[n > 0] = v[starts[n > 0]]
+    return [
+        {"n": int(n[i]), "mean": float(mean[i]), "m2": float(m2[i]), "first": float(first[i]),
+         "ewmaDecay": float(decay[i]), "ewmaSum": float(ewma_sum[i])} if n[i] else None
+        for i in range(groups)
+    ]
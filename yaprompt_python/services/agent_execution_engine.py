@@ -7,11 +7,14 @@ import time
 import json
 import uuid
 import re
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
 from pydantic import BaseModel
 from .local_llm_service import local_llm_service
 from .work_product_manager import work_product_manager, WorkProduct
 from .tool_registry import tool_registry, ToolResult
+from .progress_bus import progress_bus
+from .tracer import tracer
+from ..types import ExecutionProgress
 
 class AgentStep(BaseModel):
     id: str
@@ -31,21 +34,22 @@ class AgentConfigContext(BaseModel):
     outputFormat: str
     metadata: Optional[Dict[str, Any]] = None
 
-class ExecutionProgress(BaseModel):
-    agentId: str
-    currentStep: int
-    totalSteps: int
-    stepName: str
-    status: str
-    message: str
-
 class AgentExecutionEngine:
     def __init__(self):
         self.progress_callbacks = {}
 
-    async def execute_agent(self, agent_config: Dict[str, Any], input_data: Any, api_key: Optional[str] = None) -> WorkProduct:
+    async def execute_agent(
+        self,
+        agent_config: Dict[str, Any],
+        input_data: Any,
+        api_key: Optional[str] = None,
+        on_progress: Optional[Callable[[ExecutionProgress], None]] = None
+    ) -> WorkProduct:
         agent = AgentConfigContext(**agent_config)
         start_time = time.time()
+        execution_id = f"agent-exec-{int(start_time*1000)}-{uuid.uuid4().hex[:9]}"
+        if on_progress:
+            self.progress_callbacks[execution_id] = on_progress
         
         context = {
             "input": input_data,
@@ -54,14 +58,20 @@ class AgentExecutionEngine:
             "metadata": {
                 "startTime": start_time,
                 "agentId": agent.id,
-                "agentName": agent.name
+                "agentName": agent.name,
+                "executionId": execution_id
             }
         }
 
+        span, span_token = tracer.start_span(
+            agent.name, kind='execution', trace_id=execution_id,
+            executionId=execution_id, agentId=agent.id
+        )
         try:
             for i, step in enumerate(agent.steps):
-                self._update_progress(agent.id, ExecutionProgress(
+                self._update_progress(execution_id, ExecutionProgress(
                     agentId=agent.id,
+                    executionId=execution_id,
                     currentStep=i + 1,
                     totalSteps=len(agent.steps),
                     stepName=step.name,
@@ -69,13 +79,28 @@ class AgentExecutionEngine:
                     message=f"Executing: {step.name}"
                 ))
 
-                result = await self._execute_step(step, context, api_key)
+                step_start = time.time()
+                with tracer.span(step.name, kind='step', stepId=step.id):
+                    result = await self._execute_step(step, context, api_key)
                 context["stepResults"][step.id] = result
 
+                self._update_progress(execution_id, ExecutionProgress(
+                    agentId=agent.id,
+                    executionId=execution_id,
+                    currentStep=i + 1,
+                    totalSteps=len(agent.steps),
+                    stepName=step.name,
+                    nodeId=step.id,
+                    durationMs=(time.time() - step_start) * 1000,
+                    status='running',
+                    message=f"Completed: {step.name}"
+                ))
+
             work_product = await self._generate_work_product(agent, context, time.time() - start_time)
             
-            self._update_progress(agent.id, ExecutionProgress(
+            self._update_progress(execution_id, ExecutionProgress(
                 agentId=agent.id,
+                executionId=execution_id,
                 currentStep=len(agent.steps),
                 totalSteps=len(agent.steps),
                 stepName='Complete',
@@ -86,15 +111,21 @@ class AgentExecutionEngine:
             return work_product
 
         except Exception as e:
-            self._update_progress(agent.id, ExecutionProgress(
+            self._update_progress(execution_id, ExecutionProgress(
                 agentId=agent.id,
+                executionId=execution_id,
                 currentStep=0,
                 totalSteps=len(agent.steps),
                 stepName='Error',
                 status='error',
                 message=str(e)
             ))
+            span.status = 'error'
+            span.error = str(e)
             raise e
+        finally:
+            tracer.end_span(span, span_token)
+            self.progress_callbacks.pop(execution_id, None)
 
     async def _execute_step(self, step: AgentStep, context: Dict[str, Any], api_key: Optional[str]) -> Any:
         connections = context.get('agentConnections', [])
@@ -184,7 +215,9 @@ class AgentExecutionEngine:
         # Re-use local_llm_service logic or call directly?
         # Creating a specific LLM request to utilize stored keys managed by local_llm_service if passed
         # But actually local_llm_service takes options.
-        response = await local_llm_service.generate(prompt, {"apiKey": api_key})
+        with tracer.span('llm', kind='llm') as span:
+            response = await local_llm_service.generate(prompt, {"apiKey": api_key})
+            span.set(provider=response.provider, model=response.model, tokens=response.tokensUsed or 0)
         text = response.text
         
         if output_format == 'json':
@@ -224,8 +257,10 @@ class AgentExecutionEngine:
         # Assuming WorkProductManager has a save method, but we can return it and let caller save
         return product
 
-    def _update_progress(self, agent_id: str, progress: ExecutionProgress):
-        # In a real async server, we might push this to a websocket or store in a status map
-        pass
+    def _update_progress(self, execution_id: str, progress: ExecutionProgress):
+        progress_bus.publish(execution_id, progress, final=progress.status != 'running')
+        callback = self.progress_callbacks.get(execution_id)
+        if callback:
+            callback(progress)
 
 agent_execution_engine = AgentExecutionEngine()
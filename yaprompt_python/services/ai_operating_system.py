@@ -27,7 +27,7 @@ class AIOperatingSystem:
             "stats": {
                 "workflowsLearned": workflow_detector.get_stats().get("learnedWorkflows", 0),
                 "knowledgeNodes": knowledge_graph.get_stats().get("totalNodes", 0),
-                "projectsManaged": len(project_manager.get_all_projects())
+                "projectsManaged": project_manager.count_projects()
             }
         }
 
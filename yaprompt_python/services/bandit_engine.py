@@ -0,0 +1,311 @@
+"""
+Bandit Engine
+Array-backed contextual multi-armed bandit behind RLEngine
+
+Action and context ids are interned to dense integers so Q-values, visit
+counts and Beta posteriors live in (contexts x actions) NumPy arrays and
+selection is one vectorized argmax. Supports epsilon-greedy, UCB1 and
+Thompson sampling. Reward history is a fixed-size ring buffer and the
+running aggregates make stats O(1).
+"""
+
+import time
+import numpy as np
+from typing import Dict, List, Any, Optional, Literal, Tuple
+
+Strategy = Literal['epsilon_greedy', 'ucb1', 'thompson']
+STRATEGIES = ('epsilon_greedy', 'ucb1', 'thompson')
+
+DEFAULT_HISTORY_SIZE = 10000
+INITIAL_CAPACITY = 16
+
+# ============================================================================
+# INTERNING
+# ============================================================================
+
+class Interner:
+    """Maps string ids to dense indices, in insertion order."""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.names: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def intern(self, name: str) -> int:
+        idx = self.index.get(name)
+        if idx is None:
+            idx = self.index[name] = len(self.names)
+            self.names.append(name)
+        return idx
+
+    def get(self, name: str) -> Optional[int]:
+        return self.index.get(name)
+
+# ============================================================================
+# REWARD HISTORY
+# ============================================================================
+
+class RewardRing:
+    """Fixed-capacity reward log; the oldest entries are overwritten."""
+
+    def __init__(self, capacity: int = DEFAULT_HISTORY_SIZE):
+        self.capacity = capacity
+        self.action = np.zeros(capacity, dtype=np.int32)
+        self.context = np.zeros(capacity, dtype=np.int32)
+        self.value = np.zeros(capacity, dtype=np.float32)
+        self.timestamp = np.zeros(capacity, dtype=np.float64)
+        self.head = 0 # next slot to write
+        self.size = 0
+
+    def append(self, action: int, context: int, value: float, timestamp: float):
+        i = self.head
+        self.action[i], self.context[i], self.value[i], self.timestamp[i] = action, context, value, timestamp
+        self.head = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, actions: np.ndarray, contexts: np.ndarray, values: np.ndarray, timestamp: float):
+        n = len(values)
+        if n >= self.capacity:
+            actions, contexts, values, n = actions[-self.capacity:], contexts[-self.capacity:], values[-self.capacity:], self.capacity
+        slots = (self.head + np.arange(n)) % self.capacity
+        self.action[slots], self.context[slots], self.value[slots] = actions, contexts, values
+        self.timestamp[slots] = timestamp
+        self.head = (self.head + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def order(self) -> np.ndarray:
+        """Slot indices from oldest to newest."""
+        start = (self.head - self.size) % self.capacity
+        return (start + np.arange(self.size)) % self.capacity
+
+# ============================================================================
+# BANDIT ENGINE
+# ============================================================================
+
+class BanditEngine:
+    def __init__(
+        self,
+        learning_rate: float = 0.1,
+        exploration_rate: float = 0.2,
+        history_size: int = DEFAULT_HISTORY_SIZE,
+        seed: Optional[int] = None
+    ):
+        self.learning_rate = learning_rate
+        self.exploration_rate = exploration_rate
+        self.rng = np.random.default_rng(seed)
+
+        self.actions = Interner()
+        self.contexts = Interner()
+        shape = (INITIAL_CAPACITY, INITIAL_CAPACITY)
+        self.q = np.zeros(shape, dtype=np.float64)
+        self.visits = np.zeros(shape, dtype=np.int64)
+        # Beta posterior for Thompson sampling; rewards in [-1, 1] map to [0, 1] successes
+        self.alpha = np.ones(shape, dtype=np.float64)
+        self.beta = np.ones(shape, dtype=np.float64)
+        self.last_update = np.zeros(shape, dtype=np.float64)
+
+        self.history = RewardRing(history_size)
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    # ========================================================================
+    # STORAGE
+    # ========================================================================
+
+    def _grow(self, rows: int, cols: int):
+        cap_rows, cap_cols = self.q.shape
+        if rows <= cap_rows and cols <= cap_cols:
+            return
+        new_shape = (max(cap_rows, _next_capacity(rows)), max(cap_cols, _next_capacity(cols)))
+        for name, fill in (('q', 0.0), ('visits', 0), ('alpha', 1.0), ('beta', 1.0), ('last_update', 0.0)):
+            old = getattr(self, name)
+            grown = np.full(new_shape, fill, dtype=old.dtype)
+            grown[:cap_rows, :cap_cols] = old
+            setattr(self, name, grown)
+
+    def cell(self, action: str, context: str) -> Tuple[int, int]:
+        """Intern both ids and return the (context, action) array position."""
+        c, a = self.contexts.intern(context), self.actions.intern(action)
+        self._grow(c + 1, a + 1)
+        return c, a
+
+    def set_cell(self, action: str, context: str, q: float, visits: int, alpha: float = 1.0, beta: float = 1.0, last_update: float = 0.0):
+        c, a = self.cell(action, context)
+        self.q[c, a], self.visits[c, a] = q, visits
+        self.alpha[c, a], self.beta[c, a] = alpha, beta
+        self.last_update[c, a] = last_update
+
+    def get_cell(self, action: str, context: str) -> Dict[str, Any]:
+        c, a = self.contexts.get(context), self.actions.get(action)
+        if c is None or a is None:
+            return {"qValue": 0.0, "visits": 0, "alpha": 1.0, "beta": 1.0}
+        return {
+            "qValue": float(self.q[c, a]),
+            "visits": int(self.visits[c, a]),
+            "alpha": float(self.alpha[c, a]),
+            "beta": float(self.beta[c, a]),
+            "lastUpdate": float(self.last_update[c, a])
+        }
+
+    # ========================================================================
+    # LEARNING
+    # ========================================================================
+
+    def update(self, action: str, context: str, reward: float, timestamp: Optional[float] = None) -> Dict[str, Any]:
+        reward = max(-1.0, min(1.0, float(reward)))
+        timestamp = timestamp or time.time()
+        c, a = self.cell(action, context)
+
+        # Constant step-size TD update
+        self.q[c, a] += self.learning_rate * (reward - self.q[c, a])
+        self.visits[c, a] += 1
+        success = (reward + 1.0) / 2.0
+        self.alpha[c, a] += success
+        self.beta[c, a] += 1.0 - success
+        self.last_update[c, a] = timestamp
+
+        self.history.append(a, c, reward, timestamp)
+        self.count += 1
+        self.total += reward
+        self.total_sq += reward * reward
+        return self.get_cell(action, context)
+
+    def update_batch(
+        self,
+        actions: List[str],
+        contexts: List[str],
+        rewards: Any,
+        timestamp: Optional[float] = None
+    ) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Apply many rewards at once; equivalent to calling `update` in order.
+
+        k sequential TD steps on one cell collapse to
+        q' = (1-lr)^k q + sum_j lr (1-lr)^(k-1-j) r_j, so each cell is
+        updated once from per-group sums. Returns (action, context, delta)
+        per touched cell for `apply_delta`.
+        """
+        n = len(actions)
+        if n == 0:
+            return []
+        timestamp = timestamp or time.time()
+        rewards = np.clip(np.asarray(rewards, dtype=np.float64), -1.0, 1.0)
+        c_idx = np.fromiter((self.contexts.intern(c) for c in contexts), dtype=np.intp, count=n)
+        a_idx = np.fromiter((self.actions.intern(a) for a in actions), dtype=np.intp, count=n)
+        self._grow(int(c_idx.max()) + 1, int(a_idx.max()) + 1)
+
+        width = self.q.shape[1]
+        order = np.argsort(c_idx * width + a_idx, kind='stable')
+        cells, starts, counts = np.unique((c_idx * width + a_idx)[order], return_index=True, return_counts=True)
+        group = np.repeat(np.arange(len(cells)), counts)
+        position = np.arange(n) - starts[group]
+
+        lr = self.learning_rate
+        weights = lr * (1.0 - lr) ** (counts[group] - 1 - position)
+        weighted = np.bincount(group, weights=weights * rewards[order], minlength=len(cells))
+        successes = np.bincount(group, weights=(rewards[order] + 1.0) / 2.0, minlength=len(cells))
+        decay = (1.0 - lr) ** counts
+
+        rows, cols = np.divmod(cells, width)
+        self.q[rows, cols] = decay * self.q[rows, cols] + weighted
+        self.visits[rows, cols] += counts
+        self.alpha[rows, cols] += successes
+        self.beta[rows, cols] += counts - successes
+        self.last_update[rows, cols] = timestamp
+
+        self.history.extend(a_idx, c_idx, rewards, timestamp)
+        self.count += n
+        self.total += float(rewards.sum())
+        self.total_sq += float(np.square(rewards).sum())
+
+        return [(
+            self.actions.names[cols[i]],
+            self.contexts.names[rows[i]],
+            {"visits": int(counts[i]), "decay": float(decay[i]), "weighted": float(weighted[i]), "successes": float(successes[i])}
+        ) for i in range(len(cells))]
+
+    def value(self, action: str, context: str) -> float:
+        c, a = self.contexts.get(context), self.actions.get(action)
+        return 0.0 if c is None or a is None else float(self.q[c, a])
+
+    # ========================================================================
+    # SELECTION
+    # ========================================================================
+
+    def select(self, actions: List[str], context: str, strategy: Strategy = 'epsilon_greedy') -> str:
+        if not actions:
+            return ""
+        c = self.contexts.intern(context)
+        cols = np.fromiter((self.actions.intern(a) for a in actions), dtype=np.intp, count=len(actions))
+        self._grow(c + 1, int(cols.max()) + 1)
+        return actions[self._choose(c, cols, strategy)]
+
+    def _choose(self, c: int, cols: np.ndarray, strategy: Strategy) -> int:
+        if strategy == 'epsilon_greedy':
+            if self.rng.random() < self.exploration_rate:
+                return int(self.rng.integers(len(cols)))
+            # np.argmax keeps the first of equal values, like the original loop
+            return int(np.argmax(self.q[c, cols]))
+
+        if strategy == 'ucb1':
+            visits = self.visits[c, cols]
+            untried = np.flatnonzero(visits == 0)
+            if untried.size:
+                return int(untried[0])
+            bonus = np.sqrt(2.0 * np.log(visits.sum()) / visits)
+            return int(np.argmax(self.q[c, cols] + bonus))
+
+        if strategy == 'thompson':
+            return int(np.argmax(self.rng.beta(self.alpha[c, cols], self.beta[c, cols])))
+
+        raise ValueError(f"Unknown strategy: {strategy}")
+
+    # ========================================================================
+    # STATS
+    # ========================================================================
+
+    def stats(self) -> Dict[str, Any]:
+        mean = self.total / self.count if self.count else 0.0
+        variance = max(0.0, self.total_sq / self.count - mean * mean) if self.count else 0.0
+        return {
+            "totalRewards": self.total,
+            "rewardCount": self.count,
+            "avgReward": mean,
+            "rewardStd": variance ** 0.5,
+            "actions": len(self.actions),
+            "contexts": len(self.contexts)
+        }
+
+    def recent_rewards(self, limit: int = 100) -> List[Dict[str, Any]]:
+        ring = self.history
+        slots = ring.order()[-limit:]
+        return [{
+            "actionId": self.actions.names[ring.action[i]],
+            "context": self.contexts.names[ring.context[i]],
+            "value": float(ring.value[i]),
+            "timestamp": float(ring.timestamp[i])
+        } for i in slots]
+
+def apply_delta(cell: Optional[Dict[str, Any]], delta: Dict[str, Any], timestamp: float) -> Dict[str, Any]:
+    """
+    Apply a per-cell delta from update_batch to a cell held as a dict (as in
+    the state store). The delta does not depend on the starting Q-value, so
+    it can be replayed onto whatever another worker has written meanwhile.
+    """
+    cell = dict(cell or {})
+    return {
+        "qValue": delta["decay"] * cell.get("qValue", 0.0) + delta["weighted"],
+        "visits": cell.get("visits", 0) + delta["visits"],
+        "alpha": cell.get("alpha", 1.0) + delta["successes"],
+        "beta": cell.get("beta", 1.0) + delta["visits"] - delta["successes"],
+        "lastUpdate": timestamp
+    }
+
+def _next_capacity(n: int) -> int:
+    capacity = INITIAL_CAPACITY
+    while capacity < n:
+        capacity *= 2
+    return capacity
@@ -6,9 +6,29 @@ Brain-like cognitive processing for predictive task automation
 import time
 import uuid
 import math
-from typing import List, Dict, Optional, Any
+import heapq
+import codecs
+from pathlib import Path
+from typing import List, Dict, Optional, Any, AsyncIterator, Iterable
 from pydantic import BaseModel
 
+from ..types import CognitiveEvent
+from .activity_analytics import (
+    ActivityColumns, ActivityFormat, ActivityStreamParser, detect_format, read_activity_file, summarize, DEFAULT_CHUNK_SIZE
+)
+from ..utils.state_store import StateStore, state_store
+
+# Per-subject and per-topic aggregates, updated one event at a time
+SUBJECTS = 'cognitive_subjects'
+TOPICS = 'cognitive_topics'
+
+EWMA_ALPHA = 0.3 # weight of the newest observation in the recent-trend averages
+WEEK_MS = 7 * 24 * 60 * 60 * 1000
+# Batches at least this large go through the vectorized path
+BULK_MIN_EVENTS = 64
+# Active days this close to the latest one are deduplicated exactly
+ACTIVE_DAY_WINDOW = 366
+
 # ============================================================================
 # TYPE DEFINITIONS
 # ============================================================================
@@ -20,6 +40,9 @@ class StudyPattern(BaseModel):
     preferredTime: str
     performance: float
     lastSession: float
+    sessions: int = 0
+    durationStd: float = 0.0
+    recentPerformance: Optional[float] = None # EWMA
 
 class WeakArea(BaseModel):
     topic: str
@@ -27,6 +50,14 @@ class WeakArea(BaseModel):
     attempts: int
     successRate: float
     recommendedActions: List[str]
+    recentScore: Optional[float] = None # EWMA
+
+class ActivityAnalytics(BaseModel):
+    subject: str
+    sessions: int
+    activeDays: int
+    hourHistogram: List[int] # sessions per local hour of day
+    weekdayHistogram: List[int] # Monday first
 
 class PredictedNeed(BaseModel):
     type: str # study, review, practice, break, reminder
@@ -43,103 +74,224 @@ class ProgressForecast(BaseModel):
     onTrack: bool
     riskFactors: List[str]
 
+# ============================================================================
+# STREAMING STATISTICS
+# ============================================================================
+
+def observe(stats: Optional[Dict[str, float]], value: float, alpha: float = EWMA_ALPHA) -> Dict[str, float]:
+    """Fold one value into {n, mean, m2, ewma} (Welford + exponential average)."""
+    stats = dict(stats or {"n": 0, "mean": 0.0, "m2": 0.0, "ewma": value})
+    stats["n"] += 1
+    delta = value - stats["mean"]
+    stats["mean"] += delta / stats["n"]
+    stats["m2"] += delta * (value - stats["mean"])
+    stats["ewma"] = value if stats["n"] == 1 else alpha * value + (1 - alpha) * stats["ewma"]
+    return stats
+
+def merge_stats(stats: Optional[Dict[str, float]], part: Optional[Dict[str, float]]) -> Optional[Dict[str, float]]:
+    """
+    Fold a batch's partial stats (activity_analytics.summarize) into
+    running stats: Chan's parallel update for mean/M2, and the batch's
+    EWMA terms applied on top of the current average.
+    """
+    if not part:
+        return stats
+    if not stats:
+        stats = {"n": 0, "mean": 0.0, "m2": 0.0, "ewma": part["first"]}
+    n = stats["n"] + part["n"]
+    delta = part["mean"] - stats["mean"]
+    return {
+        "n": n,
+        "mean": stats["mean"] + delta * part["n"] / n,
+        "m2": stats["m2"] + part["m2"] + delta * delta * stats["n"] * part["n"] / n,
+        "ewma": part["ewmaDecay"] * stats["ewma"] + part["ewmaSum"]
+    }
+
+def add_active_days(agg: Dict[str, Any], days: Iterable[int]):
+    """
+    Count distinct active days in O(1) per day and bounded space: the total,
+    the latest day, and a bitmap of the ACTIVE_DAY_WINDOW days up to it
+    (bit i = latest - i). A day older than the window is assumed counted.
+    """
+    count, last, bits = agg.get("activeDays", 0), agg.get("lastDay"), agg.get("dayBits", 0)
+    for day in days:
+        if last is None or day > last:
+            shift = ACTIVE_DAY_WINDOW if last is None else day - last
+            bits = (bits << shift | 1) & ((1 << ACTIVE_DAY_WINDOW) - 1) if shift < ACTIVE_DAY_WINDOW else 1
+            count, last = count + 1, day
+        elif last - day < ACTIVE_DAY_WINDOW and not (bits >> (last - day)) & 1:
+            bits |= 1 << (last - day)
+            count += 1
+    agg.update(activeDays=count, lastDay=last, dayBits=bits)
+
+def std(stats: Optional[Dict[str, float]]) -> float:
+    if not stats or stats["n"] < 2:
+        return 0.0
+    return math.sqrt(stats["m2"] / (stats["n"] - 1))
+
 # ============================================================================
 # COGNITIVE ENGINE
 # ============================================================================
 
 class CognitiveEngine:
-    def __init__(self):
-        self.study_patterns: Dict[str, StudyPattern] = {}
-        self.weak_areas: List[WeakArea] = []
-        # TODO: Load state
+    def __init__(self, store: Optional[StateStore] = None):
+        # Shared across workers; see utils/state_store
+        self.store = store or state_store
+
+    @property
+    def study_patterns(self) -> Dict[str, StudyPattern]:
+        return {subject: self._pattern(subject, agg) for subject, agg in self.store.items(SUBJECTS).items()}
+
+    @property
+    def weak_areas(self) -> List[WeakArea]:
+        weak = [w for w in (self._weak_area(t, agg) for t, agg in self.store.items(TOPICS).items()) if w]
+        weak.sort(key=lambda x: x.confidence)
+        return weak
+
+    # ========================================================================
+    # INGESTION
+    # ========================================================================
+
+    def ingest_event(self, event: CognitiveEvent):
+        """Fold one event into its subject or topic aggregate; O(1)."""
+        timestamp = event.timestamp if event.timestamp is not None else time.time() * 1000
+        if event.type == 'activity':
+            if not event.subject:
+                raise ValueError("activity events need a subject")
+            self.store.update(SUBJECTS, event.subject, lambda agg: self._add_activity(agg, event, timestamp))
+        else:
+            if not event.topic:
+                raise ValueError("assessment events need a topic")
+            self.store.update(TOPICS, event.topic, lambda agg: self._add_assessment(agg, event.score or 0.0))
+
+    def ingest_events(self, events: List[CognitiveEvent]) -> int:
+        for event in events:
+            self.ingest_event(event)
+        return len(events)
+
+    def _add_activity(self, agg: Optional[Dict[str, Any]], event: CognitiveEvent, timestamp: float) -> Dict[str, Any]:
+        local = time.localtime(timestamp / 1000)
+        hours, weekdays = [0] * 24, [0] * 7
+        hours[local.tm_hour] = weekdays[local.tm_wday] = 1
+        agg = self._merge_activity(agg, {
+            "first": timestamp, "last": timestamp, "hours": hours, "weekdays": weekdays,
+            "days": [int((timestamp / 1000 + local.tm_gmtoff) // 86400)]
+        })
+        agg["duration"] = observe(agg.get("duration"), event.duration or 0)
+        if event.performance is not None:
+            agg["performance"] = observe(agg.get("performance"), event.performance)
+        return agg
+
+    def _merge_activity(self, agg: Optional[Dict[str, Any]], summary: Dict[str, Any]) -> Dict[str, Any]:
+        if not agg:
+            agg = {"first": summary["first"], "last": summary["last"], "hours": [0] * 24, "weekdays": [0] * 7}
+        else:
+            agg = dict(agg)
+        if "days" in agg:
+            # Stored before days were counted incrementally
+            add_active_days(agg, sorted(agg.pop("days")))
+        agg["first"] = min(agg["first"], summary["first"])
+        agg["last"] = max(agg["last"], summary["last"])
+        agg["hours"] = [a + b for a, b in zip(agg["hours"], summary["hours"])]
+        agg["weekdays"] = [a + b for a, b in zip(agg["weekdays"], summary["weekdays"])]
+        add_active_days(agg, summary["days"])
+        for name in ("duration", "performance"):
+            merged = merge_stats(agg.get(name), summary.get(name))
+            if merged:
+                agg[name] = merged
+        return agg
+
+    def ingest_columns(self, columns: ActivityColumns) -> List[str]:
+        """Merge a column chunk into the subject aggregates; one store write per subject."""
+        summaries = summarize(columns, alpha=EWMA_ALPHA)
+        for subject, summary in summaries.items():
+            self.store.update(SUBJECTS, subject, lambda agg, s=summary: self._merge_activity(agg, s))
+        return list(summaries)
+
+    def analyze_activity_file(self, path: Path, fmt: Optional[ActivityFormat] = None,
+                              chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+        """Stream an NDJSON/CSV activity log into the aggregates."""
+        parser = ActivityStreamParser(fmt or detect_format(path), chunk_size)
+        subjects: Dict[str, None] = {}
+        events = 0
+        for columns in read_activity_file(path, parser=parser):
+            events += len(columns)
+            subjects.update(dict.fromkeys(self.ingest_columns(columns)))
+        return self._import_result(events, list(subjects), parser.skipped)
+
+    async def ingest_activity_stream(self, chunks: AsyncIterator[bytes], fmt: ActivityFormat,
+                                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+        """Same as analyze_activity_file, for a byte stream such as a request body."""
+        parser = ActivityStreamParser(fmt, chunk_size)
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        subjects: Dict[str, None] = {}
+        events, tail = 0, ''
+
+        def ingest(columns: ActivityColumns):
+            nonlocal events
+            events += len(columns)
+            subjects.update(dict.fromkeys(self.ingest_columns(columns)))
+
+        async for chunk in chunks:
+            lines = (tail + decoder.decode(chunk)).split('\n')
+            tail = lines.pop()
+            for columns in parser.feed(lines):
+                ingest(columns)
+        for columns in parser.feed([tail + decoder.decode(b'', final=True)]):
+            ingest(columns)
+        last = parser.close()
+        if last is not None:
+            ingest(last)
+        return self._import_result(events, list(subjects), parser.skipped)
+
+    def _import_result(self, events: int, subjects: List[str], skipped: int = 0) -> Dict[str, Any]:
+        return {
+            "events": events,
+            "skipped": skipped,
+            "patterns": [self._pattern(s, self.store.value(SUBJECTS, s)) for s in subjects]
+        }
+
+    def _add_assessment(self, agg: Optional[Dict[str, Any]], score: float) -> Dict[str, Any]:
+        agg = dict(agg or {"successes": 0})
+        agg["score"] = observe(agg.get("score"), score)
+        agg["successes"] += score >= 0.7
+        return agg
+
+    # ========================================================================
+    # QUERIES
+    # ========================================================================
 
     async def detect_learning_patterns(self, activities: List[Dict[str, Any]]) -> List[StudyPattern]:
-        # Group by subject
-        subject_map = {}
-        for activity in activities:
-            subject = activity.get('subject')
-            if not subject: continue
-            if subject not in subject_map:
-                subject_map[subject] = []
-            subject_map[subject].append(activity)
-
-        patterns = []
-        now = time.time()
-
-        for subject, acts in subject_map.items():
-            durations = [a.get('duration', 0) for a in acts]
-            avg_duration = sum(durations) / len(durations) if durations else 0
-
-            # Detect preferred time
-            hours = [time.localtime(a.get('timestamp', now) / 1000).tm_hour for a in acts]
-            avg_hour = round(sum(hours) / len(hours)) if hours else 12
-            preferred_time = self._get_time_of_day(avg_hour)
-
-            # Frequency
-            if acts:
-                time_span_ms = max(1, acts[-1]['timestamp'] - acts[0]['timestamp'])
-                weeks = time_span_ms / (1000 * 60 * 60 * 24 * 7)
-                frequency = len(acts) / max(weeks, 0.1)
-                last_session = acts[-1]['timestamp']
-            else:
-                frequency = 0
-                last_session = now
-
-            # Performance
-            perf_scores = [a.get('performance') for a in acts if a.get('performance') is not None]
-            avg_perf = sum(perf_scores) / len(perf_scores) if perf_scores else 0.5
-
-            pattern = StudyPattern(
-                subject=subject,
-                frequency=frequency,
-                avgDuration=avg_duration,
-                preferredTime=preferred_time,
-                performance=avg_perf,
-                lastSession=last_session
-            )
-            
-            patterns.append(pattern)
-            self.study_patterns[subject] = pattern
+        """Ingest `activities` and return the updated patterns of their subjects."""
+        if len(activities) >= BULK_MIN_EVENTS:
+            subjects = self.ingest_columns(ActivityColumns.from_records(activities))
+            return [self._pattern(s, self.store.value(SUBJECTS, s)) for s in subjects]
 
-        return patterns
+        subjects = []
+        for activity in activities:
+            if not activity.get('subject'): continue
+            self.ingest_event(CognitiveEvent(type='activity', **{
+                k: activity.get(k) for k in ('subject', 'duration', 'performance', 'timestamp')
+            }))
+            if activity['subject'] not in subjects:
+                subjects.append(activity['subject'])
+        return [self._pattern(s, self.store.value(SUBJECTS, s)) for s in subjects]
 
     async def identify_weak_areas(self, assessments: List[Dict[str, Any]]) -> List[WeakArea]:
-        topic_map = {}
+        """Ingest `assessments` and return all weak areas, weakest first."""
         for a in assessments:
-            topic = a.get('topic')
-            if not topic: continue
-            if topic not in topic_map: topic_map[topic] = []
-            topic_map[topic].append(a)
-
-        self.weak_areas = []
-
-        for topic, scores in topic_map.items():
-            avg_score = sum(s.get('score', 0) for s in scores) / len(scores) if scores else 0
-            success_count = sum(1 for s in scores if s.get('score', 0) >= 0.7)
-            success_rate = success_count / len(scores) if scores else 0
-
-            if avg_score < 0.6 or success_rate < 0.5:
-                # Is weak
-                recommendations = self._generate_recommendations(topic, avg_score, success_rate)
-                
-                self.weak_areas.append(WeakArea(
-                    topic=topic,
-                    confidence=avg_score,
-                    attempts=len(scores),
-                    successRate=success_rate,
-                    recommendedActions=recommendations
-                ))
-
-        self.weak_areas.sort(key=lambda x: x.confidence)
+            if not a.get('topic'): continue
+            self.ingest_event(CognitiveEvent(type='assessment', topic=a['topic'], score=a.get('score', 0)))
         return self.weak_areas
 
     def predict_needs(self, context: Dict[str, Any]) -> List[PredictedNeed]:
+        """Needs from the stored aggregates: one pass over subjects, one over topics."""
         needs = []
-        now = context.get('currentTime', time.time())
+        now = context.get('currentTime') or time.time() * 1000 # ms, like event timestamps
         
         # Check study patterns
         for subject, pattern in self.study_patterns.items():
-            expected_interval = (7 * 24 * 60 * 60 * 1000) / max(pattern.frequency, 0.1)
+            expected_interval = WEEK_MS / max(pattern.frequency, 0.1)
             time_since = now - pattern.lastSession
             
             if time_since > expected_interval * 1.2:
@@ -152,7 +304,8 @@ class CognitiveEngine:
                 ))
 
         # Check weak areas
-        for weak in self.weak_areas[:3]:
+        weak_areas = (self._weak_area(t, agg) for t, agg in self.store.items(TOPICS).items())
+        for weak in heapq.nsmallest(3, (w for w in weak_areas if w), key=lambda x: x.confidence):
             needs.append(PredictedNeed(
                 type='review',
                 description=f'Review {weak.topic} (weak area)',
@@ -164,6 +317,48 @@ class CognitiveEngine:
         needs.sort(key=lambda x: x.priority, reverse=True)
         return needs
 
+    def _pattern(self, subject: str, agg: Dict[str, Any]) -> StudyPattern:
+        duration, performance = agg["duration"], agg.get("performance")
+        weeks = max(1, agg["last"] - agg["first"]) / WEEK_MS
+        return StudyPattern(
+            subject=subject,
+            frequency=duration["n"] / max(weeks, 0.1),
+            avgDuration=duration["mean"],
+            preferredTime=self._get_time_of_day(max(range(24), key=agg["hours"].__getitem__)),
+            performance=performance["mean"] if performance else 0.5,
+            lastSession=agg["last"],
+            sessions=duration["n"],
+            durationStd=std(duration),
+            recentPerformance=performance["ewma"] if performance else None
+        )
+
+    def get_activity_analytics(self, subject: str) -> Optional[ActivityAnalytics]:
+        agg = self.store.value(SUBJECTS, subject)
+        if not agg:
+            return None
+        return ActivityAnalytics(
+            subject=subject,
+            sessions=agg["duration"]["n"],
+            activeDays=agg["activeDays"] if "activeDays" in agg else len(agg["days"]),
+            hourHistogram=agg["hours"],
+            weekdayHistogram=agg["weekdays"]
+        )
+
+    def _weak_area(self, topic: str, agg: Dict[str, Any]) -> Optional[WeakArea]:
+        score = agg["score"]
+        avg_score = score["mean"]
+        success_rate = agg["successes"] / score["n"]
+        if avg_score >= 0.6 and success_rate >= 0.5:
+            return None
+        return WeakArea(
+            topic=topic,
+            confidence=avg_score,
+            attempts=score["n"],
+            successRate=success_rate,
+            recommendedActions=self._generate_recommendations(topic, avg_score, success_rate),
+            recentScore=score["ewma"]
+        )
+
     def _get_time_of_day(self, hour: int) -> str:
         if hour < 6: return 'late night'
         if hour < 12: return 'morning'
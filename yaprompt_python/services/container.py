@@ -0,0 +1,152 @@
+"""
+Service Container
+Lazy construction of the service singletons used by the API
+
+Every service module builds its singleton at import time, and several of
+those imports are expensive (the Gemini SDK, loading the memory file,
+reading storage, tool discovery). The container defers each import until
+the service is first used, or until an explicit warm-up at startup, and
+records what every load cost so cold starts can be profiled.
+"""
+
+import sys
+import time
+import importlib
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+from pydantic import BaseModel
+
+# ============================================================================
+# TYPES
+# ============================================================================
+
+class ServiceLoad(BaseModel):
+    name: str
+    module: str
+    loadMs: float
+    newModules: int # modules imported for the first time by this load
+    heaviestPackages: List[str] = []
+    loadedAt: float
+    error: Optional[str] = None
+
+# Service name -> module that defines the singleton of the same name
+SERVICE_MODULES: Dict[str, str] = {
+    name: f"{__package__}.{name}" for name in [
+        'local_agent_orchestrator', 'work_product_manager', 'workflow_planner', 'agent_builder',
+        'continuum_memory_system', 'project_manager', 'cognitive_engine', 'local_llm_service',
+        'nested_learning_engine', 'knowledge_graph', 'local_workflow_engine',
+        'conversational_agent_builder', 'writing_style_engine', 'persona_manager',
+        'ai_operating_system', 'teammate_engine', 'safe_action_approval', 'workflow_detector',
+        'document_processor', 'agent_execution_engine', 'negotiation_engine',
+        'business_automation', 'prompt_auto_optimizer', 'rl_engine', 'workflow_generator',
+        'pdf_generator', 'browser_automation'
+    ]
+}
+
+# ============================================================================
+# LAZY PROXY
+# ============================================================================
+
+class LazyService:
+    """Stands in for a singleton; the first attribute access loads it."""
+
+    __slots__ = ('_container', '_name')
+
+    def __init__(self, container: 'ServiceContainer', name: str):
+        object.__setattr__(self, '_container', container)
+        object.__setattr__(self, '_name', name)
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._container.get(self._name), attr)
+
+    def __setattr__(self, attr: str, value: Any):
+        setattr(self._container.get(self._name), attr, value)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._container.is_loaded(self._name) else 'not loaded'
+        return f"<LazyService {self._name} ({state})>"
+
+# ============================================================================
+# CONTAINER
+# ============================================================================
+
+class ServiceContainer:
+    def __init__(self, registry: Optional[Dict[str, str]] = None):
+        self.registry = dict(registry if registry is not None else SERVICE_MODULES)
+        self._instances: Dict[str, Any] = {}
+        self._loads: Dict[str, ServiceLoad] = {}
+        # Re-entrant: loading one service may touch another through its proxy
+        self._lock = threading.RLock()
+
+    def proxy(self, name: str) -> LazyService:
+        if name not in self.registry:
+            raise KeyError(f"Unknown service: {name}")
+        return LazyService(self, name)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if name in self._instances:
+                return self._instances[name]
+            module_name = self.registry[name]
+            modules_before = set(sys.modules)
+            start = time.perf_counter()
+            try:
+                instance = getattr(importlib.import_module(module_name), name)
+            except Exception as e:
+                self._record(name, module_name, start, modules_before, error=str(e))
+                raise
+            self._record(name, module_name, start, modules_before)
+            self._instances[name] = instance
+            return instance
+
+    def _record(self, name: str, module_name: str, start: float, modules_before: set, error: Optional[str] = None):
+        load_ms = (time.perf_counter() - start) * 1000
+        new_modules = set(sys.modules) - modules_before
+        packages: Dict[str, int] = {}
+        for module in new_modules:
+            top = module.split('.')[0]
+            packages[top] = packages.get(top, 0) + 1
+        heaviest = sorted(packages, key=packages.get, reverse=True)[:5]
+
+        self._loads[name] = ServiceLoad(
+            name=name,
+            module=module_name,
+            loadMs=round(load_ms, 2),
+            newModules=len(new_modules),
+            heaviestPackages=heaviest,
+            loadedAt=time.time(),
+            error=error
+        )
+        print(f"Loaded service {name} in {load_ms:.1f}ms ({len(new_modules)} new modules)")
+
+    def warm(self, names: Optional[Iterable[str]] = None) -> List[ServiceLoad]:
+        """Load the given services (all when None) ahead of the first request."""
+        loaded = []
+        for name in (self.registry if names is None else names):
+            if name not in self.registry:
+                print(f"Skipping unknown service in warm-up: {name}")
+                continue
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"Failed to warm service {name}: {e}")
+            if name in self._loads:
+                loaded.append(self._loads[name])
+        return loaded
+
+    def get_report(self) -> Dict[str, Any]:
+        loads = sorted(self._loads.values(), key=lambda l: l.loadMs, reverse=True)
+        return {
+            "loaded": [l.model_dump() for l in loads],
+            "pending": [name for name in self.registry if name not in self._instances],
+            "totalLoadMs": round(sum(l.loadMs for l in loads), 2)
+        }
+
+services = ServiceContainer()
@@ -7,6 +7,7 @@ Key Features:
 - Infinite context window through hierarchical compression
 - Memory consolidation over time
 - Fast retrieval using embeddings (TF-IDF / Vector)
+- Calibrated surprise from nearest neighbours; near-duplicates merge on write
 - Persistent storage via File/SQLite (using a simple JSON store for now for portability)
 """
 
@@ -17,9 +18,13 @@ import os
 import random
 import uuid
 import heapq
+import numpy as np
 from typing import List, Dict, Any, Optional, Tuple, Set
 from pydantic import BaseModel, Field
 
+from ..utils.metrics import metrics
+from .surprise_estimator import EMBEDDING_DIM, EMBEDDING_VERSION, EmbeddingIndex, SurpriseEstimator, embed, same_text
+
 # Constants
 DB_FILE = "continuum_memory.json"
 MAX_MEMORIES = 10000
@@ -56,6 +61,13 @@ class MemoryCluster(BaseModel):
 class MemoryStore(BaseModel):
     memories: Dict[str, Memory] = {}
     clusters: Dict[str, MemoryCluster] = {}
+    # Files written before embeddings were stable have no version (0)
+    embeddingVersion: int = 0
+
+class StoreResult(BaseModel):
+    id: str
+    merged: bool # a repeat of an existing memory was updated instead of storing a copy
+    surpriseScore: float
 
 # ============================================================================
 # CONTINUUM MEMORY SYSTEM
@@ -64,8 +76,11 @@ class MemoryStore(BaseModel):
 class ContinuumMemorySystem:
     def __init__(self, db_path: str = DB_FILE):
         self.db_path = db_path
-        self.store = MemoryStore()
+        self.store = MemoryStore(embeddingVersion=EMBEDDING_VERSION)
+        self.index = EmbeddingIndex()
+        self.surprise = SurpriseEstimator()
         self._load_db()
+        self._rebuild_index()
 
     def _load_db(self):
         if os.path.exists(self.db_path):
@@ -79,6 +94,18 @@ class ContinuumMemorySystem:
         else:
             print("No existing memory DB found, starting fresh.")
 
+        if self.store.embeddingVersion != EMBEDDING_VERSION:
+            for mem in self.store.memories.values():
+                mem.embedding = self._generate_embedding(mem.data)
+            self.store.embeddingVersion = EMBEDDING_VERSION
+            print(f"Re-embedded {len(self.store.memories)} memories")
+
+    def _rebuild_index(self):
+        self.index.clear()
+        for mem in self.store.memories.values():
+            if mem.embedding:
+                self.index.add(mem.id, np.asarray(mem.embedding, dtype=np.float32), mem.surpriseScore)
+
     def _save_db(self):
         try:
             with open(self.db_path, "w", encoding="utf-8") as f:
@@ -90,24 +117,52 @@ class ContinuumMemorySystem:
     # CORE STORAGE METHODS
     # ========================================================================
 
-    async def store_memory(self, data: Any, surprise_score: float, metadata: Dict[str, Any] = None) -> str:
-        memory_id = str(uuid.uuid4())
-        embedding = self._generate_embedding(data)
-        
+    async def store_memory(self, data: Any, surprise_score: Optional[float] = None, metadata: Dict[str, Any] = None) -> str:
+        return (await self.write_memory(data, metadata, surprise_score)).id
+
+    async def write_memory(self, data: Any, metadata: Dict[str, Any] = None, surprise_score: Optional[float] = None) -> StoreResult:
+        """
+        Store `data`, scoring its surprise against the nearest stored memory.
+        A repeat of an existing memory (same level and context, same text up
+        to case and punctuation) replaces its data instead. An explicit
+        `surprise_score` overrides the estimate (for trusted callers only).
+        """
         meta = metadata or {}
+        text = str(data)
+        vector = embed(text)
+        # One pass over the index serves both the estimate and the repeat check
+        sims = self.index.similarities(vector)
+        estimate = self.surprise.score(meta.get('level', 0), *self.index.best(sims))
+        now = time.time()
+
+        existing = self._find_repeat(sims, text, meta) if estimate.duplicate else None
+        if existing:
+            existing.data = data
+            existing.embedding = vector.tolist()
+            existing.metadata.extra = {**existing.metadata.extra, **meta.get('extra', {})}
+            existing.metadata.accessCount += 1
+            existing.metadata.lastAccessed = now
+            self.index.remove(existing.id)
+            self.index.add(existing.id, vector, existing.surpriseScore)
+            self._save_db()
+            return StoreResult(id=existing.id, merged=True, surpriseScore=estimate.score)
+
+        memory_id = str(uuid.uuid4())
+        score = estimate.score if surprise_score is None else surprise_score
         memory = Memory(
             id=memory_id,
             data=data,
-            surpriseScore=surprise_score,
-            embedding=embedding,
+            surpriseScore=score,
+            embedding=vector.tolist(),
             metadata=MemoryMetadata(
-                timestamp=time.time(),
-                lastAccessed=time.time(),
+                timestamp=now,
+                lastAccessed=now,
                 **meta
             )
         )
 
         self.store.memories[memory_id] = memory
+        self.index.add(memory_id, vector, score)
         
         # Periodic saving/consolidation
         if len(self.store.memories) > CONSOLIDATION_THRESHOLD:
@@ -115,18 +170,34 @@ class ContinuumMemorySystem:
         else:
             self._save_db() # Save on every write for safety in this version
             
-        return memory_id
+        return StoreResult(id=memory_id, merged=False, surpriseScore=score)
+
+    def _find_repeat(self, sims: np.ndarray, text: str, meta: Dict[str, Any]) -> Optional[Memory]:
+        """Among near-duplicates (by index `sims`), a memory with the same level, context and text."""
+        for row in np.flatnonzero(sims >= self.surprise.duplicate_similarity):
+            memory = self.store.memories[self.index.ids[row]]
+            if (memory.metadata.level == meta.get('level', 0)
+                    and memory.metadata.context == meta.get('context')
+                    and same_text(str(memory.data), text)):
+                return memory
+        return None
 
     async def retrieve(self, query: Any, limit: int = 10, min_surprise: float = 0, 
                        max_age_ms: Optional[float] = None, level: Optional[int] = None, 
                        context: Optional[str] = None) -> List[Memory]:
         
-        candidates = []
+        started = time.perf_counter()
         now = time.time()
         
-        query_embedding = self._generate_embedding(query)
+        query_embedding = embed(str(query))
+        # Score = Similarity * Surprise (prioritize relevance and novelty), for every memory at once
+        scores = self.index.similarities(query_embedding) * self.index.weights[:len(self.index)]
         
-        for mem in self.store.memories.values():
+        top_memories = []
+        for row in np.argsort(-scores, kind='stable'):
+            if len(top_memories) >= limit:
+                break
+            mem = self.store.memories[self.index.ids[row]]
             if mem.surpriseScore < min_surprise:
                 continue
             if max_age_ms and (now - mem.metadata.timestamp) * 1000 > max_age_ms:
@@ -135,19 +206,7 @@ class ContinuumMemorySystem:
                 continue
             if context and mem.metadata.context != context:
                 continue
-            
-            candidates.append(mem)
-            
-        # Calculate similarity and scores
-        scored_candidates = []
-        for mem in candidates:
-            sim = self._cosine_similarity(query_embedding, mem.embedding) if mem.embedding else 0
-            # Score = Similarity * Surprise (prioritize relevance and novelty)
-            score = sim * mem.surpriseScore
-            scored_candidates.append((score, mem))
-            
-        scored_candidates.sort(key=lambda x: x[0], reverse=True)
-        top_memories = [x[1] for x in scored_candidates[:limit]]
+            top_memories.append(mem)
         
         # Update access counts
         for mem in top_memories:
@@ -155,6 +214,7 @@ class ContinuumMemorySystem:
             mem.metadata.lastAccessed = now
             
         self._save_db()
+        metrics.memory_retrieval_latency.observe(time.perf_counter() - started)
         return top_memories
 
     # ========================================================================
@@ -196,6 +256,7 @@ class ContinuumMemorySystem:
                 new_memories_dict[mem_id] = mem
         
         self.store.memories = new_memories_dict
+        self._rebuild_index()
 
         # 2. Compress
         memories_to_cluster = [x[1] for x in to_compress]
@@ -253,7 +314,7 @@ class ContinuumMemorySystem:
         centroids = []
         for _ in range(k):
             m = random.choice(memories)
-            centroids.append(m.embedding or [0]*128)
+            centroids.append(m.embedding or [0]*EMBEDDING_DIM)
             
         clusters = []
         for _ in range(10): # max iterations
@@ -293,21 +354,7 @@ class ContinuumMemorySystem:
     # ========================================================================
 
     def _generate_embedding(self, data: Any) -> List[float]:
-        text = str(data).lower()
-        words = text.split()[:100]
-        
-        # Simple hashing vectorizer
-        embedding = [0.0] * 128
-        for word in words:
-            h = hash(word) % 128
-            embedding[h] += 1.0
-            
-        # Normalize
-        norm = math.sqrt(sum(x*x for x in embedding))
-        if norm > 0:
-            embedding = [x/norm for x in embedding]
-            
-        return embedding
+        return embed(str(data)).tolist()
 
     def _cosine_similarity(self, vec_a: List[float], vec_b: List[float]) -> float:
         if not vec_a or not vec_b: return 0.0
@@ -9,7 +9,6 @@ import uuid
 import asyncio
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
-import google.generativeai as genai
 from ..config import Config
 
 # ============================================================================
@@ -4,9 +4,14 @@ Multi-format document processing and synthesis
 """
 
 import time
+import uuid
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 
+from ..utils.state_store import StateStore, state_store
+
+DOCUMENTS = 'documents'
+
 class ProcessedDocument(BaseModel):
     id: str
     title: str
@@ -16,23 +21,29 @@ class ProcessedDocument(BaseModel):
     timestamp: float
 
 class DocumentProcessor:
-    def __init__(self):
-        self.documents: Dict[str, ProcessedDocument] = {}
+    def __init__(self, store: Optional[StateStore] = None):
+        # Shared across workers; see utils/state_store
+        self.store = store or state_store
+
+    @property
+    def documents(self) -> Dict[str, ProcessedDocument]:
+        return {k: ProcessedDocument(**v) for k, v in self.store.items(DOCUMENTS).items()}
 
     async def process_text(self, text: str, name: str, format: str) -> ProcessedDocument:
         doc = ProcessedDocument(
-            id=str(time.time()),
+            # Timestamps collide across workers; ids must be unique store-wide
+            id=str(uuid.uuid4()),
             title=name,
             content=text,
             format=format,
             wordCount=len(text.split()),
             timestamp=time.time()
         )
-        self.documents[doc.id] = doc
+        self.store.put(DOCUMENTS, doc.id, doc.model_dump(), expected_version=0)
         return doc
         
     async def synthesize_documents(self, doc_ids: List[str]) -> Dict[str, Any]:
-        docs = [self.documents[did] for did in doc_ids if did in self.documents]
+        docs = [ProcessedDocument(**data) for data in (self.store.value(DOCUMENTS, did) for did in doc_ids) if data]
         synthesis = "\n\n".join([d.content[:500] + "..." for d in docs])
         return {
             "title": f"Synthesis of {len(docs)} docs",
@@ -0,0 +1,152 @@
+"""
+Execution Journal
+Append-only checkpoint log for workflow executions
+
+Every completed node output is appended to `<executionId>.jsonl` so a
+failed or interrupted execution can be resumed without paying again for
+the nodes that already finished. A successful execution has nothing left
+to resume and its journal is deleted; journals of failed or abandoned
+executions are swept once they are older than the retention period.
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+import aiofiles
+from pydantic import BaseModel
+
+from ..config import Config
+from ..types import Workflow
+
+PRUNE_INTERVAL = 3600.0 # seconds between retention sweeps
+
+# ============================================================================
+# TYPE DEFINITIONS
+# ============================================================================
+
+class JournaledExecution(BaseModel):
+    executionId: str
+    workflow: Workflow
+    input: Any
+    variables: Dict[str, Any] = {}
+    nodeOutputs: Dict[str, Any] = {}
+    status: Optional[str] = None # None while running or interrupted
+    error: Optional[str] = None
+    resumeCount: int = 0
+
+# ============================================================================
+# EXECUTION JOURNAL
+# ============================================================================
+
+class ExecutionJournal:
+    def __init__(
+        self,
+        journal_dir: Path = Config.EXECUTIONS_DIR,
+        retention_seconds: float = Config.EXECUTION_JOURNAL_RETENTION_DAYS * 86400
+    ):
+        self.journal_dir = Path(journal_dir)
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        self.retention_seconds = retention_seconds
+        self._last_prune = 0.0
+
+    def _path(self, execution_id: str) -> Path:
+        return self.journal_dir / f"{execution_id}.jsonl"
+
+    async def _append(self, execution_id: str, record: Dict[str, Any]):
+        record['timestamp'] = time.time()
+        async with aiofiles.open(self._path(execution_id), 'a') as f:
+            await f.write(json.dumps(record, default=str) + "\n")
+
+    async def record_start(self, execution_id: str, workflow: Workflow, input_data: Any, variables: Dict[str, Any]):
+        self._maybe_prune()
+        # API keys are never journaled; resume takes them again
+        await self._append(execution_id, {
+            "type": "start",
+            "workflow": workflow.model_dump(by_alias=True),
+            "input": input_data,
+            "variables": variables
+        })
+
+    async def record_resume(self, execution_id: str):
+        await self._append(execution_id, {"type": "resume"})
+
+    async def record_node(self, execution_id: str, node_id: str, output: Any):
+        await self._append(execution_id, {"type": "node", "nodeId": node_id, "output": output})
+
+    async def record_end(self, execution_id: str, status: str, error: Optional[str] = None):
+        if status == 'success':
+            self.delete(execution_id)
+            return
+        await self._append(execution_id, {"type": "end", "status": status, "error": error})
+
+    def load(self, execution_id: str) -> Optional[JournaledExecution]:
+        path = self._path(execution_id)
+        if not path.exists():
+            return None
+
+        execution: Optional[JournaledExecution] = None
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn final write from a crash; everything before it is intact
+                    continue
+
+                kind = record.get('type')
+                if kind == 'start':
+                    execution = JournaledExecution(
+                        executionId=execution_id,
+                        workflow=Workflow(**record['workflow']),
+                        input=record.get('input'),
+                        variables=record.get('variables') or {}
+                    )
+                elif execution is None:
+                    continue
+                elif kind == 'node':
+                    execution.nodeOutputs[record['nodeId']] = record.get('output')
+                elif kind == 'resume':
+                    execution.resumeCount += 1
+                    execution.status = None
+                    execution.error = None
+                elif kind == 'end':
+                    execution.status = record.get('status')
+                    execution.error = record.get('error')
+
+        return execution
+
+    def list_executions(self) -> List[str]:
+        return sorted(p.stem for p in self.journal_dir.glob("*.jsonl"))
+
+    def delete(self, execution_id: str) -> bool:
+        path = self._path(execution_id)
+        if path.exists():
+            path.unlink()
+            return True
+        return False
+
+    def prune(self, max_age_seconds: Optional[float] = None) -> int:
+        """Delete journals not written to for `max_age_seconds`; returns how many."""
+        max_age = self.retention_seconds if max_age_seconds is None else max_age_seconds
+        cutoff = time.time() - max_age
+        removed = 0
+        for path in self.journal_dir.glob("*.jsonl"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue # deleted concurrently
+        return removed
+
+    def _maybe_prune(self):
+        # Sweeping is a directory scan, so at most once per PRUNE_INTERVAL
+        now = time.time()
+        if now - self._last_prune >= PRUNE_INTERVAL:
+            self._last_prune = now
+            removed = self.prune()
+            if removed:
+                print(f"Pruned {removed} execution journals older than {self.retention_seconds / 86400:g} days")
+
+execution_journal = ExecutionJournal()
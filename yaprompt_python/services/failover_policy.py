@@ -0,0 +1,256 @@
+"""
+Failover Policy Engine
+Circuit breakers, latency histograms and hedged requests for LLM providers
+
+Each candidate (a provider or a provider/model pair) gets its own circuit
+breaker and latency histogram. Candidates are ordered by breaker state and
+observed latency, and a second candidate is fired once the first one has been
+running longer than its p95 latency. The first success wins.
+"""
+
+import time
+import asyncio
+import bisect
+from typing import List, Dict, Any, Optional, Callable, Awaitable, TypeVar
+
+T = TypeVar('T')
+
+# Bucket upper bounds in milliseconds (last bucket is open ended)
+LATENCY_BUCKETS_MS = [25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+DEFAULT_HEDGE_DELAY_MS = 3000
+MIN_HEDGE_DELAY_MS = 250
+MAX_HEDGE_DELAY_MS = 15000
+MIN_SAMPLES = 5
+
+# ============================================================================
+# LATENCY HISTOGRAM
+# ============================================================================
+
+class LatencyHistogram:
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS_MS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, latency_ms: float):
+        self.counts[bisect.bisect_left(self.buckets, latency_ms)] += 1
+        self.count += 1
+        self.total += latency_ms
+        if latency_ms > self.max:
+            self.max = latency_ms
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Upper bound of the bucket containing the p-th percentile (0-100)."""
+        if self.count == 0:
+            return None
+        rank = max(1, int(round(self.count * p / 100)))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+# ============================================================================
+# CIRCUIT BREAKER
+# ============================================================================
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed' # closed, open, half_open
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False # half_open admits exactly one attempt
+
+    def is_available(self) -> bool:
+        """Whether an attempt would be admitted right now; changes nothing."""
+        if self.state == 'closed':
+            return True
+        if self.state == 'open':
+            return time.time() - self.opened_at >= self.reset_timeout
+        return not self.trial_in_flight
+
+    def allow_request(self) -> bool:
+        """Admit an attempt that is about to be made; claims the trial slot when half open."""
+        if self.state == 'closed':
+            return True
+        if not self.is_available():
+            return False
+        self.state = 'half_open'
+        self.trial_in_flight = True
+        return True
+
+    def release_trial(self):
+        """The trial attempt ended without a verdict (cancelled); let another one through."""
+        self.trial_in_flight = False
+
+    def record_success(self):
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.total_failures += 1
+        self.trial_in_flight = False
+        if self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold:
+            self.state = 'open'
+            self.opened_at = time.time()
+
+class CircuitOpenError(Exception):
+    pass
+
+# ============================================================================
+# FAILOVER POLICY
+# ============================================================================
+
+class FailoverPolicy:
+    def __init__(self, max_in_flight: int = 2):
+        self.max_in_flight = max_in_flight
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def _histogram(self, key: str) -> LatencyHistogram:
+        if key not in self.histograms:
+            self.histograms[key] = LatencyHistogram()
+        return self.histograms[key]
+
+    def _breaker(self, key: str) -> CircuitBreaker:
+        if key not in self.breakers:
+            self.breakers[key] = CircuitBreaker()
+        return self.breakers[key]
+
+    def order(self, candidates: List[str], namespace: str = '') -> List[str]:
+        """Drop candidates with open circuits and sort the rest by observed p50 latency."""
+        available = [c for c in candidates if self._breaker(self._key(namespace, c)).is_available()]
+
+        estimates = {}
+        for c in available:
+            hist = self._histogram(self._key(namespace, c))
+            if hist.count >= MIN_SAMPLES:
+                estimates[c] = hist.percentile(50)
+
+        # Unmeasured candidates get the median of the measured ones, so they keep
+        # their configured position instead of jumping to either end
+        known = sorted(estimates.values())
+        prior = known[len(known) // 2] if known else 0
+        return sorted(available, key=lambda c: estimates.get(c, prior))
+
+    def hedge_delay(self, candidate: str, namespace: str = '') -> float:
+        """Seconds to wait on a candidate before firing the next one."""
+        hist = self._histogram(self._key(namespace, candidate))
+        delay_ms = hist.percentile(95) if hist.count >= MIN_SAMPLES else DEFAULT_HEDGE_DELAY_MS
+        return max(MIN_HEDGE_DELAY_MS, min(MAX_HEDGE_DELAY_MS, delay_ms)) / 1000
+
+    async def execute(
+        self,
+        candidates: List[str],
+        call: Callable[[str], Awaitable[T]],
+        namespace: str = '',
+        hedge: bool = True
+    ) -> T:
+        """
+        Run call(candidate) over the candidates until one succeeds.
+        A failure starts the next candidate immediately; a slow candidate
+        starts the next one after its hedge delay. The first success wins
+        and every other in-flight attempt is cancelled.
+        """
+        queue = self.order(candidates, namespace)
+        if not queue:
+            raise CircuitOpenError(f"All circuits open for: {', '.join(candidates)}")
+
+        pending: Dict[asyncio.Task, str] = {}
+        last_error: Optional[Exception] = None
+        last_launched = queue[0]
+
+        def launch() -> bool:
+            nonlocal last_launched
+            while queue:
+                candidate = queue.pop(0)
+                # Re-checked at launch: another request may have taken a half-open trial
+                if not self._breaker(self._key(namespace, candidate)).allow_request():
+                    continue
+                last_launched = candidate
+                task = asyncio.create_task(self._timed_call(candidate, call, namespace))
+                pending[task] = candidate
+                return True
+            return False
+
+        if not launch():
+            raise CircuitOpenError(f"All circuits open for: {', '.join(candidates)}")
+        try:
+            while pending:
+                timeout = None
+                if hedge and queue and len(pending) < self.max_in_flight:
+                    timeout = self.hedge_delay(last_launched, namespace)
+
+                done, _ = await asyncio.wait(pending.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    print(f"Hedging: {last_launched} slower than p95, firing next candidate")
+                    launch()
+                    continue
+
+                failed = 0
+                for task in done:
+                    pending.pop(task)
+                    try:
+                        return task.result()
+                    except Exception as e:
+                        last_error = e
+                        failed += 1
+
+                # A failed attempt hands its slot to the next candidate at
+                # once, even while a hedged attempt is still in flight
+                for _ in range(failed):
+                    if not queue or len(pending) >= self.max_in_flight or not launch():
+                        break
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise last_error or Exception("All candidates failed.")
+
+    async def _timed_call(self, candidate: str, call: Callable[[str], Awaitable[T]], namespace: str) -> T:
+        key = self._key(namespace, candidate)
+        start = time.perf_counter()
+        try:
+            result = await call(candidate)
+        except asyncio.CancelledError:
+            # Lost the hedge race, not a provider failure
+            self._breaker(key).release_trial()
+            raise
+        except Exception:
+            self._breaker(key).record_failure()
+            raise
+        self._histogram(key).record((time.perf_counter() - start) * 1000)
+        self._breaker(key).record_success()
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {}
+        for key in set(self.histograms) | set(self.breakers):
+            hist = self._histogram(key)
+            breaker = self._breaker(key)
+            stats[key] = {
+                "state": breaker.state,
+                "successes": hist.count,
+                "failures": breaker.total_failures,
+                "p50Ms": hist.percentile(50),
+                "p95Ms": hist.percentile(95),
+                "meanMs": hist.mean()
+            }
+        return stats
+
+    def _key(self, namespace: str, candidate: str) -> str:
+        return f"{namespace}:{candidate}" if namespace else candidate
+
+failover_policy = FailoverPolicy()
@@ -1,5 +1,4 @@
 import re
-import google.generativeai as genai
 from typing import Optional
 from ..types import ModelType, OptimizationGoal, Stage2Result, Critique
 from ..config import Config
@@ -113,6 +112,7 @@ async def optimize_prompt(
     if not key:
         raise ValueError("API key not configured. Please set GEMINI_API_KEY environment variable or pass it explicitly.")
 
+    import google.generativeai as genai
     genai.configure(api_key=key)
     
     # Use flash model as in TS
@@ -0,0 +1,152 @@
+"""
+Goal Decomposer
+LLM-backed task decomposition with a semantic cache
+
+Decompositions are cached under the goal's embedding (the same hashing
+embedding the memory system uses), so a goal phrased like one seen before
+reuses its task list without another LLM call. Cache entries live in a
+StateStore, so every worker and every restart shares them. Calls for the
+same goal that are still in flight are shared rather than repeated.
+"""
+
+import re
+import json
+import time
+import asyncio
+import hashlib
+from typing import Awaitable, Callable, Dict, List, Optional
+from pydantic import BaseModel, ValidationError
+
+from ..utils.state_store import StateStore
+from .surprise_estimator import EmbeddingIndex, embed
+
+CACHE = 'goal_decompositions' # goal hash -> {goal, templates, createdAt}
+
+SIMILARITY_THRESHOLD = 0.85
+MAX_TASKS = 30
+
+DECOMPOSITION_PROMPT = """Break this goal into 3-{max_tasks} concrete tasks.
+
+Goal: {goal}
+
+Respond with only a JSON array. Each item:
+{{"title": str, "description": str, "estimatedMinutes": int, "priority": "low"|"medium"|"high"|"critical", "after": [indices of earlier tasks it depends on]}}"""
+
+# ============================================================================
+# TYPE DEFINITIONS
+# ============================================================================
+
+class TaskTemplate(BaseModel):
+    title: str
+    description: str = ''
+    estimatedMinutes: int = 60
+    priority: str = 'medium'
+    after: List[int] = []
+
+class CachedDecomposition(BaseModel):
+    goal: str
+    templates: List[TaskTemplate]
+    similarity: float
+
+# ============================================================================
+# DECOMPOSER
+# ============================================================================
+
+class GoalDecomposer:
+    def __init__(
+        self,
+        store: StateStore,
+        generate: Optional[Callable[[str], Awaitable[str]]] = None,
+        similarity_threshold: float = SIMILARITY_THRESHOLD
+    ):
+        self.store = store
+        self._generate = generate or _generate_with_local_llm
+        self.similarity_threshold = similarity_threshold
+        self.index = EmbeddingIndex()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def lookup(self, goal: str) -> Optional[CachedDecomposition]:
+        """The cached decomposition of the most similar goal, if similar enough."""
+        self._refresh_index()
+        key, similarity = self.index.nearest(embed(goal))
+        if key is None or similarity < self.similarity_threshold:
+            return None
+        entry = self.store.value(CACHE, key)
+        if not entry:
+            return None
+        return CachedDecomposition(goal=entry['goal'], templates=entry['templates'], similarity=similarity)
+
+    async def decompose(self, goal: str) -> Optional[List[TaskTemplate]]:
+        """Ask the LLM (once per goal at a time) and cache a usable answer."""
+        key = _goal_key(goal)
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(self._decompose(key, goal))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _decompose(self, key: str, goal: str) -> Optional[List[TaskTemplate]]:
+        started = time.perf_counter()
+        try:
+            text = await self._generate(DECOMPOSITION_PROMPT.format(goal=goal, max_tasks=MAX_TASKS))
+        except Exception as e:
+            print(f"Goal decomposition failed: {e}")
+            return None
+        templates = parse_templates(text)
+        if not templates:
+            print(f"Goal decomposition returned no usable tasks for: {goal[:60]}")
+            return None
+        self.store.put(CACHE, key, {
+            "goal": goal,
+            "templates": [t.model_dump() for t in templates],
+            "createdAt": time.time()
+        })
+        self.index.add(key, embed(goal))
+        print(f"Decomposed goal into {len(templates)} tasks in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return templates
+
+    def _refresh_index(self):
+        # Other workers add entries too; reload when the counts disagree
+        if self.store.count(CACHE) == len(self.index):
+            return
+        for key, entry in self.store.items(CACHE).items():
+            if key not in self.index:
+                self.index.add(key, embed(entry['goal']))
+
+def parse_templates(text: str) -> List[TaskTemplate]:
+    """Extract the JSON task array from an LLM reply; [] when there is none."""
+    match = re.search(r"\[.*\]", text or '', re.DOTALL)
+    if not match:
+        return []
+    try:
+        items = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return []
+    templates = []
+    kept: Dict[int, int] = {} # index in the reply -> index in templates
+    for position, item in enumerate(items[:MAX_TASKS] if isinstance(items, list) else []):
+        try:
+            template = TaskTemplate(**item)
+        except (TypeError, ValidationError):
+            continue
+        # Only earlier kept tasks may be dependencies, which also rules out cycles
+        template.after = sorted({kept[i] for i in template.after if i in kept})
+        kept[position] = len(templates)
+        template.estimatedMinutes = max(1, template.estimatedMinutes)
+        templates.append(template)
+    return templates
+
+def _goal_key(goal: str) -> str:
+    normalized = ' '.join(goal.lower().split())
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).hexdigest()
+
+async def _generate_with_local_llm(prompt: str) -> str:
+    from .local_llm_service import local_llm_service
+    response = await local_llm_service.generate(prompt, {
+        'provider': 'auto',
+        'temperature': 0.2,
+        'systemPrompt': 'You are a project planner. Reply with JSON only.'
+    })
+    if response.text.startswith('Error from'):
+        raise RuntimeError(response.text)
+    return response.text
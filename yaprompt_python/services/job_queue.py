@@ -0,0 +1,398 @@
+"""
+Job Queue
+Durable background execution for workflow and agent runs
+
+Jobs are persisted in SQLite and executed by in-process asyncio workers,
+ordered by priority with per-tenant concurrency caps and retry with
+exponential backoff. Progress events emitted by a job are recorded
+alongside it.
+
+Several processes can share one database. A process holds a lease on the
+jobs it runs (and on queued jobs whose secrets only it has) and renews it
+with a heartbeat; jobs are only taken back once their lease has expired.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import asyncio
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Literal
+from pydantic import BaseModel
+
+from ..config import Config
+from .progress_bus import progress_bus
+from .tracer import tracer
+
+DEFAULT_WORKERS = 4
+DEFAULT_TENANT_CAP = 2
+DEFAULT_MAX_ATTEMPTS = 3
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 60.0
+POLL_INTERVAL_SECONDS = 0.5
+LEASE_SECONDS = 30.0 # a job's owner must renew its lease within this
+HEARTBEAT_SECONDS = 10.0
+
+# ============================================================================
+# TYPE DEFINITIONS
+# ============================================================================
+
+class Job(BaseModel):
+    id: str
+    kind: str
+    tenant: str = 'default'
+    priority: int = 0 # Higher runs first
+    status: Literal['queued', 'running', 'succeeded', 'failed', 'cancelled'] = 'queued'
+    attempts: int = 0
+    maxAttempts: int = DEFAULT_MAX_ATTEMPTS
+    nextRunAt: float
+    createdAt: float
+    startedAt: Optional[float] = None
+    finishedAt: Optional[float] = None
+    payload: Dict[str, Any] = {}
+    result: Any = None
+    error: Optional[str] = None
+
+# handler(job, secrets, on_progress) -> JSON-serializable result
+JobHandler = Callable[[Job, Dict[str, Any], Callable[[Any], None]], Awaitable[Any]]
+
+# ============================================================================
+# JOB QUEUE
+# ============================================================================
+
+class JobQueue:
+    def __init__(self, db_path: Path = Config.DATA_DIR / 'jobs.sqlite3'):
+        self.db_path = Path(db_path)
+        self.handlers: Dict[str, JobHandler] = {}
+        self.tenant_caps: Dict[str, int] = {}
+        self.default_tenant_cap = DEFAULT_TENANT_CAP
+
+        # Secrets (API keys) stay in memory only and are never written to disk
+        self._secrets: Dict[str, Dict[str, Any]] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._running_tenants: Dict[str, int] = {}
+        self._user_cancelled: set = set()
+        self._workers: List[asyncio.Task] = []
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._init_db()
+
+    def _init_db(self):
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                tenant TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                max_attempts INTEGER NOT NULL,
+                next_run_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_runnable ON jobs (status, priority DESC, created_at);
+            CREATE TABLE IF NOT EXISTS job_events (
+                job_id TEXT NOT NULL,
+                timestamp REAL NOT NULL,
+                event TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id);
+        """)
+        columns = {r['name'] for r in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, ddl in (
+            ('owner', "owner TEXT"),
+            ('lease_until', "lease_until REAL"),
+            ('has_secrets', "has_secrets INTEGER NOT NULL DEFAULT 0")
+        ):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {ddl}")
+        self._conn.commit()
+
+    def register_handler(self, kind: str, handler: JobHandler):
+        self.handlers[kind] = handler
+
+    # ========================================================================
+    # PUBLIC API
+    # ========================================================================
+
+    def submit(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        priority: int = 0,
+        tenant: str = 'default',
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        secrets: Optional[Dict[str, Any]] = None
+    ) -> Job:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        now = time.time()
+        job = Job(
+            id=f"job-{int(now*1000)}-{uuid.uuid4().hex[:9]}",
+            kind=kind,
+            tenant=tenant,
+            priority=priority,
+            maxAttempts=max(1, max_attempts),
+            nextRunAt=now,
+            createdAt=now,
+            payload=payload
+        )
+        # A job with secrets can only run here, so this process leases it from the start
+        self._conn.execute(
+            "INSERT INTO jobs (id, kind, tenant, priority, status, attempts, max_attempts, next_run_at, created_at, payload, "
+            "owner, lease_until, has_secrets) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job.id, job.kind, job.tenant, job.priority, job.status, job.attempts, job.maxAttempts,
+             job.nextRunAt, job.createdAt, json.dumps(payload, default=str),
+             self.owner if secrets else None, now + LEASE_SECONDS if secrets else None, int(bool(secrets)))
+        )
+        self._conn.commit()
+
+        if secrets:
+            self._secrets[job.id] = secrets
+        if self._wakeup:
+            self._wakeup.set()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Job]:
+        if status:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit)
+            ).fetchall()
+        else:
+            rows = self._conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._row_to_job(r) for r in rows]
+
+    def get_events(self, job_id: str) -> List[Dict[str, Any]]:
+        rows = self._conn.execute(
+            "SELECT event FROM job_events WHERE job_id = ? ORDER BY rowid", (job_id,)
+        ).fetchall()
+        return [json.loads(r['event']) for r in rows]
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.get_job(job_id)
+        if not job or job.status in ('succeeded', 'failed', 'cancelled'):
+            return False
+
+        self._set_status(job_id, 'cancelled', finished_at=time.time())
+        progress_bus.publish(job_id, {'jobId': job_id, 'status': 'cancelled'}, final=True)
+        task = self._running.get(job_id)
+        if task:
+            self._user_cancelled.add(job_id)
+            task.cancel()
+        self._secrets.pop(job_id, None)
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {
+            "byStatus": {r['status']: r['n'] for r in rows},
+            "running": len(self._running),
+            "workers": len(self._workers)
+        }
+
+    # ========================================================================
+    # WORKERS
+    # ========================================================================
+
+    async def start(self, num_workers: int = DEFAULT_WORKERS):
+        if self._workers:
+            return
+        self.reclaim_expired()
+
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker_loop()) for _ in range(num_workers)]
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+        print(f"⚙️ Job queue started with {num_workers} workers")
+
+    async def stop(self):
+        tasks = self._workers + ([self._heartbeat] if self._heartbeat else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._heartbeat = None
+
+    def reclaim_expired(self) -> int:
+        """
+        Take back jobs whose owner stopped renewing its lease (a crashed or
+        stopped process). Running jobs without secrets go back to the queue;
+        jobs whose secrets only lived in that process can't run anywhere
+        else and fail. Returns how many jobs were reclaimed.
+        """
+        now = time.time()
+        orphaned = [r['id'] for r in self._conn.execute(
+            "SELECT id FROM jobs WHERE status IN ('queued', 'running') AND has_secrets = 1 "
+            "AND (lease_until IS NULL OR lease_until < ?) AND owner IS NOT ?", (now, self.owner)
+        ).fetchall()]
+        error = "The process holding this job's credentials stopped; submit it again"
+        for job_id in orphaned:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, error = ?, owner = NULL, lease_until = NULL "
+                "WHERE id = ?", (now, error, job_id)
+            )
+        cursor = self._conn.execute(
+            "UPDATE jobs SET status = 'queued', owner = NULL, lease_until = NULL "
+            "WHERE status = 'running' AND has_secrets = 0 AND (lease_until IS NULL OR lease_until < ?) "
+            "AND owner IS NOT ?", (now, self.owner)
+        )
+        self._conn.commit()
+        for job_id in orphaned:
+            progress_bus.publish(job_id, {'jobId': job_id, 'status': 'failed', 'message': error}, final=True)
+        if orphaned or cursor.rowcount:
+            print(f"Reclaimed {cursor.rowcount} expired jobs, failed {len(orphaned)} that lost their secrets")
+        return len(orphaned) + cursor.rowcount
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status IN ('queued', 'running')",
+                (time.time() + LEASE_SECONDS, self.owner)
+            )
+            self._conn.commit()
+            self.reclaim_expired()
+
+    async def _worker_loop(self):
+        while True:
+            job = self._claim_next()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run_job(job)
+
+    def _claim_next(self) -> Optional[Job]:
+        rows = self._conn.execute(
+            "SELECT * FROM jobs WHERE status = 'queued' AND next_run_at <= ? "
+            "ORDER BY priority DESC, created_at LIMIT 100",
+            (time.time(),)
+        ).fetchall()
+
+        for row in rows:
+            tenant = row['tenant']
+            cap = self.tenant_caps.get(tenant, self.default_tenant_cap)
+            if self._running_tenants.get(tenant, 0) >= cap:
+                continue
+            if row['has_secrets'] and row['id'] not in self._secrets:
+                continue # submitted to another process, which holds its secrets
+            now = time.time()
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1, owner = ?, lease_until = ? "
+                "WHERE id = ? AND status = 'queued'",
+                (now, self.owner, now + LEASE_SECONDS, row['id'])
+            )
+            self._conn.commit()
+            if cursor.rowcount == 1:
+                self._running_tenants[tenant] = self._running_tenants.get(tenant, 0) + 1
+                return self.get_job(row['id'])
+        return None
+
+    async def _run_job(self, job: Job):
+        handler = self.handlers.get(job.kind)
+
+        def on_progress(progress: Any):
+            event = progress.model_dump() if hasattr(progress, 'model_dump') else progress
+            self._conn.execute(
+                "INSERT INTO job_events (job_id, timestamp, event) VALUES (?, ?, ?)",
+                (job.id, time.time(), json.dumps(event, default=str))
+            )
+            self._conn.commit()
+            # Relayed so /executions/{jobId}/events follows the job across retries
+            progress_bus.publish(job.id, event)
+
+        # Set before the task is created so the run's spans nest under the job
+        span, span_token = tracer.start_span(
+            f"job:{job.kind}", kind='job', trace_id=job.id,
+            attempt=job.attempts, tenant=job.tenant,
+            queueWaitMs=max(0.0, (job.startedAt or job.nextRunAt) - job.nextRunAt) * 1000
+        )
+        task = asyncio.create_task(handler(job, self._secrets.get(job.id, {}), on_progress))
+        self._running[job.id] = task
+        try:
+            result = await task
+            self._finish(job, 'succeeded', result=result)
+        except asyncio.CancelledError:
+            span.status = 'cancelled'
+            if job.id not in self._user_cancelled:
+                # Worker shutdown: leave the job for the next process
+                self._set_status(job.id, 'queued')
+                raise
+        except Exception as e:
+            span.status = 'error'
+            span.error = str(e)
+            self._retry_or_fail(job, e)
+        finally:
+            tracer.end_span(span, span_token)
+            self._running.pop(job.id, None)
+            self._user_cancelled.discard(job.id)
+            self._running_tenants[job.tenant] = max(0, self._running_tenants.get(job.tenant, 1) - 1)
+
+    def _retry_or_fail(self, job: Job, error: Exception):
+        if job.attempts < job.maxAttempts:
+            delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** (job.attempts - 1)))
+            print(f"Job {job.id} failed (attempt {job.attempts}/{job.maxAttempts}), retrying in {delay}s: {error}")
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', next_run_at = ?, error = ? WHERE id = ? AND status = 'running' AND owner = ?",
+                (time.time() + delay, str(error), job.id, self.owner)
+            )
+            self._conn.commit()
+            progress_bus.publish(job.id, {'jobId': job.id, 'status': 'retrying', 'message': str(error)})
+        else:
+            self._finish(job, 'failed', error=str(error))
+
+    def _finish(self, job: Job, status: str, result: Any = None, error: Optional[str] = None):
+        self._conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ?, lease_until = NULL "
+            "WHERE id = ? AND status = 'running' AND owner = ?",
+            (status, time.time(), json.dumps(result, default=str), error, job.id, self.owner)
+        )
+        self._conn.commit()
+        self._secrets.pop(job.id, None)
+        progress_bus.publish(job.id, {'jobId': job.id, 'status': status, 'message': error}, final=True)
+
+    def _set_status(self, job_id: str, status: str, finished_at: Optional[float] = None):
+        self._conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = COALESCE(?, finished_at) WHERE id = ?",
+            (status, finished_at, job_id)
+        )
+        self._conn.commit()
+
+    def _row_to_job(self, row: sqlite3.Row) -> Job:
+        return Job(
+            id=row['id'],
+            kind=row['kind'],
+            tenant=row['tenant'],
+            priority=row['priority'],
+            status=row['status'],
+            attempts=row['attempts'],
+            maxAttempts=row['max_attempts'],
+            nextRunAt=row['next_run_at'],
+            createdAt=row['created_at'],
+            startedAt=row['started_at'],
+            finishedAt=row['finished_at'],
+            payload=json.loads(row['payload']),
+            result=json.loads(row['result']) if row['result'] else None,
+            error=row['error']
+        )
+
+job_queue = JobQueue()
@@ -9,6 +9,8 @@ import heapq
 from typing import List, Dict, Set, Optional, Any
 from pydantic import BaseModel
 
+from ..utils.state_store import StateStore, state_store
+
 # ============================================================================
 # TYPE DEFINITIONS
 # ============================================================================
@@ -35,11 +37,26 @@ class KnowledgeEdge(BaseModel):
 # KNOWLEDGE GRAPH
 # ============================================================================
 
+NODES = 'kg_nodes'
+EDGES = 'kg_edges'
+INDEX = 'kg_index' # term -> node ids
+
 class KnowledgeGraph:
-    def __init__(self):
-        self.nodes: Dict[str, KnowledgeNode] = {}
-        self.edges: Dict[str, KnowledgeEdge] = {}
-        self.node_index: Dict[str, Set[str]] = {}
+    def __init__(self, store: Optional[StateStore] = None):
+        # Shared across workers; see utils/state_store
+        self.store = store or state_store
+
+    @property
+    def nodes(self) -> Dict[str, KnowledgeNode]:
+        return {k: KnowledgeNode(**v) for k, v in self.store.items(NODES).items()}
+
+    @property
+    def edges(self) -> Dict[str, KnowledgeEdge]:
+        return {k: KnowledgeEdge(**v) for k, v in self.store.items(EDGES).items()}
+
+    @property
+    def node_index(self) -> Dict[str, Set[str]]:
+        return {k: set(v) for k, v in self.store.items(INDEX).items()}
 
     async def add_node(self, node_data: Dict[str, Any]) -> KnowledgeNode:
         node = KnowledgeNode(
@@ -47,7 +64,7 @@ class KnowledgeGraph:
             **node_data,
             timestamp=time.time()
         )
-        self.nodes[node.id] = node
+        self.store.put(NODES, node.id, node.model_dump(), expected_version=0)
         self._index_node(node)
         
         # Auto-enrich (mock)
@@ -64,34 +81,39 @@ class KnowledgeGraph:
             weight=weight,
             timestamp=time.time()
         )
-        self.edges[edge.id] = edge
+        self.store.put(EDGES, edge.id, edge.model_dump(), expected_version=0)
         return edge
 
     def search(self, term: str, limit: int = 20) -> List[KnowledgeNode]:
         term = term.lower()
         results = set()
         
-        for idx_term, node_ids in self.node_index.items():
+        for idx_term, node_ids in self.store.items(INDEX).items():
             if term in idx_term or idx_term in term:
                 results.update(node_ids)
                 
-        nodes = [self.nodes[nid] for nid in results if nid in self.nodes]
+        nodes = []
+        for nid in results:
+            data = self.store.value(NODES, nid)
+            if data:
+                nodes.append(KnowledgeNode(**data))
         nodes.sort(key=lambda x: x.confidence, reverse=True)
         return nodes[:limit]
     
     def get_stats(self) -> Dict[str, Any]:
+        total_nodes = self.store.count(NODES)
+        total_edges = self.store.count(EDGES)
         return {
-            "totalNodes": len(self.nodes),
-            "totalEdges": len(self.edges),
-            "avgConnections": len(self.edges) / max(len(self.nodes), 1)
+            "totalNodes": total_nodes,
+            "totalEdges": total_edges,
+            "avgConnections": total_edges / max(total_nodes, 1)
         }
 
     def _index_node(self, node: KnowledgeNode):
         terms = f"{node.label} {node.description}".lower().split()
-        for term in terms:
+        for term in set(terms):
             if len(term) < 3: continue
-            if term not in self.node_index:
-                self.node_index[term] = set()
-            self.node_index[term].add(node.id)
+            # Other workers may be indexing the same term concurrently
+            self.store.update(INDEX, term, lambda ids: sorted(set(ids or []) | {node.id}))
 
 knowledge_graph = KnowledgeGraph()
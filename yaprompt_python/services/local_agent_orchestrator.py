@@ -1,7 +1,7 @@
 import time
 import uuid
 import asyncio
-from typing import List, Optional, Any, Dict, Union, Literal
+from typing import List, Optional, Any, Dict, Union, Literal, Callable
 from pydantic import ValidationError
 
 from ..types import (
@@ -22,11 +22,19 @@ class ExecutionResult:
         self.error = error
 
 class ExecutionRequest:
-    def __init__(self, agent_id: str, input_data: Any, strategy: str = 'auto', api_key: Optional[str] = None):
+    def __init__(
+        self,
+        agent_id: str,
+        input_data: Any,
+        strategy: str = 'auto',
+        api_key: Optional[str] = None,
+        on_progress: Optional[Callable[[Any], None]] = None
+    ):
         self.agent_id = agent_id
         self.input_data = input_data
         self.strategy = strategy
         self.api_key = api_key
+        self.on_progress = on_progress
 
 class LocalAgentOrchestrator:
     AGENTS_STORAGE_KEY = 'local_agents'
@@ -136,13 +144,13 @@ class LocalAgentOrchestrator:
             strategy = request.strategy
             if strategy == 'auto':
                 if agent.type == 'workflow':
-                    work_product = await self._execute_via_workflow(agent, request.input_data, request.api_key)
+                    work_product = await self._execute_via_workflow(agent, request.input_data, request.api_key, request.on_progress)
                 else:
-                    work_product = await self._execute_via_config(agent, request.input_data, request.api_key)
+                    work_product = await self._execute_via_config(agent, request.input_data, request.api_key, request.on_progress)
             elif strategy == 'workflow':
-                 work_product = await self._execute_via_workflow(agent, request.input_data, request.api_key)
+                 work_product = await self._execute_via_workflow(agent, request.input_data, request.api_key, request.on_progress)
             else:
-                 work_product = await self._execute_via_config(agent, request.input_data, request.api_key)
+                 work_product = await self._execute_via_config(agent, request.input_data, request.api_key, request.on_progress)
 
             # Save work product
             await work_product_manager.save_work_product(work_product)
@@ -158,11 +166,17 @@ class LocalAgentOrchestrator:
             await self._update_agent_stats(agent.id, False, 0)
             return ExecutionResult(False, error=str(e))
 
-    async def _execute_via_workflow(self, agent: StoredAgent, input_data: Any, api_key: Optional[str]) -> WorkProduct:
+    async def _execute_via_workflow(
+        self,
+        agent: StoredAgent,
+        input_data: Any,
+        api_key: Optional[str],
+        on_progress: Optional[Callable[[Any], None]] = None
+    ) -> WorkProduct:
         if not agent.workflow:
             raise ValueError('Agent does not have a workflow')
             
-        result = await local_workflow_engine.execute_workflow(agent.workflow, input_data, api_key)
+        result = await local_workflow_engine.execute_workflow(agent.workflow, input_data, api_key, on_progress)
         
         if result.status == 'error':
              raise Exception(result.error or 'Workflow execution failed')
@@ -188,11 +202,17 @@ class LocalAgentOrchestrator:
             metadata=wp_metadata
         )
 
-    async def _execute_via_config(self, agent: StoredAgent, input_data: Any, api_key: Optional[str]) -> WorkProduct:
+    async def _execute_via_config(
+        self,
+        agent: StoredAgent,
+        input_data: Any,
+        api_key: Optional[str],
+        on_progress: Optional[Callable[[Any], None]] = None
+    ) -> WorkProduct:
         if not agent.config:
             raise ValueError('Agent does not have a config')
             
-        return await agent_execution_engine.execute_agent(agent.config, input_data, api_key)
+        return await agent_execution_engine.execute_agent(agent.config, input_data, api_key, on_progress)
 
     async def _update_agent_stats(self, agent_id: str, success: bool, execution_time: float):
         agent = await self.get_agent(agent_id)
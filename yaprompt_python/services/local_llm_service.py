@@ -13,6 +13,9 @@ from typing import List, Dict, Optional, Any, Callable, AsyncGenerator
 from pydantic import BaseModel
 from fastapi import HTTPException
 
+from .failover_policy import failover_policy
+from ..utils.metrics import metrics
+
 # ============================================================================
 # TYPE DEFINITIONS
 # ============================================================================
@@ -38,6 +41,11 @@ class LLMResponse(BaseModel):
     tokensUsed: Optional[int] = None
     latencyMs: float
 
+class LLMBatchItem(BaseModel):
+    index: int
+    response: Optional[LLMResponse] = None
+    error: Optional[str] = None
+
 # ============================================================================
 # LOCAL LLM SERVICE
 # ============================================================================
@@ -46,6 +54,8 @@ class LocalLLMService:
     OLLAMA_ENDPOINT = 'http://localhost:11434'
     LMSTUDIO_ENDPOINT = 'http://localhost:1234'
     OPENROUTER_ENDPOINT = 'https://openrouter.ai/api/v1/chat/completions'
+    BATCH_CONCURRENCY = 4
+    OLLAMA_KEEP_ALIVE = '5m'
     
     def __init__(self):
         self.config = LocalLLMConfig()
@@ -135,35 +145,16 @@ class LocalLLMService:
     async def generate(self, prompt: str, options: Dict[str, Any] = None) -> LLMResponse:
         start_time = time.time()
         options = options or {}
-        
-        provider = options.get('provider', self.config.provider)
-        if provider == 'auto':
-            provider = await self.select_best_provider()
-
-        model = options.get('model', self.config.model)
-        system_prompt = options.get('systemPrompt', '')
-        temperature = options.get('temperature', self.config.temperature)
+        provider, model, system_prompt, temperature = await self._resolve_request(options)
+        max_tokens = int(options.get('maxTokens') or self.config.maxTokens)
         
         text = ""
         tokens_used = 0
 
-        # Auto-detect provider based on model name if it's a known cloud model
-        if '/' in model or 'gpt' in model or 'claude' in model:
-            provider = 'openrouter'
-        elif 'gemini' in model and provider != 'openrouter' and not '/' in model:
-            provider = 'gemini'
-
         try:
-            if provider == 'ollama':
-                text = await self._generate_ollama(prompt, model, system_prompt, temperature)
-            elif provider == 'lmstudio':
-                text = await self._generate_lmstudio(prompt, model, system_prompt, temperature)
-            elif provider == 'gemini':
-                text = await self._generate_gemini(prompt, model, system_prompt, temperature)
-            elif provider == 'openrouter':
-                text = await self._generate_openrouter(prompt, model, system_prompt, temperature)
-            else:
-                raise HTTPException(status_code=503, detail="No LLM provider available. Please set GEMINI_API_KEY or OPENROUTER_API_KEY.")
+            text = await self._dispatch(
+                provider, prompt, model, system_prompt, temperature, options.get('apiKey'), max_tokens=max_tokens
+            )
         except Exception as e:
             text = f"Error from {provider}: {str(e)}"
             
@@ -176,6 +167,109 @@ class LocalLLMService:
             latencyMs=latency
         )
 
+    async def generate_batch(self, prompts: List[str], options: Dict[str, Any] = None) -> List[LLMBatchItem]:
+        """
+        Generate completions for many prompts sharing the same options.
+        Prompts run concurrently (options['concurrency'], default BATCH_CONCURRENCY)
+        and results come back in input order. A failing prompt yields an item with
+        `error` set instead of failing the whole batch.
+        """
+        options = options or {}
+        if not prompts:
+            return []
+
+        provider, model, system_prompt, temperature = await self._resolve_request(options)
+        max_tokens = int(options.get('maxTokens') or self.config.maxTokens)
+        api_key = options.get('apiKey')
+        concurrency = max(1, int(options.get('concurrency', self.BATCH_CONCURRENCY)))
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(index: int, prompt: str, session: Optional[aiohttp.ClientSession]) -> LLMBatchItem:
+            async with semaphore:
+                start_time = time.time()
+                try:
+                    text = await self._dispatch(
+                        provider, prompt, model, system_prompt, temperature, api_key, session, max_tokens=max_tokens
+                    )
+                except Exception as e:
+                    return LLMBatchItem(index=index, error=f"Error from {provider}: {str(e)}")
+                return LLMBatchItem(index=index, response=LLMResponse(
+                    text=text,
+                    provider=provider,
+                    model=model,
+                    tokensUsed=0,
+                    latencyMs=(time.time() - start_time) * 1000
+                ))
+
+        if provider in ('ollama', 'lmstudio'):
+            # Local servers: one keep-alive session for the whole batch so every
+            # prompt reuses the same connections (and Ollama keeps the model loaded)
+            connector = aiohttp.TCPConnector(limit=concurrency)
+            async with aiohttp.ClientSession(connector=connector) as session:
+                return list(await asyncio.gather(*(run(i, p, session) for i, p in enumerate(prompts))))
+
+        return list(await asyncio.gather(*(run(i, p, None) for i, p in enumerate(prompts))))
+
+    async def _resolve_request(self, options: Dict[str, Any]) -> tuple[str, str, str, float]:
+        provider = options.get('provider', self.config.provider)
+        if provider == 'auto':
+            provider = await self.select_best_provider()
+
+        model = options.get('model', self.config.model)
+        system_prompt = options.get('systemPrompt', '')
+        temperature = options.get('temperature', self.config.temperature)
+
+        # Auto-detect provider based on model name if it's a known cloud model
+        if '/' in model or 'gpt' in model or 'claude' in model:
+            provider = 'openrouter'
+        elif 'gemini' in model and provider != 'openrouter' and not '/' in model:
+            provider = 'gemini'
+
+        return provider, model, system_prompt, temperature
+
+    async def _dispatch(
+        self,
+        provider: str,
+        prompt: str,
+        model: str,
+        system_prompt: str,
+        temperature: float,
+        api_key: Optional[str] = None,
+        session: Optional[aiohttp.ClientSession] = None,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        start = time.perf_counter()
+        try:
+            return await self._dispatch_provider(
+                provider, prompt, model, system_prompt, temperature, api_key, session, max_tokens or self.config.maxTokens
+            )
+        except Exception:
+            metrics.llm_errors.inc(provider)
+            raise
+        finally:
+            metrics.llm_latency.observe(time.perf_counter() - start, provider)
+
+    async def _dispatch_provider(
+        self,
+        provider: str,
+        prompt: str,
+        model: str,
+        system_prompt: str,
+        temperature: float,
+        api_key: Optional[str],
+        session: Optional[aiohttp.ClientSession],
+        max_tokens: int
+    ) -> str:
+        if provider == 'ollama':
+            return await self._generate_ollama(prompt, model, system_prompt, temperature, session, max_tokens)
+        elif provider == 'lmstudio':
+            return await self._generate_lmstudio(prompt, model, system_prompt, temperature, session, max_tokens)
+        elif provider == 'gemini':
+            return await self._generate_gemini(prompt, model, system_prompt, temperature, api_key, max_tokens)
+        elif provider == 'openrouter':
+            return await self._generate_openrouter(prompt, model, system_prompt, temperature, max_tokens)
+        raise HTTPException(status_code=503, detail="No LLM provider available. Please set GEMINI_API_KEY or OPENROUTER_API_KEY.")
+
     # --- Providers ---
 
     async def _list_ollama_models(self) -> List[ModelInfo]:
@@ -194,27 +288,41 @@ class LocalLLMService:
                     return [ModelInfo(name=m['id'], size='Unknown', modified='', available=True) for m in data.get('data', [])]
         except: return []
 
-    async def _generate_ollama(self, prompt: str, model: str, system: str, temp: float) -> str:
+    async def _generate_ollama(self, prompt: str, model: str, system: str, temp: float,
+                               session: Optional[aiohttp.ClientSession] = None, max_tokens: Optional[int] = None) -> str:
         url = f"{self.OLLAMA_ENDPOINT}/api/generate"
-        payload = {"model": model, "prompt": prompt, "system": system, "temperature": temp, "stream": False}
+        # Ollama reads sampling settings from "options" only
+        sampling = {"temperature": temp}
+        if max_tokens:
+            sampling["num_predict"] = max_tokens
+        payload = {"model": model, "prompt": prompt, "system": system, "options": sampling, "stream": False}
+        if session is not None:
+            payload["keep_alive"] = self.OLLAMA_KEEP_ALIVE
+            return (await self._post_json(session, url, payload)).get('response', '')
         async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload) as resp:
-                if resp.status != 200: raise Exception(f"Status {resp.status}")
-                return (await resp.json()).get('response', '')
+            return (await self._post_json(session, url, payload)).get('response', '')
 
-    async def _generate_lmstudio(self, prompt: str, model: str, system: str, temp: float) -> str:
+    async def _generate_lmstudio(self, prompt: str, model: str, system: str, temp: float,
+                                 session: Optional[aiohttp.ClientSession] = None, max_tokens: Optional[int] = None) -> str:
         url = f"{self.LMSTUDIO_ENDPOINT}/v1/chat/completions"
         messages = [{"role": "user", "content": prompt}]
         if system: messages.insert(0, {"role": "system", "content": system})
         payload = {"model": model, "messages": messages, "temperature": temp, "stream": False}
+        if max_tokens: payload["max_tokens"] = max_tokens
+        if session is not None:
+            return (await self._post_json(session, url, payload))['choices'][0]['message']['content']
         async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload) as resp:
-                if resp.status != 200: raise Exception(f"Status {resp.status}")
-                return (await resp.json())['choices'][0]['message']['content']
+            return (await self._post_json(session, url, payload))['choices'][0]['message']['content']
+
+    async def _post_json(self, session: aiohttp.ClientSession, url: str, payload: Dict[str, Any]) -> Any:
+        async with session.post(url, json=payload) as resp:
+            if resp.status != 200: raise Exception(f"Status {resp.status}")
+            return await resp.json()
 
-    async def _generate_gemini(self, prompt: str, model: str, system: str, temp: float) -> str:
+    async def _generate_gemini(self, prompt: str, model: str, system: str, temp: float,
+                               api_key: Optional[str] = None, max_tokens: Optional[int] = None) -> str:
         import google.generativeai as genai
-        api_key = os.getenv("GEMINI_API_KEY")
+        api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not api_key: raise Exception("Missing GEMINI_API_KEY")
         genai.configure(api_key=api_key)
         
@@ -225,19 +333,17 @@ class LocalLLMService:
         if model and 'gemini' in model and model not in models_to_try:
             models_to_try.insert(0, model)
             
-        last_error = None
-        for m in models_to_try:
-            try:
-                g_model = genai.GenerativeModel(m)
-                response = await asyncio.to_thread(g_model.generate_content, prompt)
-                return response.text
-            except Exception as e:
-                last_error = e
-                continue # Try next model
-        
-        raise last_error
+        generation_config = genai.types.GenerationConfig(temperature=temp, max_output_tokens=max_tokens)
+
+        async def attempt(m: str) -> str:
+            g_model = genai.GenerativeModel(m, system_instruction=system or None)
+            response = await asyncio.to_thread(g_model.generate_content, prompt, generation_config=generation_config)
+            return response.text
+
+        return await failover_policy.execute(models_to_try, attempt, namespace='gemini')
 
-    async def _generate_openrouter(self, prompt: str, model: str, system: str, temp: float) -> str:
+    async def _generate_openrouter(self, prompt: str, model: str, system: str, temp: float,
+                                   max_tokens: Optional[int] = None) -> str:
         api_key = os.getenv("OPENROUTER_API_KEY")
         if not api_key: raise Exception("Missing OPENROUTER_API_KEY")
         
@@ -259,8 +365,6 @@ class LocalLLMService:
              # But if it's the default local model 'llama3.2:3b', ignore it and use fallbacks
              fallback_models = [model]
 
-        last_error = None
-        
         headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json",
@@ -268,7 +372,7 @@ class LocalLLMService:
             "X-Title": "PromptForge Studio"
         }
 
-        for target_model in fallback_models:
+        async def attempt(target_model: str) -> str:
             print(f"Attempting OpenRouter model: {target_model}")
             messages = [{"role": "user", "content": prompt}]
             if system: messages.insert(0, {"role": "system", "content": system})
@@ -278,28 +382,20 @@ class LocalLLMService:
                 "messages": messages,
                 "temperature": temp
             }
+            if max_tokens: payload["max_tokens"] = max_tokens
             
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(self.OPENROUTER_ENDPOINT, json=payload, headers=headers) as resp:
-                        if resp.status != 200:
-                            err_text = await resp.text()
-                            # If rate limit or temporary error, continue to next model
-                            if resp.status == 429 or resp.status >= 500:
-                                print(f"Model {target_model} failed with {resp.status}: {err_text}")
-                                last_error = Exception(f"OpenRouter Error {resp.status}: {err_text}")
-                                continue
-                            else:
-                                # If it's a 4xx error (like bad request), fail immediately
-                                raise Exception(f"OpenRouter Error {resp.status}: {err_text}")
-                        
-                        data = await resp.json()
-                        return data['choices'][0]['message']['content']
-            except Exception as e:
-                print(f"Connection error with {target_model}: {e}")
-                last_error = e
-                continue
-        
-        raise last_error or Exception("All OpenRouter models failed.")
+            async with aiohttp.ClientSession() as session:
+                async with session.post(self.OPENROUTER_ENDPOINT, json=payload, headers=headers) as resp:
+                    if resp.status != 200:
+                        err_text = await resp.text()
+                        print(f"Model {target_model} failed with {resp.status}: {err_text}")
+                        raise Exception(f"OpenRouter Error {resp.status}: {err_text}")
+                    
+                    data = await resp.json()
+                    return data['choices'][0]['message']['content']
+
+        # Models are raced by the failover policy: a failure moves straight to the
+        # next model, a slow one gets a hedged request after its p95 latency
+        return await failover_policy.execute(fallback_models, attempt, namespace='openrouter')
 
 local_llm_service = LocalLLMService()
@@ -1,11 +1,11 @@
 import time
 import json
 import uuid
-import re
 import asyncio
 import aiohttp
-from typing import Dict, Any, List, Optional, Callable, Union
-import google.generativeai as genai
+from urllib.parse import urlsplit
+from collections import ChainMap
+from typing import Dict, Any, List, Optional, Callable, Union, Awaitable
 
 from ..types import (
     Workflow, WorkflowNode, WorkflowExecutionContext, WorkflowExecutionResult,
@@ -13,8 +13,35 @@ from ..types import (
 )
 from ..config import Config
 from ..utils.storage import storage
+from .failover_policy import failover_policy
+from .execution_journal import execution_journal
+from .node_output_cache import node_output_cache
+from .progress_bus import progress_bus
+from .tracer import tracer
+from .local_llm_service import local_llm_service
+from .template_compiler import (
+    NodeTemplates, CompiledObject, template_cache, compile_template, compile_path, get_nested_value
+)
+from .script_sandbox import DEFAULT_CPU_LIMIT, run_transform, run_transform_in_pool, evaluate_condition
 
 class LocalWorkflowEngine:
+    GEMINI_MODEL = 'gemini-2.0-flash-exp'
+
+    # name -> (Direct URL, Direct Model, OpenRouter Model)
+    FALLBACK_PROVIDERS = {
+        'deepseek': ('https://api.deepseek.com/v1/chat/completions', 'deepseek-chat', 'deepseek/deepseek-chat'),
+        'kimi': ('https://api.moonshot.cn/v1/chat/completions', 'moonshot-v1-8k', 'moonshotai/moonshot-v1-8k'),
+        'qwen': ('https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions', 'qwen-plus', 'qwen/qwen-plus'),
+        'openai': ('https://api.openai.com/v1/chat/completions', 'gpt-4o-mini', 'openai/gpt-4o-mini'),
+        'mistral': ('https://api.mistral.ai/v1/chat/completions', 'mistral-small-latest', 'mistralai/mistral-small'),
+        'meta': ('https://api.meta.com/v1/chat/completions', 'llama-3-70b', 'meta-llama/llama-3-70b-instruct'), # Hypothetical direct
+        'venice': ('https://api.venice.ai/api/v1/chat/completions', 'venice-v1', 'venice/venice-v1'), # Hypothetical
+        'nvidia': ('https://integrate.api.nvidia.com/v1/chat/completions', 'nvidia/llama3-chatqa-1.5-70b', 'nvidia/llama-3.1-nemotron-70b-instruct'),
+    }
+
+    # Configured preference; the failover policy reorders by observed latency
+    FALLBACK_ORDER = ['deepseek', 'kimi', 'qwen', 'openai', 'mistral', 'meta', 'venice', 'nvidia']
+
     def __init__(self):
         self.progress_callbacks: Dict[str, Callable[[ExecutionProgress], None]] = {}
 
@@ -34,12 +61,58 @@ class LocalWorkflowEngine:
             nodeOutputs={},
             variables={},
             startTime=int(time.time() * 1000),
-            apiKey=api_key
+            apiKey=api_key,
+            workflowVersion=self._workflow_version(workflow)
+        )
+
+        await execution_journal.record_start(execution_id, workflow, input_data, context.variables)
+        return await self._run(workflow, context, on_progress)
+
+    async def resume_workflow(
+        self,
+        execution_id: str,
+        api_key: Optional[str] = None,
+        on_progress: Optional[Callable[[ExecutionProgress], None]] = None
+    ) -> WorkflowExecutionResult:
+        """
+        Re-run a journaled execution. Nodes whose output was checkpointed are
+        restored from the journal instead of being executed again.
+        """
+        journaled = execution_journal.load(execution_id)
+        if not journaled:
+            raise ValueError(f"No journal found for execution \"{execution_id}\"")
+
+        workflow = journaled.workflow
+        context = WorkflowExecutionContext(
+            workflowId=workflow.id,
+            executionId=execution_id,
+            input=journaled.input,
+            nodeOutputs={},
+            variables=journaled.variables,
+            startTime=int(time.time() * 1000),
+            apiKey=api_key,
+            workflowVersion=self._workflow_version(workflow),
+            restoredOutputs=journaled.nodeOutputs
         )
 
+        await execution_journal.record_resume(execution_id)
+        return await self._run(workflow, context, on_progress)
+
+    async def _run(
+        self,
+        workflow: Workflow,
+        context: WorkflowExecutionContext,
+        on_progress: Optional[Callable[[ExecutionProgress], None]] = None
+    ) -> WorkflowExecutionResult:
+        execution_id = context.executionId
+
         if on_progress:
             self.progress_callbacks[execution_id] = on_progress
 
+        span, span_token = tracer.start_span(
+            workflow.name, kind='execution', trace_id=execution_id,
+            executionId=execution_id, workflowId=workflow.id
+        )
         try:
             # Find start node
             start_node = next((n for n in workflow.nodes if n.id == workflow.startNode), None)
@@ -61,7 +134,7 @@ class LocalWorkflowEngine:
                 executionTime=duration,
                 nodesExecuted=len(context.nodeOutputs),
                 totalNodes=len(workflow.nodes),
-                nodeResults=context.nodeOutputs
+                nodeResults=self._node_results(context)
             )
 
             self._update_progress(execution_id, ExecutionProgress(
@@ -73,10 +146,13 @@ class LocalWorkflowEngine:
                 message='Workflow completed successfully'
             ))
 
+            await execution_journal.record_end(execution_id, 'success')
             return result
 
         except Exception as error:
             duration = (time.time() * 1000) - context.startTime
+            span.status = 'error'
+            span.error = str(error)
             self._update_progress(execution_id, ExecutionProgress(
                 executionId=execution_id,
                 currentNode='error',
@@ -86,6 +162,7 @@ class LocalWorkflowEngine:
                 message=str(error)
             ))
 
+            await execution_journal.record_end(execution_id, 'error', str(error))
             return WorkflowExecutionResult(
                 executionId=execution_id,
                 status='error',
@@ -94,9 +171,10 @@ class LocalWorkflowEngine:
                 nodesExecuted=len(context.nodeOutputs),
                 totalNodes=len(workflow.nodes),
                 error=str(error),
-                nodeResults=context.nodeOutputs
+                nodeResults=self._node_results(context)
             )
         finally:
+            tracer.end_span(span, span_token)
             if execution_id in self.progress_callbacks:
                 del self.progress_callbacks[execution_id]
 
@@ -119,36 +197,68 @@ class LocalWorkflowEngine:
             message=f"Executing: {node.name}"
         ))
 
-        node_input = self._prepare_node_input(node, context)
-        
-        output = None
-        
-        if node.type == WorkflowNodeType.LLM_CALL:
-            output = await self._execute_llm_call(node, node_input, context)
-        elif node.type == WorkflowNodeType.HTTP_REQUEST:
-            output = await self._execute_http_request(node, node_input, context)
-        elif node.type == WorkflowNodeType.TRANSFORM_DATA:
-            output = await self._execute_transform(node, node_input, context)
-        elif node.type == WorkflowNodeType.EXTRACT_DATA:
-            output = await self._execute_extract(node, node_input, context)
-        elif node.type == WorkflowNodeType.BROWSER_ACTION:
-            output = await self._execute_browser_action(node, node_input, context)
-        elif node.type == WorkflowNodeType.STORAGE_READ:
-            output = await self._execute_storage_read(node, node_input, context)
-        elif node.type == WorkflowNodeType.STORAGE_WRITE:
-            output = await self._execute_storage_write(node, node_input, context)
-        elif node.type == WorkflowNodeType.CONDITIONAL:
-            output = await self._execute_conditional(node, node_input, workflow, context)
-            if output is not None and not isinstance(output, dict):
-                 # Result from executed branch
-                 pass # return output? The TS code returns output of branch execution
-            return output 
-        elif node.type == WorkflowNodeType.LOOP:
-            output = await self._execute_loop(node, node_input, workflow, context)
-        else:
-            raise ValueError(f"Unknown node type: {node.type}")
-
-        context.nodeOutputs[node.id] = output
+        node_start = time.time()
+        with tracer.span(node.name, kind='node', nodeId=node.id, nodeType=node.type.value) as span:
+            node_input = self._prepare_node_input(node, context)
+
+            output = None
+            cache_key = None
+            cache_hit = False
+            restored = node.id in context.restoredOutputs and node.type != WorkflowNodeType.CONDITIONAL
+            if not restored and node_output_cache.is_cacheable(node):
+                cache_key = node_output_cache.make_key(node, self._cache_input(node, node_input, context))
+                cache_hit, output = node_output_cache.get(cache_key)
+                context.cacheStatus[node.id] = 'hit' if cache_hit else 'miss'
+                span.set(cache=context.cacheStatus[node.id])
+
+            if restored:
+                # Checkpointed by an earlier attempt of this execution; never recompute
+                output = context.restoredOutputs[node.id]
+                span.set(restored=True)
+            elif cache_hit:
+                pass
+            elif node.type == WorkflowNodeType.LLM_CALL:
+                output = await self._execute_llm_call(node, node_input, context)
+            elif node.type == WorkflowNodeType.HTTP_REQUEST:
+                output = await self._execute_http_request(node, node_input, context)
+            elif node.type == WorkflowNodeType.TRANSFORM_DATA:
+                output = await self._execute_transform(node, node_input, context)
+            elif node.type == WorkflowNodeType.EXTRACT_DATA:
+                output = await self._execute_extract(node, node_input, context)
+            elif node.type == WorkflowNodeType.BROWSER_ACTION:
+                output = await self._execute_browser_action(node, node_input, context)
+            elif node.type == WorkflowNodeType.STORAGE_READ:
+                output = await self._execute_storage_read(node, node_input, context)
+            elif node.type == WorkflowNodeType.STORAGE_WRITE:
+                output = await self._execute_storage_write(node, node_input, context)
+            elif node.type == WorkflowNodeType.CONDITIONAL:
+                output = await self._execute_conditional(node, node_input, workflow, context)
+                if output is not None and not isinstance(output, dict):
+                     # Result from executed branch
+                     pass # return output? The TS code returns output of branch execution
+                return output 
+            elif node.type == WorkflowNodeType.LOOP:
+                output = await self._execute_loop(node, node_input, workflow, context)
+            else:
+                raise ValueError(f"Unknown node type: {node.type}")
+
+            if cache_key and not cache_hit:
+                node_output_cache.set(cache_key, output, node)
+
+            context.nodeOutputs[node.id] = output
+            if context.checkpoint and node.id not in context.restoredOutputs:
+                await execution_journal.record_node(context.executionId, node.id, output)
+
+        self._update_progress(context.executionId, ExecutionProgress(
+            executionId=context.executionId,
+            currentNode=node.name,
+            nodeId=node.id,
+            durationMs=(time.time() - node_start) * 1000,
+            nodesExecuted=len(context.nodeOutputs),
+            totalNodes=len(workflow.nodes),
+            status='running',
+            message=f"Completed: {node.name}"
+        ))
 
         # Execute next nodes
         next_connections = [c for c in workflow.connections if c.from_ == node.id]
@@ -159,140 +269,96 @@ class LocalWorkflowEngine:
 
         return output
 
+    def _workflow_version(self, workflow: Workflow) -> Optional[str]:
+        if not workflow.metadata:
+            return None
+        return f"{workflow.metadata.version}:{workflow.metadata.lastModified}"
+
+    def _templates(self, node: WorkflowNode, context: WorkflowExecutionContext) -> NodeTemplates:
+        return template_cache.get(context.workflowId, context.workflowVersion, node)
+
     def _prepare_node_input(self, node: WorkflowNode, context: WorkflowExecutionContext) -> Any:
         input_data = context.input.copy() if isinstance(context.input, dict) else {'input': context.input}
 
-        if node.config.inputMapping:
-            for key, source_path in node.config.inputMapping.items():
-                input_data[key] = self._resolve_data_path(source_path, context)
+        for key, source_path in self._templates(node, context).input_mapping:
+            input_data[key] = source_path.resolve(context)
 
         input_data['$nodes'] = context.nodeOutputs
         input_data['$variables'] = context.variables
         return input_data
 
+    def _cache_input(self, node: WorkflowNode, node_input: Dict[str, Any], context: WorkflowExecutionContext) -> Any:
+        """
+        The part of a node's input its output depends on (its config is
+        keyed separately): only the values its templates, mapping or fields
+        read, so unrelated upstream outputs don't defeat the cache. Scripts
+        and pass-through transforms can read anything, so they key on all of it.
+        """
+        templates = self._templates(node, context)
+        if node.type in (WorkflowNodeType.LLM_CALL, WorkflowNodeType.HTTP_REQUEST):
+            return {'.'.join(path): get_nested_value(node_input, path) for path in templates.placeholders}
+        if node.type == WorkflowNodeType.TRANSFORM_DATA and not node.config.transformScript and templates.mapping:
+            return {path.literal: path.resolve(context) for _, path in templates.mapping}
+        if node.type == WorkflowNodeType.EXTRACT_DATA and node.config.fields:
+            return {field: node_input.get(field) for field in node.config.fields}
+        if node.type == WorkflowNodeType.STORAGE_READ:
+            return {}
+        return {**node_input, '$nodes': dict(context.nodeOutputs)}
+
     def _resolve_data_path(self, path: str, context: WorkflowExecutionContext) -> Any:
-        if path.startswith('$nodes.'):
-            parts = path[7:].split('.')
-            node_id = parts[0]
-            node_output = context.nodeOutputs.get(node_id)
-            if node_output is None:
-                return None
-            return self._get_nested_value(node_output, parts[1:]) if len(parts) > 1 else node_output
-        elif path.startswith('$variables.'):
-            var_name = path[11:]
-            return context.variables.get(var_name)
-        elif path.startswith('$input.'):
-            parts = path[7:].split('.')
-            return self._get_nested_value(context.input, parts)
-        return path
-
-    def _get_nested_value(self, obj: Any, path: List[str]) -> Any:
-        current = obj
-        for key in path:
-            if isinstance(current, dict):
-                 current = current.get(key)
-            elif isinstance(current, list) and key.isdigit():
-                 try:
-                     current = current[int(key)]
-                 except IndexError:
-                     return None
-            else:
-                 return getattr(current, key, None)
-            
-            if current is None:
-                return None
-        return current
+        return compile_path(path).resolve(context)
 
     def _interpolate_string(self, template: str, data: Any) -> str:
-        # Regex to find {{ ... }}
-        def replace_match(match):
-            path = match.group(1).strip()
-            value = self._get_nested_value(data, path.split('.'))
-            return str(value) if value is not None else match.group(0)
-        
-        return re.sub(r'\{\{([^}]+)\}\}', replace_match, template)
+        return compile_template(template).render(data)
 
     def _interpolate_object(self, obj: Any, data: Any) -> Any:
-        if isinstance(obj, str):
-            return self._interpolate_string(obj, data)
-        elif isinstance(obj, list):
-            return [self._interpolate_object(item, data) for item in obj]
-        elif isinstance(obj, dict):
-            return {k: self._interpolate_object(v, data) for k, v in obj.items()}
-        return obj
+        return CompiledObject(obj).render(data)
 
     async def _execute_llm_call(self, node: WorkflowNode, input_data: Any, context: WorkflowExecutionContext) -> Any:
-        prompt = self._interpolate_string(node.config.prompt or '', input_data)
-        
-        # Primary: Try Gemini
-        try:
-            api_key = context.apiKey or Config.GEMINI_API_KEY
-            if not api_key:
-                raise ValueError("API key required for LLM calls")
-
-            genai.configure(api_key=api_key)
-            model_name = 'gemini-2.0-flash-exp'
-            
-            gen_config = {
-                "temperature": node.config.temperature or 0.7,
-                "maxWorkflowTokens": node.config.maxTokens or 2048
-            }
-            
-            model = genai.GenerativeModel(model_name)
-            response = model.generate_content(prompt, generation_config=genai.types.GenerationConfig(
-                temperature=gen_config['temperature'],
-                max_output_tokens=gen_config['maxWorkflowTokens']
-            ))
-            
-            return {"text": response.text, "raw": str(response)}
-            
-        except Exception as e:
-            # Check for Fallbacks
-            error_str = str(e)
-            if "429" in error_str or "quota" in error_str.lower() or "resource exhausted" in error_str.lower():
-                print(f"Gemini quota exceeded. Attempting fallbacks...")
-                fallback_result = await self._try_fallback_providers(prompt, node.config)
-                if fallback_result:
-                    return fallback_result
-            
-            # If no fallback succeeded or not a quota error
-            raise e
-
-    async def _try_fallback_providers(self, prompt: str, config: NodeConfig) -> Optional[Dict[str, Any]]:
-        # List of providers and their default models/direct-urls
-        # name -> (Direct URL, Direct Model, OpenRouter Model)
-        providers_map = {
-            'deepseek': ('https://api.deepseek.com/v1/chat/completions', 'deepseek-chat', 'deepseek/deepseek-chat'),
-            'kimi': ('https://api.moonshot.cn/v1/chat/completions', 'moonshot-v1-8k', 'moonshotai/moonshot-v1-8k'),
-            'qwen': ('https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions', 'qwen-plus', 'qwen/qwen-plus'),
-            'openai': ('https://api.openai.com/v1/chat/completions', 'gpt-4o-mini', 'openai/gpt-4o-mini'),
-            'mistral': ('https://api.mistral.ai/v1/chat/completions', 'mistral-small-latest', 'mistralai/mistral-small'),
-            'meta': ('https://api.meta.com/v1/chat/completions', 'llama-3-70b', 'meta-llama/llama-3-70b-instruct'), # Hypothetical direct
-            'venice': ('https://api.venice.ai/api/v1/chat/completions', 'venice-v1', 'venice/venice-v1'), # Hypothetical
-            'nvidia': ('https://integrate.api.nvidia.com/v1/chat/completions', 'nvidia/llama3-chatqa-1.5-70b', 'nvidia/llama-3.1-nemotron-70b-instruct'),
-        }
-
-        # Order to try
-        try_order = ['deepseek', 'kimi', 'qwen', 'openai', 'mistral', 'meta', 'venice', 'nvidia']
-
-        for name in try_order:
-            key = Config.FALLBACK_KEYS.get(name)
-            if not key:
-                continue
-
-            # Determine URL and Model based on key type
-            url, model = self._resolve_provider_config(name, key, providers_map)
-            
-            print(f"Trying fallback: {name} (URL: {url}, Model: {model})...")
-            try:
-                result = await self._call_openai_compatible(url, key, model, prompt, config)
-                if result:
-                    print(f"Fallback {name} succeeded.")
-                    return result
-            except Exception as e:
-                print(f"Fallback {name} failed: {e}")
-
-        return None
+        prompt = self._templates(node, context).prompt.render(input_data)
+        return await self._generate_text(prompt, node.config, context)
+
+    async def _generate_text(self, prompt: str, config: NodeConfig, context: WorkflowExecutionContext) -> Dict[str, Any]:
+        api_key = context.apiKey or Config.GEMINI_API_KEY
+        providers = (['gemini'] if api_key else []) + [
+            name for name in self.FALLBACK_ORDER if Config.FALLBACK_KEYS.get(name)
+        ]
+        if not providers:
+            raise ValueError("API key required for LLM calls")
+
+        async def attempt(name: str) -> Dict[str, Any]:
+            with tracer.span(f"llm:{name}", kind='llm', provider=name):
+                if name == 'gemini':
+                    return await self._call_gemini(api_key, prompt, config)
+
+                key = Config.FALLBACK_KEYS[name]
+                url, model = self._resolve_provider_config(name, key, self.FALLBACK_PROVIDERS)
+                print(f"Trying fallback: {name} (URL: {url}, Model: {model})...")
+                try:
+                    return await self._call_openai_compatible(url, key, model, prompt, config)
+                except Exception as e:
+                    print(f"Fallback {name} failed: {e}")
+                    raise
+
+        # Gemini stays first until the latency histograms say otherwise; fallbacks are
+        # fired on failure or hedged in once the current provider exceeds its p95
+        return await failover_policy.execute(providers, attempt, namespace='workflow')
+
+    async def _call_gemini(self, api_key: str, prompt: str, config: NodeConfig) -> Dict[str, Any]:
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(self.GEMINI_MODEL)
+        response = await asyncio.to_thread(
+            model.generate_content,
+            prompt,
+            generation_config=genai.types.GenerationConfig(
+                temperature=config.temperature or 0.7,
+                max_output_tokens=config.maxTokens or 2048
+            )
+        )
+        usage = getattr(response, 'usage_metadata', None)
+        tracer.annotate(model=self.GEMINI_MODEL, tokens=getattr(usage, 'total_token_count', None) or 0)
+        return {"text": response.text, "raw": str(response)}
 
     def _resolve_provider_config(self, name: str, key: str, providers_map: Dict) -> tuple[str, str]:
         defaults = providers_map.get(name)
@@ -335,6 +401,7 @@ class LocalWorkflowEngine:
                 data = await response.json()
                 # Handle OpenRouter structure vs Direct
                 if 'choices' in data:
+                    tracer.annotate(model=model, tokens=(data.get('usage') or {}).get('total_tokens') or 0)
                     content = data['choices'][0]['message']['content']
                     return {"text": content, "raw": data}
                 else: 
@@ -342,51 +409,46 @@ class LocalWorkflowEngine:
 
 
     async def _execute_http_request(self, node: WorkflowNode, input_data: Any, context: WorkflowExecutionContext) -> Any:
-        url = self._interpolate_string(node.config.url or '', input_data)
+        templates = self._templates(node, context)
+        url = templates.url.render(input_data)
         method = node.config.method or 'GET'
-        headers = node.config.headers or {}
-        body = None
-        if node.config.body:
-             body = self._interpolate_object(node.config.body, input_data)
-
-        async with aiohttp.ClientSession() as session:
-            async with session.request(method, url, headers=headers, json=body) as response:
-                content_type = response.headers.get('Content-Type', '')
-                if 'application/json' in content_type:
-                    data = await response.json()
-                else:
-                    data = await response.text()
-                
-                return {
-                    "status": response.status,
-                    "statusText": response.reason,
-                    "headers": dict(response.headers),
-                    "data": data
-                }
+        headers = templates.headers.render(input_data) if templates.headers else {}
+        body = templates.body.render(input_data) if templates.body else None
+
+        # Host only: query strings can carry credentials
+        with tracer.span(f"http:{method}", kind='http', method=method, host=urlsplit(url).netloc) as span:
+            async with aiohttp.ClientSession() as session:
+                async with session.request(method, url, headers=headers, json=body) as response:
+                    span.set(statusCode=response.status)
+                    content_type = response.headers.get('Content-Type', '')
+                    if 'application/json' in content_type:
+                        data = await response.json()
+                    else:
+                        data = await response.text()
+
+                    return {
+                        "status": response.status,
+                        "statusText": response.reason,
+                        "headers": dict(response.headers),
+                        "data": data
+                    }
 
     async def _execute_transform(self, node: WorkflowNode, input_data: Any, context: WorkflowExecutionContext) -> Any:
         if node.config.transformScript:
-            # Danger: Executing arbitrary code
-            # In a real local app this is somewhat acceptable if source is trusted
-            # Using a restricted local scope
-            
-            script = node.config.transformScript
-            # Wrap in a function to allow return
-            # But exec doesn't return. 
-            # We can define a function and call it.
-            
-            local_scope = {'input': input_data, 'context': {'variables': context.variables}}
-            exec_str = f"def transform(input, context):\n  {script}\nresult = transform(input, context)"
+            # Scripts run precompiled with restricted builtins and a CPU-time limit
+            cpu_limit = node.config.cpuTimeLimit or DEFAULT_CPU_LIMIT
             try:
-                exec(exec_str, {}, local_scope)
-                return local_scope.get('result')
+                if node.config.runInProcessPool:
+                    return await run_transform_in_pool(node.config.transformScript, input_data, context.variables, cpu_limit)
+                code = self._templates(node, context).transform_code()
+                return run_transform(code, input_data, context.variables, cpu_limit)
             except Exception as e:
                 raise ValueError(f"Transform script execution failed: {e}")
                 
         elif node.config.mapping:
             result = {}
-            for target_field, source_path in node.config.mapping.items():
-                result[target_field] = self._resolve_data_path(source_path, context)
+            for target_field, source_path in self._templates(node, context).mapping:
+                result[target_field] = source_path.resolve(context)
             return result
         
         return input_data
@@ -414,14 +476,12 @@ class LocalWorkflowEngine:
         return {"success": True, "key": key, "data": data}
 
     async def _execute_conditional(self, node: WorkflowNode, input_data: Any, workflow: Workflow, context: WorkflowExecutionContext) -> Any:
-        condition = node.config.condition or 'True'
-        
-        # Evaluate condition
-        local_scope = {'input': input_data, 'context': {'variables': context.variables}}
+        # Evaluate condition (validated expression, compiled once per workflow version)
         try:
-             # simple eval
-             is_true = eval(condition, {}, local_scope)
-        except Exception:
+             code = self._templates(node, context).condition_code()
+             is_true = evaluate_condition(code, input_data, context.variables, node.config.cpuTimeLimit or DEFAULT_CPU_LIMIT)
+        except Exception as e:
+             print(f"Condition on {node.name} failed, treating as false: {e}")
              is_true = False
              
         next_node_id = node.config.trueNode if is_true else node.config.falseNode
@@ -433,27 +493,131 @@ class LocalWorkflowEngine:
         return {"condition": is_true}
 
     async def _execute_loop(self, node: WorkflowNode, input_data: Any, workflow: Workflow, context: WorkflowExecutionContext) -> Any:
-        items_path = node.config.items or '$input'
-        items = self._resolve_data_path(items_path, context)
+        items = self._templates(node, context).items.resolve(context)
         
         if not isinstance(items, list):
             raise ValueError("Loop node requires an array of items")
 
-        results = []
-        if node.config.loopNode:
-            loop_node = next((n for n in workflow.nodes if n.id == node.config.loopNode), None)
-            if loop_node:
-                for item in items:
-                    # Create a new context? Or just update input? 
-                    # TS creates loopContext with input: item. 
-                    loop_context = context.model_copy()
-                    loop_context.input = item
-                    
-                    res = await self._execute_node(loop_node, workflow, loop_context)
-                    results.append(res)
-        
+        if not node.config.loopNode:
+            return []
+        loop_node = next((n for n in workflow.nodes if n.id == node.config.loopNode), None)
+        if not loop_node:
+            return []
+
+        concurrency = max(1, node.config.concurrency or 1)
+        collect_errors = node.config.errorMode == 'collect_errors'
+
+        if self._is_batchable_loop_body(loop_node, workflow, context):
+            return await self._execute_llm_batch(loop_node, items, context, concurrency, collect_errors)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run_iteration(item: Any) -> Any:
+            async with semaphore:
+                return await self._execute_node(loop_node, workflow, self._iteration_context(context, item))
+
+        return await self._gather_ordered([run_iteration(item) for item in items], collect_errors)
+
+    def _iteration_context(self, context: WorkflowExecutionContext, item: Any) -> WorkflowExecutionContext:
+        # Copy-on-write: reads fall through to the parent's node outputs, while
+        # outputs produced inside the iteration stay in its own layer
+        return WorkflowExecutionContext.model_construct(
+            workflowId=context.workflowId,
+            executionId=context.executionId,
+            input=item,
+            nodeOutputs=ChainMap({}, context.nodeOutputs),
+            variables=context.variables,
+            startTime=context.startTime,
+            apiKey=context.apiKey,
+            workflowVersion=context.workflowVersion,
+            restoredOutputs={},
+            checkpoint=False,
+            cacheStatus=context.cacheStatus
+        )
+
+    async def _gather_ordered(
+        self,
+        coros: List[Awaitable[Any]],
+        collect_errors: bool,
+        indices: Optional[List[int]] = None
+    ) -> List[Any]:
+        """
+        Await coroutines concurrently, returning results in input order.
+        fail_fast (default) cancels the remaining work on the first error;
+        collect_errors records {"error", "index"} in place of failed results.
+        """
+        tasks = [asyncio.ensure_future(c) for c in coros]
+        if not collect_errors:
+            try:
+                return list(await asyncio.gather(*tasks))
+            except Exception:
+                for task in tasks:
+                    task.cancel()
+                raise
+
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        indices = indices or list(range(len(tasks)))
+        return [
+            {"error": str(o), "index": i} if isinstance(o, Exception) else o
+            for i, o in zip(indices, outcomes)
+        ]
+
+    def _is_batchable_loop_body(self, node: WorkflowNode, workflow: Workflow, context: WorkflowExecutionContext) -> bool:
+        # A lone llm_call (nothing chained after it) maps straight onto generate_batch
+        if node.type != WorkflowNodeType.LLM_CALL:
+            return False
+        if any(c.from_ == node.id for c in workflow.connections):
+            return False
+        return bool(context.apiKey or Config.GEMINI_API_KEY)
+
+    async def _execute_llm_batch(
+        self,
+        node: WorkflowNode,
+        items: List[Any],
+        context: WorkflowExecutionContext,
+        concurrency: int,
+        collect_errors: bool
+    ) -> List[Any]:
+        prompt_template = self._templates(node, context).prompt
+        prompts = [
+            prompt_template.render(self._prepare_node_input(node, self._iteration_context(context, item)))
+            for item in items
+        ]
+
+        with tracer.span('llm:batch', kind='llm', provider='gemini', items=len(prompts)) as span:
+            batch = await local_llm_service.generate_batch(prompts, {
+                "provider": "gemini",
+                "model": self.GEMINI_MODEL,
+                "temperature": node.config.temperature or 0.7,
+                # Same limits as the per-item path (_call_gemini)
+                "maxTokens": node.config.maxTokens or 2048,
+                "apiKey": context.apiKey or Config.GEMINI_API_KEY,
+                "concurrency": concurrency
+            })
+            span.set(tokens=sum(item.response.tokensUsed or 0 for item in batch if item.response))
+
+        results = [
+            {"text": item.response.text, "raw": str(item.response)} if item.response else None
+            for item in batch
+        ]
+
+        # Per-item failures go through the full failover path
+        failed = [item.index for item in batch if item.error]
+        retried = await self._gather_ordered(
+            [self._generate_text(prompts[i], node.config, context) for i in failed],
+            collect_errors,
+            failed
+        )
+        for i, output in zip(failed, retried):
+            results[i] = output
         return results
 
+    def _node_results(self, context: WorkflowExecutionContext) -> Dict[str, Any]:
+        if not context.cacheStatus:
+            return context.nodeOutputs
+        # Memoization outcome per cache-enabled node, alongside $nodes/$variables naming
+        return {**context.nodeOutputs, '$cache': dict(context.cacheStatus)}
+
     def _get_final_output(self, workflow: Workflow, context: WorkflowExecutionContext) -> Any:
         # Last executed node
         if context.nodeOutputs:
@@ -461,6 +625,7 @@ class LocalWorkflowEngine:
         return None
 
     def _update_progress(self, execution_id: str, progress: ExecutionProgress):
+        progress_bus.publish(execution_id, progress, final=progress.status != 'running')
         if execution_id in self.progress_callbacks:
             self.progress_callbacks[execution_id](progress)
 
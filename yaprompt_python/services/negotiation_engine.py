@@ -9,6 +9,11 @@ import random
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 
+from ..utils.state_store import StateStore, state_store
+
+ACTIVE = 'negotiation_active'
+COMPLETED = 'negotiation_completed'
+
 class NegotiationSession(BaseModel):
     id: str
     type: str
@@ -24,9 +29,18 @@ class NegotiationSession(BaseModel):
     savings: Optional[float] = 0
 
 class NegotiationEngine:
-    def __init__(self):
-        self.active_sessions: Dict[str, NegotiationSession] = {}
-        self.completed_sessions: List[NegotiationSession] = []
+    def __init__(self, store: Optional[StateStore] = None):
+        # Shared across workers; see utils/state_store
+        self.store = store or state_store
+
+    @property
+    def active_sessions(self) -> Dict[str, NegotiationSession]:
+        return {k: NegotiationSession(**v) for k, v in self.store.items(ACTIVE).items()}
+
+    @property
+    def completed_sessions(self) -> List[NegotiationSession]:
+        sessions = [NegotiationSession(**v) for v in self.store.items(COMPLETED).values()]
+        return sorted(sessions, key=lambda s: s.completedAt or 0)
 
     async def start_negotiation(self, params: Dict[str, Any]) -> NegotiationSession:
         session_id = str(uuid.uuid4())
@@ -56,13 +70,14 @@ class NegotiationEngine:
             "timestamp": time.time()
         })
         session.currentPrice = offer
-        self.active_sessions[session_id] = session
+        self.store.put(ACTIVE, session_id, session.model_dump(), expected_version=0)
         return session
 
     async def process_vendor_response(self, session_id: str, vendor_price: float, vendor_msg: str) -> Dict[str, Any]:
-        session = self.active_sessions.get(session_id)
-        if not session:
+        data, version = self.store.get(ACTIVE, session_id)
+        if not version:
             raise ValueError("Session not found")
+        session = NegotiationSession(**data)
 
         last_round = session.rounds[-1]
         last_round['vendorResponse'] = {
@@ -79,8 +94,10 @@ class NegotiationEngine:
             session.completedAt = time.time()
             session.savings = session.initialPrice - vendor_price
             msg = f"Deal! {vendor_price} works."
-            del self.active_sessions[session_id]
-            self.completed_sessions.append(session)
+            # Conditional delete: if another worker answered this round first, ours is
+            # stale and VersionConflict goes back to the caller (409 from the API)
+            self.store.delete(ACTIVE, session_id, expected_version=version)
+            self.store.put(COMPLETED, session_id, session.model_dump())
             return {"counterOffer": vendor_price, "message": msg, "shouldAccept": True}
         
         # Counter
@@ -99,12 +116,13 @@ class NegotiationEngine:
             "timestamp": time.time()
         })
         session.currentPrice = counter
+        self.store.put(ACTIVE, session_id, session.model_dump(), expected_version=version)
         return {"counterOffer": counter, "message": msg, "shouldAccept": False}
 
     def get_stats(self) -> Dict[str, Any]:
         return {
-            "totalNegotiations": len(self.completed_sessions),
-            "active": len(self.active_sessions)
+            "totalNegotiations": self.store.count(COMPLETED),
+            "active": self.store.count(ACTIVE)
         }
 
 negotiation_engine = NegotiationEngine()
@@ -5,12 +5,17 @@ Implementation of Google's Nested Learning paradigm for continual learning
 
 import time
 import json
+import heapq
+import bisect
+import hashlib
 import asyncio
 import math
-from typing import List, Dict, Any, Optional
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
 from pydantic import BaseModel
 
-# from .continuum_memory_system import continuum_memory_system 
+from .container import services
+from .surprise_estimator import EmbeddingIndex, SurpriseEstimate, SurpriseEstimator, embed, same_text
 
 # ============================================================================
 # TYPE DEFINITIONS
@@ -38,12 +43,131 @@ class LearningComponent(BaseModel):
     parameters: Dict[str, float]
     performance: float
 
+# Entries kept per level; faster levels are small working sets
+LEVEL_CAPACITY = {0: 1000, 1: 5000, 2: 10000, 3: 20000}
+# Age, in seconds, that costs an entry one unit of retention at each level
+RETENTION_HORIZON_SECONDS = {0: 600, 1: 86400, 2: 7 * 86400, 3: 30 * 86400}
+SURPRISE_WEIGHT = 1.0
+ACCESS_WEIGHT = 1.0
+# An entry is promoted to the next level once seen this often, or when this surprising
+PROMOTE_MIN_ACCESS = 2
+PROMOTE_MIN_SURPRISE = 0.7
+
+# ============================================================================
+# PATTERN INDEX
+# ============================================================================
+
+class PatternIndex:
+    """
+    Entries seen more than once, kept sorted by frequency x confidence
+    (confidence = 1 - surprise). Updated on every write, so top-k is a
+    prefix walk instead of a scan over the whole level.
+    """
+
+    def __init__(self):
+        self._sorted: List[Tuple[float, str]] = [] # (-score, key)
+        self._score: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._sorted)
+
+    def update(self, entry: AssociativeMemoryEntry):
+        self.remove(entry.key)
+        if entry.accessCount > 1:
+            score = entry.accessCount * (1.0 - entry.surpriseScore)
+            self._score[entry.key] = score
+            bisect.insort(self._sorted, (-score, entry.key))
+
+    def remove(self, key: str):
+        score = self._score.pop(key, None)
+        if score is not None:
+            i = bisect.bisect_left(self._sorted, (-score, key))
+            del self._sorted[i]
+
+    def ranked(self) -> List[Tuple[float, str]]:
+        """(-score, key) pairs, best first."""
+        return self._sorted
+
+# ============================================================================
+# BOUNDED MEMORY LEVEL
+# ============================================================================
+
+class AssociativeMemoryLevel:
+    """
+    Capacity-bounded memory for one level. Eviction removes the entry with
+    the lowest retention = surprise + log(1 + accesses) - age / horizon.
+    The age term is written as lastAccessed / horizon, which orders entries
+    the same way at any "now", so priorities never need recomputing as time
+    passes and a min-heap (with lazy invalidation) finds the victim.
+    """
+
+    def __init__(self, level: int, capacity: int, horizon: float, epoch: float):
+        self.level = level
+        self.capacity = capacity
+        self.horizon = horizon
+        self.epoch = epoch
+        self.entries: Dict[str, AssociativeMemoryEntry] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._priority: Dict[str, float] = {}
+        self.patterns = PatternIndex()
+        self.index = EmbeddingIndex()
+        self.evicted = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: str) -> Optional[AssociativeMemoryEntry]:
+        return self.entries.get(key)
+
+    def retention(self, entry: AssociativeMemoryEntry) -> float:
+        return (
+            SURPRISE_WEIGHT * entry.surpriseScore
+            + ACCESS_WEIGHT * math.log1p(entry.accessCount)
+            + (entry.lastAccessed - self.epoch) / self.horizon
+        )
+
+    def put(self, entry: AssociativeMemoryEntry, vector: Optional[np.ndarray] = None) -> List[str]:
+        """Insert or refresh an entry; returns the keys evicted to make room."""
+        if entry.key not in self.entries:
+            self.index.add(entry.key, vector if vector is not None else embed(_serialize(entry.value)))
+        self.entries[entry.key] = entry
+        priority = self.retention(entry)
+        self._priority[entry.key] = priority
+        heapq.heappush(self._heap, (priority, entry.key))
+        self.patterns.update(entry)
+
+        evicted = []
+        while len(self.entries) > self.capacity:
+            evicted.append(self._evict())
+        # Stale heap items pile up as entries are refreshed; rebuild occasionally
+        if len(self._heap) > 2 * max(len(self.entries), 64):
+            self._heap = [(p, k) for k, p in self._priority.items()]
+            heapq.heapify(self._heap)
+        return evicted
+
+    def _evict(self) -> str:
+        while True:
+            priority, key = heapq.heappop(self._heap)
+            if self._priority.get(key) == priority:
+                del self._priority[key]
+                del self.entries[key]
+                self.patterns.remove(key)
+                self.index.remove(key)
+                self.evicted += 1
+                return key
+
 # ============================================================================
 # NESTED LEARNING ENGINE
 # ============================================================================
 
 class NestedLearningEngine:
-    def __init__(self):
+    def __init__(self, memory: Optional[Any] = None):
+        """`memory`: a ContinuumMemorySystem whose memories also count as known data."""
+        self.memory = memory
+        self.surprise = SurpriseEstimator()
         self.levels = [0, 1, 2, 3]
         self.update_frequencies = {
             0: 100,
@@ -52,10 +176,20 @@ class NestedLearningEngine:
             3: 604800000
         }
         self.components: Dict[str, LearningComponent] = {}
-        self.associative_memories: Dict[int, Dict[str, AssociativeMemoryEntry]] = {l: {} for l in self.levels}
+        epoch = time.time()
+        self.memory_levels: Dict[int, AssociativeMemoryLevel] = {
+            l: AssociativeMemoryLevel(l, LEVEL_CAPACITY[l], RETENTION_HORIZON_SECONDS[l], epoch) for l in self.levels
+        }
+        # Keys touched at level l-1 since level l last consolidated (dict as ordered set)
+        self._pending: Dict[int, Dict[str, None]] = {l: {} for l in self.levels[1:]}
+        self._scheduler: Optional[asyncio.Task] = None
         
         self._init_levels()
 
+    @property
+    def associative_memories(self) -> Dict[int, Dict[str, AssociativeMemoryEntry]]:
+        return {l: self.memory_levels[l].entries for l in self.levels}
+
     def _init_levels(self):
         for level in self.levels:
             self.components[f"level_{level}"] = LearningComponent(
@@ -68,70 +202,197 @@ class NestedLearningEngine:
             )
 
     async def process_data(self, data: Any, context: str = None) -> List[ContextFlow]:
-        flows = []
-        for level in self.levels:
-            flow = await self._process_at_level(data, level, context)
-            flows.append(flow)
+        self._ensure_scheduler()
+        # Only the fastest level learns synchronously; slower levels are
+        # updated by scheduled consolidation and are only read here
+        # Serialize, hash and embed the payload once for all levels
+        serialized = _serialize(data)
+        key = self._generate_key(serialized, context)
+        vector = embed(serialized)
+        # The long-term memories are searched once and shared by every level
+        shared = [self.memory.index.nearest(vector)] if self.memory is not None else []
+        flows = [self._write_level(0, key, vector, data, serialized, shared)]
+        for level in self.levels[1:]:
+            flows.append(self._read_level(level, vector, data, shared))
         return flows
 
-    async def _process_at_level(self, data: Any, level: int, context: str = None) -> ContextFlow:
-        key = self._generate_key(data, context)
-        memories = self.associative_memories[level]
+    def _write_level(
+        self,
+        level: int,
+        key: str,
+        vector: np.ndarray,
+        data: Any,
+        serialized: str,
+        shared: List[Tuple[Optional[str], float]]
+    ) -> ContextFlow:
+        memory = self.memory_levels[level]
         
-        surprise_score = self._calculate_surprise(data, memories)
+        estimate = self._calculate_surprise(level, vector, shared)
+        surprise_score = estimate.score
+        now = time.time()
         
-        if key in memories:
-            mem = memories[key]
+        # Repeats of an entry (same context, same text up to case and
+        # punctuation) refresh it rather than adding a copy
+        if key not in memory and estimate.duplicate and estimate.nearestId in memory:
+            nearest = memory.get(estimate.nearestId)
+            if _same_context(key, nearest.key) and same_text(_serialize(nearest.value), serialized):
+                key = estimate.nearestId
+        mem = memory.get(key)
+        if mem:
+            mem.value = data
             mem.accessCount += 1
-            mem.lastAccessed = time.time()
+            mem.lastAccessed = now
             mem.surpriseScore = (mem.surpriseScore + surprise_score) / 2
         else:
-            memories[key] = AssociativeMemoryEntry(
+            mem = AssociativeMemoryEntry(
                 key=key,
                 value=data,
                 surpriseScore=surprise_score,
                 accessCount=1,
-                lastAccessed=time.time(),
+                lastAccessed=now,
                 level=level
             )
+        self._store(level, mem, vector)
 
         return ContextFlow(
             level=level,
             data=data,
-            timestamp=time.time(),
+            timestamp=now,
             surpriseScore=surprise_score
         )
 
-    def _calculate_surprise(self, data: Any, memories: Dict[str, AssociativeMemoryEntry]) -> float:
-        if not memories: return 1.0
-        
-        # Simplified surprise calculation
-        # In a real system this would use embeddings distance or loss from a prediction model
-        # Here we use a hash-based novelty check for speed/simplicity in this port
-        key = self._generate_key(data)
-        if key in memories:
-            return 0.1 # Known pattern
-        return 0.8 # Novel
-
-    def _generate_key(self, data: Any, context: str = None) -> str:
-        s = json.dumps(data, sort_keys=True)
-        return f"{context or ''}:{hash(s)}"
-
-    async def detect_patterns(self, min_confidence: float = 0.7) -> List[Dict]:
+    def _read_level(self, level: int, vector: np.ndarray, data: Any, shared: List[Tuple[Optional[str], float]]) -> ContextFlow:
+        return ContextFlow(
+            level=level,
+            data=data,
+            timestamp=time.time(),
+            surpriseScore=self._calculate_surprise(level, vector, shared).score
+        )
+
+    def _store(self, level: int, entry: AssociativeMemoryEntry, vector: Optional[np.ndarray] = None):
+        for key in self.memory_levels[level].put(entry, vector):
+            self._pending.get(level + 1, {}).pop(key, None)
+        if level + 1 in self._pending:
+            self._pending[level + 1][entry.key] = None
+
+    # ========================================================================
+    # CONSOLIDATION
+    # ========================================================================
+
+    def consolidate_level(self, level: int) -> int:
+        """Promote qualifying entries touched at level-1 into `level`; returns how many."""
+        source = self.memory_levels[level - 1]
+        pending, self._pending[level] = self._pending[level], {}
+        promoted = 0
+        for key in pending:
+            src = source.get(key)
+            if not src or (src.accessCount < PROMOTE_MIN_ACCESS and src.surpriseScore < PROMOTE_MIN_SURPRISE):
+                continue
+            existing = self.memory_levels[level].get(key)
+            if existing:
+                existing.accessCount += 1
+                existing.lastAccessed = src.lastAccessed
+                existing.surpriseScore = (existing.surpriseScore + src.surpriseScore) / 2
+                entry = existing
+            else:
+                entry = src.model_copy(update={'level': level, 'accessCount': 1})
+            self._store(level, entry, source.index.vector(key))
+            promoted += 1
+
+        component = self.components[f"level_{level}"]
+        component.lastUpdate = time.time()
+        return promoted
+
+    def consolidate_due(self, now: Optional[float] = None) -> Dict[int, int]:
+        """Run consolidation for every level whose update frequency has elapsed."""
+        now = now or time.time()
+        results = {}
+        for level in self.levels[1:]:
+            component = self.components[f"level_{level}"]
+            if (now - component.lastUpdate) * 1000 >= component.updateFrequency:
+                results[level] = self.consolidate_level(level)
+        return results
+
+    def _next_due_in(self) -> float:
+        now = time.time()
+        return max(0.0, min(
+            self.components[f"level_{l}"].lastUpdate + self.update_frequencies[l] / 1000 - now
+            for l in self.levels[1:]
+        ))
+
+    def _ensure_scheduler(self):
+        if self._scheduler is None or self._scheduler.done():
+            self._scheduler = asyncio.get_running_loop().create_task(self._run_scheduler())
+
+    async def _run_scheduler(self):
+        while True:
+            await asyncio.sleep(self._next_due_in())
+            try:
+                promoted = self.consolidate_due()
+                if any(promoted.values()):
+                    print(f"Nested learning consolidation promoted {promoted}")
+            except Exception as e:
+                print(f"Nested learning consolidation failed: {e}")
+
+    async def stop(self):
+        if self._scheduler:
+            self._scheduler.cancel()
+            self._scheduler = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "levels": {
+                l: {
+                    "entries": len(m),
+                    "capacity": m.capacity,
+                    "evicted": m.evicted,
+                    "pending": len(self._pending.get(l, {})),
+                    "lastUpdate": self.components[f"level_{l}"].lastUpdate
+                } for l, m in self.memory_levels.items()
+            },
+            "surprise": self.surprise.get_stats()
+        }
+
+    def _calculate_surprise(
+        self,
+        level: int,
+        vector: np.ndarray,
+        shared: List[Tuple[Optional[str], float]]
+    ) -> SurpriseEstimate:
+        # Nearest neighbour among this level's entries and the long-term
+        # memories (`shared`, looked up once per request)
+        return self.surprise.estimate(vector, level, [self.memory_levels[level].index], shared)
+
+    def _generate_key(self, serialized: str, context: str = None) -> str:
+        # blake2b is stable across processes, unlike hash(), and cheap at 8 bytes
+        return f"{context or ''}:{hashlib.blake2b(serialized.encode('utf-8'), digest_size=8).hexdigest()}"
+
+    def _ranked_patterns(self, level: int):
+        for neg_score, key in self.memory_levels[level].patterns.ranked():
+            yield neg_score, level, key
+
+    async def detect_patterns(self, min_confidence: float = 0.7, limit: Optional[int] = None) -> List[Dict]:
+        """Top patterns across levels by frequency x confidence, from the per-level indexes."""
+        ranked = heapq.merge(*(self._ranked_patterns(level) for level in self.levels))
         patterns = []
-        for level in self.levels:
-            memories = self.associative_memories[level]
-            for mem in memories.values():
-                confidence = 1.0 - mem.surpriseScore
-                if confidence >= min_confidence and mem.accessCount > 1:
-                    patterns.append({
-                        "pattern": mem.value,
-                        "level": level,
-                        "confidence": confidence,
-                        "frequency": mem.accessCount
-                    })
-        
-        patterns.sort(key=lambda x: x['frequency'] * x['confidence'], reverse=True)
+        for neg_score, level, key in ranked:
+            if limit is not None and len(patterns) >= limit:
+                break
+            mem = self.memory_levels[level].get(key)
+            confidence = 1.0 - mem.surpriseScore
+            if confidence >= min_confidence:
+                patterns.append({
+                    "pattern": mem.value,
+                    "level": level,
+                    "confidence": confidence,
+                    "frequency": mem.accessCount
+                })
         return patterns
 
-nested_learning_engine = NestedLearningEngine()
+def _same_context(key: str, other: str) -> bool:
+    return key.rsplit(':', 1)[0] == other.rsplit(':', 1)[0]
+
+def _serialize(data: Any) -> str:
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+
+nested_learning_engine = NestedLearningEngine(memory=services.proxy('continuum_memory_system'))
@@ -0,0 +1,101 @@
+"""
+Node Output Cache
+Memoizes deterministic workflow node outputs across runs
+
+Entries are keyed by a hash of the node type, its config and its resolved
+input, so identical nodes in different workflows share results. Stored in
+SQLite under the data dir so hits survive restarts.
+"""
+
+import json
+import time
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import Config
+from ..types import WorkflowNode, WorkflowNodeType
+
+DEFAULT_TTL_SECONDS = 3600
+
+# Node types that touch the outside world (or run other nodes) are never cached
+UNCACHEABLE_TYPES = {
+    WorkflowNodeType.STORAGE_WRITE,
+    WorkflowNodeType.BROWSER_ACTION,
+    WorkflowNodeType.CONDITIONAL,
+    WorkflowNodeType.LOOP,
+}
+
+class NodeOutputCache:
+    def __init__(self, db_path: Path = Config.DATA_DIR / 'node_cache.sqlite3'):
+        self.db_path = Path(db_path)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS node_cache ("
+            "key TEXT PRIMARY KEY, output TEXT NOT NULL, expires_at REAL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def is_cacheable(self, node: WorkflowNode) -> bool:
+        policy = node.config.cache or 'off'
+        if policy == 'off' or node.type in UNCACHEABLE_TYPES:
+            return False
+        # Only plain fetches are deterministic enough to reuse
+        if node.type == WorkflowNodeType.HTTP_REQUEST and (node.config.method or 'GET') != 'GET':
+            return False
+        return True
+
+    def make_key(self, node: WorkflowNode, node_input: Any) -> str:
+        config = node.config.model_dump(exclude={'cache', 'cacheTtl'}, exclude_none=True)
+        payload = json.dumps(
+            {"type": node.type.value, "config": config, "input": node_input},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        row = self._conn.execute(
+            "SELECT output, expires_at FROM node_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return False, None
+        output, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            self._conn.execute("DELETE FROM node_cache WHERE key = ?", (key,))
+            self._conn.commit()
+            return False, None
+        return True, json.loads(output)
+
+    def set(self, key: str, output: Any, node: WorkflowNode):
+        expires_at = None
+        if node.config.cache == 'ttl':
+            expires_at = time.time() + (node.config.cacheTtl or DEFAULT_TTL_SECONDS)
+        try:
+            serialized = json.dumps(output)
+        except (TypeError, ValueError):
+            # Outputs that don't round-trip through JSON are not memoized
+            return
+        self._conn.execute(
+            "INSERT OR REPLACE INTO node_cache (key, output, expires_at, created_at) VALUES (?, ?, ?, ?)",
+            (key, serialized, expires_at, time.time())
+        )
+        self._conn.commit()
+
+    def purge_expired(self) -> int:
+        cursor = self._conn.execute(
+            "DELETE FROM node_cache WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+        )
+        self._conn.commit()
+        return cursor.rowcount
+
+    def clear(self):
+        self._conn.execute("DELETE FROM node_cache")
+        self._conn.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        count = self._conn.execute("SELECT COUNT(*) FROM node_cache").fetchone()[0]
+        return {"entries": count}
+
+node_output_cache = NodeOutputCache()
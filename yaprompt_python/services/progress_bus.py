@@ -0,0 +1,119 @@
+"""
+Progress Bus
+Fan-out of execution progress events to live subscribers
+
+Engines publish `ExecutionProgress` per execution id. Each subscriber gets
+its own bounded queue: a slow reader loses its oldest undelivered events
+rather than stalling the publisher. The most recent events of every
+channel are kept so late joiners can replay what they missed.
+"""
+
+import time
+import asyncio
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set
+
+REPLAY_SIZE = 200
+SUBSCRIBER_QUEUE_SIZE = 100
+MAX_CHANNELS = 512
+
+_CLOSED = object()
+
+class _Channel:
+    __slots__ = ('events', 'subscribers', 'next_seq', 'closed')
+
+    def __init__(self):
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=REPLAY_SIZE)
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.next_seq = 1
+        self.closed = False
+
+class ProgressBus:
+    def __init__(self, max_channels: int = MAX_CHANNELS):
+        self.max_channels = max_channels
+        self._channels: "OrderedDict[str, _Channel]" = OrderedDict()
+        self.dropped = 0
+
+    def _channel(self, channel_id: str) -> _Channel:
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            channel = _Channel()
+            self._channels[channel_id] = channel
+            self._evict()
+        else:
+            self._channels.move_to_end(channel_id)
+        return channel
+
+    def _evict(self):
+        # Oldest channels without live subscribers go first
+        while len(self._channels) > self.max_channels:
+            victim = next((cid for cid, ch in self._channels.items() if not ch.subscribers), None)
+            if victim is None:
+                return
+            del self._channels[victim]
+
+    def publish(self, channel_id: str, event: Any, final: bool = False):
+        """Never blocks; safe to call from synchronous engine code on the loop thread."""
+        payload = event.model_dump(exclude_none=True) if hasattr(event, 'model_dump') else dict(event)
+        channel = self._channel(channel_id)
+        if channel.closed:
+            # A resumed execution reopens its channel
+            channel.closed = False
+
+        record = {'seq': channel.next_seq, 'timestamp': time.time(), **payload}
+        channel.next_seq += 1
+        channel.events.append(record)
+
+        for queue in channel.subscribers:
+            self._offer(queue, record)
+        if final:
+            channel.closed = True
+            for queue in channel.subscribers:
+                self._offer(queue, _CLOSED)
+
+    def _offer(self, queue: asyncio.Queue, item: Any):
+        if queue.full():
+            queue.get_nowait()
+            self.dropped += 1
+        queue.put_nowait(item)
+
+    def recent(self, channel_id: str, after_seq: int = 0) -> List[Dict[str, Any]]:
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            return []
+        return [e for e in channel.events if e['seq'] > after_seq]
+
+    async def subscribe(self, channel_id: str, after_seq: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """Replay buffered events after `after_seq`, then stream live until the execution ends."""
+        channel = self._channel(channel_id)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+        # Registered before replaying so nothing published meanwhile is missed
+        channel.subscribers.add(queue)
+        try:
+            last_seq = after_seq
+            for record in list(channel.events):
+                if record['seq'] > last_seq:
+                    last_seq = record['seq']
+                    yield record
+            if channel.closed:
+                return
+
+            while True:
+                item = await queue.get()
+                if item is _CLOSED:
+                    return
+                if item['seq'] > last_seq:
+                    last_seq = item['seq']
+                    yield item
+        finally:
+            channel.subscribers.discard(queue)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "channels": len(self._channels),
+            "subscribers": sum(len(ch.subscribers) for ch in self._channels.values()),
+            "dropped": self.dropped
+        }
+
+progress_bus = ProgressBus()
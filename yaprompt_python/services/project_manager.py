@@ -6,9 +6,21 @@ Autonomous project decomposition and management
 import uuid
 import time
 import math
+import asyncio
 import collections
-from typing import List, Dict, Optional, Any, Union
-from pydantic import BaseModel
+import numpy as np
+from typing import List, Dict, Optional, Any, Union, Tuple, Set
+from pydantic import BaseModel, Field
+
+from ..config import Config
+from ..utils.state_store import StateStore, VersionConflict, DEFAULT_UPDATE_RETRIES
+from .goal_decomposer import GoalDecomposer
+from .surprise_estimator import embed
+from .project_repository import ProjectRepository, ProjectSummary, ProjectSummaryPage, TaskPage, TaskStatus
+from .project_scheduler import CriticalPathScheduler, ProjectSchedule, remaining_minutes
+
+# An LLM task this similar (by title) to an existing task replaces it in place
+TASK_MATCH_SIMILARITY = 0.8
 
 # ============================================================================
 # TYPE DEFINITIONS
@@ -41,30 +53,49 @@ class Project(BaseModel):
     progress: float = 0.0
     timeline: ProjectTimeline
     autoGenerated: bool = False
+    decomposition: str = 'template' # template, cache, llm
     documents: List[str] = []
 
 class DecompositionResult(BaseModel):
     project: Project
     reasoning: str
+    source: str = 'template' # template, cache
+    refining: bool = False # an LLM plan will be merged in when ready
+
+class TaskUpdate(BaseModel):
+    status: Optional[TaskStatus] = None
+    estimatedMinutes: Optional[int] = Field(default=None, ge=0)
 
 # ============================================================================
 # PROJECT MANAGER
 # ============================================================================
 
 class ProjectManager:
-    def __init__(self):
-        self.projects: Dict[str, Project] = {}
-        # TODO: Load state from persistence layer
+    def __init__(self, store: Optional[StateStore] = None, llm_decomposition: bool = False):
+        # Persistent and shared across workers; see project_repository
+        self.repository = ProjectRepository(store)
+        self.store = self.repository.store
+        # project id -> (header version it reflects, scheduler); this process only
+        self._schedulers: Dict[str, Tuple[int, CriticalPathScheduler]] = {}
+        # Keyword templates answer at once; an LLM plan is merged in later
+        self.decomposer = GoalDecomposer(self.store) if llm_decomposition else None
+        self._refinements: Set[asyncio.Task] = set()
+
+    @property
+    def projects(self) -> Dict[str, Project]:
+        """Every project with all its tasks; prefer list_projects / get_tasks."""
+        return {p.id: p for p in self.get_all_projects()}
 
     async def create_project(self, goal: str, deadline: Optional[float] = None) -> DecompositionResult:
         # Decompose goal into tasks
-        tasks = await self._decompose_goal(goal)
+        tasks, source = await self._decompose_goal(goal)
         
         # Analyze dependencies
         self._analyze_dependencies(tasks)
         
-        # Estimate timeline
-        estimated_duration_minutes = sum(t.estimatedMinutes for t in tasks)
+        # Estimate timeline: one person working the tasks in dependency order
+        scheduler = self._build_scheduler(tasks)
+        estimated_duration_minutes = scheduler.schedule('', workers=1).makespanMinutes
         estimated_completion = time.time() + (estimated_duration_minutes * 60)
         
         project_id = str(uuid.uuid4())
@@ -80,10 +111,18 @@ class ProjectManager:
                 estimatedCompletion=deadline or estimated_completion
             ),
             autoGenerated=True,
+            decomposition=source,
             documents=[]
         )
         
-        self.projects[project_id] = project
+        version = self.repository.create(project.model_dump())
+        self._schedulers[project_id] = (version, scheduler)
+
+        refining = source == 'template' and self.decomposer is not None
+        if refining:
+            task = asyncio.ensure_future(self._refine_project(project_id, goal, deadline))
+            self._refinements.add(task)
+            task.add_done_callback(self._refinements.discard)
         
         # Auto-generate initial documentation (mocked)
         # await self.generate_project_doc(project.id)
@@ -91,13 +130,20 @@ class ProjectManager:
         hours = round(estimated_duration_minutes / 60)
         return DecompositionResult(
             project=project,
-            reasoning=f'Broke down "{goal}" into {len(tasks)} manageable tasks with estimated completion in {hours} hours.'
+            reasoning=f'Broke down "{goal}" into {len(tasks)} manageable tasks with estimated completion in {hours} hours.',
+            source=source,
+            refining=refining
         )
 
-    async def _decompose_goal(self, goal: str) -> List[Task]:
+    async def _decompose_goal(self, goal: str) -> Tuple[List[Task], str]:
+        """Tasks for the goal and their source: an LLM plan cached for a similar goal, else keyword templates."""
+        cached = self.decomposer.lookup(goal) if self.decomposer else None
+        if cached:
+            return self._tasks_from_templates(goal, [t.model_dump() for t in cached.templates]), 'cache'
+        return self._tasks_from_templates(goal, self._get_template_for_goal(goal)), 'template'
+
+    def _tasks_from_templates(self, goal: str, templates: List[Dict]) -> List[Task]:
         tasks: List[Task] = []
-        templates = self._get_template_for_goal(goal)
-        
         for template in templates:
             tasks.append(Task(
                 id=str(uuid.uuid4()),
@@ -106,7 +152,7 @@ class ProjectManager:
                 status='pending',
                 priority=template.get('priority', 'medium'),
                 estimatedMinutes=template.get('estimatedMinutes', 60),
-                dependencies=[],
+                dependencies=[tasks[i].id for i in template.get('after', [])],
                 tags=self._extract_tags(goal),
                 createdAt=time.time()
             ))
@@ -120,42 +166,42 @@ class ProjectManager:
         if any(x in lower for x in ['study', 'learn', 'course']):
             return [
                 {'title': 'Gather learning resources', 'description': 'Find tutorials, docs, and materials', 'estimatedMinutes': 30},
-                {'title': 'Create study schedule', 'description': 'Plan when to study each topic', 'estimatedMinutes': 20},
+                {'title': 'Create study schedule', 'description': 'Plan when to study each topic', 'estimatedMinutes': 20, 'after': [0]},
                 {'title': 'Set up practice environment', 'description': 'Install tools or prepare workspace', 'estimatedMinutes': 45},
-                {'title': 'Complete main learning', 'description': 'Go through core material', 'estimatedMinutes': 180},
-                {'title': 'Practice exercises', 'description': 'Apply knowledge with practice problems', 'estimatedMinutes': 120},
-                {'title': 'Review and test knowledge', 'description': 'Self-assessment and review', 'estimatedMinutes': 60}
+                {'title': 'Complete main learning', 'description': 'Go through core material', 'estimatedMinutes': 180, 'after': [1, 2]},
+                {'title': 'Practice exercises', 'description': 'Apply knowledge with practice problems', 'estimatedMinutes': 120, 'after': [3]},
+                {'title': 'Review and test knowledge', 'description': 'Self-assessment and review', 'estimatedMinutes': 60, 'after': [4]}
             ]
 
         # Website/App projects
         if any(x in lower for x in ['website', 'app', 'build']):
             return [
                 {'title': 'Define requirements', 'description': 'List all features and constraints', 'priority': 'high', 'estimatedMinutes': 45},
-                {'title': 'Design architecture', 'description': 'Plan technical structure', 'estimatedMinutes': 60},
-                {'title': 'Set up development environment', 'description': 'Install tools and dependencies', 'estimatedMinutes': 30},
-                {'title': 'Implement core features', 'description': 'Build main functionality', 'estimatedMinutes': 300},
-                {'title': 'Add styling and UX', 'description': 'Design and polish interface', 'estimatedMinutes': 120},
-                {'title': 'Test and debug', 'description': 'Fix issues and test thoroughly', 'estimatedMinutes': 90},
-                {'title': 'Deploy', 'description': 'Publish to production', 'estimatedMinutes': 45}
+                {'title': 'Design architecture', 'description': 'Plan technical structure', 'estimatedMinutes': 60, 'after': [0]},
+                {'title': 'Set up development environment', 'description': 'Install tools and dependencies', 'estimatedMinutes': 30, 'after': [0]},
+                {'title': 'Implement core features', 'description': 'Build main functionality', 'estimatedMinutes': 300, 'after': [1, 2]},
+                {'title': 'Add styling and UX', 'description': 'Design and polish interface', 'estimatedMinutes': 120, 'after': [3]},
+                {'title': 'Test and debug', 'description': 'Fix issues and test thoroughly', 'estimatedMinutes': 90, 'after': [3]},
+                {'title': 'Deploy', 'description': 'Publish to production', 'estimatedMinutes': 45, 'after': [4, 5]}
             ]
 
         # Research projects
         if any(x in lower for x in ['research', 'investigate']):
             return [
                 {'title': 'Define research question', 'description': 'Clarify what to investigate', 'estimatedMinutes': 20},
-                {'title': 'Find sources', 'description': 'Gather papers, articles, and data', 'estimatedMinutes': 60},
-                {'title': 'Read and take notes', 'description': 'Process all sources', 'estimatedMinutes': 180},
-                {'title': 'Synthesize findings', 'description': 'Combine insights', 'estimatedMinutes': 90},
-                {'title': 'Write summary', 'description': 'Document key takeaways', 'estimatedMinutes': 60}
+                {'title': 'Find sources', 'description': 'Gather papers, articles, and data', 'estimatedMinutes': 60, 'after': [0]},
+                {'title': 'Read and take notes', 'description': 'Process all sources', 'estimatedMinutes': 180, 'after': [1]},
+                {'title': 'Synthesize findings', 'description': 'Combine insights', 'estimatedMinutes': 90, 'after': [2]},
+                {'title': 'Write summary', 'description': 'Document key takeaways', 'estimatedMinutes': 60, 'after': [3]}
             ]
 
         # Generic
         return [
             {'title': 'Planning and research', 'description': 'Understand requirements', 'estimatedMinutes': 60},
-            {'title': 'Break down into sub-tasks', 'description': 'Create detailed task list', 'estimatedMinutes': 30},
-            {'title': 'Implement/Execute', 'description': 'Do the main work', 'estimatedMinutes': 240},
-            {'title': 'Review and refine', 'description': 'Polish and improve', 'estimatedMinutes': 60},
-            {'title': 'Finalize', 'description': 'Complete and deliver', 'estimatedMinutes': 30}
+            {'title': 'Break down into sub-tasks', 'description': 'Create detailed task list', 'estimatedMinutes': 30, 'after': [0]},
+            {'title': 'Implement/Execute', 'description': 'Do the main work', 'estimatedMinutes': 240, 'after': [1]},
+            {'title': 'Review and refine', 'description': 'Polish and improve', 'estimatedMinutes': 60, 'after': [2]},
+            {'title': 'Finalize', 'description': 'Complete and deliver', 'estimatedMinutes': 30, 'after': [3]}
         ]
 
     def _extract_project_name(self, goal: str) -> str:
@@ -173,21 +219,170 @@ class ProjectManager:
         return tags
 
     def _analyze_dependencies(self, tasks: List[Task]):
-        for i in range(1, len(tasks)):
-            current = tasks[i]
-            previous = tasks[i - 1]
-            
-            # Simple heuristic
-            status_related = current.title.lower().startswith('deploy') or current.title.lower().startswith('finalize')
-            keyword_related = 'implement' in current.title.lower() and 'design' in previous.title.lower()
-            
-            if status_related or keyword_related:
-                current.dependencies.append(previous.id)
+        # Templates declare their order ('after'); this only validates the graph
+        self._build_scheduler(tasks)
+
+    # ========================================================================
+    # LLM REFINEMENT
+    # ========================================================================
+
+    async def _refine_project(self, project_id: str, goal: str, deadline: Optional[float]):
+        """Merge the LLM's plan into a project created from templates, keeping work already started."""
+        templates = await self.decomposer.decompose(goal)
+        if not templates:
+            return
+        proposed = self._tasks_from_templates(goal, [t.model_dump() for t in templates])
+        for _ in range(DEFAULT_UPDATE_RETRIES):
+            header, version = self.repository.header(project_id)
+            if not version:
+                return
+            tasks = self._merge_tasks(self.get_project(project_id).tasks, proposed)
+            scheduler = self._build_scheduler(tasks)
+            timeline = dict(header['timeline'])
+            if deadline is None:
+                # Same one-worker estimate create_project makes
+                timeline['estimatedCompletion'] = timeline['startDate'] + scheduler.schedule('', workers=1).makespanMinutes * 60
+            try:
+                version = self.repository.replace_tasks(
+                    project_id, [t.model_dump() for t in tasks], version,
+                    decomposition='llm', timeline=timeline
+                )
+            except VersionConflict:
+                # A task was updated meanwhile; merge again on top of it
+                continue
+            self._schedulers[project_id] = (version, scheduler)
+            print(f"Refined project {project_id} with {len(tasks)} LLM-planned tasks")
+            return
+        print(f"Gave up refining project {project_id}: it kept changing")
+
+    def _merge_tasks(self, current: List[Task], proposed: List[Task]) -> List[Task]:
+        """
+        Proposed tasks replace the current tasks whose titles they match; a
+        matched task that is already under way keeps its state. Unmatched
+        pending tasks are dropped, unmatched started ones are kept at the end.
+        """
+        match: Dict[int, int] = {} # proposed index -> current index
+        if current and proposed:
+            sims = np.stack([embed(t.title) for t in proposed]) @ np.stack([embed(t.title) for t in current]).T
+            taken = set()
+            for flat in np.argsort(sims, axis=None)[::-1]:
+                p, c = divmod(int(flat), len(current))
+                if sims[p, c] < TASK_MATCH_SIMILARITY:
+                    break
+                if p not in match and c not in taken:
+                    match[p] = c
+                    taken.add(c)
+
+        ids = {t.id: current[match[p]].id if p in match else t.id for p, t in enumerate(proposed)}
+        merged: List[Task] = []
+        for p, task in enumerate(proposed):
+            dependencies = [ids[d] for d in task.dependencies]
+            if p not in match:
+                merged.append(task.model_copy(update={'dependencies': dependencies}))
+                continue
+            old = current[match[p]]
+            if old.status == 'pending':
+                merged.append(task.model_copy(update={'id': old.id, 'createdAt': old.createdAt, 'dependencies': dependencies}))
+            else:
+                merged.append(old.model_copy(update={'dependencies': dependencies}))
+
+        # Nothing planned depends on the leftovers, so appending them can't close a cycle
+        kept = {t.id for t in merged}
+        for c, task in enumerate(current):
+            if c not in match.values() and task.status != 'pending':
+                merged.append(task.model_copy(update={'dependencies': [d for d in task.dependencies if d in kept]}))
+                kept.add(task.id)
+        return merged
+
+    async def wait_for_refinements(self):
+        """Wait for background LLM plans still in flight (tests, shutdown)."""
+        while self._refinements:
+            await asyncio.gather(*list(self._refinements), return_exceptions=True)
+
+    # ========================================================================
+    # SCHEDULING
+    # ========================================================================
+
+    def _build_scheduler(self, tasks: List[Task]) -> CriticalPathScheduler:
+        """Raises DependencyCycle or KeyError (unknown dependency)."""
+        return CriticalPathScheduler(
+            (t.id, remaining_minutes(t.status, t.estimatedMinutes), t.dependencies) for t in tasks
+        )
+
+    def _scheduler(self, project_id: str) -> Optional[CriticalPathScheduler]:
+        _, version = self.repository.header(project_id)
+        if not version:
+            return None
+        cached = self._schedulers.get(project_id)
+        if cached and cached[0] == version:
+            return cached[1]
+        # Changed elsewhere (another worker, or first use here): rebuild
+        scheduler = self._build_scheduler(self.get_project(project_id).tasks)
+        self._schedulers[project_id] = (version, scheduler)
+        return scheduler
+
+    def get_schedule(self, project_id: str, workers: int = 1) -> Optional[ProjectSchedule]:
+        scheduler = self._scheduler(project_id)
+        return scheduler.schedule(project_id, workers) if scheduler else None
+
+    def update_task(self, project_id: str, task_id: str, update: TaskUpdate) -> Optional[Task]:
+        """Change one task's status or estimate; the cached schedule is updated incrementally."""
+        scheduler = self._scheduler(project_id)
+        if scheduler is None:
+            return None
+
+        def apply(task: Dict[str, Any]) -> Dict[str, Any]:
+            if update.status is not None:
+                task['status'] = update.status
+                task['completedAt'] = time.time() if update.status == 'completed' else None
+            if update.estimatedMinutes is not None:
+                task['estimatedMinutes'] = update.estimatedMinutes
+            return task
+
+        result = self.repository.update_task(project_id, task_id, apply)
+        if result is None:
+            raise KeyError(f"Unknown task: {task_id}")
+        data, before, after = result
+        task = Task(**data)
+
+        cached = self._schedulers.get(project_id)
+        if cached and cached[0] == before:
+            scheduler.set_duration(task_id, remaining_minutes(task.status, task.estimatedMinutes))
+            self._schedulers[project_id] = (after, scheduler)
+        return task
+
+    # ========================================================================
+    # QUERIES
+    # ========================================================================
+
+    def count_projects(self) -> int:
+        return self.repository.count()
+
+    def list_projects(self, offset: int = 0, limit: int = 50, status: Optional[str] = None) -> ProjectSummaryPage:
+        return self.repository.list_summaries(offset, limit, status)
+
+    def get_summary(self, project_id: str) -> Optional[ProjectSummary]:
+        return self.repository.summary(project_id)
+
+    def get_tasks(self, project_id: str, offset: int = 0, limit: int = 50) -> Optional[TaskPage]:
+        return self.repository.task_page(project_id, offset, limit)
 
     def get_all_projects(self) -> List[Project]:
-        return list(self.projects.values())
+        summaries = self.repository.list_summaries(limit=self.repository.count()).projects
+        return [p for p in (self.get_project(s.id) for s in summaries) if p]
 
     def get_project(self, project_id: str) -> Optional[Project]:
-        return self.projects.get(project_id)
+        data = self.repository.get(project_id)
+        return Project(**data) if data else None
+
+_project_manager: Optional[ProjectManager] = None
 
-project_manager = ProjectManager()
+def __getattr__(name: str) -> Any:
+    # `project_manager` is built on first use, not at import: construction
+    # opens (and creates) the projects database under the data dir
+    global _project_manager
+    if name == 'project_manager':
+        if _project_manager is None:
+            _project_manager = ProjectManager(llm_decomposition=Config.LLM_GOAL_DECOMPOSITION)
+        return _project_manager
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
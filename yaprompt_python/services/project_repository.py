@@ -0,0 +1,295 @@
+"""
+Project Repository
+Persistent, indexed storage for projects and their tasks
+
+A project is stored as a small header (the summary projection: name,
+status, progress, per-status task counts) plus one record per task and a
+task-order list, all in a StateStore. Listing and counting projects reads
+only headers; task pages read only the tasks on the page. A task update
+writes that task and applies a counter delta to the header, so progress
+is maintained without re-reading the other tasks.
+
+Re-planning writes the new task list under a fresh generation and then
+points the header at it with one conditional write, so a task update that
+races the swap either lands before it (and the swap retries) or is redone
+against the new list.
+
+Projects are kept in the shared state store when it is durable
+(STATE_BACKEND sqlite/redis), otherwise in their own SQLite file.
+"""
+
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple, get_args
+from pydantic import BaseModel
+
+from ..config import Config
+from ..utils.state_store import StateStore, SQLiteStateStore, VersionConflict, DEFAULT_UPDATE_RETRIES, state_store
+
+PROJECTS = 'projects' # project id -> header (ProjectSummary)
+TASK_ORDER = 'project_task_order' # project id[:generation] -> [task id]
+TASKS_PREFIX = 'project_tasks:' # one namespace per project[:generation]: task id -> task
+
+TaskStatus = Literal['pending', 'in_progress', 'completed', 'blocked']
+TASK_STATUSES = get_args(TaskStatus)
+
+# ============================================================================
+# TYPE DEFINITIONS
+# ============================================================================
+
+class ProjectSummary(BaseModel):
+    id: str
+    name: str
+    description: str
+    status: str = 'planning'
+    progress: float = 0.0
+    taskCount: int = 0
+    taskCounts: Dict[str, int] = {}
+    timeline: Dict[str, Any]
+    autoGenerated: bool = False
+    decomposition: str = 'template' # template, cache, llm
+    documents: List[str] = []
+    updatedAt: float = 0.0
+    taskGeneration: str = '' # which task list is current; '' for the original one
+
+class TaskPage(BaseModel):
+    projectId: str
+    total: int
+    offset: int
+    limit: int
+    tasks: List[Dict[str, Any]]
+
+class ProjectSummaryPage(BaseModel):
+    total: int
+    offset: int
+    limit: int
+    projects: List[ProjectSummary]
+
+def default_project_store() -> StateStore:
+    if Config.STATE_BACKEND.lower() != 'memory':
+        return state_store
+    return SQLiteStateStore(Config.PROJECTS_DB)
+
+def _task_key(project_id: str, header: Optional[Dict[str, Any]] = None) -> str:
+    generation = (header or {}).get('taskGeneration', '')
+    return f"{project_id}:{generation}" if generation else project_id
+
+def _tasks_ns(project_id: str, header: Optional[Dict[str, Any]] = None) -> str:
+    return f"{TASKS_PREFIX}{_task_key(project_id, header)}"
+
+# ============================================================================
+# REPOSITORY
+# ============================================================================
+
+class ProjectRepository:
+    def __init__(self, store: Optional[StateStore] = None):
+        self.store = store or default_project_store()
+
+    # ========================================================================
+    # WRITES
+    # ========================================================================
+
+    def create(self, project: Dict[str, Any]) -> int:
+        """Store a full project dict (with 'tasks'); returns the header version."""
+        project = dict(project)
+        tasks = project.pop('tasks', [])
+        self.store.put_many(_tasks_ns(project['id']), {t['id']: t for t in tasks})
+        self.store.put(TASK_ORDER, project['id'], [t['id'] for t in tasks], expected_version=0)
+        header = self._header(project, tasks)
+        # The header goes last: a project is visible only once complete
+        return self.store.put(PROJECTS, project['id'], header, expected_version=0)
+
+    def update_task(
+        self,
+        project_id: str,
+        task_id: str,
+        fn: Callable[[Dict[str, Any]], Dict[str, Any]]
+    ) -> Optional[Tuple[Dict[str, Any], int, int]]:
+        """
+        Apply `fn` to one task and fold its status change into the header.
+        Returns (task, header version before, header version after), or None
+        when the task does not exist.
+        """
+        for _ in range(DEFAULT_UPDATE_RETRIES):
+            header, header_version = self.header(project_id)
+            if not header_version:
+                return None
+            ns = _tasks_ns(project_id, header)
+            written = self._update_record(ns, task_id, fn)
+            if written is None:
+                if _tasks_ns(project_id, self.store.value(PROJECTS, project_id)) != ns:
+                    continue # that list was just replaced
+                return None
+            old, new = written
+
+            # Every task write bumps the header, so cached derivations
+            # (schedules) can tell the project changed
+            for _ in range(DEFAULT_UPDATE_RETRIES):
+                counts = dict(header['taskCounts'])
+                counts[old['status']] = counts.get(old['status'], 0) - 1
+                counts[new['status']] = counts.get(new['status'], 0) + 1
+                header.update(self._progress(header['status'], counts, header['taskCount']))
+                header['taskCounts'] = counts
+                header['updatedAt'] = time.time()
+                try:
+                    new_version = self.store.put(PROJECTS, project_id, header, expected_version=header_version)
+                    return new, header_version, new_version
+                except VersionConflict:
+                    header, header_version = self.store.get(PROJECTS, project_id)
+                    if not header_version or _tasks_ns(project_id, header) != ns:
+                        break
+            else:
+                raise VersionConflict(PROJECTS, project_id, None, None)
+            # The task list was replaced meanwhile: redo the change on the new list
+            self.store.delete(ns, task_id)
+        raise VersionConflict(PROJECTS, project_id, None, None)
+
+    def _update_record(
+        self,
+        ns: str,
+        task_id: str,
+        fn: Callable[[Dict[str, Any]], Dict[str, Any]]
+    ) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        for _ in range(DEFAULT_UPDATE_RETRIES):
+            old, version = self.store.get(ns, task_id)
+            if not version:
+                return None
+            new = fn(dict(old))
+            try:
+                self.store.put(ns, task_id, new, expected_version=version)
+                return old, new
+            except VersionConflict:
+                continue
+        raise VersionConflict(ns, task_id, None, None)
+
+    def replace_tasks(
+        self,
+        project_id: str,
+        tasks: List[Dict[str, Any]],
+        expected_version: int,
+        **fields: Any
+    ) -> int:
+        """
+        Swap in a new task list (a re-planned project) and update header
+        `fields`; returns the new header version. Raises VersionConflict when
+        the project changed since `expected_version`, including a task update
+        that landed while the new list was being written.
+        """
+        header, version = self.store.get(PROJECTS, project_id)
+        if version != expected_version:
+            raise VersionConflict(PROJECTS, project_id, expected_version, version)
+        new_header = dict(header, **fields, taskGeneration=uuid.uuid4().hex[:12])
+        self.store.put_many(_tasks_ns(project_id, new_header), {t['id']: t for t in tasks})
+        self.store.put(TASK_ORDER, _task_key(project_id, new_header), [t['id'] for t in tasks])
+        try:
+            new_version = self.store.put(
+                PROJECTS, project_id, self._header(new_header, tasks), expected_version=version
+            )
+        except VersionConflict:
+            self._drop_tasks(project_id, new_header)
+            raise
+        self._drop_tasks(project_id, header)
+        return new_version
+
+    def _drop_tasks(self, project_id: str, header: Dict[str, Any]):
+        self.store.clear(_tasks_ns(project_id, header))
+        self.store.delete(TASK_ORDER, _task_key(project_id, header))
+
+    def recount(self, project_id: str) -> Optional[ProjectSummary]:
+        """Rebuild a header's counters from its tasks (repair after a crash between writes)."""
+        data = self.get(project_id)
+        if not data:
+            return None
+        tasks = data.pop('tasks')
+        header = self._header(data, tasks)
+        self.store.put(PROJECTS, project_id, header)
+        return ProjectSummary(**header)
+
+    def _header(self, project: Dict[str, Any], tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        counts = {status: 0 for status in TASK_STATUSES}
+        for task in tasks:
+            counts[task['status']] = counts.get(task['status'], 0) + 1
+        header = {k: v for k, v in project.items() if k in ProjectSummary.model_fields}
+        header.update(taskCount=len(tasks), taskCounts=counts, updatedAt=time.time())
+        header.update(self._progress(project.get('status', 'planning'), counts, len(tasks)))
+        return ProjectSummary(**header).model_dump()
+
+    def _progress(self, status: str, counts: Dict[str, int], total: int) -> Dict[str, Any]:
+        done = counts.get('completed', 0)
+        progress = done / total if total else 0.0
+        if total and done == total:
+            status = 'completed'
+        elif status == 'completed' or (status == 'planning' and (done or counts.get('in_progress', 0))):
+            status = 'active'
+        return {"progress": progress, "status": status}
+
+    # ========================================================================
+    # READS
+    # ========================================================================
+
+    def count(self) -> int:
+        return self.store.count(PROJECTS)
+
+    def summary(self, project_id: str) -> Optional[ProjectSummary]:
+        header, version = self.header(project_id)
+        return ProjectSummary(**header) if version else None
+
+    def header(self, project_id: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        header, version = self.store.get(PROJECTS, project_id)
+        if version and 'tasks' in header:
+            self._migrate(project_id, header)
+            header, version = self.store.get(PROJECTS, project_id)
+        return header, version
+
+    def list_summaries(self, offset: int = 0, limit: int = 50, status: Optional[str] = None) -> ProjectSummaryPage:
+        headers = self.store.items(PROJECTS)
+        for project_id in [k for k, v in headers.items() if 'tasks' in v]:
+            self._migrate(project_id, headers[project_id])
+            headers[project_id] = self.store.value(PROJECTS, project_id)
+        summaries = [ProjectSummary(**h) for h in headers.values() if status is None or h['status'] == status]
+        summaries.sort(key=lambda s: s.timeline.get('startDate', 0), reverse=True)
+        return ProjectSummaryPage(total=len(summaries), offset=offset, limit=limit, projects=summaries[offset:offset + limit])
+
+    def task_page(self, project_id: str, offset: int = 0, limit: int = 50) -> Optional[TaskPage]:
+        loaded = self._load(project_id, lambda ns, ids: [self.store.value(ns, i) for i in ids[offset:offset + limit]])
+        if loaded is None:
+            return None
+        _, order, tasks = loaded
+        return TaskPage(projectId=project_id, total=len(order), offset=offset, limit=limit, tasks=tasks)
+
+    def get(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """The full project dict, tasks in creation order."""
+        loaded = self._load(project_id, lambda ns, ids: self._ordered(self.store.items(ns), ids))
+        if loaded is None:
+            return None
+        header, _, tasks = loaded
+        project = {k: v for k, v in header.items() if k not in ('taskCount', 'taskCounts', 'updatedAt')}
+        project['tasks'] = tasks
+        return project
+
+    def _ordered(self, tasks: Dict[str, Any], order: List[str]) -> List[Dict[str, Any]]:
+        return [tasks.get(task_id) for task_id in order]
+
+    def _load(
+        self,
+        project_id: str,
+        read: Callable[[str, List[str]], List[Optional[Dict[str, Any]]]]
+    ) -> Optional[Tuple[Dict[str, Any], List[str], List[Dict[str, Any]]]]:
+        """Header, task order and `read` tasks, all from the same task list."""
+        for _ in range(DEFAULT_UPDATE_RETRIES):
+            header, version = self.header(project_id)
+            if not version:
+                return None
+            order = self.store.value(TASK_ORDER, _task_key(project_id, header))
+            tasks = read(_tasks_ns(project_id, header), order or [])
+            # A re-plan dropped this list while it was being read; read the new one
+            if order is not None and None not in tasks:
+                return header, order, tasks
+        return header, order or [], [t for t in tasks if t is not None]
+
+    def _migrate(self, project_id: str, data: Dict[str, Any]):
+        """Split a project stored whole (before this repository) into header and tasks."""
+        tasks = data.get('tasks', [])
+        self.store.put_many(_tasks_ns(project_id), {t['id']: t for t in tasks})
+        self.store.put(TASK_ORDER, project_id, [t['id'] for t in tasks])
+        self.store.put(PROJECTS, project_id, self._header({k: v for k, v in data.items() if k != 'tasks'}, tasks))
@@ -0,0 +1,255 @@
+"""
+Project Scheduler
+Critical-path analysis and parallel list scheduling for project tasks
+
+Tasks are interned to dense indices with successor lists, so every pass
+is O(V + E). The forward pass gives earliest starts; the backward pass
+keeps each task's "tail" (longest remaining path including itself), so
+latest start = makespan - tail. When one task's duration changes, only
+its descendants' earliest starts and its ancestors' tails can move. Both
+are re-propagated in topological order and stop where values don't
+change, and the result equals a full recomputation.
+
+Worker assignment is greedy list scheduling: whenever a worker is free it
+takes the ready task with the smallest latest start (least slack first).
+"""
+
+import heapq
+import collections
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+from pydantic import BaseModel
+
+# Completed tasks take no more time
+DONE_STATUSES = ('completed',)
+
+# ============================================================================
+# TYPE DEFINITIONS
+# ============================================================================
+
+class DependencyCycle(ValueError):
+    def __init__(self, cycle: List[str]):
+        super().__init__(f"Dependency cycle: {' -> '.join(cycle)}")
+        self.cycle = cycle
+
+class TaskSchedule(BaseModel):
+    id: str
+    durationMinutes: float
+    earliestStart: float # minutes from project start
+    earliestFinish: float
+    latestStart: float
+    latestFinish: float
+    slack: float
+    critical: bool
+    worker: Optional[int] = None
+    start: Optional[float] = None # with the given number of workers
+    finish: Optional[float] = None
+
+class ProjectSchedule(BaseModel):
+    projectId: str
+    workers: int
+    criticalPathMinutes: float # makespan with unlimited workers
+    makespanMinutes: float # with `workers` workers
+    criticalPath: List[str]
+    tasks: List[TaskSchedule]
+
+# ============================================================================
+# SCHEDULER
+# ============================================================================
+
+class CriticalPathScheduler:
+    def __init__(self, tasks: Iterable[Tuple[str, float, List[str]]]):
+        """`tasks`: (id, duration, dependency ids). Unknown dependencies raise KeyError."""
+        tasks = list(tasks)
+        self.ids = [t[0] for t in tasks]
+        self.index = {task_id: i for i, task_id in enumerate(self.ids)}
+        n = len(self.ids)
+        self.duration = np.array([t[1] for t in tasks], dtype=np.float64)
+        self.preds: List[List[int]] = [[] for _ in range(n)]
+        self.succs: List[List[int]] = [[] for _ in range(n)]
+        for i, (task_id, _, deps) in enumerate(tasks):
+            for dep in deps:
+                if dep not in self.index:
+                    raise KeyError(f"Task {task_id} depends on unknown task {dep}")
+                j = self.index[dep]
+                self.preds[i].append(j)
+                self.succs[j].append(i)
+
+        self.order = self._toposort()
+        self.position = np.empty(n, dtype=np.int64)
+        self.position[self.order] = np.arange(n)
+        self.es = np.zeros(n)
+        self.tail = np.zeros(n)
+        self._forward(self.order)
+        self._backward(reversed(self.order))
+
+    # ========================================================================
+    # ORDERING
+    # ========================================================================
+
+    def _toposort(self) -> List[int]:
+        indegree = [len(p) for p in self.preds]
+        ready = collections.deque(i for i, d in enumerate(indegree) if d == 0)
+        order = []
+        while ready:
+            i = ready.popleft()
+            order.append(i)
+            for s in self.succs[i]:
+                indegree[s] -= 1
+                if indegree[s] == 0:
+                    ready.append(s)
+        if len(order) < len(self.ids):
+            raise DependencyCycle(self._find_cycle({i for i, d in enumerate(indegree) if d > 0}))
+        return order
+
+    def _find_cycle(self, remaining: set) -> List[str]:
+        """Walk predecessors inside the unsorted remainder until a node repeats."""
+        node = next(iter(remaining))
+        seen: Dict[int, int] = {}
+        path = []
+        while node not in seen:
+            seen[node] = len(path)
+            path.append(node)
+            node = next(p for p in self.preds[node] if p in remaining)
+        cycle = path[seen[node]:][::-1]
+        return [self.ids[i] for i in cycle + [cycle[0]]]
+
+    # ========================================================================
+    # PASSES
+    # ========================================================================
+
+    def _forward(self, nodes: Iterable[int]):
+        es, duration = self.es, self.duration
+        for i in nodes:
+            es[i] = max((es[p] + duration[p] for p in self.preds[i]), default=0.0)
+
+    def _backward(self, nodes: Iterable[int]):
+        tail, duration = self.tail, self.duration
+        for i in nodes:
+            tail[i] = duration[i] + max((tail[s] for s in self.succs[i]), default=0.0)
+
+    def _propagate(self, start: int, forward: bool):
+        """Recompute from `start` along successors (forward) or predecessors, in topological order."""
+        key = (lambda i: self.position[i]) if forward else (lambda i: -self.position[i])
+        heap = [(key(start), start)]
+        queued = {start}
+        while heap:
+            _, i = heapq.heappop(heap)
+            queued.discard(i)
+            if forward:
+                old = self.es[i]
+                self._forward((i,))
+                changed, nexts = self.es[i] != old, self.succs[i]
+            else:
+                old = self.tail[i]
+                self._backward((i,))
+                changed, nexts = self.tail[i] != old, self.preds[i]
+            if changed or i == start:
+                for j in nexts:
+                    if j not in queued:
+                        queued.add(j)
+                        heapq.heappush(heap, (key(j), j))
+
+    def set_duration(self, task_id: str, duration: float):
+        """Exact incremental update after one task's remaining duration changes."""
+        i = self.index[task_id]
+        if self.duration[i] == duration:
+            return
+        self.duration[i] = duration
+        # Own earliest start is unchanged; successors and ancestors may move
+        self._propagate(i, forward=True)
+        self._propagate(i, forward=False)
+
+    # ========================================================================
+    # RESULTS
+    # ========================================================================
+
+    @property
+    def makespan(self) -> float:
+        return float((self.es + self.duration).max()) if len(self.ids) else 0.0
+
+    def critical_path(self) -> List[str]:
+        """One zero-slack chain from a start task to the end."""
+        if not self.ids:
+            return []
+        makespan = self.makespan
+        critical = np.isclose(self.es + self.tail, makespan)
+        node = next(i for i in self.order if critical[i] and self.es[i] == 0)
+        path = [node]
+        while True:
+            finish = self.es[node] + self.duration[node]
+            node = next((s for s in self.succs[node] if critical[s] and np.isclose(self.es[s], finish)), None)
+            if node is None:
+                return [self.ids[i] for i in path]
+            path.append(node)
+
+    def assign(self, workers: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """List-schedule onto `workers`; returns (start, finish, worker) per task."""
+        n = len(self.ids)
+        latest_start = self.makespan - self.tail
+        start, finish = np.zeros(n), np.zeros(n)
+        worker_of = np.full(n, -1, dtype=np.int64)
+        waiting = [len(p) for p in self.preds]
+        ready_at = np.zeros(n) # when the last predecessor finishes
+
+        ready = [(latest_start[i], self.position[i], i) for i in range(n) if waiting[i] == 0]
+        heapq.heapify(ready)
+        idle = list(range(workers))
+        running: List[Tuple[float, int, int]] = [] # (finish, worker, task)
+        now = 0.0
+        while ready or running:
+            while ready and idle:
+                _, _, i = heapq.heappop(ready)
+                w = heapq.heappop(idle)
+                start[i] = max(now, ready_at[i])
+                finish[i] = start[i] + self.duration[i]
+                worker_of[i] = w
+                heapq.heappush(running, (finish[i], w, i))
+            # Advance to the next completion and release everything finishing then
+            now, w, i = heapq.heappop(running)
+            finished = [(w, i)]
+            while running and running[0][0] == now:
+                _, w, i = heapq.heappop(running)
+                finished.append((w, i))
+            for w, i in finished:
+                heapq.heappush(idle, w)
+                for s in self.succs[i]:
+                    waiting[s] -= 1
+                    ready_at[s] = max(ready_at[s], finish[i])
+                    if waiting[s] == 0:
+                        heapq.heappush(ready, (latest_start[s], self.position[s], s))
+        return start, finish, worker_of
+
+    def schedule(self, project_id: str, workers: int = 1) -> ProjectSchedule:
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        makespan = self.makespan
+        latest_start = makespan - self.tail
+        slack = latest_start - self.es
+        start, finish, worker_of = self.assign(workers)
+        tasks = [
+            TaskSchedule(
+                id=task_id,
+                durationMinutes=float(self.duration[i]),
+                earliestStart=float(self.es[i]),
+                earliestFinish=float(self.es[i] + self.duration[i]),
+                latestStart=float(latest_start[i]),
+                latestFinish=float(latest_start[i] + self.duration[i]),
+                slack=float(slack[i]),
+                critical=bool(np.isclose(slack[i], 0.0)),
+                worker=int(worker_of[i]),
+                start=float(start[i]),
+                finish=float(finish[i])
+            ) for i, task_id in enumerate(self.ids)
+        ]
+        return ProjectSchedule(
+            projectId=project_id,
+            workers=workers,
+            criticalPathMinutes=makespan,
+            makespanMinutes=float(finish.max()) if len(self.ids) else 0.0,
+            criticalPath=self.critical_path(),
+            tasks=tasks
+        )
+
+def remaining_minutes(status: str, estimated_minutes: float) -> float:
+    return 0.0 if status in DONE_STATUSES else float(estimated_minutes)
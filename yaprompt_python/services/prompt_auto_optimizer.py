@@ -3,12 +3,26 @@ Prompt Auto Optimizer (Python Port)
 Intelligent prompt improvement logic
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, List
 import json
 from .local_llm_service import local_llm_service
 
 class PromptAutoOptimizer:
     async def optimize_prompt(self, original_prompt: str, options: Dict[str, Any] = {}) -> Dict[str, Any]:
+        meta_prompt = self._build_meta_prompt(original_prompt, options)
+        response = await local_llm_service.generate(meta_prompt, {})
+        return self._parse_response(response.text)
+
+    async def optimize_prompts(self, prompts: List[str], options: Dict[str, Any] = {}) -> List[Dict[str, Any]]:
+        """Optimize many prompts with one batched LLM call; results keep input order."""
+        meta_prompts = [self._build_meta_prompt(p, options) for p in prompts]
+        batch = await local_llm_service.generate_batch(meta_prompts, options.get('llmOptions', {}))
+        return [
+            self._parse_response(item.response.text) if item.response else {"error": item.error}
+            for item in batch
+        ]
+
+    def _build_meta_prompt(self, original_prompt: str, options: Dict[str, Any]) -> str:
         # Stage 1: Heuristic / Rule based (Simulated RL Logic)
         stage1 = original_prompt
         if len(original_prompt) < 20:
@@ -20,7 +34,7 @@ class PromptAutoOptimizer:
         if options.get('memory'):
             memory_context = "Use knowledge of user preferences."
 
-        meta_prompt = f"""
+        return f"""
         You are a world-class Prompt Engineer.
         Your task is to OPTIMIZE the User Prompt below.
         
@@ -36,9 +50,9 @@ class PromptAutoOptimizer:
         
         JSON ONLY. No markdown.
         """
-        
-        response = await local_llm_service.generate(meta_prompt, {})
-        text = response.text.replace('```json', '').replace('```', '').strip()
+
+    def _parse_response(self, raw_text: str) -> Dict[str, Any]:
+        text = raw_text.replace('```json', '').replace('```', '').strip()
         
         try:
             return json.loads(text)
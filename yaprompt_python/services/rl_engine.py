@@ -4,72 +4,217 @@ Reinforcement Learning for personalization
 """
 
 import time
-import json
+import numpy as np
+from pathlib import Path
 from typing import Dict, List, Any, Optional
 
+from ..config import Config
+from ..utils.state_store import StateStore, VersionConflict, DEFAULT_UPDATE_RETRIES, state_store
+from .bandit_engine import BanditEngine, Strategy, STRATEGIES, apply_delta
+from .rl_persistence import RewardLog, save_snapshot, load_snapshot
+
+VALUES = 'rl_values' # "action::context" -> {qValue, visits, alpha, beta, lastUpdate}
+STATS = 'rl_stats'
+
+SNAPSHOT_EVERY_REWARDS = 5000
+SNAPSHOT_INTERVAL_SECONDS = 300.0
+
 class RLEngine:
-    def __init__(self):
-        self.action_values = {} # key -> {qValue, visits, ...}
-        self.reward_history = []
-        self.learning_rate = 0.1
-        self.exploration_rate = 0.2
-        
+    def __init__(
+        self,
+        store: Optional[StateStore] = None,
+        strategy: Strategy = 'epsilon_greedy',
+        seed: Optional[int] = None,
+        state_dir: Optional[Path] = None,
+        wal_fsync: bool = Config.RL_WAL_FSYNC
+    ):
+        # The store is shared across workers; the bandit arrays are this
+        # process's copy, refreshed whenever another worker has written
+        self.store = store or state_store
+        self.bandit = BanditEngine(learning_rate=0.1, exploration_rate=0.2, seed=seed)
+        self.strategy = strategy
+        self._synced_version = -1
+
+        # Snapshot + write-ahead log make the state survive restarts
+        self.state_dir = Path(state_dir or Config.RL_STATE_DIR)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.snapshot_path = self.state_dir / 'bandit.snapshot'
+        self.wal = RewardLog(self.state_dir / 'rewards.wal', fsync=wal_fsync)
+        self._since_snapshot = 0
+        self._last_snapshot = time.time()
+        self._restore()
+
+    @property
+    def learning_rate(self) -> float:
+        return self.bandit.learning_rate
+
+    @learning_rate.setter
+    def learning_rate(self, value: float):
+        self.bandit.learning_rate = value
+
+    @property
+    def exploration_rate(self) -> float:
+        return self.bandit.exploration_rate
+
+    @exploration_rate.setter
+    def exploration_rate(self, value: float):
+        self.bandit.exploration_rate = value
+
+    @property
+    def action_values(self) -> Dict[str, Dict[str, Any]]:
+        return self.store.items(VALUES)
+
+    @property
+    def reward_history(self) -> List[Dict[str, Any]]:
+        # Bounded ring buffer, this process only
+        return self.bandit.recent_rewards(self.bandit.history.capacity)
+
     def record_reward(self, action_id: str, value: float, context: str):
-        reward = max(-1.0, min(1.0, value))
-        self.reward_history.append({
-            "actionId": action_id,
-            "value": reward,
-            "timestamp": time.time(),
-            "context": context
-        })
-        self._update_action_value(action_id, context, reward)
-        
+        self.record_rewards([action_id], [value], [context])
+
+    def record_rewards(self, action_ids: List[str], values: List[float], contexts: List[str]) -> Dict[str, Any]:
+        """Apply a batch of rewards in one vectorized update."""
+        if not (len(action_ids) == len(values) == len(contexts)):
+            raise ValueError("actionIds, values and contexts must have the same length")
+        if not action_ids:
+            return {"applied": 0, "cells": 0}
+
+        rewards = np.clip(np.asarray(values, dtype=np.float64), -1.0, 1.0)
+        now = time.time()
+        # The lock spans append and apply: a snapshot taken by another worker
+        # meanwhile would otherwise truncate a batch not yet in the store
+        with self.wal.locked():
+            self._sync()
+            # Durable before applied
+            self.wal.append(list(action_ids), list(contexts), rewards.tolist(), now)
+            deltas = self.bandit.update_batch(action_ids, contexts, rewards, now)
+
+            for action, context, delta in deltas:
+                cell = self.store.update(VALUES, f"{action}::{context}", lambda current, d=delta: apply_delta(current, d, now))
+                # The shared cell wins if another worker updated it in between
+                self.bandit.set_cell(action, context, cell["qValue"], cell["visits"], cell["alpha"], cell["beta"], cell["lastUpdate"])
+            self._bump_totals(len(rewards), float(rewards.sum()), float(np.square(rewards).sum()))
+
+        self._since_snapshot += len(rewards)
+        if self._since_snapshot >= SNAPSHOT_EVERY_REWARDS or time.time() - self._last_snapshot >= SNAPSHOT_INTERVAL_SECONDS:
+            self.snapshot()
+        return {"applied": len(rewards), "cells": len(deltas)}
+
     def get_action_value(self, action: str, context: str) -> float:
-        key = f"{action}::{context}"
-        return self.action_values.get(key, {}).get("qValue", 0.0)
-    
-    def select_action(self, actions: List[str], context: str) -> str:
-        # Epsilon-greedy
-        if not actions: return ""
-        # In python random is imported
-        import random
-        if random.random() < self.exploration_rate:
-            return random.choice(actions)
-            
-        # Argmax
-        best_action = actions[0]
-        best_val = self.get_action_value(best_action, context)
-        
-        for action in actions[1:]:
-            val = self.get_action_value(action, context)
-            if val > best_val:
-                best_val = val
-                best_action = action
-                
-        return best_action
-        
-    def _update_action_value(self, action_id: str, context: str, reward: float):
-        key = f"{action_id}::{context}"
-        current = self.action_values.get(key, {
-            "qValue": 0.0,
-            "visits": 0
-        })
-        
-        # Simple TD update
-        current["qValue"] += self.learning_rate * (reward - current["qValue"])
-        current["visits"] += 1
-        current["lastUpdate"] = time.time()
-        
-        self.action_values[key] = current
-        
+        self._sync()
+        return self.bandit.value(action, context)
+
+    def select_action(self, actions: List[str], context: str, strategy: Optional[Strategy] = None) -> str:
+        strategy = strategy or self.strategy
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy}")
+        self._sync()
+        return self.bandit.select(actions, context, strategy)
+
     def get_stats(self) -> Dict[str, Any]:
-        count = len(self.reward_history)
-        total = sum(r['value'] for r in self.reward_history)
-        avg = total / count if count > 0 else 0
-        return {
-            "totalRewards": total,
-            "avgReward": avg,
-            "learningRate": self.learning_rate
-        }
-
-rl_engine = RLEngine()
+        self._sync()
+        stats = self.bandit.stats()
+        stats.update({
+            "learningRate": self.learning_rate,
+            "strategy": self.strategy
+        })
+        return stats
+
+    # ========================================================================
+    # PERSISTENCE
+    # ========================================================================
+
+    def snapshot(self):
+        """Write a snapshot and truncate the WAL; appends from other workers wait meanwhile."""
+        with self.wal.locked():
+            self._sync()
+            save_snapshot(self.bandit, self.snapshot_path)
+            self.wal.truncate()
+        self._since_snapshot = 0
+        self._last_snapshot = time.time()
+
+    def _restore(self):
+        start = time.perf_counter()
+        restored = load_snapshot(self.bandit, self.snapshot_path)
+        replayed = 0
+        for batch in self.wal.replay():
+            self.bandit.update_batch(batch["a"], batch["c"], batch["v"], batch["t"])
+            replayed += len(batch["v"])
+        if restored or replayed:
+            print(f"RL state restored ({self.bandit.count} rewards, {replayed} from WAL) in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    # ========================================================================
+    # SHARED STATE
+    # ========================================================================
+
+    def _bump_totals(self, count: int, total: float, total_sq: float):
+        for _ in range(DEFAULT_UPDATE_RETRIES):
+            totals, version = self.store.get(STATS, 'totals')
+            totals = totals or {}
+            new = {
+                "count": totals.get("count", 0) + count,
+                "total": totals.get("total", 0.0) + total,
+                "totalSq": totals.get("totalSq", 0.0) + total_sq
+            }
+            try:
+                new_version = self.store.put(STATS, 'totals', new, expected_version=version)
+                break
+            except VersionConflict:
+                continue
+        else:
+            raise VersionConflict(STATS, 'totals', None, None)
+
+        self._apply_totals(new)
+        # Only our own write landed since the last sync: nothing to reload
+        if version == self._synced_version:
+            self._synced_version = new_version
+
+    def _apply_totals(self, totals: Dict[str, Any]):
+        self.bandit.count = totals.get("count", 0)
+        self.bandit.total = totals.get("total", 0.0)
+        self.bandit.total_sq = totals.get("totalSq", 0.0)
+
+    def _seed_store(self):
+        """Publish state restored from disk to an empty shared store."""
+        rows, cols = np.nonzero(self.bandit.visits)
+        for c, a in zip(rows.tolist(), cols.tolist()):
+            action, context = self.bandit.actions.names[a], self.bandit.contexts.names[c]
+            try:
+                self.store.put(VALUES, f"{action}::{context}", self.bandit.get_cell(action, context), expected_version=0)
+            except VersionConflict:
+                pass # another worker seeded it first
+        try:
+            self.store.put(STATS, 'totals', {
+                "count": self.bandit.count, "total": self.bandit.total, "totalSq": self.bandit.total_sq
+            }, expected_version=0)
+        except VersionConflict:
+            pass
+
+    def _sync(self):
+        """Reload the arrays from the store if another worker has written (one read otherwise)."""
+        totals, version = self.store.get(STATS, 'totals')
+        if version == self._synced_version:
+            return
+        if version == 0 and self.bandit.count:
+            self._seed_store()
+            totals, version = self.store.get(STATS, 'totals')
+        for key, cell in self.store.items(VALUES).items():
+            action, _, context = key.partition('::')
+            self.bandit.set_cell(
+                action, context, cell.get("qValue", 0.0), cell.get("visits", 0),
+                cell.get("alpha", 1.0), cell.get("beta", 1.0), cell.get("lastUpdate", 0.0)
+            )
+        self._apply_totals(totals or {})
+        self._synced_version = version
+
+_rl_engine: Optional[RLEngine] = None
+
+def __getattr__(name: str) -> Any:
+    # `rl_engine` is built on first use, not at import: construction creates
+    # the state dir, opens the WAL and replays it
+    global _rl_engine
+    if name == 'rl_engine':
+        if _rl_engine is None:
+            _rl_engine = RLEngine()
+        return _rl_engine
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,176 @@
+"""
+RL Persistence
+Binary snapshots and a reward write-ahead log for the bandit engine
+
+The snapshot is a single file: an 8-byte magic, a JSON header (ids,
+aggregates, array layout) and the raw arrays, 64-byte aligned. Loading
+memory-maps the arrays copy-on-write, so startup cost does not grow with
+the table size. Every reward batch is appended to the WAL before it is
+applied; startup replays the WAL on top of the snapshot, and taking a
+snapshot truncates it.
+"""
+
+import os
+import threading
+import json
+import time
+import struct
+import numpy as np
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+
+from .bandit_engine import BanditEngine
+
+SNAPSHOT_MAGIC = b'PFBANDIT'
+SNAPSHOT_VERSION = 1
+ALIGNMENT = 64
+
+CELL_ARRAYS = ('q', 'visits', 'alpha', 'beta', 'last_update')
+RING_ARRAYS = ('action', 'context', 'value', 'timestamp')
+
+# ============================================================================
+# SNAPSHOT
+# ============================================================================
+
+def _align(n: int) -> int:
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def save_snapshot(bandit: BanditEngine, path: Path):
+    """Write the bandit's state atomically (temp file + rename)."""
+    path = Path(path)
+    rows, cols = len(bandit.contexts), len(bandit.actions)
+    arrays: List[Tuple[str, np.ndarray]] = [
+        (name, np.ascontiguousarray(getattr(bandit, name)[:rows, :cols])) for name in CELL_ARRAYS
+    ] + [
+        (f"ring_{name}", np.ascontiguousarray(getattr(bandit.history, name))) for name in RING_ARRAYS
+    ]
+
+    layout, offset = {}, 0
+    for name, array in arrays:
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset = _align(offset + array.nbytes)
+
+    header = json.dumps({
+        "version": SNAPSHOT_VERSION,
+        "createdAt": time.time(),
+        "actions": bandit.actions.names,
+        "contexts": bandit.contexts.names,
+        "count": bandit.count,
+        "total": bandit.total,
+        "totalSq": bandit.total_sq,
+        "ring": {"capacity": bandit.history.capacity, "head": bandit.history.head, "size": bandit.history.size},
+        "arrays": layout
+    }).encode('utf-8')
+    data_start = _align(len(SNAPSHOT_MAGIC) + 8 + len(header))
+
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for name, array in arrays:
+            f.seek(data_start + layout[name]["offset"])
+            f.write(array.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def load_snapshot(bandit: BanditEngine, path: Path) -> bool:
+    """Memory-map a snapshot into `bandit`. Returns False when there is none."""
+    path = Path(path)
+    if not path.exists():
+        return False
+    with open(path, 'rb') as f:
+        if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a bandit snapshot")
+        (header_len,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_len))
+    data_start = _align(len(SNAPSHOT_MAGIC) + 8 + header_len)
+
+    def mapped(name: str) -> np.ndarray:
+        spec = header["arrays"][name]
+        shape = tuple(spec["shape"])
+        if 0 in shape:
+            return np.zeros(shape, dtype=spec["dtype"])
+        # Copy-on-write: pages are read lazily and writes never reach the file
+        return np.memmap(path, dtype=spec["dtype"], mode='c', offset=data_start + spec["offset"], shape=shape)
+
+    for name in header["actions"]:
+        bandit.actions.intern(name)
+    for name in header["contexts"]:
+        bandit.contexts.intern(name)
+    if header["actions"] and header["contexts"]:
+        for name in CELL_ARRAYS:
+            setattr(bandit, name, mapped(name))
+
+    ring = header["ring"]
+    if ring["capacity"] == bandit.history.capacity:
+        for name in RING_ARRAYS:
+            setattr(bandit.history, name, mapped(f"ring_{name}"))
+        bandit.history.head, bandit.history.size = ring["head"], ring["size"]
+
+    bandit.count, bandit.total, bandit.total_sq = header["count"], header["total"], header["totalSq"]
+    return True
+
+# ============================================================================
+# WRITE-AHEAD LOG
+# ============================================================================
+
+class RewardLog:
+    """Append-only JSONL of reward batches, shared safely between processes."""
+
+    def __init__(self, path: Path, fsync: bool = True):
+        self.path = Path(path)
+        self.fsync = fsync
+        # One descriptor for appends and locking, so re-locking in-process never deadlocks
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        # Re-entrant: the file lock is taken by the outermost holder and
+        # released only when it exits (an inner unlock would drop it early)
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+
+    @contextmanager
+    def locked(self):
+        with self._thread_lock:
+            if self._depth == 0 and fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0 and fcntl:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def append(self, actions: List[str], contexts: List[str], values: List[float], timestamp: float):
+        line = json.dumps({"t": timestamp, "a": actions, "c": contexts, "v": values}, separators=(',', ':')) + '\n'
+        with self.locked():
+            os.write(self._fd, line.encode('utf-8'))
+            if self.fsync:
+                os.fsync(self._fd)
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-append
+                    print(f"Skipping unreadable WAL entry in {self.path}")
+
+    def size(self) -> int:
+        return os.fstat(self._fd).st_size
+
+    def truncate(self):
+        os.ftruncate(self._fd, 0)
+        if self.fsync:
+            os.fsync(self._fd)
+
+    def close(self):
+        os.close(self._fd)
@@ -8,6 +8,11 @@ import uuid
 from typing import Dict, List, Any, Optional
 from pydantic import BaseModel
 
+from ..utils.state_store import StateStore, VersionConflict, state_store
+
+PENDING = 'approval_pending'
+HISTORY = 'approval_history'
+
 class PendingAction(BaseModel):
     id: str
     type: str
@@ -19,9 +24,18 @@ class PendingAction(BaseModel):
     approvedAt: Optional[float] = None
 
 class SafeActionApproval:
-    def __init__(self):
-        self.pending_actions: Dict[str, PendingAction] = {}
-        self.history: List[PendingAction] = []
+    def __init__(self, store: Optional[StateStore] = None):
+        # Shared across workers; see utils/state_store
+        self.store = store or state_store
+
+    @property
+    def pending_actions(self) -> Dict[str, PendingAction]:
+        return {k: PendingAction(**v) for k, v in self.store.items(PENDING).items()}
+
+    @property
+    def history(self) -> List[PendingAction]:
+        actions = [PendingAction(**v) for v in self.store.items(HISTORY).values()]
+        return sorted(actions, key=lambda a: a.approvedAt or 0)
     
     async def request_approval(self, type: str, description: str, details: Dict[str, Any]) -> str:
         risk = self._assess_risk(type, details)
@@ -33,23 +47,28 @@ class SafeActionApproval:
             riskLevel=risk,
             timestamp=time.time()
         )
-        self.pending_actions[action.id] = action
+        self.store.put(PENDING, action.id, action.model_dump(), expected_version=0)
         return action.id
 
     async def approve_action(self, action_id: str, method: str) -> bool:
-        if action_id not in self.pending_actions:
+        data, version = self.store.get(PENDING, action_id)
+        if not version:
             return False
-            
-        action = self.pending_actions[action_id]
+
+        # Only the worker whose conditional delete lands gets to approve
+        try:
+            self.store.delete(PENDING, action_id, expected_version=version)
+        except VersionConflict:
+            return False
+
+        action = PendingAction(**data)
         action.status = 'approved'
         action.approvedAt = time.time()
-        
-        del self.pending_actions[action_id]
-        self.history.append(action)
+        self.store.put(HISTORY, action.id, action.model_dump())
         return True
 
     def get_pending_actions(self) -> List[PendingAction]:
-        return list(self.pending_actions.values())
+        return sorted(self.pending_actions.values(), key=lambda a: a.timestamp)
 
     def _assess_risk(self, type: str, details: Dict[str, Any]) -> str:
         if type == 'payment_initiate':
@@ -0,0 +1,215 @@
+"""
+Script Sandbox
+Precompiled, restricted execution of workflow transform scripts and conditions
+
+Scripts are validated and compiled to code objects once, then run with a
+restricted builtins set under a CPU-time limit. Library helpers are exposed
+as plain functions (json_loads, re_match, math_sqrt, ...), never as module
+objects, since any module attribute chain can reach sys.modules. Heavy
+transforms can be sent to a process pool so they do not block the event
+loop; there a wall-clock limit also covers long-running C builtins.
+"""
+
+import ast
+import sys
+import json
+import math
+import re
+import time
+import asyncio
+import builtins
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from types import CodeType
+from typing import Any, Dict, Optional
+
+DEFAULT_CPU_LIMIT = 2.0 # seconds of CPU per script run
+# Pool runs get this much wall-clock time beyond the CPU limit (startup, pickling)
+POOL_WALL_MARGIN = 5.0
+
+SAFE_BUILTINS = {name: getattr(builtins, name) for name in (
+    'abs', 'all', 'any', 'bool', 'dict', 'divmod', 'enumerate', 'filter', 'float',
+    'int', 'isinstance', 'len', 'list', 'map', 'max', 'min', 'range', 'reversed',
+    'round', 'set', 'sorted', 'str', 'sum', 'tuple', 'zip', 'None', 'True', 'False',
+    'Exception', 'ValueError', 'KeyError', 'TypeError', 'IndexError'
+)}
+
+SAFE_FUNCTIONS = {
+    'json_loads': json.loads, 'json_dumps': json.dumps,
+    're_match': re.match, 're_search': re.search, 're_fullmatch': re.fullmatch,
+    're_findall': re.findall, 're_sub': re.sub, 're_split': re.split, 're_escape': re.escape,
+    'math_sqrt': math.sqrt, 'math_floor': math.floor, 'math_ceil': math.ceil,
+    'math_log': math.log, 'math_exp': math.exp, 'math_isclose': math.isclose,
+    'math_pi': math.pi, 'math_inf': math.inf
+}
+
+# Module names scripts could once use directly, and their replacements
+RETIRED_MODULES = {
+    name: ', '.join(f for f in SAFE_FUNCTIONS if f.startswith(name + '_'))
+    for name in ('json', 'math', 're')
+}
+
+# str.format resolves attribute paths at runtime, out of reach of validation
+BLOCKED_ATTRIBUTES = {'format', 'format_map'}
+
+# Attribute access is limited to the public methods and properties of the
+# data types scripts work on. Anything else (generator, frame, traceback and
+# code object attributes) can walk back to the sandbox's own globals.
+ALLOWED_ATTRIBUTES = frozenset(
+    name
+    for cls in (str, bytes, dict, list, tuple, set, frozenset, int, float, bool,
+                type(re.match('', '')), type(re.compile('')))
+    for name in dir(cls)
+    if not name.startswith('_')
+) - BLOCKED_ATTRIBUTES
+
+# Node types allowed in condition expressions
+CONDITION_NODES = (
+    ast.Expression, ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.Compare, ast.IfExp,
+    ast.Call, ast.Name, ast.Constant, ast.Subscript, ast.Slice, ast.Attribute,
+    ast.List, ast.Tuple, ast.Dict, ast.Set, ast.ListComp, ast.SetComp,
+    ast.GeneratorExp, ast.comprehension, ast.keyword,
+    ast.Load, ast.Store, ast.boolop, ast.operator, ast.unaryop, ast.cmpop
+)
+
+class UnsafeScriptError(ValueError):
+    pass
+
+class ScriptTimeoutError(Exception):
+    pass
+
+# ============================================================================
+# VALIDATION & COMPILATION
+# ============================================================================
+
+def _validate(tree: ast.AST, expression_only: bool = False):
+    # Names first, so a retired module reports its replacement rather than its attribute
+    for node in sorted(ast.walk(tree), key=lambda n: not isinstance(n, ast.Name)):
+        if expression_only and not isinstance(node, CONDITION_NODES):
+            raise UnsafeScriptError(f"{type(node).__name__} is not allowed in conditions")
+        if isinstance(node, (ast.Import, ast.ImportFrom, ast.Global, ast.Nonlocal)):
+            raise UnsafeScriptError(f"{type(node).__name__} is not allowed in scripts")
+        if isinstance(node, ast.Attribute):
+            if node.attr not in ALLOWED_ATTRIBUTES:
+                raise UnsafeScriptError(f"Access to '{node.attr}' is not allowed")
+            if isinstance(node.value, ast.Name) and node.value.id in SAFE_FUNCTIONS:
+                raise UnsafeScriptError(f"Attributes of '{node.value.id}' are not accessible")
+        if isinstance(node, ast.Name) and node.id.startswith('__'):
+            raise UnsafeScriptError(f"Access to '{node.id}' is not allowed")
+        if isinstance(node, ast.Name) and node.id in RETIRED_MODULES:
+            raise UnsafeScriptError(f"Module '{node.id}' is not available; use {RETIRED_MODULES[node.id]}")
+
+@lru_cache(maxsize=1024)
+def compile_transform(script: str) -> CodeType:
+    """Compile a transform body into a module defining transform(input, context)."""
+    # Legacy layout first (only the first line indented), which earlier
+    # multi-line scripts were written against; then a fully indented body
+    sources = [
+        f"def transform(input, context):\n  {script}",
+        "def transform(input, context):\n" + "\n".join(f"  {line}" for line in script.splitlines())
+    ]
+    last_error: Optional[SyntaxError] = None
+    for source in sources:
+        try:
+            tree = ast.parse(source, filename='<transform>')
+        except SyntaxError as e:
+            last_error = e
+            continue
+        _validate(tree)
+        return compile(tree, '<transform>', 'exec')
+    raise last_error
+
+@lru_cache(maxsize=1024)
+def compile_condition(condition: str) -> CodeType:
+    tree = ast.parse(condition, filename='<condition>', mode='eval')
+    _validate(tree, expression_only=True)
+    return compile(tree, '<condition>', 'eval')
+
+# ============================================================================
+# EXECUTION
+# ============================================================================
+
+def _sandbox_globals() -> Dict[str, Any]:
+    return {'__builtins__': SAFE_BUILTINS, **SAFE_FUNCTIONS}
+
+def _run_with_cpu_limit(fn, cpu_limit: float) -> Any:
+    # Checked on every traced line/call, so a runaway loop is interrupted
+    deadline = time.process_time() + cpu_limit
+
+    def tracer(frame, event, arg):
+        if time.process_time() > deadline:
+            raise ScriptTimeoutError(f"Script exceeded CPU time limit of {cpu_limit}s")
+        return tracer
+
+    previous = sys.gettrace()
+    sys.settrace(tracer)
+    try:
+        return fn()
+    finally:
+        sys.settrace(previous)
+
+def run_transform(code: CodeType, input_data: Any, variables: Dict[str, Any], cpu_limit: float = DEFAULT_CPU_LIMIT) -> Any:
+    namespace = _sandbox_globals()
+    exec(code, namespace)
+    transform = namespace['transform']
+    return _run_with_cpu_limit(lambda: transform(input_data, {'variables': variables}), cpu_limit)
+
+def evaluate_condition(code: CodeType, input_data: Any, variables: Dict[str, Any], cpu_limit: float = DEFAULT_CPU_LIMIT) -> bool:
+    local_scope = {'input': input_data, 'context': {'variables': variables}}
+    return bool(_run_with_cpu_limit(lambda: eval(code, _sandbox_globals(), local_scope), cpu_limit))
+
+# ============================================================================
+# PROCESS POOL
+# ============================================================================
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor()
+    return _process_pool
+
+def _run_transform_in_worker(script: str, input_data: Any, variables: Dict[str, Any], cpu_limit: float) -> Any:
+    # Code objects do not pickle; each worker compiles (and caches) from source
+    return run_transform(compile_transform(script), input_data, variables, cpu_limit)
+
+def _kill_process_pool():
+    """Terminate every pool worker; the next pool run starts a fresh pool."""
+    global _process_pool
+    pool, _process_pool = _process_pool, None
+    if pool is None:
+        return
+    for process in list((pool._processes or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+async def run_transform_in_pool(
+    script: str,
+    input_data: Any,
+    variables: Dict[str, Any],
+    cpu_limit: float = DEFAULT_CPU_LIMIT,
+    wall_limit: Optional[float] = None
+) -> Any:
+    """
+    Run a transform in the process pool. The trace hook cannot interrupt a
+    long C builtin (a huge sort, a catastrophic regex), so past `wall_limit`
+    seconds the workers are killed. Other transforms running in the pool at
+    that moment fail with BrokenProcessPool.
+    """
+    loop = asyncio.get_running_loop()
+    wall_limit = cpu_limit + POOL_WALL_MARGIN if wall_limit is None else wall_limit
+    future = loop.run_in_executor(
+        _get_process_pool(), _run_transform_in_worker, script, input_data, variables, cpu_limit
+    )
+    try:
+        return await asyncio.wait_for(future, wall_limit)
+    except asyncio.TimeoutError:
+        _kill_process_pool()
+        raise ScriptTimeoutError(f"Script exceeded wall-clock limit of {wall_limit}s")
+    except BrokenProcessPool:
+        # Killed on behalf of another run; don't keep handing out a dead pool
+        if _process_pool is not None and _process_pool._broken:
+            _kill_process_pool()
+        raise
@@ -0,0 +1,223 @@
+"""
+Surprise Estimator
+Embedding-based novelty scoring shared by the memory and learning engines
+
+Surprise is the distance from new data to its nearest stored neighbour,
+found with one matrix-vector product over an EmbeddingIndex. The raw
+distance is calibrated against running statistics of the distances seen
+at the same level, so a score of 0.5 means "as novel as a typical write
+at this level" whatever the data looks like. Near-duplicates are flagged
+as merge candidates; hashed embeddings of records that differ in a single
+identifier can be nearly identical, so callers merge only when the
+normalized text matches too (`same_text`).
+"""
+
+import re
+import math
+import zlib
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from pydantic import BaseModel
+
+EMBEDDING_DIM = 128
+# Bumped whenever `embed` changes, so stored embeddings get recomputed
+EMBEDDING_VERSION = 2
+MAX_TOKENS = 200
+
+DUPLICATE_SIMILARITY = 0.97
+# Below this many observations a level reports the raw distance
+MIN_CALIBRATION_SAMPLES = 30
+MIN_STD = 0.02
+
+_TOKEN = re.compile(r"\w+")
+
+# ============================================================================
+# EMBEDDING
+# ============================================================================
+
+def _features(text: str) -> Iterable[str]:
+    for word in _TOKEN.findall(text.lower())[:MAX_TOKENS]:
+        yield word
+        # Character trigrams keep short payloads that differ in one token apart
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            yield f"#{padded[i:i + 3]}"
+
+def embed(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """
+    Signed hashing vectorizer over words and character trigrams, L2
+    normalized. crc32 is stable across processes, unlike hash().
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature in _features(text):
+        h = zlib.crc32(feature.encode('utf-8'))
+        vector[h % dim] += 1.0 if (h >> 16) & 1 else -1.0
+    norm = float(np.linalg.norm(vector))
+    if norm > 0:
+        vector /= norm
+    return vector
+
+def normalize_text(text: str) -> str:
+    """Lowercased word tokens: equal for texts differing only in case, spacing or punctuation."""
+    return ' '.join(_TOKEN.findall(text.lower()))
+
+def same_text(a: str, b: str) -> bool:
+    return normalize_text(a) == normalize_text(b)
+
+# ============================================================================
+# INDEX
+# ============================================================================
+
+class EmbeddingIndex:
+    """
+    Unit vectors in one contiguous matrix, with an optional weight per row.
+    Removal swaps the last row into the hole, so rows stay dense.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, capacity: int = 64):
+        self.dim = dim
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.weights = np.ones(capacity, dtype=np.float32)
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self.rows
+
+    def add(self, item_id: str, vector: np.ndarray, weight: float = 1.0):
+        row = self.rows.get(item_id)
+        if row is None:
+            row = len(self.ids)
+            if row == len(self.vectors):
+                self._grow(2 * row)
+            self.rows[item_id] = row
+            self.ids.append(item_id)
+        self.vectors[row] = vector
+        self.weights[row] = weight
+
+    def set_weight(self, item_id: str, weight: float):
+        self.weights[self.rows[item_id]] = weight
+
+    def vector(self, item_id: str) -> Optional[np.ndarray]:
+        row = self.rows.get(item_id)
+        return None if row is None else self.vectors[row].copy()
+
+    def remove(self, item_id: str):
+        row = self.rows.pop(item_id, None)
+        if row is None:
+            return
+        last = len(self.ids) - 1
+        if row != last:
+            moved = self.ids[last]
+            self.vectors[row], self.weights[row] = self.vectors[last], self.weights[last]
+            self.ids[row] = moved
+            self.rows[moved] = row
+        self.ids.pop()
+
+    def clear(self):
+        self.ids, self.rows = [], {}
+
+    def similarities(self, vector: np.ndarray) -> np.ndarray:
+        """Cosine similarity to every row, in row order."""
+        return self.vectors[:len(self.ids)] @ vector
+
+    def nearest(self, vector: np.ndarray) -> Tuple[Optional[str], float]:
+        return self.best(self.similarities(vector)) if self.ids else (None, 0.0)
+
+    def best(self, sims: np.ndarray) -> Tuple[Optional[str], float]:
+        """The nearest row given `similarities` already computed for a vector."""
+        if not len(sims):
+            return None, 0.0
+        row = int(np.argmax(sims))
+        return self.ids[row], float(sims[row])
+
+    def _grow(self, capacity: int):
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:len(self.vectors)] = self.vectors
+        weights = np.ones(capacity, dtype=np.float32)
+        weights[:len(self.weights)] = self.weights
+        self.vectors, self.weights = vectors, weights
+
+# ============================================================================
+# CALIBRATION
+# ============================================================================
+
+class RunningStats:
+    """Welford mean/variance of nearest-neighbour distances."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+class SurpriseEstimate(BaseModel):
+    score: float
+    distance: float
+    nearestId: Optional[str] = None
+    similarity: float = 0.0
+    duplicate: bool = False
+
+class SurpriseEstimator:
+    def __init__(self, duplicate_similarity: float = DUPLICATE_SIMILARITY):
+        self.duplicate_similarity = duplicate_similarity
+        self.stats: Dict[Any, RunningStats] = {}
+
+    def estimate(
+        self,
+        vector: np.ndarray,
+        level: Any,
+        indexes: Iterable[EmbeddingIndex],
+        neighbours: Iterable[Tuple[Optional[str], float]] = ()
+    ) -> SurpriseEstimate:
+        """
+        Score `vector` against the nearest neighbour across `indexes` and
+        `neighbours`, (id, similarity) pairs the caller already looked up.
+        """
+        candidates = list(neighbours) + [index.nearest(vector) for index in indexes]
+        nearest_id, similarity = max(
+            ((i, s) for i, s in candidates if i is not None), key=lambda c: c[1], default=(None, 0.0)
+        )
+        return self.score(level, nearest_id, similarity)
+
+    def score(self, level: Any, nearest_id: Optional[str], similarity: float) -> SurpriseEstimate:
+        """Score a nearest neighbour found by the caller (None when nothing is stored)."""
+        if nearest_id is None:
+            return SurpriseEstimate(score=1.0, distance=1.0)
+
+        similarity = min(1.0, max(0.0, similarity))
+        distance = 1.0 - similarity
+        duplicate = similarity >= self.duplicate_similarity
+        stats = self.stats.setdefault(level, RunningStats())
+        score = self._calibrate(distance, stats)
+        # Repeats would drag the typical distance towards zero and make
+        # everything else look surprising, so they are not observed
+        if not duplicate:
+            stats.observe(distance)
+        return SurpriseEstimate(
+            score=score, distance=distance, nearestId=nearest_id, similarity=similarity, duplicate=duplicate
+        )
+
+    def _calibrate(self, distance: float, stats: RunningStats) -> float:
+        if stats.count < MIN_CALIBRATION_SAMPLES:
+            return distance
+        z = (distance - stats.mean) / max(stats.std, MIN_STD)
+        return 1.0 / (1.0 + math.exp(-z))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            str(level): {"samples": s.count, "meanDistance": s.mean, "stdDistance": s.std}
+            for level, s in self.stats.items()
+        }
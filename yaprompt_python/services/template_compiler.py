@@ -0,0 +1,228 @@
+"""
+Template Compiler
+Compiles workflow node templates into literal and path-accessor segments
+
+`{{a.b.c}}` placeholders, `$nodes.x.y` data paths, transform scripts and
+conditions are parsed once per workflow version instead of on every node
+execution and loop iteration.
+"""
+
+import re
+import hashlib
+from collections import OrderedDict
+from collections.abc import Mapping
+from functools import lru_cache
+from types import CodeType
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from ..types import NodeConfig, WorkflowNode
+from .script_sandbox import compile_transform, compile_condition
+
+PLACEHOLDER_PATTERN = re.compile(r'\{\{([^}]+)\}\}')
+
+def get_nested_value(obj: Any, path: Tuple[str, ...]) -> Any:
+    current = obj
+    for key in path:
+        if isinstance(current, Mapping):
+             current = current.get(key)
+        elif isinstance(current, list) and key.isdigit():
+             try:
+                 current = current[int(key)]
+             except IndexError:
+                 return None
+        else:
+             return getattr(current, key, None)
+
+        if current is None:
+            return None
+    return current
+
+# ============================================================================
+# COMPILED FORMS
+# ============================================================================
+
+class CompiledTemplate:
+    """A string template as a list of literals and (path, placeholder) accessors."""
+    __slots__ = ('segments', 'static')
+
+    def __init__(self, template: str):
+        self.segments: List[Union[str, Tuple[Tuple[str, ...], str]]] = []
+        pos = 0
+        for match in PLACEHOLDER_PATTERN.finditer(template):
+            if match.start() > pos:
+                self.segments.append(template[pos:match.start()])
+            path = tuple(match.group(1).strip().split('.'))
+            self.segments.append((path, match.group(0)))
+            pos = match.end()
+        if pos < len(template):
+            self.segments.append(template[pos:])
+
+        # Templates without placeholders render to themselves
+        self.static = template if all(isinstance(s, str) for s in self.segments) else None
+
+    def paths(self) -> List[Tuple[str, ...]]:
+        return [s[0] for s in self.segments if not isinstance(s, str)]
+
+    def render(self, data: Any) -> str:
+        if self.static is not None:
+            return self.static
+        parts = []
+        for segment in self.segments:
+            if isinstance(segment, str):
+                parts.append(segment)
+            else:
+                path, placeholder = segment
+                value = get_nested_value(data, path)
+                # Unresolved placeholders are left in place
+                parts.append(str(value) if value is not None else placeholder)
+        return ''.join(parts)
+
+class CompiledObject:
+    """A JSON-like value (request body, headers) with every string compiled."""
+    __slots__ = ('root',)
+
+    def __init__(self, obj: Any):
+        self.root = self._compile(obj)
+
+    def _compile(self, obj: Any) -> Any:
+        if isinstance(obj, str):
+            return CompiledTemplate(obj)
+        elif isinstance(obj, list):
+            return [self._compile(item) for item in obj]
+        elif isinstance(obj, dict):
+            return {k: self._compile(v) for k, v in obj.items()}
+        return obj
+
+    def render(self, data: Any) -> Any:
+        return self._render(self.root, data)
+
+    def paths(self, node: Any = None) -> List[Tuple[str, ...]]:
+        node = self.root if node is None else node
+        if isinstance(node, CompiledTemplate):
+            return node.paths()
+        children = node if isinstance(node, list) else node.values() if isinstance(node, dict) else []
+        return [path for child in children for path in self.paths(child)]
+
+    def _render(self, node: Any, data: Any) -> Any:
+        if isinstance(node, CompiledTemplate):
+            return node.render(data)
+        elif isinstance(node, list):
+            return [self._render(item, data) for item in node]
+        elif isinstance(node, dict):
+            return {k: self._render(v, data) for k, v in node.items()}
+        return node
+
+class CompiledPath:
+    """A `$nodes.` / `$variables.` / `$input.` data path, split once."""
+    __slots__ = ('kind', 'head', 'rest', 'literal')
+
+    def __init__(self, path: str):
+        self.literal = path
+        self.head = ''
+        self.rest: Tuple[str, ...] = ()
+        if path.startswith('$nodes.'):
+            parts = path[7:].split('.')
+            self.kind = 'nodes'
+            self.head = parts[0]
+            self.rest = tuple(parts[1:])
+        elif path.startswith('$variables.'):
+            self.kind = 'variables'
+            self.head = path[11:]
+        elif path.startswith('$input.'):
+            self.kind = 'input'
+            self.rest = tuple(path[7:].split('.'))
+        else:
+            self.kind = 'literal'
+
+    def resolve(self, context: Any) -> Any:
+        if self.kind == 'nodes':
+            node_output = context.nodeOutputs.get(self.head)
+            if node_output is None:
+                return None
+            return get_nested_value(node_output, self.rest) if self.rest else node_output
+        elif self.kind == 'variables':
+            return context.variables.get(self.head)
+        elif self.kind == 'input':
+            return get_nested_value(context.input, self.rest)
+        return self.literal
+
+@lru_cache(maxsize=4096)
+def compile_template(template: str) -> CompiledTemplate:
+    return CompiledTemplate(template)
+
+@lru_cache(maxsize=4096)
+def compile_path(path: str) -> CompiledPath:
+    return CompiledPath(path)
+
+# ============================================================================
+# PER-NODE CACHE
+# ============================================================================
+
+class NodeTemplates:
+    def __init__(self, config: NodeConfig):
+        self.source = config
+        self.prompt = compile_template(config.prompt or '')
+        self.url = compile_template(config.url or '')
+        self.body = CompiledObject(config.body) if config.body else None
+        self.headers = CompiledObject(config.headers) if config.headers else None
+        self.input_mapping = [(k, compile_path(p)) for k, p in (config.inputMapping or {}).items()]
+        self.mapping = [(k, compile_path(p)) for k, p in (config.mapping or {}).items()]
+        self.items = compile_path(config.items or '$input')
+        # Every input path the prompt, URL, headers and body read
+        self.placeholders = sorted(set(
+            self.prompt.paths() + self.url.paths()
+            + (self.body.paths() if self.body else []) + (self.headers.paths() if self.headers else [])
+        ))
+        self._transform: Optional[CodeType] = None
+        self._condition: Optional[CodeType] = None
+
+    def transform_code(self) -> CodeType:
+        # Compiled on first use so a bad script only fails the node that runs it
+        if self._transform is None:
+            self._transform = compile_transform(self.source.transformScript)
+        return self._transform
+
+    def condition_code(self) -> CodeType:
+        if self._condition is None:
+            self._condition = compile_condition(self.source.condition or 'True')
+        return self._condition
+
+class TemplateCache:
+    """
+    Compiled node templates keyed by (workflowId, version, nodeId) and a
+    fingerprint of the node's config, so an edited node (or another client
+    reusing the same id and version) never gets another config's templates.
+    The config object last served per node is remembered, so repeated
+    lookups during one execution skip the fingerprint.
+    """
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Optional[str], str, str], NodeTemplates]" = OrderedDict()
+        self._last: Dict[Tuple[str, Optional[str], str], NodeTemplates] = {}
+
+    def get(self, workflow_id: str, version: Optional[str], node: WorkflowNode) -> NodeTemplates:
+        node_key = (workflow_id, version, node.id)
+        entry = self._last.get(node_key)
+        if entry is not None and entry.source is node.config:
+            return entry
+        key = node_key + (config_fingerprint(node.config),)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = NodeTemplates(node.config)
+            self._entries[key] = entry
+            if len(self._entries) > self.max_entries:
+                evicted = self._entries.popitem(last=False)[0]
+                self._last.pop(evicted[:3], None)
+        else:
+            self._entries.move_to_end(key)
+        self._last[node_key] = entry
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+        self._last.clear()
+
+def config_fingerprint(config: NodeConfig) -> str:
+    return hashlib.blake2b(config.model_dump_json().encode('utf-8'), digest_size=8).hexdigest()
+
+template_cache = TemplateCache()
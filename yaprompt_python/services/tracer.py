@@ -0,0 +1,235 @@
+"""
+Tracer
+Lightweight spans for workflow nodes, agent steps and provider calls
+
+Spans nest through a context variable, so a provider call made inside a
+node is recorded as that node's child without threading span objects
+through every call. Finished spans live in a bounded ring buffer and can
+be exported as plain JSON or as OTLP/JSON for OpenTelemetry tooling.
+"""
+
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from ..config import Config
+
+MAX_SPANS = 20000
+MAX_ALIASES = 4096
+
+class Span:
+    __slots__ = ('traceId', 'spanId', 'parentId', 'name', 'kind', 'start', 'end', 'attributes', 'status', 'error')
+
+    def __init__(self, trace_id: str, name: str, kind: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.traceId = trace_id
+        self.spanId = uuid.uuid4().hex[:16]
+        self.parentId = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self.status = 'ok' # ok | error | cancelled
+        self.error: Optional[str] = None
+
+    @property
+    def durationMs(self) -> float:
+        return ((self.end or time.time()) - self.start) * 1000
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.traceId,
+            "spanId": self.spanId,
+            "parentId": self.parentId,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start,
+            "end": self.end,
+            "durationMs": self.durationMs,
+            "attributes": self.attributes,
+            "status": self.status,
+            "error": self.error
+        }
+
+_current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+class Tracer:
+    def __init__(self, max_spans: int = MAX_SPANS, export_dir: Path = Config.TRACES_DIR):
+        self.export_dir = Path(export_dir)
+        self._spans: Deque[Span] = deque(maxlen=max_spans)
+        # Execution ids that ran inside another trace (e.g. a job) -> that trace
+        self._aliases: "OrderedDict[str, str]" = OrderedDict()
+
+    # ========================================================================
+    # RECORDING
+    # ========================================================================
+
+    def start_span(self, name: str, kind: str = 'internal', trace_id: Optional[str] = None, **attributes: Any) -> Tuple[Span, Token]:
+        parent = _current_span.get()
+        if parent is not None:
+            if trace_id and trace_id != parent.traceId:
+                self._alias(trace_id, parent.traceId)
+            span = Span(parent.traceId, name, kind, parent.spanId, attributes)
+        else:
+            span = Span(trace_id or uuid.uuid4().hex, name, kind, None, attributes)
+        return span, _current_span.set(span)
+
+    def end_span(self, span: Span, token: Token):
+        span.end = time.time()
+        _current_span.reset(token)
+        self._spans.append(span)
+
+    @contextmanager
+    def span(self, name: str, kind: str = 'internal', trace_id: Optional[str] = None, **attributes: Any) -> Iterator[Span]:
+        span, token = self.start_span(name, kind, trace_id, **attributes)
+        try:
+            yield span
+        except asyncio.CancelledError:
+            span.status = 'cancelled'
+            raise
+        except Exception as e:
+            span.status = 'error'
+            span.error = str(e)
+            raise
+        finally:
+            self.end_span(span, token)
+
+    def annotate(self, **attributes: Any):
+        """Attach attributes (tokens, status codes) to whatever span is current."""
+        span = _current_span.get()
+        if span is not None:
+            span.attributes.update(attributes)
+
+    def _alias(self, trace_id: str, target: str):
+        self._aliases[trace_id] = target
+        if len(self._aliases) > MAX_ALIASES:
+            self._aliases.popitem(last=False)
+
+    # ========================================================================
+    # QUERIES
+    # ========================================================================
+
+    def get_trace(self, trace_id: str) -> List[Dict[str, Any]]:
+        trace_id = self._aliases.get(trace_id, trace_id)
+        spans = [s for s in self._spans if s.traceId == trace_id]
+        return [s.to_dict() for s in sorted(spans, key=lambda s: s.start)]
+
+    def list_traces(self, limit: int = 50) -> List[Dict[str, Any]]:
+        roots: "OrderedDict[str, Span]" = OrderedDict()
+        for span in reversed(self._spans):
+            if span.parentId is None and span.traceId not in roots:
+                roots[span.traceId] = span
+                if len(roots) >= limit:
+                    break
+        return [
+            {"traceId": s.traceId, "name": s.name, "kind": s.kind, "start": s.start, "durationMs": s.durationMs, "status": s.status}
+            for s in roots.values()
+        ]
+
+    def flame_summary(self, trace_id: str) -> Dict[str, Any]:
+        """
+        Aggregate a trace by call path (root;child;grandchild), the folded-stack
+        shape flame graphs are drawn from. selfMs excludes time in child spans.
+        """
+        spans = self.get_trace(trace_id)
+        by_id = {s['spanId']: s for s in spans}
+        child_ms: Dict[str, float] = {}
+        for s in spans:
+            if s['parentId'] in by_id:
+                child_ms[s['parentId']] = child_ms.get(s['parentId'], 0.0) + s['durationMs']
+
+        frames: Dict[str, Dict[str, Any]] = {}
+        for s in spans:
+            path = [s['name']]
+            parent = by_id.get(s['parentId'])
+            while parent is not None:
+                path.append(parent['name'])
+                parent = by_id.get(parent['parentId'])
+            key = ';'.join(reversed(path))
+
+            frame = frames.setdefault(key, {"path": key, "kind": s['kind'], "count": 0, "totalMs": 0.0, "selfMs": 0.0})
+            frame['count'] += 1
+            frame['totalMs'] += s['durationMs']
+            # Concurrent children (loops, hedged calls) can overlap their parent
+            frame['selfMs'] += max(0.0, s['durationMs'] - child_ms.get(s['spanId'], 0.0))
+
+        total = sum(s['durationMs'] for s in spans if s['parentId'] not in by_id)
+        return {
+            "traceId": self._aliases.get(trace_id, trace_id),
+            "totalMs": total,
+            "frames": sorted(frames.values(), key=lambda f: f['totalMs'], reverse=True),
+            "folded": [f"{f['path']} {int(f['selfMs'] * 1000)}" for f in frames.values()]
+        }
+
+    # ========================================================================
+    # EXPORT
+    # ========================================================================
+
+    def export_json(self, trace_id: str) -> Path:
+        path = self.export_dir / f"{trace_id}.json"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.get_trace(trace_id), f, indent=2, default=str)
+        return path
+
+    def export_otlp(self, trace_id: str) -> Path:
+        """Write the trace as an OTLP/JSON ExportTraceServiceRequest."""
+        spans = self.get_trace(trace_id)
+        otlp_spans = []
+        for s in spans:
+            otlp_spans.append({
+                "traceId": self._otlp_trace_id(s['traceId']),
+                "spanId": s['spanId'],
+                "parentSpanId": s['parentId'] or "",
+                "name": s['name'],
+                "kind": 1, # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(int(s['start'] * 1e9)),
+                "endTimeUnixNano": str(int((s['end'] or s['start']) * 1e9)),
+                "attributes": [self._otlp_attribute('span.kind', s['kind'])] + [
+                    self._otlp_attribute(k, v) for k, v in s['attributes'].items()
+                ],
+                "status": {"code": 2, "message": s['error'] or s['status']} if s['status'] != 'ok' else {"code": 1}
+            })
+
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": [self._otlp_attribute('service.name', 'promptforge')]},
+                "scopeSpans": [{"scope": {"name": "yaprompt_python.tracer"}, "spans": otlp_spans}]
+            }]
+        }
+        path = self.export_dir / f"{trace_id}.otlp.json"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(request, f)
+        return path
+
+    def _otlp_trace_id(self, trace_id: str) -> str:
+        # OTLP wants 16 bytes of hex; execution ids are hashed down to that
+        if len(trace_id) == 32 and all(c in '0123456789abcdef' for c in trace_id):
+            return trace_id
+        return hashlib.md5(trace_id.encode('utf-8')).hexdigest()
+
+    def _otlp_attribute(self, key: str, value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        return {"key": key, "value": typed}
+
+    def clear(self):
+        self._spans.clear()
+        self._aliases.clear()
+
+tracer = Tracer()
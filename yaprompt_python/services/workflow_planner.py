@@ -2,7 +2,6 @@ import json
 import time
 import re
 from typing import Dict, Any, List, Optional, Union
-import google.generativeai as genai
 
 from ..types import (
     Workflow, WorkflowNode, WorkflowConnection, WorkflowNodeType,
@@ -157,6 +156,7 @@ Provide an optimized version of this workflow as JSON."""
         )
 
     async def _call_llm(self, prompt: str, api_key: str) -> str:
+        import google.generativeai as genai
         genai.configure(api_key=api_key)
         model = genai.GenerativeModel(
             'gemini-2.0-flash-exp',
@@ -8,6 +8,11 @@ import re
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 
+from ..utils.state_store import StateStore, state_store
+
+STYLE = 'writing_style'
+MAX_SAMPLES = 100
+
 class StyleCorrection(BaseModel):
     type: str
     before: str
@@ -27,9 +32,17 @@ class StyleProfile(BaseModel):
     commonPatterns: List[str] = []
 
 class WritingStyleEngine:
-    def __init__(self):
-        self.samples: List[StyleSample] = []
-        self.profile = StyleProfile()
+    def __init__(self, store: Optional[StateStore] = None):
+        # Shared across workers; see utils/state_store
+        self.store = store or state_store
+
+    @property
+    def samples(self) -> List[StyleSample]:
+        return [StyleSample(**s) for s in self.store.value(STYLE, 'samples', [])]
+
+    @property
+    def profile(self) -> StyleProfile:
+        return StyleProfile(**self.store.value(STYLE, 'profile', {}))
 
     async def learn_from_correction(self, original: str, edited: str):
         corrections = self._detect_corrections(original, edited)
@@ -39,26 +52,27 @@ class WritingStyleEngine:
             timestamp=time.time(), 
             corrections=corrections
         )
-        self.samples.append(sample)
-        if len(self.samples) > 100: self.samples.pop(0)
+        self.store.update(STYLE, 'samples', lambda samples: ((samples or []) + [sample.model_dump()])[-MAX_SAMPLES:])
         
         self._update_profile(sample)
 
     def apply_style(self, text: str) -> str:
         # Simple application for now
         styled = text
+        profile = self.profile
         
         # Tone
-        if self.profile.tonePreference == 'formal':
+        if profile.tonePreference == 'formal':
             styled = styled.replace("gonna", "going to").replace("wanna", "want to")
         
         return styled
 
     def get_style_summary(self) -> Dict[str, Any]:
+        profile = self.profile
         return {
-            "tone": self.profile.tonePreference,
-            "avgSentenceLength": self.profile.sentenceLengthAvg,
-            "sampleCount": len(self.samples)
+            "tone": profile.tonePreference,
+            "avgSentenceLength": profile.sentenceLengthAvg,
+            "sampleCount": len(self.store.value(STYLE, 'samples', []))
         }
 
     def _detect_corrections(self, original: str, edited: str) -> List[StyleCorrection]:
@@ -72,7 +86,13 @@ class WritingStyleEngine:
         # Update sentence length
         sentences = re.split(r'[.!?]+', sample.edited)
         avg_len = sum(len(s.split()) for s in sentences if s) / max(1, len(sentences))
-        self.profile.sentenceLengthAvg = (self.profile.sentenceLengthAvg * 0.8) + (avg_len * 0.2)
+
+        def blend(data):
+            profile = StyleProfile(**(data or {}))
+            profile.sentenceLengthAvg = (profile.sentenceLengthAvg * 0.8) + (avg_len * 0.2)
+            return profile.model_dump()
+
+        self.store.update(STYLE, 'profile', blend)
         
             
 writing_style_engine = WritingStyleEngine()
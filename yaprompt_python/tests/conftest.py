@@ -0,0 +1,13 @@
+"""
+Shared fixtures
+"""
+import pytest
+from yaprompt_python.services import local_workflow_engine as engine_module
+from yaprompt_python.services.execution_journal import ExecutionJournal
+
+@pytest.fixture(autouse=True)
+def execution_journal(tmp_path, monkeypatch):
+    """Workflow runs journal into the test's tmp dir, never ~/.yaprompt_data."""
+    journal = ExecutionJournal(tmp_path / 'executions')
+    monkeypatch.setattr(engine_module, 'execution_journal', journal)
+    return journal
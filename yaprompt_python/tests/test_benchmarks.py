@@ -0,0 +1,42 @@
+"""
+Unit Tests for Benchmarks
+Smoke-tests the workflow benchmark harness and baseline comparison.
+"""
+import pytest
+from yaprompt_python.benchmarks.workflow_bench import run_benchmarks
+from yaprompt_python.benchmarks.report import compare_reports, percentile
+
+class TestWorkflowBenchmark:
+    @pytest.mark.asyncio
+    async def test_quick_run_reports_every_scenario(self):
+        report = await run_benchmarks(runs=2, concurrency=2, latency_ms=0, jitter_ms=0, quick=True, log=lambda _: None)
+
+        assert set(report['results']) == {'chain_2', 'fanout_2', 'loop_10_c8', 'conditional', 'http_chain_2'}
+        for result in report['results'].values():
+            assert result['errors'] == 0
+            assert result['p50Ms'] is not None
+            assert result['stubRequests'] > 0
+
+    def test_compare_flags_regressions(self):
+        baseline = {'results': {'chain': {'p50Ms': 100.0, 'p99Ms': 200.0, 'throughputPerSec': 10.0}}}
+        current = {'results': {'chain': {'p50Ms': 130.0, 'p99Ms': 205.0, 'throughputPerSec': 7.0}}}
+
+        regressions = compare_reports(current, baseline, tolerance=0.2)
+        assert len(regressions) == 2
+        assert percentile([5, 1, 3, 2, 4], 50) == 3
+
+class TestMemoryBenchmark:
+    @pytest.mark.asyncio
+    async def test_small_run_reports_every_metric(self):
+        from yaprompt_python.benchmarks.memory_bench import run_benchmarks as run_memory_benchmarks
+
+        report = await run_memory_benchmarks(sizes=[200], queries=3, writes=2, phase_timeout=60, log=lambda _: None)
+
+        result = report['results']['n_200']
+        assert result['fileSizeBytes'] > 0
+        assert 0.0 <= result['recallAtK'] <= 1.0
+        assert result['retrieveP50Ms'] is not None
+        assert result['storeP50Ms'] is not None
+        # Near-duplicate writes refresh an existing memory instead of adding one
+        assert result['countAfterStores'] + result['mergedWrites'] == 202
+        assert 'consolidationSec' in result
@@ -0,0 +1,177 @@
+"""
+Unit Tests for Cognitive Engine
+Tests streaming aggregates, event ingestion and need prediction.
+"""
+import json
+import time
+import numpy as np
+import pytest
+from yaprompt_python.services.cognitive_engine import (
+    CognitiveEngine, SUBJECTS, ACTIVE_DAY_WINDOW, add_active_days, observe, std, WEEK_MS
+)
+from yaprompt_python.types import CognitiveEvent
+from yaprompt_python.utils.state_store import MemoryStateStore
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+@pytest.fixture
+def engine():
+    return CognitiveEngine(store=MemoryStateStore())
+
+class TestStreamingStats:
+    def test_matches_batch_statistics(self):
+        values = [30, 45, 20, 60, 35]
+        stats = None
+        for v in values:
+            stats = observe(stats, v, alpha=0.5)
+        assert stats["mean"] == pytest.approx(np.mean(values))
+        assert std(stats) == pytest.approx(np.std(values, ddof=1))
+        assert stats["ewma"] == pytest.approx(((((30 * 0.5 + 45 * 0.5) * 0.5 + 20 * 0.5) * 0.5 + 60 * 0.5) * 0.5 + 35 * 0.5))
+
+class TestActiveDays:
+    def test_matches_a_set_within_the_window(self):
+        rng = np.random.default_rng(5)
+        days = rng.integers(20000, 20000 + ACTIVE_DAY_WINDOW // 2, size=2000).tolist()
+        agg = {}
+        for day in days:
+            add_active_days(agg, [day])
+        assert agg['activeDays'] == len(set(days))
+        assert agg['lastDay'] == max(days)
+        assert agg['dayBits'].bit_length() <= ACTIVE_DAY_WINDOW
+
+    def test_stored_day_lists_are_migrated(self, engine):
+        engine.store.put(SUBJECTS, 'math', {
+            'first': 0.0, 'last': 0.0, 'hours': [0] * 24, 'weekdays': [0] * 7, 'days': [1, 2, 3],
+            'duration': observe(None, 30.0)
+        })
+        assert engine.get_activity_analytics('math').activeDays == 3
+        engine.ingest_event(CognitiveEvent(type='activity', subject='math', duration=20, timestamp=10 * DAY_MS + 1))
+        agg = engine.store.value(SUBJECTS, 'math')
+        assert 'days' not in agg
+        assert engine.get_activity_analytics('math').activeDays == 4
+
+class TestCognitiveEngine:
+    @pytest.mark.asyncio
+    async def test_patterns_accumulate_across_calls(self, engine):
+        start = time.time() * 1000 - 14 * DAY_MS
+        await engine.detect_learning_patterns([
+            {'subject': 'math', 'duration': 30, 'performance': 0.6, 'timestamp': start},
+            {'subject': 'math', 'duration': 50, 'timestamp': start + 7 * DAY_MS},
+        ])
+        patterns = await engine.detect_learning_patterns([
+            {'subject': 'math', 'duration': 40, 'performance': 0.9, 'timestamp': start + 14 * DAY_MS},
+        ])
+
+        math_pattern = patterns[0]
+        assert math_pattern.sessions == 3
+        assert math_pattern.avgDuration == pytest.approx(40)
+        assert math_pattern.frequency == pytest.approx(1.5)
+        assert math_pattern.performance == pytest.approx(0.75)
+        assert math_pattern.lastSession == start + 14 * DAY_MS
+
+    def test_predict_needs_uses_the_real_clock(self, engine):
+        last = time.time() * 1000 - 30 * DAY_MS
+        engine.ingest_events([
+            CognitiveEvent(type='activity', subject='history', duration=30, timestamp=last - WEEK_MS),
+            CognitiveEvent(type='activity', subject='history', duration=30, timestamp=last),
+            CognitiveEvent(type='assessment', topic='algebra', score=0.3),
+            CognitiveEvent(type='assessment', topic='algebra', score=0.5),
+            CognitiveEvent(type='assessment', topic='geometry', score=0.9),
+        ])
+
+        needs = engine.predict_needs({})
+        assert [n.type for n in needs] == ['study', 'review']
+        assert needs[1].description == 'Review algebra (weak area)'
+        assert needs[1].priority == pytest.approx(0.6)
+        # Nothing is overdue right after the last session
+        assert [n.type for n in engine.predict_needs({'currentTime': last})] == ['review']
+
+    def test_events_without_a_key_are_rejected(self, engine):
+        with pytest.raises(ValueError):
+            engine.ingest_event(CognitiveEvent(type='assessment', score=0.5))
+
+class TestActivityAnalytics:
+    def _activities(self, count=300):
+        rng = np.random.default_rng(3)
+        start = 1_700_000_000_000
+        return [{
+            'subject': ['math', 'physics', 'art'][i % 3],
+            'duration': float(rng.integers(10, 90)),
+            'performance': None if i % 4 == 0 else float(rng.random()),
+            'timestamp': start + i * 5 * 60 * 60 * 1000
+        } for i in range(count)]
+
+    @pytest.mark.asyncio
+    async def test_vectorized_path_matches_per_event_updates(self):
+        activities = self._activities()
+        bulk = CognitiveEngine(store=MemoryStateStore())
+        single = CognitiveEngine(store=MemoryStateStore())
+        await bulk.detect_learning_patterns(activities)
+        for a in activities:
+            await single.detect_learning_patterns([a])
+
+        for subject in ('math', 'physics', 'art'):
+            b, s = bulk.study_patterns[subject], single.study_patterns[subject]
+            assert b.sessions == s.sessions == 100
+            assert b.avgDuration == pytest.approx(s.avgDuration)
+            assert b.durationStd == pytest.approx(s.durationStd)
+            assert b.performance == pytest.approx(s.performance)
+            assert b.recentPerformance == pytest.approx(s.recentPerformance)
+            assert b.frequency == pytest.approx(s.frequency)
+            assert b.preferredTime == s.preferredTime
+            assert bulk.get_activity_analytics(subject) == single.get_activity_analytics(subject)
+
+    def test_streams_ndjson_and_csv_files_in_chunks(self, engine, tmp_path):
+        activities = self._activities(50)
+        ndjson = tmp_path / 'log.ndjson'
+        ndjson.write_text('\n'.join(json.dumps(a) for a in activities[:30]) + '\nnot json\n')
+        csv_path = tmp_path / 'log.csv'
+        csv_path.write_text('subject,duration,performance,timestamp\n' + ''.join(
+            f"{a['subject']},{a['duration']},{'' if a['performance'] is None else a['performance']},{a['timestamp']}\n"
+            for a in activities[30:]
+        ))
+
+        first = engine.analyze_activity_file(ndjson, chunk_size=7)
+        second = engine.analyze_activity_file(csv_path, chunk_size=7)
+
+        assert (first['events'], second['events']) == (30, 20)
+        analytics = engine.get_activity_analytics('math')
+        assert analytics.sessions == 17
+        assert sum(analytics.hourHistogram) == sum(analytics.weekdayHistogram) == 17
+
+    def test_malformed_rows_are_skipped_not_fatal(self, engine, tmp_path):
+        good = self._activities(4)
+        ndjson = tmp_path / 'log.ndjson'
+        ndjson.write_text('\n'.join([
+            json.dumps(good[0]), '[1,2]', '"math"', json.dumps({'duration': 5}),
+            json.dumps(dict(good[1], duration='abc')), json.dumps(dict(good[1], duration=float('inf'))),
+            json.dumps(good[1])
+        ]) + '\n')
+        csv_path = tmp_path / 'log.csv'
+        csv_path.write_text(
+            'subject,duration,performance,timestamp\n'
+            f"math,abc,0.5,{good[2]['timestamp']}\n"
+            f"math,30,{[1]},{good[2]['timestamp']}\n"
+            f"{good[3]['subject']},{good[3]['duration']},,{good[3]['timestamp']}\n"
+        )
+
+        first = engine.analyze_activity_file(ndjson)
+        second = engine.analyze_activity_file(csv_path)
+        assert (first['events'], first['skipped']) == (2, 5)
+        assert (second['events'], second['skipped']) == (1, 2)
+        assert sum(p.sessions for p in engine.study_patterns.values()) == 3
+
+    @pytest.mark.asyncio
+    async def test_ingests_a_byte_stream_split_mid_line(self, engine):
+        body = b''.join(
+            json.dumps(a).encode() + b'\n' for a in self._activities(10)
+        )
+
+        async def chunks():
+            for i in range(0, len(body), 13):
+                yield body[i:i + 13]
+
+        result = await engine.ingest_activity_stream(chunks(), 'ndjson', chunk_size=4)
+        assert result['events'] == 10
+        assert result['skipped'] == 0
+        assert sorted(p.subject for p in result['patterns']) == ['art', 'math', 'physics']
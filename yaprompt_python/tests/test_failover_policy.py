@@ -0,0 +1,127 @@
+"""
+Unit Tests for Failover Policy
+Tests hedged requests, circuit breakers and latency-based ordering.
+"""
+import asyncio
+import pytest
+from yaprompt_python.services.failover_policy import FailoverPolicy, CircuitOpenError
+
+class TestFailoverPolicy:
+    @pytest.mark.asyncio
+    async def test_failure_moves_to_next_candidate(self):
+        policy = FailoverPolicy()
+        calls = []
+
+        async def call(name):
+            calls.append(name)
+            if name == 'a':
+                raise Exception("boom")
+            return name
+
+        assert await policy.execute(['a', 'b'], call) == 'b'
+        assert calls == ['a', 'b']
+
+    @pytest.mark.asyncio
+    async def test_hedged_request_wins_over_slow_candidate(self, monkeypatch):
+        policy = FailoverPolicy()
+        monkeypatch.setattr(policy, 'hedge_delay', lambda candidate, namespace='': 0.01)
+
+        async def call(name):
+            await asyncio.sleep(1.0 if name == 'slow' else 0.0)
+            return name
+
+        assert await policy.execute(['slow', 'fast'], call) == 'fast'
+        # The cancelled loser is not counted as a failure
+        assert policy.breakers['slow'].total_failures == 0
+
+    @pytest.mark.asyncio
+    async def test_failure_launches_next_while_hedge_is_pending(self, monkeypatch):
+        policy = FailoverPolicy()
+        monkeypatch.setattr(policy, 'hedge_delay', lambda candidate, namespace='': 0.01 if candidate == 'a' else 5.0)
+
+        async def call(name):
+            if name == 'a':
+                await asyncio.sleep(0.05)
+                raise Exception("boom")
+            await asyncio.sleep(5.0 if name == 'slow' else 0.0)
+            return name
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        # 'slow' is hedged in while 'a' runs; a's failure must not wait out slow's hedge delay
+        assert await policy.execute(['a', 'slow', 'c'], call) == 'c'
+        assert loop.time() - started < 1.0
+
+    @pytest.mark.asyncio
+    async def test_circuit_opens_after_repeated_failures(self):
+        policy = FailoverPolicy()
+
+        async def call(name):
+            raise Exception("down")
+
+        for _ in range(3):
+            with pytest.raises(Exception):
+                await policy.execute(['a'], call)
+
+        assert policy.breakers['a'].state == 'open'
+        with pytest.raises(CircuitOpenError):
+            await policy.execute(['a'], call)
+
+    def test_order_prefers_lower_latency(self):
+        policy = FailoverPolicy()
+        for _ in range(10):
+            policy._histogram('slow').record(4000)
+            policy._histogram('fast').record(80)
+
+        assert policy.order(['slow', 'fast']) == ['fast', 'slow']
+
+class TestCircuitBreaker:
+    def _tripped(self, policy):
+        breaker = policy._breaker('a')
+        for _ in range(3):
+            breaker.record_failure()
+        breaker.opened_at -= breaker.reset_timeout
+        return breaker
+
+    def test_ordering_does_not_change_breaker_state(self):
+        policy = FailoverPolicy()
+        breaker = self._tripped(policy)
+        assert policy.order(['a', 'b']) == ['a', 'b']
+        assert breaker.state == 'open' and not breaker.trial_in_flight
+
+    @pytest.mark.asyncio
+    async def test_half_open_admits_a_single_trial(self):
+        policy = FailoverPolicy()
+        breaker = self._tripped(policy)
+        release = asyncio.Event()
+        calls = []
+
+        async def call(name):
+            calls.append(name)
+            await release.wait()
+            return name
+
+        trial = asyncio.create_task(policy.execute(['a'], call, hedge=False))
+        await asyncio.sleep(0)
+        assert breaker.state == 'half_open' and breaker.trial_in_flight
+        with pytest.raises(CircuitOpenError):
+            await policy.execute(['a'], call)
+        # Others go straight to the next candidate while the trial runs
+        release.set()
+        assert await policy.execute(['a', 'b'], call) == 'b'
+        assert await trial == 'a'
+        assert calls == ['a', 'b'] and breaker.state == 'closed'
+
+    @pytest.mark.asyncio
+    async def test_cancelled_trial_frees_the_slot(self, monkeypatch):
+        policy = FailoverPolicy()
+        breaker = self._tripped(policy)
+        monkeypatch.setattr(policy, 'hedge_delay', lambda candidate, namespace='': 0.01)
+
+        async def call(name):
+            await asyncio.sleep(1.0 if name == 'a' else 0.0)
+            return name
+
+        assert await policy.execute(['a', 'b'], call) == 'b'
+        await asyncio.sleep(0) # let the cancelled trial unwind
+        assert breaker.state == 'half_open' and breaker.is_available()
@@ -0,0 +1,155 @@
+"""
+Unit Tests for Goal Decomposer
+Tests LLM output parsing, the semantic cache and background plan merging.
+"""
+import json
+import asyncio
+import pytest
+from yaprompt_python.services.goal_decomposer import GoalDecomposer, parse_templates
+from yaprompt_python.services.project_manager import ProjectManager, TaskUpdate
+from yaprompt_python.utils.state_store import MemoryStateStore
+
+PLAN = [
+    {'title': 'Define the requirements', 'description': 'Pages, menu, ordering', 'estimatedMinutes': 40, 'priority': 'high'},
+    {'title': 'Pick a site builder', 'description': 'Compare hosted options', 'estimatedMinutes': 30, 'after': [0]},
+    {'title': 'Photograph the products', 'description': 'Shots for the menu', 'estimatedMinutes': 90, 'after': [0]},
+    {'title': 'Build the pages', 'description': 'Home, menu, contact', 'estimatedMinutes': 180, 'after': [1, 2]},
+    {'title': 'Deploy', 'description': 'Publish and set up the domain', 'estimatedMinutes': 30, 'after': [3]}
+]
+
+class FakeLLM:
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = 0
+
+    async def __call__(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(0)
+        return self.reply
+
+def _manager(reply):
+    llm = FakeLLM(reply)
+    manager = ProjectManager(store=MemoryStateStore())
+    manager.decomposer = GoalDecomposer(manager.store, generate=llm)
+    return manager, llm
+
+class TestParseTemplates:
+    def test_extracts_the_array_and_drops_bad_dependencies(self):
+        text = "Here is the plan:\n" + json.dumps([
+            {'title': 'A', 'after': [0, 1]},
+            {'title': 'B', 'after': [0, 5, -1]},
+            {'description': 'no title'},
+            {'title': 'C', 'estimatedMinutes': 0, 'after': [1]}
+        ]) + "\nGood luck!"
+        templates = parse_templates(text)
+        assert [t.title for t in templates] == ['A', 'B', 'C']
+        assert [t.after for t in templates] == [[], [0], [1]]
+        assert templates[2].estimatedMinutes == 1
+
+    def test_dependencies_follow_tasks_past_a_skipped_item(self):
+        text = json.dumps([
+            {'title': 'A'},
+            {'description': 'no title'},
+            {'title': 'C', 'after': [0]},
+            {'title': 'D', 'after': [1, 2]},
+            {'title': 'E', 'after': [3, 4]}
+        ])
+        templates = parse_templates(text)
+        assert [t.title for t in templates] == ['A', 'C', 'D', 'E']
+        # D depended on C (reply index 2) and the dropped item; E on D (reply index 3)
+        assert [t.after for t in templates] == [[], [0], [1], [2]]
+
+    def test_unusable_replies(self):
+        assert parse_templates("Error from ollama: connection refused") == []
+        assert parse_templates("[not json]") == []
+        assert parse_templates('{"title": "not a list"}') == []
+
+class TestGoalDecomposer:
+    @pytest.mark.asyncio
+    async def test_similar_goals_hit_the_cache(self):
+        llm = FakeLLM(json.dumps(PLAN))
+        decomposer = GoalDecomposer(MemoryStateStore(), generate=llm)
+        assert decomposer.lookup("Build a website for my bakery") is None
+
+        # Concurrent requests for one goal share a single LLM call
+        results = await asyncio.gather(*[decomposer.decompose("Build a website for my bakery") for _ in range(3)])
+        assert llm.calls == 1 and all(len(r) == 5 for r in results)
+
+        cached = decomposer.lookup("Build a website for my small bakery")
+        assert cached is not None and cached.templates[3].after == [1, 2]
+        assert decomposer.lookup("Research vector databases") is None
+
+        # Another worker sharing the store sees the entry too
+        other = GoalDecomposer(decomposer.store, generate=llm)
+        assert other.lookup("build a website for my bakery") is not None
+
+class TestProjectRefinement:
+    @pytest.mark.asyncio
+    async def test_llm_plan_is_merged_in_the_background(self):
+        manager, _ = _manager(json.dumps(PLAN))
+        result = await manager.create_project("Build a website for my bakery")
+        assert result.source == 'template' and result.refining
+        project = result.project
+        by_title = {t.title: t for t in project.tasks}
+        manager.update_task(project.id, by_title['Define requirements'].id, TaskUpdate(status='completed'))
+        manager.update_task(project.id, by_title['Design architecture'].id, TaskUpdate(status='in_progress'))
+
+        await manager.wait_for_refinements()
+        refined = manager.get_project(project.id)
+        titles = [t.title for t in refined.tasks]
+        assert refined.decomposition == 'llm'
+        assert titles == ['Define requirements'] + [p['title'] for p in PLAN[1:]] + ['Design architecture']
+
+        # Started work survives: the matched task keeps its id and status, the unmatched one stays
+        requirements = refined.tasks[0]
+        assert requirements.id == by_title['Define requirements'].id and requirements.status == 'completed'
+        assert refined.tasks[-1].status == 'in_progress'
+        assert refined.tasks[4].id == by_title['Deploy'].id
+        assert manager.get_summary(project.id).taskCount == 6
+        assert manager.get_schedule(project.id).criticalPathMinutes == 90 + 180 + 30
+        # One person works the plan: the ETA covers all remaining work, not just the critical path
+        timeline = manager.get_summary(project.id).timeline
+        remaining = sum(p['estimatedMinutes'] for p in PLAN[1:]) + 60
+        assert timeline['estimatedCompletion'] - timeline['startDate'] == pytest.approx(remaining * 60)
+
+        # The next similar goal is planned from the cache straight away
+        again = await manager.create_project("Build a website for my small bakery")
+        assert again.source == 'cache' and not again.refining
+        assert [t.title for t in again.project.tasks] == [p['title'] for p in PLAN]
+
+    @pytest.mark.asyncio
+    async def test_task_update_during_the_merge_is_kept(self):
+        manager, _ = _manager(json.dumps(PLAN))
+        project = (await manager.create_project("Build a website for my bakery")).project
+        deploy = next(t for t in project.tasks if t.title == 'Deploy')
+        put_many = manager.store.put_many
+
+        def racing_put_many(namespace, values):
+            # Another worker starts a task while the new list is being written
+            if namespace.count(':') > 1 and manager.get_project(project.id).tasks[-1].status == 'pending':
+                manager.update_task(project.id, deploy.id, TaskUpdate(status='in_progress'))
+            return put_many(namespace, values)
+
+        manager.store.put_many = racing_put_many
+        await manager.wait_for_refinements()
+
+        refined = manager.get_project(project.id)
+        assert refined.decomposition == 'llm'
+        assert next(t for t in refined.tasks if t.id == deploy.id).status == 'in_progress'
+        summary = manager.get_summary(project.id)
+        assert summary.status == 'active' and summary.taskCounts['in_progress'] == 1
+        # Only the current task list is left in the store
+        assert [ns for ns in manager.store._data if ns.startswith('project_tasks:')] == [
+            f"project_tasks:{project.id}:{summary.taskGeneration}"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_invalid_llm_output_keeps_the_templates(self):
+        manager, llm = _manager("I can't help with that.")
+        project = (await manager.create_project("Research vector databases")).project
+        await manager.wait_for_refinements()
+
+        stored = manager.get_project(project.id)
+        assert llm.calls == 1 and stored.decomposition == 'template'
+        assert [t.id for t in stored.tasks] == [t.id for t in project.tasks]
+        assert manager.decomposer.lookup("Research vector databases") is None
@@ -0,0 +1,163 @@
+"""
+Unit Tests for Job Queue
+Tests priorities, tenant caps, retries, cancellation and progress events.
+"""
+import time
+import asyncio
+import pytest
+from yaprompt_python.services import job_queue as job_queue_module
+from yaprompt_python.services.job_queue import JobQueue
+
+async def wait_for_status(queue, job_id, statuses, timeout=3.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        job = queue.get_job(job_id)
+        if job.status in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} stuck in {queue.get_job(job_id).status}")
+
+class TestJobQueue:
+    @pytest.mark.asyncio
+    async def test_runs_by_priority_and_records_events(self, tmp_path):
+        queue = JobQueue(tmp_path / 'jobs.sqlite3')
+        order = []
+
+        async def handler(job, secrets, on_progress):
+            order.append(job.payload['name'])
+            on_progress({'status': 'running', 'message': job.payload['name']})
+            return {'echo': job.payload['name'], 'key': secrets.get('api_key')}
+
+        queue.register_handler('echo', handler)
+        low = queue.submit('echo', {'name': 'low'}, priority=0)
+        high = queue.submit('echo', {'name': 'high'}, priority=5, secrets={'api_key': 'k'})
+
+        await queue.start(num_workers=1)
+        try:
+            done = await wait_for_status(queue, low.id, {'succeeded'})
+            await wait_for_status(queue, high.id, {'succeeded'})
+        finally:
+            await queue.stop()
+
+        assert order == ['high', 'low']
+        assert done.result == {'echo': 'low', 'key': None}
+        assert queue.get_job(high.id).result['key'] == 'k'
+        assert queue.get_events(high.id) == [{'status': 'running', 'message': 'high'}]
+
+    @pytest.mark.asyncio
+    async def test_tenant_cap_limits_concurrency(self, tmp_path):
+        queue = JobQueue(tmp_path / 'jobs.sqlite3')
+        queue.tenant_caps['acme'] = 1
+        active = []
+        peak = []
+
+        async def handler(job, secrets, on_progress):
+            active.append(job.id)
+            peak.append(len(active))
+            await asyncio.sleep(0.05)
+            active.remove(job.id)
+
+        queue.register_handler('work', handler)
+        jobs = [queue.submit('work', {}, tenant='acme') for _ in range(3)]
+
+        await queue.start(num_workers=3)
+        try:
+            for job in jobs:
+                await wait_for_status(queue, job.id, {'succeeded'})
+        finally:
+            await queue.stop()
+
+        assert max(peak) == 1
+
+    @pytest.mark.asyncio
+    async def test_retries_with_backoff_then_fails(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(job_queue_module, 'BACKOFF_BASE_SECONDS', 0.01)
+        queue = JobQueue(tmp_path / 'jobs.sqlite3')
+        attempts = []
+
+        async def handler(job, secrets, on_progress):
+            attempts.append(job.attempts)
+            raise Exception("flaky")
+
+        queue.register_handler('flaky', handler)
+        job = queue.submit('flaky', {}, max_attempts=2)
+
+        await queue.start(num_workers=1)
+        try:
+            failed = await wait_for_status(queue, job.id, {'failed'})
+        finally:
+            await queue.stop()
+
+        assert attempts == [1, 2]
+        assert failed.error == "flaky"
+
+    @pytest.mark.asyncio
+    async def test_cancel_running_job(self, tmp_path):
+        queue = JobQueue(tmp_path / 'jobs.sqlite3')
+        started = asyncio.Event()
+
+        async def handler(job, secrets, on_progress):
+            started.set()
+            await asyncio.sleep(10)
+
+        queue.register_handler('slow', handler)
+        job = queue.submit('slow', {})
+
+        await queue.start(num_workers=1)
+        try:
+            await asyncio.wait_for(started.wait(), timeout=2)
+            assert queue.cancel(job.id)
+            cancelled = await wait_for_status(queue, job.id, {'cancelled'})
+            await asyncio.sleep(0.05)
+        finally:
+            await queue.stop()
+
+        assert cancelled.finishedAt is not None
+        assert queue.get_job(job.id).status == 'cancelled'
+        assert not queue.cancel(job.id)
+
+    @pytest.mark.asyncio
+    async def test_starting_worker_leaves_live_jobs_alone(self, tmp_path):
+        first = JobQueue(tmp_path / 'jobs.sqlite3')
+        second = JobQueue(tmp_path / 'jobs.sqlite3')
+        release = asyncio.Event()
+        runs = []
+
+        async def handler(job, secrets, on_progress):
+            runs.append(job.id)
+            await release.wait()
+            return secrets.get('api_key')
+
+        for queue in (first, second):
+            queue.register_handler('slow', handler)
+        job = first.submit('slow', {}, secrets={'api_key': 'k'})
+
+        await first.start(num_workers=1)
+        try:
+            await wait_for_status(first, job.id, {'running'})
+            # Another process starting up must not requeue a job that is still leased
+            await second.start(num_workers=1)
+            await asyncio.sleep(0.1)
+            release.set()
+            done = await wait_for_status(first, job.id, {'succeeded'})
+        finally:
+            await second.stop()
+            await first.stop()
+
+        assert runs == [job.id] and done.result == 'k'
+
+    def test_expired_leases_are_reclaimed(self, tmp_path):
+        crashed = JobQueue(tmp_path / 'jobs.sqlite3')
+        crashed.register_handler('work', lambda *args: None)
+        plain = crashed.submit('work', {})
+        secret = crashed.submit('work', {}, secrets={'api_key': 'k'})
+        assert {crashed._claim_next().id, crashed._claim_next().id} == {plain.id, secret.id}
+        crashed._conn.execute("UPDATE jobs SET lease_until = ?", (time.time() - 1,))
+        crashed._conn.commit()
+
+        survivor = JobQueue(tmp_path / 'jobs.sqlite3')
+        assert survivor.reclaim_expired() == 2
+        assert survivor.get_job(plain.id).status == 'queued'
+        # Its API key only existed in the crashed process
+        lost = survivor.get_job(secret.id)
+        assert lost.status == 'failed' and 'credentials' in lost.error
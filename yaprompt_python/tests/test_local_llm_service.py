@@ -0,0 +1,33 @@
+"""
+Unit Tests for Local LLM Service
+Tests batched generation ordering and per-item errors.
+"""
+import asyncio
+import pytest
+from yaprompt_python.services.local_llm_service import LocalLLMService
+
+class TestGenerateBatch:
+    @pytest.mark.asyncio
+    async def test_results_keep_input_order_with_item_errors(self, monkeypatch):
+        service = LocalLLMService()
+        in_flight = 0
+        peak = 0
+
+        async def fake_dispatch(provider, prompt, model, system, temp, api_key=None, session=None, max_tokens=None):
+            nonlocal in_flight, peak
+            assert max_tokens == 256
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01 * (5 - int(prompt)))
+            in_flight -= 1
+            if prompt == '2':
+                raise Exception("bad item")
+            return f"out-{prompt}"
+
+        monkeypatch.setattr(service, '_dispatch', fake_dispatch)
+        batch = await service.generate_batch(['0', '1', '2', '3', '4'], {"provider": "gemini", "model": "gemini-2.0-flash", "concurrency": 2, "maxTokens": 256})
+
+        assert [item.index for item in batch] == [0, 1, 2, 3, 4]
+        assert batch[0].response.text == 'out-0'
+        assert batch[2].response is None and 'bad item' in batch[2].error
+        assert peak <= 2
@@ -0,0 +1,70 @@
+"""
+Unit Tests for Metrics
+Tests exposition format, the ASGI middleware and its per-request overhead.
+"""
+import time
+import pytest
+from yaprompt_python.utils.metrics import MetricsRegistry, MetricsMiddleware, metrics
+
+class _Route:
+    path = '/items/{item_id}'
+
+async def _app(scope, receive, send):
+    scope['route'] = _Route()
+    await send({'type': 'http.response.start', 'status': 201, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b''})
+
+async def _send(message):
+    pass
+
+class TestMetrics:
+    def test_histogram_renders_cumulative_buckets(self):
+        registry = MetricsRegistry()
+        hist = registry.histogram('demo_seconds', 'Demo', ('op',), buckets=(0.1, 1.0))
+        hist.observe(0.05, 'read')
+        hist.observe(0.5, 'read')
+        hist.observe(5.0, 'read')
+
+        text = registry.render()
+        assert 'demo_seconds_bucket{op="read",le="0.1"} 1' in text
+        assert 'demo_seconds_bucket{op="read",le="1"} 2' in text
+        assert 'demo_seconds_bucket{op="read",le="+Inf"} 3' in text
+        assert 'demo_seconds_count{op="read"} 3' in text
+
+    @pytest.mark.asyncio
+    async def test_middleware_labels_by_route_template(self):
+        middleware = MetricsMiddleware(_app)
+        scope = {'type': 'http', 'method': 'GET', 'path': '/items/42'}
+        before = metrics.http_requests.values.get(('GET', '/items/{item_id}', '201'), 0)
+
+        await middleware(scope, None, _send)
+
+        assert metrics.http_requests.values[('GET', '/items/{item_id}', '201')] == before + 1
+        assert metrics.http_in_flight.values[()] == 0
+
+    @pytest.mark.asyncio
+    async def test_middleware_overhead_is_small(self):
+        middleware = MetricsMiddleware(_app)
+        n = 2000
+
+        start = time.perf_counter()
+        for _ in range(n):
+            await _app({'type': 'http', 'method': 'GET'}, None, _send)
+        bare = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(n):
+            await middleware({'type': 'http', 'method': 'GET'}, None, _send)
+        wrapped = time.perf_counter() - start
+
+        assert (wrapped - bare) / n < 50e-6
+
+    @pytest.mark.asyncio
+    async def test_metrics_endpoint_includes_service_collectors(self):
+        from yaprompt_python.api import metrics_endpoint, services
+        # The memory gauge is only exported once the (lazy) memory service is loaded
+        services.get('continuum_memory_system')
+        response = await metrics_endpoint()
+        body = response.body.decode()
+        assert '# TYPE promptforge_http_request_duration_seconds histogram' in body
+        assert 'promptforge_memories ' in body
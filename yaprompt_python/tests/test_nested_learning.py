@@ -0,0 +1,113 @@
+"""
+Unit Tests for Nested Learning Engine
+Tests bounded levels, retention-based eviction and scheduled consolidation.
+"""
+import time
+import hashlib
+import pytest
+from yaprompt_python.services.nested_learning_engine import (
+    NestedLearningEngine, AssociativeMemoryLevel, AssociativeMemoryEntry, _serialize
+)
+from yaprompt_python.services.continuum_memory_system import ContinuumMemorySystem
+
+def _entry(key, surprise=0.5, access=1, last=None):
+    return AssociativeMemoryEntry(key=key, value=key, surpriseScore=surprise, accessCount=access,
+                                  lastAccessed=last or time.time(), level=0)
+
+class TestAssociativeMemoryLevel:
+    def test_evicts_lowest_retention_first(self):
+        now = time.time()
+        level = AssociativeMemoryLevel(0, capacity=3, horizon=60, epoch=now)
+        level.put(_entry('old', last=now - 3600))
+        level.put(_entry('popular', access=50, last=now - 600))
+        level.put(_entry('surprising', surprise=1.0))
+
+        assert level.put(_entry('new')) == ['old']
+        assert set(level.entries) == {'popular', 'surprising', 'new'}
+
+    def test_refreshed_entries_are_not_evicted_by_stale_priority(self):
+        now = time.time()
+        level = AssociativeMemoryLevel(0, capacity=2, horizon=60, epoch=now)
+        a = _entry('a', last=now - 3600)
+        level.put(a)
+        level.put(_entry('b', last=now - 60))
+        a.lastAccessed = now
+        level.put(a)
+
+        assert level.put(_entry('c')) == ['b']
+
+class TestNestedLearningEngine:
+    @pytest.mark.asyncio
+    async def test_memory_stays_bounded_under_traffic(self):
+        engine = NestedLearningEngine()
+        engine.memory_levels[0].capacity = 50
+        for i in range(500):
+            await engine.process_data({'event': i})
+
+        stats = engine.get_stats()['levels']
+        assert stats[0]['entries'] == 50
+        assert stats[0]['evicted'] == 450
+        assert stats[1]['entries'] == 0 # slower levels are not written synchronously
+        await engine.stop()
+
+    @pytest.mark.asyncio
+    async def test_consolidation_promotes_repeated_entries_when_due(self):
+        engine = NestedLearningEngine()
+        await engine.process_data({'event': 'repeat'})
+        await engine.process_data({'event': 'repeat'})
+        await engine.process_data({'note': 'unrelated'})
+        await engine.stop()
+
+        assert engine.consolidate_due() == {} # nothing is due yet
+        hour_later = time.time() + 3601
+        assert engine.consolidate_due(hour_later) == {1: 2}
+        # Novel entries score as surprising, so both qualify; a second
+        # round only looks at entries touched since the last one
+        assert engine.consolidate_level(1) == 0
+        assert len(engine.memory_levels[1]) == 2
+
+    @pytest.mark.asyncio
+    async def test_context_keyed_repeats_are_not_surprising(self):
+        engine = NestedLearningEngine()
+        first = await engine.process_data({'event': 'x'}, context='chat')
+        second = await engine.process_data({'event': 'x'}, context='chat')
+        await engine.stop()
+
+        assert first[0].surpriseScore == 1.0
+        assert second[0].surpriseScore < 1.0
+
+    def test_keys_are_stable_across_processes(self):
+        engine = NestedLearningEngine()
+        # Fixed digest: hash() would change with PYTHONHASHSEED
+        assert _serialize({'b': 1, 'a': 2}) == _serialize({'a': 2, 'b': 1}) == '{"a":2,"b":1}'
+        assert engine._generate_key('{"a":1}') == ':' + hashlib.blake2b(b'{"a":1}', digest_size=8).hexdigest()
+
+    @pytest.mark.asyncio
+    async def test_patterns_come_ranked_from_the_index(self):
+        engine = NestedLearningEngine()
+        for event, times in (('rare', 2), ('common', 5), ('once', 1)):
+            for _ in range(times):
+                await engine.process_data({'event': event})
+        await engine.stop()
+
+        patterns = await engine.detect_patterns(min_confidence=0.0)
+        assert [p['pattern'] for p in patterns] == [{'event': 'common'}, {'event': 'rare'}]
+        assert patterns[0]['frequency'] == 5
+        assert len(await engine.detect_patterns(min_confidence=0.0, limit=1)) == 1
+        assert len(engine.memory_levels[0].patterns) == 2
+
+    @pytest.mark.asyncio
+    async def test_long_term_memories_are_searched_once_per_request(self, tmp_path, monkeypatch):
+        cms = ContinuumMemorySystem(db_path=str(tmp_path / 'memory.json'))
+        await cms.write_memory({'event': 'known'})
+        engine = NestedLearningEngine(memory=cms)
+        lookups = []
+        similarities = cms.index.similarities
+        monkeypatch.setattr(cms.index, 'similarities', lambda v: lookups.append(1) or similarities(v))
+
+        flows = await engine.process_data({'event': 'known'})
+        await engine.stop()
+
+        assert len(lookups) == 1
+        # Every level still sees the stored memory as a near neighbour
+        assert all(flow.surpriseScore < 0.5 for flow in flows)
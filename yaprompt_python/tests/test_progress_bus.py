@@ -0,0 +1,69 @@
+"""
+Unit Tests for Progress Bus
+Tests replay for late joiners, bounded subscriber queues and engine events.
+"""
+import asyncio
+import pytest
+from yaprompt_python.services import progress_bus as progress_bus_module
+from yaprompt_python.services.progress_bus import ProgressBus
+from yaprompt_python.services.local_workflow_engine import local_workflow_engine
+from yaprompt_python.types import Workflow
+
+class TestProgressBus:
+    @pytest.mark.asyncio
+    async def test_late_joiner_gets_replay_then_live_events(self):
+        bus = ProgressBus()
+        bus.publish('exec-1', {'status': 'running', 'message': 'a'})
+        bus.publish('exec-1', {'status': 'running', 'message': 'b'})
+
+        received = []
+
+        async def consume():
+            async for event in bus.subscribe('exec-1', after_seq=1):
+                received.append(event['message'])
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0)
+        bus.publish('exec-1', {'status': 'completed', 'message': 'c'}, final=True)
+        await asyncio.wait_for(consumer, timeout=1)
+
+        assert received == ['b', 'c']
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_drops_oldest_without_blocking(self, monkeypatch):
+        monkeypatch.setattr(progress_bus_module, 'SUBSCRIBER_QUEUE_SIZE', 2)
+        monkeypatch.setattr(progress_bus_module, 'REPLAY_SIZE', 2)
+        bus = ProgressBus()
+        stream = bus.subscribe('exec-2')
+        first = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+
+        for i in range(5):
+            bus.publish('exec-2', {'status': 'running', 'message': str(i)})
+        bus.publish('exec-2', {'status': 'completed'}, final=True)
+
+        events = [await first] + [e async for e in stream]
+        assert bus.dropped > 0
+        assert events[-1]['status'] == 'completed'
+        assert len(events) <= 3
+
+    @pytest.mark.asyncio
+    async def test_workflow_engine_publishes_node_timing(self):
+        workflow = Workflow(**{
+            "id": "wf-progress",
+            "name": "Progress",
+            "description": "",
+            "nodes": [
+                {"id": "t1", "type": "transform_data", "name": "Double", "config": {"transformScript": "return input['input'] * 2"}}
+            ],
+            "connections": [],
+            "startNode": "t1"
+        })
+
+        result = await local_workflow_engine.execute_workflow(workflow, 21)
+        events = progress_bus_module.progress_bus.recent(result.executionId)
+
+        assert result.output == 42
+        node_done = next(e for e in events if e.get('nodeId') == 't1')
+        assert node_done['durationMs'] >= 0
+        assert events[-1]['status'] == 'completed'
@@ -0,0 +1,90 @@
+"""
+Unit Tests for Project Repository
+Tests summaries, task pages, incremental progress and persistence.
+"""
+import time
+import pytest
+from yaprompt_python.services.project_manager import ProjectManager, TaskUpdate
+from yaprompt_python.services.project_repository import ProjectRepository, PROJECTS
+from yaprompt_python.utils.state_store import MemoryStateStore, SQLiteStateStore
+
+def _project(project_id, tasks):
+    return {
+        'id': project_id, 'name': project_id, 'description': '', 'status': 'planning', 'progress': 0.0,
+        'timeline': {'startDate': time.time(), 'estimatedCompletion': time.time()},
+        'autoGenerated': False, 'documents': [],
+        'tasks': [{'id': f't{i}', 'title': f'Task {i}', 'description': '', 'status': 'pending',
+                   'estimatedMinutes': 10, 'dependencies': [], 'createdAt': 0.0} for i in range(tasks)]
+    }
+
+class TestProjectRepository:
+    def test_summaries_and_pages_do_not_load_every_task(self):
+        repo = ProjectRepository(MemoryStateStore())
+        repo.create(_project('big', 1000))
+        repo.create(_project('small', 3))
+
+        page = repo.list_summaries(limit=10)
+        assert page.total == 2 and repo.count() == 2
+        assert {p.id: p.taskCount for p in page.projects} == {'big': 1000, 'small': 3}
+        assert repo.store.value(PROJECTS, 'big').get('tasks') is None
+
+        tasks = repo.task_page('big', offset=990, limit=50)
+        assert tasks.total == 1000
+        assert [t['id'] for t in tasks.tasks] == [f't{i}' for i in range(990, 1000)]
+
+    def test_progress_follows_task_updates(self):
+        repo = ProjectRepository(MemoryStateStore())
+        repo.create(_project('p', 4))
+        complete = lambda task: dict(task, status='completed')
+
+        repo.update_task('p', 't0', lambda task: dict(task, status='in_progress'))
+        assert repo.summary('p').status == 'active'
+        for task_id in ('t0', 't1', 't2', 't3'):
+            repo.update_task('p', task_id, complete)
+        summary = repo.summary('p')
+        assert summary.progress == 1.0 and summary.status == 'completed'
+        assert summary.taskCounts['completed'] == 4 and summary.taskCounts['in_progress'] == 0
+        assert repo.update_task('p', 'missing', complete) is None
+
+    def test_task_update_racing_a_replan_is_redone_on_the_new_list(self):
+        repo = ProjectRepository(MemoryStateStore())
+        version = repo.create(_project('p', 2))
+        replanned = _project('p', 3)['tasks']
+        calls = []
+
+        def start(task):
+            # The re-plan lands between this task write and its header write
+            if not calls:
+                repo.replace_tasks('p', replanned, version)
+            calls.append(task['id'])
+            return dict(task, status='in_progress')
+
+        task, _, _ = repo.update_task('p', 't1', start)
+        assert calls == ['t1', 't1'] and task['status'] == 'in_progress'
+        assert [t['status'] for t in repo.get('p')['tasks']] == ['pending', 'in_progress', 'pending']
+        summary = repo.summary('p')
+        assert summary.taskCount == 3 and summary.taskCounts['in_progress'] == 1 and summary.status == 'active'
+
+    def test_projects_stored_whole_are_migrated(self):
+        store = MemoryStateStore()
+        legacy = _project('old', 2)
+        legacy['tasks'][0]['status'] = 'completed'
+        store.put(PROJECTS, 'old', legacy)
+
+        repo = ProjectRepository(store)
+        assert repo.summary('old').progress == 0.5
+        assert [t['id'] for t in repo.get('old')['tasks']] == ['t0', 't1']
+
+class TestProjectManagerPersistence:
+    @pytest.mark.asyncio
+    async def test_projects_survive_a_restart(self, tmp_path):
+        manager = ProjectManager(store=SQLiteStateStore(tmp_path / 'projects.sqlite3'))
+        project = (await manager.create_project("Research vector databases")).project
+        manager.update_task(project.id, project.tasks[0].id, TaskUpdate(status='completed'))
+
+        restarted = ProjectManager(store=SQLiteStateStore(tmp_path / 'projects.sqlite3'))
+        assert restarted.count_projects() == 1
+        summary = restarted.list_projects().projects[0]
+        assert summary.progress == pytest.approx(1 / 5)
+        assert restarted.get_project(project.id).tasks[0].status == 'completed'
+        assert restarted.get_tasks(project.id, limit=2).total == 5
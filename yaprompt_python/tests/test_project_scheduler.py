@@ -0,0 +1,105 @@
+"""
+Unit Tests for Project Scheduler
+Tests critical-path analysis, incremental updates and worker scheduling.
+"""
+import time
+import numpy as np
+import pytest
+from pydantic import ValidationError
+from yaprompt_python.services.project_scheduler import CriticalPathScheduler, DependencyCycle
+from yaprompt_python.services.project_manager import ProjectManager, TaskUpdate
+from yaprompt_python.utils.state_store import MemoryStateStore
+
+def _random_dag(n, seed=0, max_deps=3):
+    rng = np.random.default_rng(seed)
+    tasks = []
+    for i in range(n):
+        deps = sorted({f"t{j}" for j in rng.integers(0, i, size=rng.integers(0, max_deps + 1))}) if i else []
+        tasks.append((f"t{i}", float(rng.integers(5, 120)), deps))
+    order = rng.permutation(n)
+    return [tasks[i] for i in order]
+
+class TestCriticalPath:
+    def test_diamond(self):
+        scheduler = CriticalPathScheduler([
+            ('a', 10, []), ('b', 30, ['a']), ('c', 5, ['a']), ('d', 10, ['b', 'c'])
+        ])
+        schedule = scheduler.schedule('p', workers=2)
+        by_id = {t.id: t for t in schedule.tasks}
+
+        assert schedule.criticalPathMinutes == 50
+        assert schedule.criticalPath == ['a', 'b', 'd']
+        assert by_id['c'].earliestStart == 10 and by_id['c'].latestStart == 35
+        assert by_id['c'].slack == 25 and not by_id['c'].critical
+        assert schedule.makespanMinutes == 50
+
+    def test_cycle_is_reported(self):
+        with pytest.raises(DependencyCycle) as info:
+            CriticalPathScheduler([('a', 1, ['c']), ('b', 1, ['a']), ('c', 1, ['b']), ('d', 1, [])])
+        assert info.value.cycle[0] == info.value.cycle[-1]
+        assert set(info.value.cycle) == {'a', 'b', 'c'}
+
+    def test_incremental_updates_match_full_recomputation(self):
+        tasks = _random_dag(500, seed=1)
+        scheduler = CriticalPathScheduler(tasks)
+        durations = {task_id: d for task_id, d, _ in tasks}
+        rng = np.random.default_rng(2)
+        for task_id in rng.choice([t[0] for t in tasks], size=40):
+            durations[task_id] = float(rng.choice([0, rng.integers(1, 300)]))
+            scheduler.set_duration(task_id, durations[task_id])
+
+        fresh = CriticalPathScheduler([(task_id, durations[task_id], deps) for task_id, _, deps in tasks])
+        assert np.array_equal(scheduler.es, fresh.es)
+        assert np.array_equal(scheduler.tail, fresh.tail)
+
+    def test_worker_schedule_respects_dependencies_and_capacity(self):
+        tasks = _random_dag(300, seed=3)
+        scheduler = CriticalPathScheduler(tasks)
+        schedule = scheduler.schedule('p', workers=4)
+        by_id = {t.id: t for t in schedule.tasks}
+
+        for task_id, _, deps in tasks:
+            assert all(by_id[d].finish <= by_id[task_id].start for d in deps)
+        for w in range(4):
+            spans = sorted((t.start, t.finish) for t in schedule.tasks if t.worker == w)
+            assert all(a[1] <= b[0] for a, b in zip(spans, spans[1:]))
+        total = sum(t.durationMinutes for t in schedule.tasks)
+        assert max(schedule.criticalPathMinutes, total / 4) <= schedule.makespanMinutes <= total
+
+    def test_ten_thousand_tasks(self):
+        tasks = _random_dag(10000, seed=4)
+        start = time.perf_counter()
+        scheduler = CriticalPathScheduler(tasks)
+        schedule = scheduler.schedule('p', workers=8)
+        scheduler.set_duration(tasks[0][0], 500.0)
+        assert time.perf_counter() - start < 5.0
+        assert len(schedule.tasks) == 10000
+
+class TestProjectManagerSchedule:
+    @pytest.mark.asyncio
+    async def test_schedule_follows_task_updates(self):
+        manager = ProjectManager(store=MemoryStateStore())
+        project = (await manager.create_project("Build a website")).project
+
+        serial = sum(t.estimatedMinutes for t in project.tasks)
+        assert project.timeline.estimatedCompletion - project.timeline.startDate == pytest.approx(serial * 60, abs=5)
+        parallel = manager.get_schedule(project.id, workers=3)
+        assert parallel.makespanMinutes < serial
+        assert parallel.criticalPathMinutes == 45 + 60 + 300 + 120 + 45
+
+        implement = next(t for t in project.tasks if t.title == 'Implement core features')
+        manager.update_task(project.id, implement.id, TaskUpdate(status='completed'))
+        after = manager.get_schedule(project.id, workers=3)
+        assert after.criticalPathMinutes == 45 + 60 + 120 + 45
+        assert manager.get_project(project.id).progress == pytest.approx(1 / 7)
+
+        # A fresh manager (another worker) rebuilds the same schedule from the store
+        other = ProjectManager(store=manager.store)
+        assert other.get_schedule(project.id, workers=3) == after
+
+    def test_invalid_task_updates_are_rejected(self):
+        with pytest.raises(ValidationError):
+            TaskUpdate(status='done')
+        with pytest.raises(ValidationError):
+            TaskUpdate(estimatedMinutes=-30)
+        assert TaskUpdate(status='blocked', estimatedMinutes=0).estimatedMinutes == 0
@@ -0,0 +1,109 @@
+"""
+Unit Tests for RL Engine
+Tests the array-backed bandit strategies, bounded history and shared-state sync.
+"""
+import threading
+import pytest
+import numpy as np
+from yaprompt_python.utils.state_store import MemoryStateStore
+from yaprompt_python.services.bandit_engine import BanditEngine
+from yaprompt_python.services.rl_engine import RLEngine
+
+class TestBanditEngine:
+    @pytest.mark.parametrize('strategy', ['epsilon_greedy', 'ucb1', 'thompson'])
+    def test_strategies_converge_on_best_action(self, strategy):
+        bandit = BanditEngine(exploration_rate=0.1, seed=3)
+        payout = {'a': -0.5, 'b': 0.8, 'c': 0.1}
+        for _ in range(400):
+            action = bandit.select(list(payout), 'ctx', strategy)
+            bandit.update(action, 'ctx', payout[action])
+
+        picks = [bandit.select(list(payout), 'ctx', strategy) for _ in range(50)]
+        assert picks.count('b') > 35
+
+    def test_ucb1_tries_every_action_first(self):
+        bandit = BanditEngine(seed=1)
+        bandit.update('a', 'ctx', 1.0)
+        assert bandit.select(['a', 'b'], 'ctx', 'ucb1') == 'b'
+
+    def test_history_is_bounded_and_stats_are_running(self):
+        bandit = BanditEngine(history_size=5)
+        for i in range(12):
+            bandit.update(f"a{i % 3}", 'ctx', 0.5)
+
+        assert [r['actionId'] for r in bandit.recent_rewards()] == ['a1', 'a2', 'a0', 'a1', 'a2']
+        stats = bandit.stats()
+        assert stats['rewardCount'] == 12
+        assert stats['avgReward'] == pytest.approx(0.5)
+
+class TestRLEngine:
+    def test_td_update_matches_original_rule(self, tmp_path):
+        engine = RLEngine(MemoryStateStore(), state_dir=tmp_path)
+        engine.record_reward('a', 1.0, 'ctx')
+        engine.record_reward('a', 1.0, 'ctx')
+        assert engine.get_action_value('a', 'ctx') == pytest.approx(0.19)
+        assert engine.get_stats()['totalRewards'] == 2.0
+
+    def test_workers_see_each_others_rewards(self, tmp_path):
+        store = MemoryStateStore()
+        worker_a, worker_b = RLEngine(store, seed=1, state_dir=tmp_path / 'a'), RLEngine(store, seed=2, state_dir=tmp_path / 'b')
+        worker_a.exploration_rate = worker_b.exploration_rate = 0.0
+
+        worker_a.record_reward('b', 1.0, 'ctx')
+        assert worker_b.select_action(['a', 'b'], 'ctx') == 'b'
+        worker_b.record_reward('a', -1.0, 'ctx')
+        assert worker_a.get_stats()['rewardCount'] == 2
+        assert worker_a.get_action_value('a', 'ctx') == pytest.approx(-0.1)
+
+class TestRLPersistence:
+    def test_batch_update_matches_sequential_updates(self):
+        rng = np.random.default_rng(0)
+        actions = [f"a{i}" for i in rng.integers(0, 4, 300)]
+        contexts = [f"c{i}" for i in rng.integers(0, 3, 300)]
+        rewards = rng.uniform(-1, 1, 300)
+
+        sequential, batched = BanditEngine(), BanditEngine()
+        for a, c, r in zip(actions, contexts, rewards):
+            sequential.update(a, c, r, timestamp=1.0)
+        batched.update_batch(actions, contexts, rewards, timestamp=1.0)
+
+        for a, c in set(zip(actions, contexts)):
+            assert batched.get_cell(a, c) == pytest.approx(sequential.get_cell(a, c))
+        assert batched.stats() == pytest.approx(sequential.stats())
+
+    def test_state_survives_restart_via_snapshot_and_wal(self, tmp_path):
+        engine = RLEngine(MemoryStateStore(), state_dir=tmp_path, wal_fsync=False)
+        engine.record_rewards(['a', 'b', 'a'], [1.0, -1.0, 0.5], ['ctx', 'ctx', 'ctx'])
+        engine.snapshot()
+        engine.record_reward('b', 1.0, 'other') # only in the WAL
+        expected = {k: engine.get_action_value(*k) for k in [('a', 'ctx'), ('b', 'ctx'), ('b', 'other')]}
+
+        # Fresh process: empty memory store, state comes back from disk
+        restarted = RLEngine(MemoryStateStore(), state_dir=tmp_path, wal_fsync=False)
+        for (action, context), value in expected.items():
+            assert restarted.get_action_value(action, context) == pytest.approx(value)
+        assert restarted.get_stats()['rewardCount'] == 4
+        assert restarted.store.value('rl_stats', 'totals')['count'] == 4
+
+    def test_concurrent_snapshot_waits_for_the_batch_being_applied(self, tmp_path, monkeypatch):
+        store = MemoryStateStore()
+        worker_a = RLEngine(store, state_dir=tmp_path, wal_fsync=False)
+        worker_b = RLEngine(store, state_dir=tmp_path, wal_fsync=False)
+        original = store.update
+        snapshots = []
+
+        def update(namespace, key, fn, *args, **kwargs):
+            # Worker B snapshots while A's batch is in the WAL but not yet in the store
+            if not snapshots:
+                snapshots.append(threading.Thread(target=worker_b.snapshot))
+                snapshots[0].start()
+                snapshots[0].join(0.2)
+                assert snapshots[0].is_alive() # held off by the WAL lock
+            return original(namespace, key, fn, *args, **kwargs)
+
+        monkeypatch.setattr(store, 'update', update)
+        worker_a.record_rewards(['x', 'y'], [1.0, 0.5], ['ctx', 'ctx'])
+        snapshots[0].join(5)
+
+        restarted = RLEngine(MemoryStateStore(), state_dir=tmp_path, wal_fsync=False)
+        assert restarted.get_stats()['rewardCount'] == 2
@@ -0,0 +1,59 @@
+"""
+Unit Tests for Service Container
+Tests lazy loading through proxies, warm-up and the API cold-import footprint.
+"""
+import sys
+import subprocess
+import pytest
+from yaprompt_python.services.container import ServiceContainer, SERVICE_MODULES
+
+class TestServiceContainer:
+    def test_proxy_loads_on_first_attribute_access(self, tmp_path, monkeypatch):
+        from yaprompt_python.config import Config
+        from yaprompt_python.services import rl_engine as rl_module
+        monkeypatch.setattr(Config, 'RL_STATE_DIR', tmp_path / 'rl')
+        monkeypatch.setattr(rl_module, '_rl_engine', None)
+        assert not (tmp_path / 'rl').exists() # importing the module built nothing
+
+        container = ServiceContainer({'rl_engine': SERVICE_MODULES['rl_engine']})
+        proxy = container.proxy('rl_engine')
+        assert not container.is_loaded('rl_engine')
+
+        assert proxy.get_stats() is not None
+        assert container.is_loaded('rl_engine')
+        report = container.get_report()
+        assert [l['name'] for l in report['loaded']] == ['rl_engine']
+        assert report['pending'] == []
+
+    def test_project_manager_is_built_on_first_use(self, tmp_path, monkeypatch):
+        from yaprompt_python.config import Config
+        from yaprompt_python.services import project_manager as pm_module
+        monkeypatch.setattr(Config, 'PROJECTS_DB', tmp_path / 'projects.sqlite3')
+        monkeypatch.setattr(Config, 'STATE_BACKEND', 'memory')
+        monkeypatch.setattr(pm_module, '_project_manager', None)
+
+        container = ServiceContainer({'project_manager': SERVICE_MODULES['project_manager']})
+        proxy = container.proxy('project_manager')
+        assert not (tmp_path / 'projects.sqlite3').exists()
+
+        assert proxy.count_projects() == 0
+        assert (tmp_path / 'projects.sqlite3').exists()
+        assert pm_module.project_manager is container.get('project_manager')
+
+    def test_warm_skips_unknown_and_reports_loads(self):
+        container = ServiceContainer({'persona_manager': SERVICE_MODULES['persona_manager']})
+        loads = container.warm(['persona_manager', 'does_not_exist'])
+
+        assert [l.name for l in loads] == ['persona_manager']
+        with pytest.raises(KeyError):
+            container.proxy('does_not_exist')
+
+    def test_api_import_does_not_load_services(self):
+        probe = (
+            "import sys, yaprompt_python.api as api\n"
+            "assert 'google.generativeai' not in sys.modules\n"
+            "assert 'yaprompt_python.services.continuum_memory_system' not in sys.modules\n"
+            "assert api.services.get_report()['loaded'] == []\n"
+        )
+        proc = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True)
+        assert proc.returncode == 0, proc.stderr
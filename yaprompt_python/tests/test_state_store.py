@@ -0,0 +1,81 @@
+"""
+Unit Tests for Shared State Store
+Tests optimistic concurrency and cross-worker visibility of service state.
+"""
+import threading
+import pytest
+from yaprompt_python.utils.state_store import MemoryStateStore, SQLiteStateStore, VersionConflict
+from yaprompt_python.services.safe_action_approval import SafeActionApproval
+from yaprompt_python.services.negotiation_engine import NegotiationEngine
+from yaprompt_python.services.rl_engine import RLEngine
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    return MemoryStateStore() if request.param == 'memory' else SQLiteStateStore(tmp_path / 'state.sqlite3')
+
+class TestStateStore:
+    def test_conditional_writes(self, store):
+        assert store.put('ns', 'k', {'a': 1}, expected_version=0) == 1
+        with pytest.raises(VersionConflict):
+            store.put('ns', 'k', {'a': 2}, expected_version=0)
+
+        value, version = store.get('ns', 'k')
+        assert value == {'a': 1} and version == 1
+        assert store.put('ns', 'k', {'a': 2}, expected_version=1) == 2
+        with pytest.raises(VersionConflict):
+            store.delete('ns', 'k', expected_version=1)
+        assert store.delete('ns', 'k', expected_version=2)
+        assert store.get('ns', 'k') == (None, 0)
+
+    def test_concurrent_updates_from_separate_connections(self, tmp_path):
+        # Two store instances on one file behave like two uvicorn workers
+        path = tmp_path / 'state.sqlite3'
+        workers = [SQLiteStateStore(path), SQLiteStateStore(path)]
+
+        def bump(s):
+            for _ in range(50):
+                s.update('ns', 'counter', lambda n: (n or 0) + 1, retries=1000)
+
+        threads = [threading.Thread(target=bump, args=(s,)) for s in workers for _ in range(2)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+        assert workers[0].value('ns', 'counter') == 200
+
+class TestSharedServices:
+    @pytest.mark.asyncio
+    async def test_action_is_approved_by_exactly_one_worker(self, tmp_path):
+        path = tmp_path / 'state.sqlite3'
+        worker_a, worker_b = SafeActionApproval(SQLiteStateStore(path)), SafeActionApproval(SQLiteStateStore(path))
+
+        action_id = await worker_a.request_approval('email_send', 'Send report', {})
+        assert [a.id for a in worker_b.get_pending_actions()] == [action_id]
+
+        assert await worker_b.approve_action(action_id, 'click')
+        assert not await worker_a.approve_action(action_id, 'click')
+        assert worker_a.get_pending_actions() == []
+        assert len(worker_a.history) == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_negotiation_round_is_rejected(self):
+        store = MemoryStateStore()
+        engine = NegotiationEngine(store)
+        session = await engine.start_negotiation({'vendor': 'V', 'product': 'P', 'initialPrice': 1000, 'targetPrice': 700})
+
+        # Another worker answers the round between our read and our write
+        original_get = store.get
+        def racing_get(namespace, key):
+            result = original_get(namespace, key)
+            store.put(namespace, key, result[0])
+            return result
+        store.get = racing_get
+
+        with pytest.raises(VersionConflict):
+            await engine.process_vendor_response(session.id, 950, 'No')
+
+    def test_rl_values_are_shared(self, tmp_path):
+        store = MemoryStateStore()
+        RLEngine(store, state_dir=tmp_path / 'a').record_reward('a', 1.0, 'ctx')
+        other = RLEngine(store, state_dir=tmp_path / 'b')
+        assert other.get_action_value('a', 'ctx') == pytest.approx(0.1)
+        assert other.get_stats()['totalRewards'] == 1.0
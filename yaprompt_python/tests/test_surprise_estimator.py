@@ -0,0 +1,103 @@
+"""
+Unit Tests for the Surprise Estimator
+Tests embeddings, the vector index, calibration and deduplicating writes.
+"""
+import numpy as np
+import pytest
+from yaprompt_python.services.surprise_estimator import (
+    EmbeddingIndex, SurpriseEstimator, RunningStats, embed, MIN_CALIBRATION_SAMPLES, DUPLICATE_SIMILARITY
+)
+from yaprompt_python.services.continuum_memory_system import ContinuumMemorySystem
+
+class TestEmbeddingIndex:
+    def test_embeddings_are_stable_and_normalized(self):
+        vector = embed("Deploy the billing service on Friday")
+        assert np.allclose(vector, embed("deploy the billing service on friday"))
+        assert np.isclose(np.linalg.norm(vector), 1.0)
+        assert float(vector @ embed("Order lunch for the team")) < 0.5
+
+    def test_remove_keeps_rows_dense(self):
+        index = EmbeddingIndex(capacity=2)
+        for name in ('a', 'b', 'c'):
+            index.add(name, embed(f"item {name}"))
+        index.remove('a')
+
+        assert len(index) == 2
+        assert index.nearest(embed("item c")) == ('c', pytest.approx(1.0))
+        assert index.rows == {'c': 0, 'b': 1}
+
+class TestSurpriseEstimator:
+    def test_calibrates_against_the_level_distribution(self):
+        estimator = SurpriseEstimator()
+        index = EmbeddingIndex()
+        for i in range(MIN_CALIBRATION_SAMPLES + 10):
+            vector = embed(f"ticket {i} about topic{i}")
+            estimator.estimate(vector, 0, [index])
+            index.add(str(i), vector)
+
+        typical = estimator.estimate(embed("ticket 999 about topic999"), 0, [index])
+        novel = estimator.estimate(embed("quarterly revenue forecast spreadsheet"), 0, [index])
+        repeat = estimator.estimate(embed("ticket 3 about topic3"), 0, [index])
+
+        assert novel.score > typical.score > repeat.score
+        assert repeat.duplicate and repeat.nearestId == '3'
+        assert estimator.stats[0].count == MIN_CALIBRATION_SAMPLES + 10 - 1 + 2 # duplicates are not observed
+
+    def test_running_stats_match_numpy(self):
+        values = [0.2, 0.5, 0.9, 0.4]
+        stats = RunningStats()
+        for v in values:
+            stats.observe(v)
+        assert stats.mean == pytest.approx(np.mean(values))
+        assert stats.std == pytest.approx(np.std(values, ddof=1))
+
+class TestContinuumMemoryDeduplication:
+    @pytest.mark.asyncio
+    async def test_near_duplicates_merge_on_write(self, tmp_path):
+        cms = ContinuumMemorySystem(db_path=str(tmp_path / 'memory.json'))
+        first = await cms.write_memory("User prefers dark mode in the editor")
+        again = await cms.write_memory("user prefers dark mode in the editor!")
+        other = await cms.write_memory("Weekly sync moved to Thursday afternoon")
+
+        assert first.surpriseScore == 1.0 and not first.merged
+        assert again.merged and again.id == first.id
+        assert not other.merged
+        assert len(cms.store.memories) == 2
+        assert cms.store.memories[first.id].metadata.accessCount == 1
+
+        reloaded = ContinuumMemorySystem(db_path=str(tmp_path / 'memory.json'))
+        found = await reloaded.retrieve("dark mode", limit=1)
+        assert [m.id for m in found] == [first.id]
+
+    @pytest.mark.asyncio
+    async def test_merge_check_reuses_the_estimate_lookup(self, tmp_path, monkeypatch):
+        cms = ContinuumMemorySystem(db_path=str(tmp_path / 'memory.json'))
+        await cms.write_memory("User prefers dark mode in the editor")
+        lookups = []
+        similarities = cms.index.similarities
+        monkeypatch.setattr(cms.index, 'similarities', lambda v: lookups.append(1) or similarities(v))
+
+        assert (await cms.write_memory("user prefers dark mode in the editor!")).merged
+        assert len(lookups) == 1
+
+    @pytest.mark.asyncio
+    async def test_records_differing_in_one_identifier_are_kept(self, tmp_path):
+        cms = ContinuumMemorySystem(db_path=str(tmp_path / 'memory.json'))
+        record = ("Invoice {} paid by Acme Corp for quarterly consulting services rendered in March, "
+                  "settled in full by bank transfer and confirmed by the finance team")
+        paid, other = record.format(10234), record.format(10235)
+        assert float(embed(paid) @ embed(other)) >= DUPLICATE_SIMILARITY
+
+        first = await cms.write_memory(paid, {'context': 'billing'})
+        second = await cms.write_memory(other, {'context': 'billing'})
+        assert not second.merged and second.id != first.id
+
+        # Same text in another context is a different memory too
+        elsewhere = await cms.write_memory(paid, {'context': 'audit'})
+        assert not elsewhere.merged
+        assert {m.data for m in cms.store.memories.values()} == {paid, other}
+        assert len(cms.store.memories) == 3
+
+        # A true repeat keeps the newest data
+        repeat = await cms.write_memory(paid.upper(), {'context': 'billing'})
+        assert repeat.merged and cms.store.memories[first.id].data == paid.upper()
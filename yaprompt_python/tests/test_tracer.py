@@ -0,0 +1,76 @@
+"""
+Unit Tests for Tracer
+Tests span nesting, workflow instrumentation, flame summaries and OTLP export.
+"""
+import json
+import asyncio
+import pytest
+from yaprompt_python.services.tracer import Tracer, tracer
+from yaprompt_python.services.local_workflow_engine import local_workflow_engine
+from yaprompt_python.types import Workflow
+
+class TestTracer:
+    @pytest.mark.asyncio
+    async def test_spans_nest_across_tasks(self, tmp_path):
+        t = Tracer(export_dir=tmp_path)
+
+        async def child(name):
+            with t.span(name, kind='llm'):
+                await asyncio.sleep(0)
+
+        with t.span('run', kind='execution', trace_id='exec-1') as root:
+            await asyncio.gather(child('a'), child('b'))
+
+        spans = t.get_trace('exec-1')
+        assert [s['name'] for s in spans] == ['run', 'a', 'b']
+        assert all(s['parentId'] == root.spanId for s in spans[1:])
+
+    def test_nested_trace_id_is_aliased_to_parent(self, tmp_path):
+        t = Tracer(export_dir=tmp_path)
+        with t.span('job', trace_id='job-1'):
+            with t.span('workflow', trace_id='exec-9'):
+                pass
+
+        assert [s['name'] for s in t.get_trace('exec-9')] == ['job', 'workflow']
+
+    def test_flame_summary_and_otlp_export(self, tmp_path):
+        t = Tracer(export_dir=tmp_path)
+        with t.span('run', trace_id='exec-2'):
+            with t.span('node', kind='node'):
+                pass
+            with t.span('node', kind='node'):
+                pass
+
+        flame = t.flame_summary('exec-2')
+        frame = next(f for f in flame['frames'] if f['path'] == 'run;node')
+        assert frame['count'] == 2
+
+        with open(t.export_otlp('exec-2')) as f:
+            exported = json.load(f)
+        otlp_spans = exported['resourceSpans'][0]['scopeSpans'][0]['spans']
+        assert len(otlp_spans) == 3
+        assert all(len(s['traceId']) == 32 for s in otlp_spans)
+
+    @pytest.mark.asyncio
+    async def test_workflow_nodes_are_traced(self):
+        workflow = Workflow(**{
+            "id": "wf-trace",
+            "name": "Trace",
+            "description": "",
+            "nodes": [
+                {"id": "t1", "type": "transform_data", "name": "First", "config": {"transformScript": "return 1"}},
+                {"id": "t2", "type": "transform_data", "name": "Second", "config": {"transformScript": "return 2"}}
+            ],
+            "connections": [{"from": "t1", "to": "t2"}],
+            "startNode": "t1"
+        })
+
+        result = await local_workflow_engine.execute_workflow(workflow, {})
+        spans = tracer.get_trace(result.executionId)
+
+        root = spans[0]
+        assert root['kind'] == 'execution'
+        nodes = [s for s in spans if s['kind'] == 'node']
+        assert [s['attributes']['nodeId'] for s in nodes] == ['t1', 't2']
+        # Sibling nodes: the next node is not nested inside the previous one
+        assert all(s['parentId'] == root['spanId'] for s in nodes)
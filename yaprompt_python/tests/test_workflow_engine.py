@@ -0,0 +1,310 @@
+"""
+Unit Tests for Local Workflow Engine
+Tests loop execution, ordering and error modes.
+"""
+import os
+import json
+import time
+import asyncio
+import pytest
+from yaprompt_python.services import local_workflow_engine as engine_module
+from yaprompt_python.services.local_workflow_engine import LocalWorkflowEngine
+from yaprompt_python.services.node_output_cache import NodeOutputCache
+from yaprompt_python.services.template_compiler import TemplateCache, compile_template
+from yaprompt_python.services.script_sandbox import (
+    UnsafeScriptError, ScriptTimeoutError, compile_transform, compile_condition, run_transform, evaluate_condition,
+    run_transform_in_pool
+)
+from yaprompt_python.types import Workflow
+
+def make_loop_workflow(loop_config):
+    return Workflow(**{
+        "id": "wf-loop",
+        "name": "Loop",
+        "description": "Map a transform over items",
+        "startNode": "loop",
+        "nodes": [
+            {"id": "loop", "type": "loop", "name": "Loop", "config": {"items": "$input.items", "loopNode": "double", **loop_config}},
+            {"id": "double", "type": "transform_data", "name": "Double", "config": {"transformScript": "return input['input'] * 2"}}
+        ],
+        "connections": []
+    })
+
+class TestLoopExecution:
+    @pytest.mark.asyncio
+    async def test_concurrent_loop_keeps_order(self, monkeypatch):
+        engine = LocalWorkflowEngine()
+        original = engine._execute_transform
+        in_flight = 0
+        peak = 0
+
+        async def slow_transform(node, input_data, context):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01 * (10 - input_data['input']))
+            in_flight -= 1
+            return await original(node, input_data, context)
+
+        monkeypatch.setattr(engine, '_execute_transform', slow_transform)
+        result = await engine.execute_workflow(make_loop_workflow({"concurrency": 3}), {"items": list(range(8))})
+
+        assert result.status == 'success'
+        assert result.nodeResults['loop'] == [i * 2 for i in range(8)]
+        assert 1 < peak <= 3
+
+    @pytest.mark.asyncio
+    async def test_collect_errors_mode(self):
+        engine = LocalWorkflowEngine()
+        workflow = make_loop_workflow({"concurrency": 2, "errorMode": "collect_errors"})
+        workflow.nodes[1].config.transformScript = "return 10 // input['input']"
+        result = await engine.execute_workflow(workflow, {"items": [1, 0, 5]})
+
+        outputs = result.nodeResults['loop']
+        assert result.status == 'success'
+        assert outputs[0] == 10 and outputs[2] == 2
+        assert outputs[1]['index'] == 1 and 'division' in outputs[1]['error']
+
+    @pytest.mark.asyncio
+    async def test_fail_fast_mode(self):
+        engine = LocalWorkflowEngine()
+        workflow = make_loop_workflow({"concurrency": 2})
+        workflow.nodes[1].config.transformScript = "return 1 / input['input']"
+        result = await engine.execute_workflow(workflow, {"items": [1, 0, 2]})
+
+        assert result.status == 'error'
+        assert 'division by zero' in result.error
+
+class TestTemplateCompilation:
+    def test_render_matches_placeholder_semantics(self):
+        template = compile_template("Hi {{user.name}}, item {{items.1}} {{missing.path}}!")
+        data = {"user": {"name": "Ada"}, "items": ["a", "b"]}
+        assert template.render(data) == "Hi Ada, item b {{missing.path}}!"
+
+    def test_node_templates_cached_per_workflow_version(self):
+        cache = TemplateCache()
+        workflow = make_loop_workflow({})
+        node = workflow.nodes[0]
+        first = cache.get(workflow.id, "1.0:1", node)
+        # A different object for the same version reuses the compiled entry
+        assert cache.get(workflow.id, "1.0:1", node.model_copy(deep=True)) is first
+        # Unversioned workflows reuse the entry while the config is unchanged
+        unversioned = cache.get(workflow.id, None, node)
+        assert cache.get(workflow.id, None, node) is unversioned
+        assert cache.get(workflow.id, None, node.model_copy(deep=True)) is unversioned
+
+    def test_edited_node_config_is_recompiled(self):
+        cache = TemplateCache()
+        node = make_loop_workflow({}).nodes[0]
+        one = node.model_copy(deep=True)
+        one.config.transformScript = "return 1"
+        two = node.model_copy(deep=True)
+        two.config.transformScript = "return 2"
+        # Same workflow id, version and node id, different scripts
+        assert run_transform(cache.get('wf', '1.0:1', one).transform_code(), {}, {}) == 1
+        assert run_transform(cache.get('wf', '1.0:1', two).transform_code(), {}, {}) == 2
+        assert run_transform(cache.get('wf', '1.0:1', one.model_copy(deep=True)).transform_code(), {}, {}) == 1
+
+class TestScriptSandbox:
+    def test_transform_runs_with_restricted_builtins(self):
+        code = compile_transform("return sorted(input['xs'])")
+        assert run_transform(code, {'xs': [3, 1, 2]}, {}) == [1, 2, 3]
+
+        with pytest.raises(UnsafeScriptError):
+            compile_transform("import os\n  return os.getcwd()")
+        with pytest.raises(UnsafeScriptError):
+            compile_transform("return input.__class__.__subclasses__()")
+        with pytest.raises(NameError):
+            run_transform(compile_transform("return open('/etc/passwd')"), {}, {})
+
+    def test_library_helpers_do_not_expose_modules(self):
+        code = compile_transform("return json_dumps({'n': math_sqrt(16), 'm': bool(re_match('a+', 'aa'))})")
+        assert json.loads(run_transform(code, {}, {})) == {'n': 4.0, 'm': True}
+
+        with pytest.raises(UnsafeScriptError):
+            compile_condition("json.codecs.sys.modules['os'].getpid() > 0")
+        with pytest.raises(UnsafeScriptError):
+            compile_transform("return re.enum.sys.modules['os'].popen('id').read()")
+        with pytest.raises(UnsafeScriptError):
+            compile_transform("return json_loads.__globals__")
+        with pytest.raises(UnsafeScriptError):
+            compile_condition("re_match.func_globals is None")
+        with pytest.raises(UnsafeScriptError):
+            compile_transform("return '{0.__globals__}'.format(json_loads)")
+        with pytest.raises(UnsafeScriptError, match='json_loads'):
+            compile_transform("return json.loads(input)")
+
+    def test_frame_introspection_is_rejected(self):
+        # A generator's frame chain leads back to the sandbox module's globals
+        script = (
+            "def gen():\n"
+            "    yield g.gi_frame.f_back.f_back.f_globals\n"
+            "g = gen()\n"
+            "for glb in g:\n"
+            "    return glb['sys'].modules['os'].getcwd()"
+        )
+        with pytest.raises(UnsafeScriptError, match='is not allowed'):
+            compile_transform(script)
+        with pytest.raises(UnsafeScriptError):
+            compile_condition("(x for x in input).gi_code.co_consts")
+
+        code = compile_transform("return ', '.join(k.upper() for k in input.keys()).strip()")
+        assert run_transform(code, {'a': 1, 'b': 2}, {}) == 'A, B'
+
+    @pytest.mark.asyncio
+    async def test_pool_transform_hits_wall_clock_limit(self):
+        # Catastrophic backtracking runs inside C, where the trace hook never fires
+        script = "return re_match('(a+)+$', 'a' * 40 + 'b')"
+        with pytest.raises(ScriptTimeoutError):
+            await run_transform_in_pool(script, {}, {}, cpu_limit=0.1, wall_limit=1.0)
+        # The killed pool is replaced
+        assert await run_transform_in_pool("return input + 1", 1, {}) == 2
+
+    def test_runaway_transform_hits_cpu_limit(self):
+        code = compile_transform("while True:\n    pass")
+        with pytest.raises(ScriptTimeoutError):
+            run_transform(code, {}, {}, cpu_limit=0.05)
+
+    def test_condition_expression(self):
+        code = compile_condition("len(input['items']) > 2 and context['variables'].get('flag')")
+        assert evaluate_condition(code, {'items': [1, 2, 3]}, {'flag': True}) is True
+        with pytest.raises(UnsafeScriptError):
+            compile_condition("(lambda: 1)()")
+
+class TestResume:
+    @pytest.mark.asyncio
+    async def test_resume_skips_checkpointed_nodes(self, execution_journal, monkeypatch):
+        engine = LocalWorkflowEngine()
+        workflow = Workflow(**{
+            "id": "wf-resume",
+            "name": "Resume",
+            "description": "Two step chain",
+            "startNode": "a",
+            "nodes": [
+                {"id": "a", "type": "transform_data", "name": "A", "config": {"transformScript": "return 1"}},
+                {"id": "b", "type": "transform_data", "name": "B", "config": {"transformScript": "return 2"}}
+            ],
+            "connections": [{"from": "a", "to": "b"}]
+        })
+
+        calls = []
+        fail_b = True
+        original = engine._execute_transform
+
+        async def tracked_transform(node, input_data, context):
+            calls.append(node.id)
+            if node.id == 'b' and fail_b:
+                raise ValueError("transient failure")
+            return await original(node, input_data, context)
+
+        monkeypatch.setattr(engine, '_execute_transform', tracked_transform)
+        first = await engine.execute_workflow(workflow, {})
+        assert first.status == 'error'
+
+        fail_b = False
+        resumed = await engine.resume_workflow(first.executionId)
+        assert resumed.status == 'success'
+        assert resumed.nodeResults == {"a": 1, "b": 2}
+        assert calls == ['a', 'b', 'b']
+        # Nothing left to resume once it succeeded
+        assert execution_journal.load(first.executionId) is None
+
+    def test_stale_journals_are_pruned(self, execution_journal):
+        for name in ('old', 'fresh'):
+            (execution_journal.journal_dir / f"{name}.jsonl").write_text('{"type": "start"}\n')
+        stale = time.time() - 8 * 86400
+        os.utime(execution_journal.journal_dir / 'old.jsonl', (stale, stale))
+
+        assert execution_journal.prune(max_age_seconds=7 * 86400) == 1
+        assert execution_journal.list_executions() == ['fresh']
+
+class TestNodeMemoization:
+    @pytest.mark.asyncio
+    async def test_cached_node_reused_across_runs(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(engine_module, 'node_output_cache', NodeOutputCache(tmp_path / 'cache.sqlite3'))
+        engine = LocalWorkflowEngine()
+        workflow = Workflow(**{
+            "id": "wf-cache",
+            "name": "Cache",
+            "description": "Memoized transform feeding a storage write",
+            "startNode": "t",
+            "nodes": [
+                {"id": "t", "type": "transform_data", "name": "T", "config": {"transformScript": "return input['n'] * 10", "cache": "forever"}},
+                {"id": "w", "type": "storage_write", "name": "W", "config": {"key": "memo_test", "data": {"ok": True}, "cache": "forever"}}
+            ],
+            "connections": [{"from": "t", "to": "w"}]
+        })
+
+        calls = []
+        original = engine._execute_transform
+
+        async def tracked_transform(node, input_data, context):
+            calls.append(node.id)
+            return await original(node, input_data, context)
+
+        async def fake_storage_write(node, input_data, context):
+            return {"success": True}
+
+        monkeypatch.setattr(engine, '_execute_transform', tracked_transform)
+        monkeypatch.setattr(engine, '_execute_storage_write', fake_storage_write)
+        first = await engine.execute_workflow(workflow, {"n": 4})
+        second = await engine.execute_workflow(workflow, {"n": 4})
+        third = await engine.execute_workflow(workflow, {"n": 5})
+
+        assert calls == ['t', 't']
+        assert first.nodeResults['$cache'] == {"t": "miss"}
+        assert second.nodeResults['$cache'] == {"t": "hit"}
+        assert second.nodeResults['t'] == 40 and third.nodeResults['t'] == 50
+
+    @pytest.mark.asyncio
+    async def test_key_covers_only_referenced_inputs(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(engine_module, 'node_output_cache', NodeOutputCache(tmp_path / 'cache.sqlite3'))
+        engine = LocalWorkflowEngine()
+        workflow = Workflow(**{
+            "id": "wf-llm-cache",
+            "name": "LLM cache",
+            "description": "Cached prompt after a node whose output changes every run",
+            "startNode": "t",
+            "nodes": [
+                {"id": "t", "type": "transform_data", "name": "T", "config": {"transformScript": "return input['run']"}},
+                {"id": "l", "type": "llm_call", "name": "L", "config": {"prompt": "Summarize {{topic}}", "cache": "forever"}}
+            ],
+            "connections": [{"from": "t", "to": "l"}]
+        })
+        prompts = []
+
+        async def fake_llm_call(node, input_data, context):
+            prompts.append(engine._templates(node, context).prompt.render(input_data))
+            return {"text": prompts[-1]}
+
+        monkeypatch.setattr(engine, '_execute_llm_call', fake_llm_call)
+        first = await engine.execute_workflow(workflow, {"topic": "tides", "run": 1})
+        second = await engine.execute_workflow(workflow, {"topic": "tides", "run": 2})
+        third = await engine.execute_workflow(workflow, {"topic": "winds", "run": 3})
+
+        assert prompts == ["Summarize tides", "Summarize winds"]
+        assert [r.nodeResults['$cache']['l'] for r in (first, second, third)] == ['miss', 'hit', 'miss']
+
+    @pytest.mark.asyncio
+    async def test_restored_nodes_bypass_the_cache(self, tmp_path, monkeypatch):
+        cache = NodeOutputCache(tmp_path / 'cache.sqlite3')
+        monkeypatch.setattr(engine_module, 'node_output_cache', cache)
+        engine = LocalWorkflowEngine()
+        workflow = Workflow(**{
+            "id": "wf-resume-cache",
+            "name": "Resume cache",
+            "description": "Cached node restored from the journal",
+            "startNode": "a",
+            "nodes": [
+                {"id": "a", "type": "transform_data", "name": "A", "config": {"transformScript": "return 1", "cache": "forever"}},
+                {"id": "b", "type": "transform_data", "name": "B", "config": {"transformScript": "return 1 / 0"}}
+            ],
+            "connections": [{"from": "a", "to": "b"}]
+        })
+        first = await engine.execute_workflow(workflow, {})
+        assert first.status == 'error' and cache.get_stats()['entries'] == 1
+        cache.clear()
+
+        resumed = await engine.resume_workflow(first.executionId)
+        assert resumed.nodeResults['a'] == 1 and '$cache' not in resumed.nodeResults
+        assert cache.get_stats()['entries'] == 0
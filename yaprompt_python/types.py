@@ -118,6 +118,8 @@ class ExecutionProgress(BaseModel):
     status: Literal['running', 'completed', 'error']
     message: Optional[str] = None
     nodesExecuted: Optional[int] = None 
+    nodeId: Optional[str] = None
+    durationMs: Optional[float] = None # Set on node/step completion events
 
 # ============================================================================
 # LOCAL WORKFLOW ENGINE TYPES (from LocalWorkflowEngine.ts)
@@ -144,6 +146,8 @@ class NodeConfig(BaseModel):
     headers: Optional[Dict[str, str]] = None
     body: Optional[Any] = None
     transformScript: Optional[str] = None
+    cpuTimeLimit: Optional[float] = None # Seconds of CPU for transform/condition scripts
+    runInProcessPool: Optional[bool] = None # Run heavy transforms off the event loop
     mapping: Optional[Dict[str, str]] = None
     fields: Optional[List[str]] = None
     jsonPath: Optional[str] = None
@@ -155,9 +159,13 @@ class NodeConfig(BaseModel):
     falseNode: Optional[str] = None
     items: Optional[str] = None
     loopNode: Optional[str] = None
+    concurrency: Optional[int] = None # Loop iterations in flight at once (default 1)
+    errorMode: Optional[Literal['fail_fast', 'collect_errors']] = None
     key: Optional[str] = None
     data: Optional[Any] = None
     inputMapping: Optional[Dict[str, str]] = None
+    cache: Optional[Literal['off', 'ttl', 'forever']] = None # Memoize output across runs
+    cacheTtl: Optional[float] = None # Seconds, for cache='ttl'
     model_config = {'extra': 'allow'}
 
 class WorkflowNode(BaseModel):
@@ -195,6 +203,10 @@ class WorkflowExecutionContext(BaseModel):
     variables: Dict[str, Any]
     startTime: int
     apiKey: Optional[str] = None
+    workflowVersion: Optional[str] = None # Keys per-version caches (compiled templates)
+    restoredOutputs: Dict[str, Any] = {} # Journaled outputs reused when resuming
+    checkpoint: bool = True # Journal node outputs (off inside loop iterations)
+    cacheStatus: Dict[str, str] = {} # nodeId -> 'hit' | 'miss' for cache-enabled nodes
 
 class WorkflowExecutionResult(BaseModel):
     executionId: str
@@ -226,3 +238,16 @@ class StoredAgent(BaseModel):
     workflow: Optional[Workflow] = None
     config: Optional[AgentConfig] = None
     metadata: StoredAgentMetadata
+
+# ============================================================================
+# COGNITIVE ENGINE TYPES
+# ============================================================================
+
+class CognitiveEvent(BaseModel):
+    type: Literal['activity', 'assessment']
+    subject: Optional[str] = None # activity
+    topic: Optional[str] = None # assessment
+    duration: Optional[float] = None # minutes
+    performance: Optional[float] = None
+    score: Optional[float] = None
+    timestamp: Optional[float] = None # ms since epoch, defaults to now
@@ -0,0 +1,203 @@
+"""
+Prometheus-style metrics with no external dependency.
+
+Everything runs on the event loop thread, so counters are plain dict
+updates with no locking. Values owned by services (queue depths, memory
+size, provider circuit state) are read by collectors at scrape time
+instead of being pushed on every change.
+"""
+
+import bisect
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Seconds; roughly log-spaced from fast local calls to slow LLM generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        self.values[label_values] = self.values.get(label_values, 0.0) + amount
+
+    def render(self) -> Iterable[str]:
+        for key, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value: float, *label_values: str):
+        self.values[label_values] = value
+
+    def dec(self, *label_values: str, amount: float = 1.0):
+        self.values[label_values] = self.values.get(label_values, 0.0) - amount
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self.values: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, *label_values: str):
+        series = self.values.get(label_values)
+        if series is None:
+            series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            self.values[label_values] = series
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def time(self, *label_values: str) -> '_Timer':
+        return _Timer(self, label_values)
+
+    def render(self) -> Iterable[str]:
+        for key, (counts, total, count) in self.values.items():
+            yield from render_histogram(self.name, self.labels, key, self.buckets, counts, total, count)
+
+class _Timer:
+    __slots__ = ('histogram', 'label_values', 'start')
+
+    def __init__(self, histogram: Histogram, label_values: Tuple[str, ...]):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+        return False
+
+def sample(name: str, value: float, **labels: Any) -> str:
+    """One exposition line, for collectors that report values they don't own."""
+    names = tuple(labels)
+    return f"{name}{_format_labels(names, tuple(labels[n] for n in names))} {_format_value(value)}"
+
+def render_histogram(
+    name: str,
+    label_names: Tuple[str, ...],
+    label_values: Tuple[str, ...],
+    buckets: Iterable[float],
+    counts: List[int],
+    total: float,
+    count: int
+) -> Iterable[str]:
+    """Render non-cumulative bucket counts (last = overflow) as a Prometheus histogram."""
+    cumulative = 0
+    for bound, c in zip(list(buckets) + [float('inf')], counts):
+        cumulative += c
+        le = 'le="%s"' % _format_value(bound)
+        yield f"{name}_bucket{_format_labels(label_names, label_values, le)} {cumulative}"
+    yield f"{name}_sum{_format_labels(label_names, label_values)} {_format_value(total)}"
+    yield f"{name}_count{_format_labels(label_names, label_values)} {count}"
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+        self.http_requests = self.counter('promptforge_http_requests_total', 'HTTP requests by route and status', ('method', 'route', 'status'))
+        self.http_latency = self.histogram('promptforge_http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route'))
+        self.http_in_flight = self.gauge('promptforge_http_requests_in_flight', 'HTTP requests currently being served')
+        self.llm_latency = self.histogram('promptforge_llm_request_duration_seconds', 'LLM call latency by provider', ('provider',))
+        self.llm_errors = self.counter('promptforge_llm_errors_total', 'Failed LLM calls by provider', ('provider',))
+        self.storage_latency = self.histogram('promptforge_storage_duration_seconds', 'Local storage latency by operation', ('operation',))
+        self.memory_retrieval_latency = self.histogram('promptforge_memory_retrieval_duration_seconds', 'Continuum memory retrieval latency')
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]):
+        """collector() yields complete exposition lines (including HELP/TYPE)."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+
+# ============================================================================
+# ASGI MIDDLEWARE
+# ============================================================================
+
+class MetricsMiddleware:
+    """Records latency, status and in-flight count for every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        metrics.http_in_flight.inc()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.http_in_flight.dec()
+            # Route template, not the raw path, to keep label cardinality bounded
+            route = getattr(scope.get('route'), 'path', None) or 'unmatched'
+            method = scope['method']
+            metrics.http_latency.observe(time.perf_counter() - start, method, route)
+            metrics.http_requests.inc(method, route, str(status))
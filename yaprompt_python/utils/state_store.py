@@ -0,0 +1,331 @@
+"""
+Shared State Store
+Versioned key/value state shared by every API worker process
+
+Services that used to keep their state in process-local dicts read and
+write it here instead, so all uvicorn workers see the same approvals,
+sessions and values. Every record carries a version; writes can be made
+conditional on the version that was read (optimistic concurrency), and
+`update` retries a read-modify-write until it lands without a conflict.
+
+Backends:
+- memory: process-local, the default for a single worker and for tests
+- sqlite: one file shared by all workers on a host (WAL mode)
+- redis:  any Redis-protocol server (redis, valkey, keydb...), for
+          workers spread over hosts; needs the optional `redis` package
+"""
+
+import copy
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..config import Config
+
+DEFAULT_UPDATE_RETRIES = 20
+
+# ============================================================================
+# ERRORS
+# ============================================================================
+
+class VersionConflict(Exception):
+    """A conditional write lost the race against another writer."""
+
+    def __init__(self, namespace: str, key: str, expected: Optional[int], actual: Optional[int]):
+        super().__init__(f"Version conflict on {namespace}/{key}: expected {expected}, found {actual}")
+        self.namespace = namespace
+        self.key = key
+        self.expected = expected
+        self.actual = actual
+
+# ============================================================================
+# BASE
+# ============================================================================
+
+class StateStore:
+    """
+    Versions start at 1 on insert. `expected_version` semantics for writes:
+    None = unconditional, 0 = key must not exist, n = current version must be n.
+    """
+
+    def get(self, namespace: str, key: str) -> Tuple[Optional[Any], int]:
+        """Return (value, version); (None, 0) when missing."""
+        raise NotImplementedError
+
+    def put(self, namespace: str, key: str, value: Any, expected_version: Optional[int] = None) -> int:
+        """Write the value and return the new version."""
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str, expected_version: Optional[int] = None) -> bool:
+        """Delete the key; False when it was already gone."""
+        raise NotImplementedError
+
+    def put_many(self, namespace: str, values: Dict[str, Any]):
+        """Unconditional writes of several keys, in one transaction where the backend has them."""
+        for key, value in values.items():
+            self.put(namespace, key, value)
+
+    def items(self, namespace: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def count(self, namespace: str) -> int:
+        return len(self.items(namespace))
+
+    def clear(self, namespace: str):
+        raise NotImplementedError
+
+    def value(self, namespace: str, key: str, default: Any = None) -> Any:
+        value, version = self.get(namespace, key)
+        return value if version else default
+
+    def update(
+        self,
+        namespace: str,
+        key: str,
+        fn: Callable[[Optional[Any]], Any],
+        retries: int = DEFAULT_UPDATE_RETRIES
+    ) -> Any:
+        """
+        Apply `fn(current) -> new` atomically with respect to other writers.
+        `fn` may be called several times and must not have side effects.
+        """
+        for _ in range(retries):
+            current, version = self.get(namespace, key)
+            new = fn(current)
+            try:
+                self.put(namespace, key, new, expected_version=version)
+                return new
+            except VersionConflict:
+                continue
+        raise VersionConflict(namespace, key, None, None)
+
+# ============================================================================
+# MEMORY BACKEND
+# ============================================================================
+
+class MemoryStateStore(StateStore):
+    def __init__(self):
+        self._data: Dict[str, Dict[str, Tuple[Any, int]]] = {}
+        self._lock = threading.Lock()
+
+    def _check(self, namespace: str, key: str, expected: Optional[int]) -> int:
+        _, version = self._data.get(namespace, {}).get(key, (None, 0))
+        if expected is not None and expected != version:
+            raise VersionConflict(namespace, key, expected, version)
+        return version
+
+    def get(self, namespace: str, key: str) -> Tuple[Optional[Any], int]:
+        with self._lock:
+            value, version = self._data.get(namespace, {}).get(key, (None, 0))
+        # Callers mutate what they read; never hand out the stored object
+        return copy.deepcopy(value), version
+
+    def put(self, namespace: str, key: str, value: Any, expected_version: Optional[int] = None) -> int:
+        value = copy.deepcopy(value)
+        with self._lock:
+            version = self._check(namespace, key, expected_version) + 1
+            self._data.setdefault(namespace, {})[key] = (value, version)
+        return version
+
+    def delete(self, namespace: str, key: str, expected_version: Optional[int] = None) -> bool:
+        with self._lock:
+            self._check(namespace, key, expected_version)
+            return self._data.get(namespace, {}).pop(key, None) is not None
+
+    def items(self, namespace: str) -> Dict[str, Any]:
+        with self._lock:
+            entries = dict(self._data.get(namespace, {}))
+        return {k: copy.deepcopy(v) for k, (v, _) in entries.items()}
+
+    def count(self, namespace: str) -> int:
+        return len(self._data.get(namespace, {}))
+
+    def clear(self, namespace: str):
+        with self._lock:
+            self._data.pop(namespace, None)
+
+# ============================================================================
+# SQLITE BACKEND
+# ============================================================================
+
+class SQLiteStateStore(StateStore):
+    def __init__(self, db_path: Path = Config.DATA_DIR / 'state.sqlite3'):
+        self.db_path = Path(db_path)
+        # One connection per thread; SQLite itself serializes writers across processes
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS state (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _version(self, conn: sqlite3.Connection, namespace: str, key: str) -> int:
+        row = conn.execute("SELECT version FROM state WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+        return row[0] if row else 0
+
+    def get(self, namespace: str, key: str) -> Tuple[Optional[Any], int]:
+        row = self._conn().execute(
+            "SELECT value, version FROM state WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else (None, 0)
+
+    def put(self, namespace: str, key: str, value: Any, expected_version: Optional[int] = None) -> int:
+        conn = self._conn()
+        payload = json.dumps(value, default=str)
+        # IMMEDIATE takes the write lock up front so the version check and write are atomic
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = self._version(conn, namespace, key)
+            if expected_version is not None and expected_version != version:
+                raise VersionConflict(namespace, key, expected_version, version)
+            conn.execute(
+                "INSERT INTO state (namespace, key, value, version, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, "
+                "version = excluded.version, updated_at = excluded.updated_at",
+                (namespace, key, payload, version + 1, time.time())
+            )
+            conn.execute("COMMIT")
+            return version + 1
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, namespace: str, key: str, expected_version: Optional[int] = None) -> bool:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = self._version(conn, namespace, key)
+            if expected_version is not None and expected_version != version:
+                raise VersionConflict(namespace, key, expected_version, version)
+            conn.execute("DELETE FROM state WHERE namespace = ? AND key = ?", (namespace, key))
+            conn.execute("COMMIT")
+            return version > 0
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def put_many(self, namespace: str, values: Dict[str, Any]):
+        now = time.time()
+        rows = [(namespace, key, json.dumps(value, default=str), now) for key, value in values.items()]
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO state (namespace, key, value, version, updated_at) VALUES (?, ?, ?, 1, ?) "
+                "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, "
+                "version = state.version + 1, updated_at = excluded.updated_at",
+                rows
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def items(self, namespace: str) -> Dict[str, Any]:
+        rows = self._conn().execute("SELECT key, value FROM state WHERE namespace = ?", (namespace,)).fetchall()
+        return {k: json.loads(v) for k, v in rows}
+
+    def count(self, namespace: str) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM state WHERE namespace = ?", (namespace,)).fetchone()[0]
+
+    def clear(self, namespace: str):
+        self._conn().execute("DELETE FROM state WHERE namespace = ?", (namespace,))
+
+# ============================================================================
+# REDIS BACKEND
+# ============================================================================
+
+# Compare-and-set in one round trip: KEYS[1]=hash, ARGV = field, expected|-1, value
+_REDIS_CAS = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+local version = 0
+if current then version = tonumber(cjson.decode(current)[1]) end
+if ARGV[2] ~= '-1' and tonumber(ARGV[2]) ~= version then return {0, version} end
+if ARGV[3] == '' then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+else
+    redis.call('HSET', KEYS[1], ARGV[1], cjson.encode({version + 1, ARGV[3]}))
+end
+return {1, version}
+"""
+
+class RedisStateStore(StateStore):
+    """One hash per namespace; each field holds [version, json value]."""
+
+    def __init__(self, url: str = 'redis://localhost:6379/0', prefix: str = 'promptforge:state:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("STATE_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._cas = self._client.register_script(_REDIS_CAS)
+
+    def _hash(self, namespace: str) -> str:
+        return f"{self.prefix}{namespace}"
+
+    def _write(self, namespace: str, key: str, payload: str, expected_version: Optional[int]) -> int:
+        expected = -1 if expected_version is None else expected_version
+        ok, version = self._cas(keys=[self._hash(namespace)], args=[key, expected, payload])
+        if not ok:
+            raise VersionConflict(namespace, key, expected_version, int(version))
+        return int(version)
+
+    def get(self, namespace: str, key: str) -> Tuple[Optional[Any], int]:
+        raw = self._client.hget(self._hash(namespace), key)
+        if raw is None:
+            return None, 0
+        version, payload = json.loads(raw)
+        return json.loads(payload), int(version)
+
+    def put(self, namespace: str, key: str, value: Any, expected_version: Optional[int] = None) -> int:
+        return self._write(namespace, key, json.dumps(value, default=str), expected_version) + 1
+
+    def delete(self, namespace: str, key: str, expected_version: Optional[int] = None) -> bool:
+        return self._write(namespace, key, '', expected_version) > 0
+
+    def items(self, namespace: str) -> Dict[str, Any]:
+        entries = self._client.hgetall(self._hash(namespace))
+        return {k.decode(): json.loads(json.loads(raw)[1]) for k, raw in entries.items()}
+
+    def count(self, namespace: str) -> int:
+        return self._client.hlen(self._hash(namespace))
+
+    def clear(self, namespace: str):
+        self._client.delete(self._hash(namespace))
+
+# ============================================================================
+# FACTORY
+# ============================================================================
+
+def create_state_store(backend: Optional[str] = None) -> StateStore:
+    backend = (backend or Config.STATE_BACKEND).lower()
+    if backend == 'memory':
+        return MemoryStateStore()
+    if backend == 'sqlite':
+        return SQLiteStateStore()
+    if backend == 'redis':
+        return RedisStateStore(Config.STATE_REDIS_URL)
+    raise ValueError(f"Unknown STATE_BACKEND: {backend}")
+
+# Singleton instance
+state_store = create_state_store()
@@ -4,6 +4,7 @@ from pathlib import Path
 from typing import Dict, Any, List, Union
 import aiofiles
 from ..config import Config
+from .metrics import metrics
 
 class LocalStorage:
     def __init__(self):
@@ -28,7 +29,8 @@ class LocalStorage:
         Mimics chrome.storage.local.get
         """
         # Reload to capture external changes (simplistic approach)
-        self._reload()
+        with metrics.storage_latency.time('read'):
+            self._reload()
         
         if keys is None:
             return self._cache
@@ -42,9 +44,10 @@ class LocalStorage:
         """
         Mimics chrome.storage.local.set
         """
-        self._reload()
-        self._cache.update(items)
-        await self._save()
+        with metrics.storage_latency.time('write'):
+            self._reload()
+            self._cache.update(items)
+            await self._save()
 
     async def remove(self, keys: Union[str, List[str]]):
         self._reload()